@@ -0,0 +1,289 @@
+# analytics_store.py - Unified, typed analytics store over every file in data/
+# Ingests all five sources with an explicit compact schema (ordered categoricals, downcast ints,
+# float32) and caches the result as columnar Parquet so later processes skip Excel parsing.
+# pandas is imported where tables are built or queried; cached_summary() answers row counts and
+# memory from the cache manifest alone, so a cold app start does not pay for pandas.
+
+import json
+from pathlib import Path
+
+DATA_DIR = Path("data")
+ANALYTICS_CACHE_DIR = Path(".cache") / "analytics"
+
+PHOTO_CSV = "Photography_Business_Master_Analytics_With_PostingTimes.csv"
+CLUSTERING_XLSX = "Clustering_Marketing_FinalClean.xlsx"
+VIRAL_XLSX = "Viral_Social_Media_Trends_FinalClean.xlsx"
+RUTH_STATS_XLSX = "Ruth_AUTHENTIC_Combined_Stats_CORRECTED.xlsx"
+RUTH_5WEEK_XLSX = "Ruth_Complete_5Week_Data_With_Interactive_Stories.xlsx"
+
+SOURCE_FILES = [PHOTO_CSV, CLUSTERING_XLSX, VIRAL_XLSX, RUTH_STATS_XLSX, RUTH_5WEEK_XLSX]
+
+# ==========================================
+# SCHEMA
+# ==========================================
+
+DAY_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MONTH_ORDER = ["January", "February", "March", "April", "May", "June",
+               "July", "August", "September", "October", "November", "December"]
+LEVEL_ORDER = ["Low", "Medium", "High", "Very High"]
+
+# categories: column -> ordered category list (None = unordered, categories taken from data)
+SCHEMAS = {
+    "daily": {
+        "categories": {
+            "Day_of_Week": DAY_ORDER,
+            "MonthName": MONTH_ORDER,
+            "Dominant_Device": None,
+            "Website_Activity_Level": LEVEL_ORDER,
+            "PT_Level": LEVEL_ORDER,
+            "Instagram_Posting_Time": None,
+            "Facebook_Posting_Time": None,
+        },
+        "dates": {"Date": "%d/%m/%Y"},
+        "bools": ["Is_Weekend", "Instagram_Peak_Time_Match", "Facebook_Peak_Time_Match"],
+        "drop": ["Date_DMY"],
+    },
+    "audience": {
+        "categories": {"gender": None, "age_group": None},
+    },
+    "viral": {
+        "categories": {"Platform": None, "Hashtag": None, "Content_Type": None, "Region": None,
+                       "Engagement_Level": ["low", "medium", "high"]},
+    },
+    "posts": {
+        "categories": {"Platform": None, "Day_of_Week": DAY_ORDER, "post_type": None,
+                       "content_category": None, "performance_category": None, "source": None},
+        "strings": ["post_id", "caption", "hashtags"],
+    },
+    "interactive": {
+        "categories": {"type": None},
+    },
+}
+
+# Post-level columns shared by both Ruth_* workbooks
+POST_METRICS = ["reach", "views", "likes", "comments", "shares", "saves", "total_engagement"]
+POST_RATES = ["engagement_rate_reach", "engagement_rate_views"]
+
+# ==========================================
+# COMPACTION
+# ==========================================
+
+def _downcast(series):
+    """Smallest integer type for whole-number columns, float32 for the rest"""
+    import pandas as pd
+
+    if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+        return series
+    if pd.api.types.is_float_dtype(series):
+        if series.isna().any() or not (series % 1 == 0).all():
+            return series.astype("float32")
+    if series.empty:
+        return series
+    return pd.to_numeric(series, downcast="unsigned" if series.min() >= 0 else "integer")
+
+def apply_schema(df, table):
+    """Convert a raw frame to the table's compact schema"""
+    import pandas as pd
+
+    schema = SCHEMAS[table]
+    df = df.drop(columns=[c for c in schema.get("drop", []) if c in df.columns])
+
+    for column, date_format in schema.get("dates", {}).items():
+        df[column] = pd.to_datetime(df[column], format=date_format)
+    for column in schema.get("bools", []):
+        df[column] = df[column].fillna(False).astype(bool)
+    for column, order in schema.get("categories", {}).items():
+        if column in df.columns:
+            df[column] = pd.Categorical(df[column], categories=order, ordered=order is not None)
+    for column in schema.get("strings", []):
+        df[column] = df[column].astype("string")
+
+    for column in df.columns:
+        df[column] = _downcast(df[column])
+    return df
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+# ==========================================
+# INGESTION
+# ==========================================
+
+def _excel_datetime(series):
+    """Excel serial numbers or parsed datetimes -> datetime64"""
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(series):
+        return pd.to_datetime(series, unit="D", origin="1899-12-30")
+    return pd.to_datetime(series)
+
+def _normalise_posts(df, source):
+    """Map one Ruth_* post sheet onto the shared post-level columns"""
+    import pandas as pd
+
+    published = _excel_datetime(df["nz_datetime"])
+    caption = df["unified_caption"] if "unified_caption" in df.columns else df["caption"]
+    hashtags = df["hashtags"].fillna("").astype(str)
+    emojis = df["emojis"].fillna("").astype(str)
+
+    posts = pd.DataFrame({
+        "post_id": df["post_id"].astype(str).str.replace(r"\.0$", "", regex=True),
+        "Platform": df["platform"],
+        "post_type": df["post_type"],
+        "published": published,
+        "Day_of_Week": published.dt.day_name(),
+        "hour": published.dt.hour,
+        "caption": caption.fillna(""),
+        "hashtags": hashtags,
+        "hashtag_count": df["hashtag_count"] if "hashtag_count" in df.columns else hashtags.str.count("#"),
+        "emoji_count": df["emoji_count"] if "emoji_count" in df.columns else emojis.str.len(),
+        "content_category": df["content_category"],
+        "performance_category": df["performance_category"],
+        "source": source,
+    })
+    for column in POST_METRICS:
+        posts[column] = pd.to_numeric(df.get(column), errors="coerce").fillna(0)
+    for column in POST_RATES:
+        posts[column] = pd.to_numeric(df.get(column), errors="coerce")
+    return posts
+
+def ingest_sources(data_dir=DATA_DIR):
+    """Read every data/ file with default pandas dtypes; returns {table: raw DataFrame}"""
+    import pandas as pd
+
+    data_dir = Path(data_dir)
+    five_week = pd.read_excel(data_dir / RUTH_5WEEK_XLSX, sheet_name=["All_Posts_Clean", "Interactive_Elements"])
+
+    posts = pd.concat([
+        _normalise_posts(pd.read_excel(data_dir / RUTH_STATS_XLSX, sheet_name="All_Posts_Corrected"), "Combined_Stats"),
+        _normalise_posts(five_week["All_Posts_Clean"], "5Week_Interactive"),
+    ], ignore_index=True)
+    posts = posts.drop_duplicates(subset=["Platform", "post_id", "published"]).reset_index(drop=True)
+
+    return {
+        "daily": pd.read_csv(data_dir / PHOTO_CSV),
+        "audience": pd.read_excel(data_dir / CLUSTERING_XLSX),
+        "viral": pd.read_excel(data_dir / VIRAL_XLSX),
+        "posts": posts,
+        "interactive": five_week["Interactive_Elements"],
+    }
+
+# ==========================================
+# CACHE MANIFEST
+# ==========================================
+
+def source_fingerprint(data_dir=DATA_DIR):
+    return {name: (Path(data_dir) / name).stat().st_mtime_ns for name in SOURCE_FILES}
+
+def _read_manifest(cache_dir):
+    manifest_path = Path(cache_dir) / "manifest.json"
+    return json.loads(manifest_path.read_text()) if manifest_path.exists() else None
+
+def memory_report(memory):
+    """Raw vs compact resident bytes per table, plus totals"""
+    raw = sum(m["raw_bytes"] for m in memory.values())
+    compact = sum(m["compact_bytes"] for m in memory.values())
+    return {"tables": memory, "raw_bytes": raw, "compact_bytes": compact,
+            "saving_pct": round((1 - compact / raw) * 100, 1) if raw else 0.0}
+
+def cached_summary(data_dir=DATA_DIR, cache_dir=ANALYTICS_CACHE_DIR):
+    """(row counts, memory report) from a cache manifest matching the sources, else None - no pandas needed"""
+    manifest = _read_manifest(cache_dir)
+    if not manifest or manifest.get("sources") != source_fingerprint(data_dir):
+        return None
+    return {name: m["rows"] for name, m in manifest["memory"].items()}, memory_report(manifest["memory"])
+
+# ==========================================
+# STORE
+# ==========================================
+
+class AnalyticsStore:
+    """Typed in-memory tables plus a small query API over the post-level data"""
+
+    def __init__(self, tables, memory):
+        self.tables = tables
+        self.memory = memory  # table -> {"raw_bytes": ..., "compact_bytes": ...}
+
+    def __getattr__(self, name):
+        tables = self.__dict__.get("tables", {})
+        if name in tables:
+            return tables[name]
+        raise AttributeError(name)
+
+    @classmethod
+    def load(cls, data_dir=DATA_DIR, cache_dir=ANALYTICS_CACHE_DIR):
+        """Load from the Parquet cache when it matches the source files, otherwise ingest"""
+        import pandas as pd
+
+        data_dir, cache_dir = Path(data_dir), Path(cache_dir)
+        fingerprint = source_fingerprint(data_dir)
+        manifest = _read_manifest(cache_dir)
+
+        if manifest and manifest.get("sources") == fingerprint:
+            try:
+                tables = {name: pd.read_parquet(cache_dir / f"{name}.parquet") for name in SCHEMAS}
+                return cls(tables, manifest["memory"])
+            except (ImportError, OSError, ValueError):
+                pass  # no Parquet engine or damaged cache - rebuild below
+
+        raw = ingest_sources(data_dir)
+        tables, memory = {}, {}
+        for name, frame in raw.items():
+            raw_bytes = frame_bytes(frame)
+            tables[name] = apply_schema(frame, name)
+            memory[name] = {"rows": len(frame), "raw_bytes": raw_bytes, "compact_bytes": frame_bytes(tables[name])}
+
+        store = cls(tables, memory)
+        store.write_cache(cache_dir, fingerprint)
+        return store
+
+    def write_cache(self, cache_dir, fingerprint):
+        """Persist tables as Parquet (skipped when no Parquet engine is installed)"""
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            for name, frame in self.tables.items():
+                frame.to_parquet(cache_dir / f"{name}.parquet", index=False)
+        except (ImportError, OSError):
+            return
+        manifest = {"sources": fingerprint, "memory": self.memory}
+        (cache_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+    # ------------------------------------------
+    # Query API
+    # ------------------------------------------
+
+    def summary(self):
+        """Row counts per table"""
+        return {name: len(frame) for name, frame in self.tables.items()}
+
+    def memory_report(self):
+        """Raw vs compact resident bytes per table, plus totals"""
+        return memory_report(self.memory)
+
+    def query_posts(self, platform=None, day=None, content_category=None, start=None, end=None, columns=None):
+        """Filter the combined Ruth_* post-level data"""
+        import pandas as pd
+
+        posts = self.tables["posts"]
+        mask = pd.Series(True, index=posts.index)
+        if platform:
+            mask &= posts["Platform"] == platform
+        if day:
+            mask &= posts["Day_of_Week"] == day
+        if content_category:
+            mask &= posts["content_category"] == content_category
+        if start is not None:
+            mask &= posts["published"] >= pd.Timestamp(start)
+        if end is not None:
+            mask &= posts["published"] <= pd.Timestamp(end)
+        result = posts.loc[mask]
+        return result[columns] if columns else result
+
+    def engagement_by(self, dimension, metric="total_engagement", platform=None, agg="mean"):
+        """Aggregate a post metric by one dimension (e.g. Day_of_Week, hour, content_category)"""
+        posts = self.query_posts(platform=platform)
+        return posts.groupby(dimension, observed=True)[metric].agg(agg).sort_values(ascending=False)
+
+    def best_posting_hours(self, platform=None, top_n=3):
+        """Hours of day with the highest mean engagement"""
+        return list(self.engagement_by("hour", platform=platform).head(top_n).index)
@@ -0,0 +1,550 @@
+# api_service.py - Async HTTP API (ASGI) for CMS and scheduler integrations
+# Wraps the same pipeline as the Streamlit app - persona and hashtag selection, prompt building,
+# Claude/DALL-E calls under deadlines and a circuit breaker, scoring - behind JSON endpoints with
+# request validation, per-endpoint concurrency limits, idempotency keys, response caching and an
+# OpenAPI schema. It shares .cache/ with the app (image cache, pre-warmed and last-good caption
+# results, cost ledger), so run it from the same directory alongside `streamlit run`:
+#
+#   uvicorn api_service:app --port 8600 --workers 2
+#   curl -X POST localhost:8600/v1/captions -H 'Content-Type: application/json' \
+#        -H 'Idempotency-Key: post-123' -d '{"platform": "Instagram", "campaign_type": "Music-Integrated Learning"}'
+#
+# Set CONTENT_SYNTH_API_TOKEN to require `Authorization: Bearer <token>` on /v1 routes.
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Any, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from brand_profiles import DEFAULT_TENANT, get_brand_profile, list_tenants
+from circuit_breaker import CircuitBreaker
+from content_engine import (SpendCapExceeded, auto_select_persona, generate_caption_set, generate_image_prompt,
+                            template_caption_set)
+from engagement_bandit import EngagementBandit
+from image_cache import ImageCache, make_image_key
+from image_delivery import ImageDelivery
+from image_generation import DALLE_MODEL, DALLE_QUALITY, create_image, dalle_size
+from insights_sql import prompt_insights
+from mock_backend import anthropic_client, openai_client, use_mock_backend
+from model_router import ModelRouter
+from request_executor import Deadline, RequestExecutor
+from response_cache import ResponseCache, make_response_key
+from token_budget import CostLedger
+
+API_VERSION = "1.0.0"
+CAPTION_CONCURRENCY = 16        # captions in flight per worker process (each holds a thread)
+IMAGE_CONCURRENCY = 4           # DALL-E generations in flight per worker process
+QUEUE_WAIT_SECONDS = 2.0        # wait for a free slot before answering 429
+CAPTION_DEADLINE_SECONDS = 20
+MAX_BODY_BYTES = 64 * 1024
+IDEMPOTENCY_PATH = Path(".cache") / "api_idempotency.sqlite3"
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+IDEMPOTENCY_STALE_SECONDS = 120  # an unfinished request older than this may be retried
+API_SESSION = "api"              # ledger session id for API spend
+VISUAL_STYLES = ("Abstract", "Modern", "Photographic", "Minimalist", "Vibrant", "Artistic")
+IMAGE_KEY = re.compile(r"^[0-9a-f]{64}$")
+PIXEL_SIZE = re.compile(r"^\d{2,4}x\d{2,4}$")
+
+class ApiError(Exception):
+    def __init__(self, status, error, detail=None, headers=None):
+        super().__init__(error)
+        self.status, self.error, self.detail, self.headers = status, error, detail, headers or {}
+
+def _secret(name):
+    """Environment variable, else the app's .streamlit/secrets.toml entry"""
+    value = os.environ.get(name)
+    secrets_path = Path(".streamlit") / "secrets.toml"
+    if not value and secrets_path.exists():
+        import tomllib
+
+        value = tomllib.loads(secrets_path.read_text(encoding="utf-8")).get(name)
+    return value
+
+# ==========================================
+# REQUEST / RESPONSE MODELS (also the OpenAPI schema)
+# ==========================================
+
+class CaptionRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    tenant: str = Field(DEFAULT_TENANT, description="Brand profile id (config/brands/<tenant>.json)")
+    platform: str = Field(..., description="One of the tenant's platforms, e.g. Instagram")
+    campaign_type: str = Field(..., description="One of the tenant's campaign types")
+    brand_tone: Optional[str] = Field(None, description="Defaults to the tenant's default tone")
+    course_title: str = Field("", max_length=200)
+    persona: Optional[str] = Field(None, description="Defaults to the campaign's persona")
+    n_candidates: int = Field(3, ge=1, le=5, description="Captions generated and ranked per call")
+    max_age_seconds: int = Field(0, ge=0, le=7 * 24 * 3600,
+                                 description="Reuse a live result for the same brief generated this recently")
+    use_prewarmed: bool = Field(True, description="Serve a result pre-generated by campaign_prewarm.py when queued")
+
+class CaptionResponse(BaseModel):
+    source: Literal["prewarmed", "cached", "live", "fallback"]
+    result: dict[str, Any]
+    alternatives: list[dict[str, Any]]
+
+class ImageRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    tenant: str = DEFAULT_TENANT
+    platform: str
+    ratio: Optional[str] = Field(None, description="One of the platform's image ratios; defaults to the first")
+    campaign_type: str
+    brand_tone: Optional[str] = None
+    course_title: str = Field("", max_length=200)
+    persona: Optional[str] = None
+    visual_style: Literal[VISUAL_STYLES] = "Modern"
+    keywords: str = Field("", max_length=300)
+    reuse_similar: bool = Field(False, description="Return a cached image with a near-identical prompt instead of generating")
+
+class ImageResponse(BaseModel):
+    key: str
+    source: Literal["cache", "similar", "generated"]
+    prompt: str
+    dalle_size: str
+    size: str
+    similarity: Optional[float] = None
+    urls: dict[str, str]
+
+class ErrorResponse(BaseModel):
+    error: str
+    detail: Any = None
+
+# ==========================================
+# IDEMPOTENCY KEYS (SQLite, shared by every worker process)
+# ==========================================
+
+class IdempotencyStore:
+    """Idempotency-Key -> stored response; the same key with the same body replays it
+
+    A key reused with a different body is rejected (422); a key whose first request is still
+    running gets 409. Responses that are worth retrying (429, 5xx) are not stored.
+    """
+
+    def __init__(self, path=IDEMPOTENCY_PATH, ttl_seconds=IDEMPOTENCY_TTL_SECONDS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS requests (
+                key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                status INTEGER,
+                body TEXT,
+                created REAL NOT NULL)""")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def begin(self, key, fingerprint):
+        """None if the caller should run the request, else the stored (status, body) to replay"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM requests WHERE created < ?", (now - self.ttl_seconds,))
+            row = conn.execute("SELECT fingerprint, status, body, created FROM requests WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is None and now - row[3] > IDEMPOTENCY_STALE_SECONDS):
+                conn.execute("INSERT OR REPLACE INTO requests (key, fingerprint, status, body, created) VALUES (?, ?, NULL, NULL, ?)",
+                             (key, fingerprint, now))
+                return None
+        if row[0] != fingerprint:
+            raise ApiError(422, "Idempotency-Key was already used with a different request body")
+        if row[1] is None:
+            raise ApiError(409, "A request with this Idempotency-Key is still in progress", headers={"Retry-After": "2"})
+        return row[1], row[2]
+
+    def finish(self, key, status, body):
+        with self._connect() as conn:
+            if status == 429 or status >= 500:
+                conn.execute("DELETE FROM requests WHERE key = ?", (key,))
+            else:
+                conn.execute("UPDATE requests SET status = ?, body = ? WHERE key = ?", (status, body, key))
+
+# ==========================================
+# CONCURRENCY LIMITS
+# ==========================================
+
+class ConcurrencyLimit:
+    """At most `limit` requests of one kind in flight; others wait up to max_wait_s, then get 429"""
+
+    def __init__(self, name, limit, max_wait_s=QUEUE_WAIT_SECONDS):
+        self.name = name
+        self.limit = limit
+        self.max_wait_s = max_wait_s
+        self.in_flight = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    @asynccontextmanager
+    async def slot(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.max_wait_s)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ApiError(429, f"Too many {self.name} requests in flight", headers={"Retry-After": "1"}) from None
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {"limit": self.limit, "in_flight": self.in_flight, "rejected": self.rejected}
+
+# ==========================================
+# SHARED SERVICES (one set per worker process)
+# ==========================================
+
+class Services:
+    """Clients, caches and limits shared by every request in this process"""
+
+    def __init__(self):
+        self.image_cache = ImageCache()
+        self.response_cache = ResponseCache()
+        self.ledger = CostLedger()
+        claude_breaker = CircuitBreaker("anthropic")
+        self.executor = RequestExecutor(breakers={"caption": claude_breaker, "length_retry": claude_breaker})
+        self.router = ModelRouter.from_file()
+        self.delivery = ImageDelivery(self.image_cache)
+        spend_cap = _secret("TENANT_SPEND_CAP_USD")
+        self.spend_cap_usd = float(spend_cap) if spend_cap else None
+        self.limits = {"captions": ConcurrencyLimit("caption", CAPTION_CONCURRENCY),
+                       "images": ConcurrencyLimit("image", IMAGE_CONCURRENCY)}
+        self.idempotency = IdempotencyStore()
+        self._lock = threading.Lock()
+        self._bandits = {}
+        self._anthropic = self._openai = self._index = None
+
+    def bandit(self, tenant):
+        with self._lock:
+            if tenant not in self._bandits:
+                self._bandits[tenant] = EngagementBandit.for_tenant(tenant)
+            return self._bandits[tenant]
+
+    def anthropic(self):
+        if self._anthropic is None:
+            api_key = None if use_mock_backend() else _secret("ANTHROPIC_API_KEY")
+            if not api_key and not use_mock_backend():
+                raise ApiError(503, "ANTHROPIC_API_KEY is not configured")
+            self._anthropic = anthropic_client(api_key)
+        return self._anthropic
+
+    def openai(self):
+        if self._openai is None:
+            api_key = None if use_mock_backend() else _secret("OPENAI_API_KEY")
+            if not api_key and not use_mock_backend():
+                raise ApiError(503, "OPENAI_API_KEY is not configured")
+            self._openai = openai_client(api_key)
+        return self._openai
+
+    def image_index(self):
+        """Prompt/perceptual-hash index, built on the first image request (numpy, disk scan)"""
+        with self._lock:
+            if self._index is None:
+                from image_similarity import ImageSimilarityIndex
+
+                self._index = ImageSimilarityIndex(self.image_cache)
+            return self._index
+
+# ==========================================
+# PIPELINE (runs in the thread pool)
+# ==========================================
+
+def resolve_brief(req):
+    """Profile, persona and tone for a request, validated against the tenant's brand profile"""
+    if req.tenant not in list_tenants():
+        raise ApiError(404, f"Unknown tenant '{req.tenant}'")
+    profile = get_brand_profile(req.tenant)
+    persona = req.persona or auto_select_persona(req.campaign_type, profile)
+    brand_tone = req.brand_tone or profile.default_brand_tone
+    errors = [f"{field} must be one of {sorted(options)}" for field, value, options in (
+        ("platform", req.platform, profile.platforms),
+        ("campaign_type", req.campaign_type, profile.campaign_types),
+        ("brand_tone", brand_tone, profile.brand_tones),
+        ("persona", persona, profile.personas),
+    ) if value not in options]
+    if errors:
+        raise ApiError(422, "Invalid brief", errors)
+    return profile, persona, brand_tone
+
+def run_caption(services, req):
+    profile, persona, brand_tone = resolve_brief(req)
+    response_key = make_response_key(req.tenant, req.platform, req.campaign_type, brand_tone, req.course_title,
+                                     req.n_candidates)
+    if req.use_prewarmed:
+        prewarmed = services.response_cache.take(response_key)
+        if prewarmed:
+            return {"source": "prewarmed", **prewarmed}
+    if req.max_age_seconds:
+        recent = services.response_cache.recall(response_key, max_age_seconds=req.max_age_seconds)
+        if recent:
+            return {"source": "cached", **recent}
+
+    def caption_fallback():
+        """Deadline missed or circuit open: last good result for this brief, else a local template caption"""
+        remembered = services.response_cache.recall(response_key)
+        if remembered:
+            remembered["result"]["fallback"] = "cached"
+            return remembered["result"], remembered["alternatives"]
+        return template_caption_set(persona, req.platform, req.campaign_type, brand_tone, req.course_title, profile,
+                                    n_candidates=req.n_candidates)
+
+    try:
+        result, alternatives = generate_caption_set(
+            services.anthropic(), persona, req.platform, req.campaign_type, brand_tone, req.course_title,
+            req.n_candidates, profile=profile, ledger=services.ledger,
+            ledger_tags={"session_id": API_SESSION, "tenant": req.tenant},
+            spend_cap_usd=services.spend_cap_usd, executor=services.executor,
+            deadline=Deadline(CAPTION_DEADLINE_SECONDS), fallback=caption_fallback, router=services.router,
+            bandit=services.bandit(req.tenant), insights=prompt_insights(req.platform),
+        )
+    except SpendCapExceeded as e:
+        raise ApiError(402, str(e)) from None
+    if result.get("fallback"):
+        return {"source": "fallback", "result": result, "alternatives": alternatives}
+    services.response_cache.remember(response_key, {"result": result, "alternatives": alternatives})
+    return {"source": "live", "result": result, "alternatives": alternatives}
+
+def run_image(services, req):
+    profile, persona, brand_tone = resolve_brief(req)
+    ratios = profile.platform_image_specs.get(req.platform, {})
+    ratio = req.ratio or next(iter(ratios), None)
+    if ratios and ratio not in ratios:
+        raise ApiError(422, "Invalid brief", [f"ratio must be one of {sorted(ratios)}"])
+    size = ratios[ratio]["size"] if ratio in ratios else "1024x1024"
+    width, height = map(int, size.split("x"))
+
+    prompt = generate_image_prompt(persona, req.campaign_type, req.course_title, brand_tone, req.visual_style, profile)
+    if req.keywords:
+        prompt = f"{prompt}. Additional elements: {req.keywords}"
+    model_size = dalle_size(width, height)
+
+    source, similarity = "cache", None
+    image = services.image_cache.get(make_image_key(prompt, model_size, DALLE_QUALITY, DALLE_MODEL))
+    if image is None and req.reuse_similar:
+        matches = services.image_index().similar_prompts(prompt, model_size, top_k=1)
+        if matches:
+            image, source, similarity = services.image_cache.peek(matches[0]["key"]), "similar", matches[0]["similarity"]
+    if image is None:
+        client = services.openai()
+        try:
+            image = create_image(client, prompt, model_size, services.image_cache, services.executor,
+                                 services.image_index())
+        except Exception as e:
+            raise ApiError(502, "Image generation failed", str(e)) from None
+        source = "generated"
+
+    base = f"/v1/images/{image.key}"
+    return {
+        "key": image.key, "source": source, "prompt": image.metadata.get("prompt", prompt),
+        "dalle_size": model_size, "size": size, "similarity": similarity,
+        "urls": {"preview": f"{base}?format=preview", "webp": f"{base}?format=webp&size={size}",
+                 "original": f"{base}?format=original"},
+    }
+
+# ==========================================
+# HTTP LAYER
+# ==========================================
+
+def error_response(error):
+    return JSONResponse({"error": error.error, "detail": error.detail}, status_code=error.status, headers=error.headers)
+
+def authorized(request):
+    token = os.environ.get("CONTENT_SYNTH_API_TOKEN")
+    return not token or request.headers.get("authorization") == f"Bearer {token}"
+
+async def json_endpoint(request, model, limit_name, work):
+    """Validate the body, honour Idempotency-Key, run work(services, req) in the thread pool under the limit"""
+    services = request.app.state.services
+    if not authorized(request):
+        return error_response(ApiError(401, "Missing or invalid bearer token"))
+    body = await request.body()
+    if len(body) > MAX_BODY_BYTES:
+        return error_response(ApiError(413, f"Request body over {MAX_BODY_BYTES} bytes"))
+    try:
+        req = model.model_validate_json(body or b"{}")
+    except ValidationError as e:
+        return error_response(ApiError(422, "Invalid request", e.errors(include_url=False, include_context=False, include_input=False)))
+
+    idempotency_key = request.headers.get("idempotency-key")
+    scoped_key = f"{request.url.path}:{idempotency_key}"
+    if idempotency_key:
+        fingerprint = hashlib.sha256(req.model_dump_json().encode("utf-8")).hexdigest()
+        try:
+            replay = await run_in_threadpool(services.idempotency.begin, scoped_key, fingerprint)
+        except ApiError as e:
+            return error_response(e)
+        if replay:
+            status, stored = replay
+            return Response(stored, status_code=status, media_type="application/json",
+                            headers={"Idempotent-Replayed": "true"})
+
+    try:
+        async with services.limits[limit_name].slot():
+            payload = await run_in_threadpool(work, services, req)
+        response = JSONResponse(payload, headers={"Cache-Control": "no-store"})
+    except ApiError as e:
+        response = error_response(e)
+    except Exception as e:
+        response = error_response(ApiError(500, "Internal error", type(e).__name__))
+    if idempotency_key:
+        await run_in_threadpool(services.idempotency.finish, scoped_key, response.status_code, response.body.decode("utf-8"))
+    return response
+
+async def create_caption(request):
+    return await json_endpoint(request, CaptionRequest, "captions", run_caption)
+
+async def create_image_endpoint(request):
+    return await json_endpoint(request, ImageRequest, "images", run_image)
+
+def rendition_sizes(handle):
+    """Sizes a WebP may be rendered at: every tenant's platform image sizes plus the image's own size"""
+    sizes = {spec["size"] for tenant in list_tenants()
+             for ratios in get_brand_profile(tenant).platform_image_specs.values() for spec in ratios.values()}
+    if handle.metadata.get("dalle_size"):
+        sizes.add(handle.metadata["dalle_size"])
+    return sizes
+
+async def get_image(request):
+    """Cached image bytes: format=preview|webp|original (content-addressed, so cached forever by clients)"""
+    services = request.app.state.services
+    if not authorized(request):
+        return error_response(ApiError(401, "Missing or invalid bearer token"))
+    key = request.path_params["key"]
+    fmt = request.query_params.get("format", "webp")
+    size = request.query_params.get("size")
+    if not IMAGE_KEY.match(key) or fmt not in ("preview", "webp", "original") or (size and not PIXEL_SIZE.match(size)):
+        return error_response(ApiError(422, "Invalid image key, format or size"))
+    etag = f'"{key}-{fmt}-{size or "full"}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    handle = services.image_cache.peek(key)
+    if handle is None:
+        return error_response(ApiError(404, "Image not in the cache"))
+    if fmt == "preview":
+        data, media_type = await run_in_threadpool(services.delivery.preview, handle), "image/jpeg"
+    elif fmt == "webp":
+        # Every new size is a render stored for good: only platform sizes, and renders count as image work
+        if size and size not in rendition_sizes(handle):
+            return error_response(ApiError(422, "size must be a platform image size", sorted(rendition_sizes(handle))))
+        if services.delivery.has_webp(handle, size):
+            data = await run_in_threadpool(services.delivery.webp, handle, size)
+        else:
+            try:
+                async with services.limits["images"].slot():
+                    data = await run_in_threadpool(services.delivery.webp, handle, size)
+            except ApiError as e:
+                return error_response(e)
+        media_type = "image/webp"
+    else:
+        data, media_type = await run_in_threadpool(services.delivery.original, handle), "image/png"
+    return Response(data, media_type=media_type, headers=headers)
+
+async def health(request):
+    services = request.app.state.services
+    return JSONResponse({
+        "status": "ok",
+        "backend": "mock" if use_mock_backend() else "live",
+        "limits": {name: limit.stats() for name, limit in services.limits.items()},
+        "requests": services.executor.metrics(),
+        "image_cache": services.image_cache.stats(),
+        "image_delivery": services.delivery.report(),
+    })
+
+def openapi_schema():
+    """OpenAPI 3.1 document built from the pydantic models"""
+    schemas = {}
+    for model in (CaptionRequest, CaptionResponse, ImageRequest, ImageResponse, ErrorResponse):
+        schema = model.model_json_schema(ref_template="#/components/schemas/{model}")
+        schemas.update(schema.pop("$defs", {}))
+        schemas[model.__name__] = schema
+
+    def ref(name):
+        return {"$ref": f"#/components/schemas/{name}"}
+
+    def errors(*codes):
+        return {str(code): {"description": description, "content": {"application/json": {"schema": ref("ErrorResponse")}}}
+                for code, description in codes}
+
+    idempotency = {"name": "Idempotency-Key", "in": "header", "required": False, "schema": {"type": "string"},
+                   "description": "Retries with the same key and body replay the first response"}
+    common_errors = errors((401, "Missing or invalid bearer token"), (409, "Same Idempotency-Key still in progress"),
+                           (422, "Invalid request"), (429, "Too many requests in flight - retry after Retry-After"))
+    return {
+        "openapi": "3.1.0",
+        "info": {"title": "Content Synth API", "version": API_VERSION},
+        "paths": {
+            "/v1/captions": {"post": {
+                "summary": "Generate, repair and rank captions for one brief",
+                "parameters": [idempotency],
+                "requestBody": {"required": True, "content": {"application/json": {"schema": ref("CaptionRequest")}}},
+                "responses": {"200": {"description": "Best caption plus ranked alternatives",
+                                      "content": {"application/json": {"schema": ref("CaptionResponse")}}},
+                              **common_errors, **errors((402, "Tenant spend cap reached"))},
+            }},
+            "/v1/images": {"post": {
+                "summary": "Generate (or reuse) a DALL-E 3 image for one brief",
+                "parameters": [idempotency],
+                "requestBody": {"required": True, "content": {"application/json": {"schema": ref("ImageRequest")}}},
+                "responses": {"200": {"description": "Image key and delivery URLs",
+                                      "content": {"application/json": {"schema": ref("ImageResponse")}}},
+                              **common_errors, **errors((502, "Image generation failed"))},
+            }},
+            "/v1/images/{key}": {"get": {
+                "summary": "Cached image bytes",
+                "parameters": [
+                    {"name": "key", "in": "path", "required": True, "schema": {"type": "string", "pattern": IMAGE_KEY.pattern}},
+                    {"name": "format", "in": "query", "schema": {"enum": ["preview", "webp", "original"], "default": "webp"}},
+                    {"name": "size", "in": "query", "schema": {"type": "string", "pattern": PIXEL_SIZE.pattern}},
+                ],
+                "responses": {"200": {"description": "Image bytes", "content": {
+                    "image/jpeg": {}, "image/webp": {}, "image/png": {}}},
+                    "304": {"description": "Not modified (If-None-Match)"}, **errors((404, "Image not in the cache"))},
+            }},
+            "/health": {"get": {"summary": "Limits, upstream latency and cache statistics",
+                                "responses": {"200": {"description": "Service status"}}}},
+        },
+        "components": {"schemas": schemas},
+    }
+
+async def openapi(request):
+    return JSONResponse(request.app.state.openapi)
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.services = Services()
+    app.state.openapi = openapi_schema()
+    yield
+
+app = Starlette(
+    routes=[
+        Route("/v1/captions", create_caption, methods=["POST"]),
+        Route("/v1/images", create_image_endpoint, methods=["POST"]),
+        Route("/v1/images/{key}", get_image, methods=["GET"]),
+        Route("/health", health, methods=["GET"]),
+        Route("/openapi.json", openapi, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
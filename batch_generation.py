@@ -0,0 +1,313 @@
+# batch_generation.py - Bulk offline caption generation through the Message Batches API
+# End-of-term runs (persona x platform x campaign x tone) are serialised into batch submissions,
+# polled until they end and mapped back by custom_id. Every step is checkpointed under
+# .cache/batches/<run_id>/ so a restarted process resumes where it stopped. Results are written
+# to results.jsonl and queued in the ResponseCache for the interactive app.
+#
+#   python batch_generation.py --platforms Instagram TikTok --copies 2
+#   python batch_generation.py --resume <run_id>
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from brand_profiles import get_brand_profile
+from caption_candidates import rank_candidates
+from content_engine import (auto_select_persona, build_caption_prompt, build_result, caption_scorer, hit_max_tokens,
+                            parse_caption_response, select_hashtags_for_persona)
+from insights_sql import prompt_insights
+from mock_backend import anthropic_client
+from model_router import ModelRouter
+from response_cache import ResponseCache, make_response_key
+from token_budget import BATCH_PRICE_FACTOR, CostLedger, caption_call_limits, estimate_cost
+
+BATCH_DIR = Path(".cache") / "batches"
+MAX_REQUESTS_PER_BATCH = 10_000  # API limit is 100k; smaller batches end (and are collected) sooner
+POLL_SECONDS = 30
+MAX_ATTEMPTS = 2                 # errored/expired requests are resubmitted once
+BATCH_SESSION = "batch"          # ledger session id for batch spend
+
+# ==========================================
+# BRIEFS
+# ==========================================
+
+def brief_custom_id(brief):
+    """Deterministic custom_id (API limit: 64 chars of [A-Za-z0-9_-])"""
+    payload = json.dumps(brief, sort_keys=True, ensure_ascii=False)
+    return "cap-" + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:40]
+
+def expand_briefs(profile, platforms=None, campaign_types=None, tones=None, course_titles=("",),
+                  all_personas=False, n_candidates=3, copies=1):
+    """One brief per combination (x copies); persona follows the campaign unless all_personas"""
+    briefs = []
+    for platform, campaign_type, tone, course, copy in itertools.product(
+        platforms or profile.platforms, campaign_types or profile.campaign_types,
+        tones or profile.brand_tones, course_titles, range(copies)
+    ):
+        personas = profile.persona_names if all_personas else [auto_select_persona(campaign_type, profile)]
+        for persona in personas:
+            briefs.append({
+                "tenant": profile.tenant_id, "persona": persona, "platform": platform,
+                "campaign_type": campaign_type, "brand_tone": tone, "course_title": course,
+                "n_candidates": n_candidates, "copy": copy,
+            })
+    return briefs
+
+# ==========================================
+# RESUMABLE RUN
+# ==========================================
+
+class BatchRun:
+    """Checkpointed bulk run: state.json tracks every brief and batch, results.jsonl holds output"""
+
+    def __init__(self, state, directory):
+        self.state = state
+        self.directory = Path(directory)
+        self.results_path = self.directory / "results.jsonl"
+        self._written = self._load_written() if self.results_path.exists() else set()
+
+    def _load_written(self):
+        """custom_ids already in results.jsonl; a partial last line (crash mid-write) is cut off"""
+        written, complete_end = set(), 0
+        with self.results_path.open("rb") as results_file:
+            for line in results_file:
+                if not line.endswith(b"\n"):
+                    break  # only the last line can be missing its newline
+                complete_end += len(line)
+                try:
+                    written.add(json.loads(line)["custom_id"])
+                except (ValueError, KeyError):
+                    continue  # blank or unreadable line: that request is collected again
+        if complete_end < self.results_path.stat().st_size:
+            with self.results_path.open("r+b") as results_file:
+                results_file.truncate(complete_end)
+        return written
+
+    @classmethod
+    def create(cls, briefs, run_id=None, root=BATCH_DIR):
+        run_id = run_id or datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        state = {
+            "run_id": run_id,
+            "created": time.time(),
+            "requests": {brief_custom_id(b): {"brief": b, "status": "pending", "attempts": 0, "tier": None}
+                         for b in briefs},
+            "batches": {},
+            "cost_usd": 0.0,
+        }
+        run = cls(state, Path(root) / run_id)
+        run.save()
+        return run
+
+    @classmethod
+    def load(cls, run_id, root=BATCH_DIR):
+        directory = Path(root) / run_id
+        return cls(json.loads((directory / "state.json").read_text(encoding="utf-8")), directory)
+
+    def save(self):
+        """Atomic checkpoint - a crash leaves either the old or the new state, never half of one"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.directory / "state.json.tmp"
+        tmp_path.write_text(json.dumps(self.state), encoding="utf-8")
+        os.replace(tmp_path, self.directory / "state.json")
+
+    @property
+    def run_id(self):
+        return self.state["run_id"]
+
+    def counts(self):
+        counts = {}
+        for request in self.state["requests"].values():
+            counts[request["status"]] = counts.get(request["status"], 0) + 1
+        return counts
+
+    @property
+    def finished(self):
+        return all(r["status"] in ("succeeded", "failed") for r in self.state["requests"].values())
+
+    # ------------------------------------------
+    # Submit / poll / collect
+    # ------------------------------------------
+
+    def submit(self, client, router, ledger):
+        """Send every pending request; each batch id is checkpointed as soon as it exists"""
+        pending = [cid for cid, r in self.state["requests"].items() if r["status"] == "pending"]
+        for start in range(0, len(pending), MAX_REQUESTS_PER_BATCH):
+            chunk = pending[start:start + MAX_REQUESTS_PER_BATCH]
+            requests = [{"custom_id": cid, "params": self._params(cid, router, ledger)} for cid in chunk]
+            batch = client.messages.batches.create(requests=requests)
+            self.state["batches"][batch.id] = {"custom_ids": chunk, "status": batch.processing_status, "collected": False}
+            for cid in chunk:
+                self.state["requests"][cid].update(status="submitted", attempts=self.state["requests"][cid]["attempts"] + 1)
+            self.save()
+        return len(pending)
+
+    def _params(self, cid, router, ledger):
+        request = self.state["requests"][cid]
+        brief = request["brief"]
+        profile = get_brand_profile(brief["tenant"])
+        prompt, char_limit = build_caption_prompt(brief["persona"], brief["platform"], brief["campaign_type"],
+                                                  brief["brand_tone"], brief["course_title"], brief["n_candidates"], profile,
+                                                  insights=prompt_insights(brief["platform"]))
+        route = router.route(char_limit, "batch") if request["tier"] is None else router.tier_route(request["tier"], "escalated")
+        request["tier"] = route.tier
+        limits = caption_call_limits(char_limit, brief["n_candidates"], ledger.observed_output_tokens(brief["platform"]))
+        if request.get("error") == "max_tokens":
+            limits["max_tokens"] *= 2
+        return {"model": route.model, "messages": [{"role": "user", "content": prompt}], **limits}
+
+    def poll(self, client):
+        """Refresh every open batch; returns the number still processing"""
+        open_batches = 0
+        for batch_id, batch in self.state["batches"].items():
+            if batch["status"] != "ended":
+                batch["status"] = client.messages.batches.retrieve(batch_id).processing_status
+                open_batches += batch["status"] != "ended"
+        self.save()
+        return open_batches
+
+    def collect(self, client, router, cache, ledger):
+        """Map results of ended batches back to their briefs (safe to repeat after a crash)"""
+        collected = 0
+        for batch_id, batch in self.state["batches"].items():
+            if batch["status"] != "ended" or batch["collected"]:
+                continue
+            with self.results_path.open("a", encoding="utf-8") as results_file:
+                for entry in client.messages.batches.results(batch_id):
+                    collected += self._collect_one(entry, router, cache, ledger, results_file)
+            batch["collected"] = True
+            self.save()
+        return collected
+
+    def _collect_one(self, entry, router, cache, ledger, results_file):
+        request = self.state["requests"].get(entry.custom_id)
+        if request is None or request["status"] != "submitted":
+            return 0
+        if entry.result.type != "succeeded":
+            # errored / expired / canceled: resubmit until MAX_ATTEMPTS
+            request["status"] = "pending" if request["attempts"] < MAX_ATTEMPTS else "failed"
+            request["error"] = entry.result.type
+            return 0
+
+        brief, message = request["brief"], entry.result.message
+        if entry.custom_id in self._written:
+            # Written before a crash: only the spend may still be missing
+            self._record_spend(request, entry.custom_id, message, ledger)
+            request["status"] = "succeeded"
+            return 0
+
+        profile = get_brand_profile(brief["tenant"])
+        usage = {"input_tokens": message.usage.input_tokens, "output_tokens": message.usage.output_tokens,
+                 "cost_usd": estimate_cost(message.model, message.usage.input_tokens, message.usage.output_tokens,
+                                           BATCH_PRICE_FACTOR)}
+        char_limit = profile.platform_specs.get(brief["platform"], profile.platform_specs["Instagram"])['recommended_caption']
+        hashtags = select_hashtags_for_persona(brief["persona"], brief["platform"], brief["campaign_type"],
+                                               entry.custom_id, profile)
+        captions = parse_caption_response(message.content[0].text, brief["n_candidates"], hit_max_tokens(message))
+        if not captions:
+            # Cut off at max_tokens before one caption was complete: resubmit with twice the budget
+            self._record_spend(request, entry.custom_id, message, ledger)
+            request.update(status="pending" if request["attempts"] < MAX_ATTEMPTS else "failed", error="max_tokens")
+            return 0
+        score_caption = caption_scorer(brief["persona"], brief["brand_tone"], hashtags, char_limit, profile)
+        ranked = rank_candidates(captions, score_caption)
+        result = build_result(ranked[0], hashtags, brief["persona"], brief["platform"], brief["campaign_type"],
+                              brief["brand_tone"], char_limit, message.model, usage)
+
+        # Failed local scoring on the fast tier: resubmit once on the next tier up
+        rejection = router.rejection_reason(result)
+        upgrade = router.escalation(router.tier_route(request["tier"], "batch")) if rejection else None
+        if upgrade and request["attempts"] < MAX_ATTEMPTS:
+            self._record_spend(request, entry.custom_id, message, ledger)
+            request.update(status="pending", tier=upgrade.tier, error=rejection)
+            return 0
+
+        # Result line first, then spend: a crash in between is repaired by the _written branch above
+        alternatives = ranked[1:]
+        results_file.write(json.dumps({"custom_id": entry.custom_id, "brief": brief,
+                                       "result": result, "alternatives": alternatives}, ensure_ascii=False) + "\n")
+        results_file.flush()
+        self._written.add(entry.custom_id)
+        self._record_spend(request, entry.custom_id, message, ledger)
+        if brief["persona"] == auto_select_persona(brief["campaign_type"], profile):
+            key = make_response_key(brief["tenant"], brief["platform"], brief["campaign_type"],
+                                    brief["brand_tone"], brief["course_title"], brief["n_candidates"])
+            cache.put(key, {"result": result, "alternatives": alternatives}, source="batch")
+        request["status"] = "succeeded"
+        return 1
+
+    def _record_spend(self, request, custom_id, message, ledger):
+        """Ledger entry for one attempt, keyed by run, custom_id and attempt so a replay is not billed twice"""
+        brief = request["brief"]
+        usage = ledger.record(message.model, message.usage.input_tokens, message.usage.output_tokens,
+                              session_id=BATCH_SESSION, persona=brief["persona"], campaign=brief["campaign_type"],
+                              platform=brief["platform"], tenant=brief["tenant"], n_candidates=brief["n_candidates"],
+                              operation="batch", price_factor=BATCH_PRICE_FACTOR,
+                              request_id=f"{self.run_id}:{custom_id}:{request['attempts']}")
+        spend = request.setdefault("spend", {})
+        self.state["cost_usd"] += usage["cost_usd"] - spend.get(str(request["attempts"]), 0.0)
+        spend[str(request["attempts"])] = usage["cost_usd"]
+
+    def run(self, client, router=None, cache=None, ledger=None, poll_seconds=POLL_SECONDS, wait=True):
+        """Submit, poll and collect until every request has succeeded or failed"""
+        router = router or ModelRouter.from_file()
+        cache = cache or ResponseCache()
+        ledger = ledger or CostLedger()
+        while True:
+            self.submit(client, router, ledger)
+            still_open = self.poll(client)
+            self.collect(client, router, cache, ledger)
+            if self.finished or not wait:
+                return self.summary()
+            if still_open:
+                time.sleep(poll_seconds)
+
+    def summary(self):
+        batch_cost = self.state["cost_usd"]
+        return {
+            "run_id": self.run_id,
+            "requests": len(self.state["requests"]),
+            "batches": len(self.state["batches"]),
+            "elapsed_s": round(time.time() - self.state["created"], 1),
+            "cost_usd": round(batch_cost, 6),
+            "list_price_usd": round(batch_cost / BATCH_PRICE_FACTOR, 6),
+            **self.counts(),
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk caption generation through the Message Batches API")
+    parser.add_argument("--resume", metavar="RUN_ID", help="continue an earlier run after a restart")
+    parser.add_argument("--tenant", default="default")
+    parser.add_argument("--platforms", nargs="*")
+    parser.add_argument("--campaign-types", nargs="*")
+    parser.add_argument("--tones", nargs="*")
+    parser.add_argument("--course-titles", nargs="*", default=[""])
+    parser.add_argument("--all-personas", action="store_true", help="every persona for every campaign")
+    parser.add_argument("--copies", type=int, default=1, help="variants per brief")
+    parser.add_argument("--candidates", type=int, default=3)
+    parser.add_argument("--poll-seconds", type=float, default=POLL_SECONDS)
+    parser.add_argument("--no-wait", action="store_true", help="submit/collect once and exit (resume later)")
+    args = parser.parse_args(argv)
+
+    if args.resume:
+        run = BatchRun.load(args.resume)
+    else:
+        profile = get_brand_profile(args.tenant)
+        briefs = expand_briefs(profile, args.platforms, args.campaign_types, args.tones, args.course_titles,
+                               args.all_personas, args.candidates, args.copies)
+        run = BatchRun.create(briefs)
+        print(f"Run {run.run_id}: {len(briefs)} requests")
+
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    summary = run.run(anthropic_client(api_key), poll_seconds=args.poll_seconds, wait=not args.no_wait)
+    print(json.dumps(summary, indent=2))
+    return 0 if run.finished or args.no_wait else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# benchmarks/api_throughput.py - Requests per second per core for the HTTP API on the mock backend
+# Starts one single-worker `uvicorn api_service:app` (one core's worth of server) with zero mock
+# model latency, so the numbers measure the service itself - validation, limits, caches, the
+# caption pipeline and scoring - not the upstream models. Client processes hold keep-alive
+# connections and drive three scenarios: live captions (a new brief per request), cached captions
+# (max_age_seconds reuse) and WebP image fetches. Reports req/s, latency percentiles and requests
+# per server CPU-second (Linux /proc), the per-core figure to size a deployment with.
+#
+#   python benchmarks/api_throughput.py --seconds 10 --clients 4 --threads 4
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from request_executor import percentile
+
+BRIEF = {"platform": "Instagram", "campaign_type": "Music-Integrated Learning", "brand_tone": "Friendly"}
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def start_server(port, log_path):
+    env = {**os.environ, "CONTENT_SYNTH_BACKEND": "mock", "CONTENT_SYNTH_MOCK_LATENCY_SCALE": "0"}
+    env.pop("CONTENT_SYNTH_API_TOKEN", None)
+    command = [sys.executable, "-m", "uvicorn", "api_service:app", "--port", str(port), "--workers", "1",
+               "--log-level", "warning", "--no-access-log"]
+    with open(log_path, "w") as log:  # the child keeps its own handle
+        server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            status, _ = request(http.client.HTTPConnection("127.0.0.1", port, timeout=5), "GET", "/health")
+            if status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"api did not start: {Path(log_path).read_text()[-2000:]}")
+
+def cpu_seconds(pid):
+    """user + system CPU time of a process (Linux /proc), None elsewhere"""
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def request(conn, method, path, body=None):
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    return response.status, response.read()
+
+def scenario_request(scenario, image_path, client, thread, n):
+    """(method, path, body) for the n-th request of one client thread"""
+    if scenario == "captions_live":
+        return "POST", "/v1/captions", {**BRIEF, "course_title": f"Bench {client}-{thread}-{n}", "use_prewarmed": False}
+    if scenario == "captions_cached":
+        return "POST", "/v1/captions", {**BRIEF, "course_title": "Bench cached", "max_age_seconds": 3600,
+                                        "use_prewarmed": False}
+    return "GET", image_path, None
+
+def client_process(port, scenario, image_path, client, threads, seconds, results):
+    """threads keep-alive connections hammering one scenario; puts (latencies, statuses) on results"""
+    latencies, statuses, lock = [], {}, threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def worker(thread):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        n = 0
+        while time.perf_counter() < stop_at:
+            method, path, body = scenario_request(scenario, image_path, client, thread, n)
+            started = time.perf_counter()
+            try:
+                status, _ = request(conn, method, path, body)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                status = "error"
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+            n += 1
+        conn.close()
+
+    workers = [threading.Thread(target=worker, args=(thread,)) for thread in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    results.put((latencies, statuses))
+
+def run_scenario(port, pid, scenario, image_path, clients, threads, seconds):
+    results = multiprocessing.Queue()
+    cpu_before, started = cpu_seconds(pid), time.perf_counter()
+    processes = [multiprocessing.Process(target=client_process,
+                                         args=(port, scenario, image_path, client, threads, seconds, results))
+                 for client in range(clients)]
+    for process in processes:
+        process.start()
+    latencies, statuses = [], {}
+    for _ in processes:
+        client_latencies, client_statuses = results.get()
+        latencies += client_latencies
+        for status, count in client_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+    for process in processes:
+        process.join()
+    wall = time.perf_counter() - started
+    cpu_after = cpu_seconds(pid)
+    cpu = cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None
+    ok = statuses.get(200, 0)
+    return {
+        "scenario": scenario,
+        "requests": len(latencies),
+        "req_per_s": ok / wall,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "server_cpu_s": cpu,
+        "req_per_cpu_s": ok / cpu if cpu else None,
+        "statuses": statuses,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10, help="duration of each scenario")
+    parser.add_argument("--clients", type=int, default=4, help="client processes")
+    parser.add_argument("--threads", type=int, default=4, help="keep-alive connections per client process")
+    parser.add_argument("--scenarios", default="captions_live,captions_cached,image_webp")
+    parser.add_argument("--json", help="also write the results here")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        port = free_port()
+        server = start_server(port, Path(scratch) / "api.log")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            # Warm up: one live caption fills the cached scenario's entry, one image fills the WebP rendition
+            request(conn, "POST", "/v1/captions", {**BRIEF, "course_title": "Bench cached", "use_prewarmed": False})
+            status, body = request(conn, "POST", "/v1/images", {**BRIEF, "ratio": "Portrait (4:5)"})
+            if status != 200:
+                raise RuntimeError(f"image warm-up failed: {status} {body[:200]!r}")
+            image_path = json.loads(body)["urls"]["webp"]
+            request(conn, "GET", image_path)
+            conn.close()
+            for scenario in args.scenarios.split(","):
+                results.append(run_scenario(port, server.pid, scenario, image_path, args.clients, args.threads,
+                                            args.seconds))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print(f"{'scenario':17}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'CPU s':>8}{'req/CPU-s':>11}  statuses")
+    for result in results:
+        cpu = f"{result['server_cpu_s']:>8.1f}" if result["server_cpu_s"] is not None else f"{'-':>8}"
+        per_cpu = f"{result['req_per_cpu_s']:>11.1f}" if result["req_per_cpu_s"] else f"{'-':>11}"
+        print(f"{result['scenario']:17}{result['requests']:>9}{result['req_per_s']:>9.1f}{result['p50_ms']:>9.1f}"
+              f"{result['p99_ms']:>9.1f}{cpu}{per_cpu}  {result['statuses']}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2, default=str), encoding="utf-8")
+    return 1 if any(set(result["statuses"]) - {200} for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# benchmarks/bandit_selection.py - Engagement bandit vs uniform hashtag/template selection
+# Simulates a hidden engagement model (per-hashtag and per-template effects), posts in rounds,
+# feeds the observed engagement back through EngagementBandit.record and compares the average
+# engagement and per-call selection cost against the uniform selector.
+#
+#   python benchmarks/bandit_selection.py --rounds 30 --posts-per-round 40
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from brand_profiles import get_brand_profile
+from content_engine import auto_select_persona, select_content_template, select_hashtags_for_persona
+from engagement_bandit import EngagementBandit
+
+def hidden_model(profile, seed):
+    """True multiplicative effect per hashtag and template (unknown to the selectors)"""
+    rng = np.random.default_rng(seed)
+    tags = {tag: float(np.exp(rng.normal(0, 0.35))) for tag in profile.all_hashtags}
+    templates = {name: float(np.exp(rng.normal(0, 0.3))) for name in profile.content_templates}
+    return tags, templates
+
+def simulate(profile, bandit, effects, rounds, posts_per_round, seed):
+    tag_effect, template_effect = effects
+    rng = np.random.default_rng(seed)
+    mobile_tags = set(profile.hashtag_tags["mobile_optimized"])
+    per_round, seconds, calls = [], 0.0, 0
+    for round_index in range(rounds):
+        engagement = []
+        for post in range(posts_per_round):
+            campaign = profile.campaign_types[post % len(profile.campaign_types)]
+            platform = profile.platforms[post % len(profile.platforms)]
+            persona = auto_select_persona(campaign, profile)
+            seed_value = round_index * 10_000 + post + seed
+            started = time.perf_counter()
+            hashtags = select_hashtags_for_persona(persona, platform, campaign, seed_value, profile, bandit)
+            template = select_content_template(campaign, "Tuesday", profile, bandit, seed_value)
+            seconds += time.perf_counter() - started
+            calls += 1
+            value = 10 * np.mean([tag_effect[tag] for tag in hashtags]) * template_effect.get(template, 1.0)
+            value *= rng.lognormal(0, 0.25)
+            engagement.append(value)
+            if bandit:
+                bandit.record(value, hashtags, template, mobile=bool(mobile_tags.intersection(hashtags)))
+        per_round.append(float(np.mean(engagement)))
+    return per_round, seconds / calls * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--posts-per-round", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    profile = get_brand_profile()
+    effects = hidden_model(profile, args.seed)
+    uniform, uniform_us = simulate(profile, None, effects, args.rounds, args.posts_per_round, args.seed)
+    results = {"uniform": (uniform, uniform_us)}
+    for strategy in ("thompson", "ucb"):
+        results[strategy] = simulate(profile, EngagementBandit(strategy=strategy), effects,
+                                     args.rounds, args.posts_per_round, args.seed)
+
+    tail = max(1, args.rounds // 3)
+    print(f"{'selector':10}{'first rounds':>14}{'last rounds':>13}{'vs uniform':>12}{'us/call':>10}")
+    for label, (per_round, micros) in results.items():
+        late = np.mean(per_round[-tail:])
+        print(f"{label:10}{np.mean(per_round[:tail]):>14.2f}{late:>13.2f}"
+              f"{late / np.mean(uniform[-tail:]) - 1:>12.1%}{micros:>10.1f}")
+
+    thompson_late = np.mean(results["thompson"][0][-tail:])
+    if thompson_late <= np.mean(uniform[-tail:]):
+        print("FAIL Thompson sampling did not beat uniform selection")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
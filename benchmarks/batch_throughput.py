@@ -0,0 +1,72 @@
+# benchmarks/batch_throughput.py - Bulk generation: Message Batches vs one-by-one messages.create
+# Runs against the local mock backend (including its batch endpoints). The batch run is
+# "killed" after submission and resumed from its checkpoint by a fresh client and BatchRun,
+# as a restarted process would be.
+#
+#   python benchmarks/batch_throughput.py --platforms Instagram TikTok --latency-scale 0.05
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from batch_generation import BatchRun, expand_briefs
+from brand_profiles import get_brand_profile
+from content_engine import generate_caption_set
+from mock_backend import MockAnthropic
+from model_router import ModelRouter
+from response_cache import ResponseCache
+from token_budget import CostLedger
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--platforms", nargs="*", default=["Instagram", "TikTok"])
+    parser.add_argument("--latency-scale", type=float, default=0.05, help="mock latency for one-by-one calls")
+    parser.add_argument("--batch-seconds", type=float, default=1.0, help="mock batch processing time")
+    args = parser.parse_args()
+
+    profile = get_brand_profile()
+    briefs = expand_briefs(profile, platforms=args.platforms)
+    work = Path(tempfile.mkdtemp(prefix="batch-bench-"))
+
+    # One-by-one interactive path
+    ledger = CostLedger(path=None)
+    client = MockAnthropic(latency_scale=args.latency_scale, seed=1)
+    started = time.perf_counter()
+    for brief in briefs:
+        generate_caption_set(client, brief["persona"], brief["platform"], brief["campaign_type"], brief["brand_tone"],
+                             brief["course_title"], brief["n_candidates"], profile=profile, ledger=ledger,
+                             router=ModelRouter(), operation="batch")
+    sequential = {"seconds": time.perf_counter() - started, "cost": ledger.totals()["cost_usd"]}
+
+    # Batch path, interrupted after submission and resumed from disk
+    def fresh_client():
+        client = MockAnthropic(seed=1, batch_state_dir=work / "mock_service")
+        client.messages.batches.processing_seconds = args.batch_seconds
+        return client
+
+    cache, batch_ledger = ResponseCache(work / "responses.sqlite3"), CostLedger(path=None)
+    started = time.perf_counter()
+    run = BatchRun.create(briefs, root=work / "runs")
+    run.run(fresh_client(), ModelRouter(), cache, batch_ledger, wait=False)  # submit, then "crash"
+
+    resumed = BatchRun.load(run.run_id, root=work / "runs")
+    summary = resumed.run(fresh_client(), ModelRouter(), cache, batch_ledger, poll_seconds=0.2)
+    batch = {"seconds": time.perf_counter() - started, "cost": summary["cost_usd"]}
+
+    lines = (work / "runs" / run.run_id / "results.jsonl").read_text(encoding="utf-8").splitlines()
+    print(f"{len(briefs)} briefs, {summary['batches']} batches, {len(lines)} results written, "
+          f"{cache.stats()['entries']} queued in the response cache, status {resumed.counts()}")
+    print(f"{'path':12}{'wall s':>10}{'captions/s':>12}{'cost $':>10}")
+    for label, stats in (("one-by-one", sequential), ("batch", batch)):
+        print(f"{label:12}{stats['seconds']:>10.2f}{len(briefs) / stats['seconds']:>12.1f}{stats['cost']:>10.4f}")
+    print("(mock batch wall time is --batch-seconds; real batches usually end within an hour)")
+    written_ids = [json.loads(line)["custom_id"] for line in lines]
+    return 0 if resumed.finished and len(written_ids) == len(set(written_ids)) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# benchmarks/bundle_memory.py - Peak memory of the streaming campaign bundle export
+# Fills a temporary ImageCache with synthetic DALL-E-sized images, exports N posts (with
+# platform renditions) to a ZIP and compares peak traced Python memory with the archive size.
+#
+#   python benchmarks/bundle_memory.py --posts 500 --images 60
+
+import argparse
+import io
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bundle_export import write_bundle
+from image_cache import ImageCache, make_image_key
+
+def synthetic_png(seed, size=(1024, 1024)):
+    """Noisy gradient - compresses about as badly as a real photo"""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, size[0], dtype=np.float32)[None, :, None]
+    pixels = np.clip(gradient + rng.normal(0, 40, (size[1], size[0], 3)), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--images", type=int, default=60)
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="bundle-bench-"))
+    cache = ImageCache(work / "images", max_bytes=10 * 1024 ** 3)
+    keys = []
+    for i in range(args.images):
+        key = make_image_key(f"prompt {i}", "1024x1024", "standard", "dall-e-3")
+        cache.put(key, synthetic_png(i), {"prompt": f"prompt {i}"})
+        keys.append(key)
+
+    sizes = ["1080x1350", "1080x1920", "1024x1024"]
+    posts = [{
+        "caption": f"Caption {i} for the spring intake - join us!", "hashtags": ["#nzstudents", "#studyinnz"],
+        "platform": "Instagram", "persona": "Balanced Explorer", "campaign_type": "Study Abroad",
+        "brand_tone": "Friendly", "timestamp": "2026-01-05 12:00:00", "char_count": 44, "char_limit": 150,
+        "alignment_score": 90, "length_status": "good",
+        **({"image_key": keys[i % len(keys)], "image_size": sizes[i % len(sizes)]} if i < args.images * 2 else {}),
+    } for i in range(args.posts)]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    archive = work / "bundle.zip"
+    written = write_bundle(posts, archive, cache)
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    with zipfile.ZipFile(archive) as bundle:
+        bad_member = bundle.testzip()
+        members = len(bundle.namelist())
+    print(f"{args.posts} posts, {args.images} source images -> {members} members, {written / 1e6:.1f} MB in {seconds:.1f} s")
+    print(f"peak traced memory {peak / 1e6:.1f} MB ({peak / written:.1%} of the archive)")
+    if bad_member is not None:
+        print(f"FAIL corrupt member {bad_member}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# benchmarks/circuit_breaker.py - Caption latency through an Anthropic outage, with and without the breaker
+# Drives generate_caption_set against the mock backend in three phases: healthy, degraded (every
+# call hangs until the deadline and fails) and recovered. Without a breaker every degraded call
+# waits out its deadline; with one the circuit opens after a few failures, template captions are
+# served locally, and a half-open probe restores the live path once the backend is healthy.
+#
+#   python benchmarks/circuit_breaker.py --calls 30
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from brand_profiles import get_brand_profile
+from circuit_breaker import CircuitBreaker
+from content_engine import generate_caption_set
+from mock_backend import MockAnthropic
+from request_executor import RequestExecutor, percentile
+
+class FlakyAnthropic:
+    """MockAnthropic whose messages.create hangs until its timeout and fails while degraded"""
+
+    def __init__(self, latency_scale):
+        self._healthy = MockAnthropic(latency_scale=latency_scale)
+        self.degraded = False
+        self.messages = self
+
+    def create(self, timeout=None, **request):
+        if self.degraded:
+            time.sleep(timeout or 0)
+            raise TimeoutError("mock Anthropic overloaded")
+        return self._healthy.messages.create(timeout=timeout, **request)
+
+def short_circuited(executor):
+    return executor.metrics().get("caption", {}).get("short_circuited", 0)
+
+def run_phase(client, executor, calls, profile, label):
+    """Per-call durations, durations of the calls the breaker skipped, and result sources"""
+    durations, skipped, sources = [], [], {}
+    for i in range(calls):
+        before = short_circuited(executor)
+        started = time.perf_counter()
+        result, _ = generate_caption_set(client, "Creative Performer", "Instagram", "Summer Music Program", "Friendly",
+                                         f"{label} Music Camp {i}", profile=profile, executor=executor)
+        durations.append(time.perf_counter() - started)
+        if short_circuited(executor) > before:
+            skipped.append(durations[-1])
+        assert result["char_count"] <= result["char_limit"], result
+        source = "circuit" if result.get("circuit_open") else result.get("fallback", "live")
+        sources[source] = sources.get(source, 0) + 1
+    return durations, skipped, sources
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=30, help="caption requests per phase")
+    parser.add_argument("--latency-scale", type=float, default=0.02, help="mock latency multiplier")
+    parser.add_argument("--deadline", type=float, default=0.5, help="caption deadline in seconds")
+    parser.add_argument("--open-seconds", type=float, default=1.0)
+    parser.add_argument("--max-fallback-ms", type=float, default=5.0, help="required p99 of short-circuited calls")
+    args = parser.parse_args()
+
+    profile = get_brand_profile()
+    deadlines = {"caption": args.deadline, "length_retry": args.deadline}
+    print(f"{'':12}{'phase':11}{'p50 ms':>9}{'p99 ms':>9}{'total s':>9}  sources")
+
+    failed = False
+    for mode in ("no breaker", "breaker"):
+        client = FlakyAnthropic(args.latency_scale)
+        breaker = CircuitBreaker("anthropic", slow_call_seconds=args.deadline * 0.8, open_seconds=args.open_seconds)
+        executor = RequestExecutor(deadlines=deadlines,
+                                   breakers={"caption": breaker, "length_retry": breaker} if mode == "breaker" else None)
+        for phase in ("healthy", "degraded", "recovered"):
+            client.degraded = phase == "degraded"
+            if phase == "recovered" and mode == "breaker":
+                time.sleep(args.open_seconds)  # let the circuit go half-open
+            durations, skipped, sources = run_phase(client, executor, args.calls, profile, phase)
+            p50, p99, total = percentile(durations, 50) * 1000, percentile(durations, 99) * 1000, sum(durations)
+            print(f"{mode:12}{phase:11}{p50:>9.1f}{p99:>9.1f}{total:>9.2f}  {sources}")
+
+            if mode == "breaker" and phase == "degraded":
+                fallback_p99 = percentile(skipped, 99) * 1000 if skipped else float("inf")
+                print(f"{'':23}{len(skipped)} short-circuited calls, p99 {fallback_p99:.2f} ms "
+                      f"(required < {args.max_fallback_ms:.1f} ms)")
+                failed |= fallback_p99 >= args.max_fallback_ms
+            if mode == "breaker" and phase == "recovered":
+                failed |= sources.get("live", 0) < args.calls - 1 or breaker.state != "closed"
+        if mode == "breaker":
+            print(f"{'':23}breaker {breaker.metrics()}")
+
+    if failed:
+        print("FAIL breaker did not short-circuit quickly or did not recover")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+# benchmarks/derived_features_speed.py - Derived-column recomputation for many clients x years
+# Builds a multi-client daily frame by resampling the shipped photography rows, times
+# derive_features() and checks the per-client 7-day averages against pandas groupby().rolling().
+#
+#   python benchmarks/derived_features_speed.py --clients 200 --years 3
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analytics_store import DATA_DIR, PHOTO_CSV
+from derived_features import DERIVED_FEATURES, derive_features
+
+def synthetic_clients(clients, days, seed):
+    """clients x days raw rows, shuffled so the engine has to sort them"""
+    raw = pd.read_csv(DATA_DIR / PHOTO_CSV).drop(columns=list(DERIVED_FEATURES))
+    rng = np.random.default_rng(seed)
+    frame = raw.iloc[rng.integers(0, len(raw), clients * days)].reset_index(drop=True)
+    frame["client"] = np.repeat([f"client_{i:04d}" for i in range(clients)], days)
+    frame["Date"] = np.tile(pd.date_range("2022-01-01", periods=days, freq="D"), clients)
+    return frame.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--budget-s", type=float, default=5.0)
+    args = parser.parse_args()
+
+    frame = synthetic_clients(args.clients, args.years * 365, args.seed)
+    started = time.perf_counter()
+    derived = derive_features(frame, client_column="client")
+    seconds = time.perf_counter() - started
+    print(f"{len(frame):,} rows ({args.clients} clients x {args.years} years): "
+          f"{len(DERIVED_FEATURES)} columns in {seconds:.2f} s ({len(frame) / seconds / 1e6:.2f} M rows/s)")
+
+    started = time.perf_counter()
+    expected = (derived.sort_values(["client", "Date"]).groupby("client", sort=False)["Web_TotalUsers"]
+                .rolling(7, min_periods=1).mean().reset_index(level=0, drop=True).sort_index())
+    pandas_seconds = time.perf_counter() - started
+    error = np.abs(expected.to_numpy() - derived["Web_TotalUsers_7day_avg"].to_numpy()).max()
+    print(f"pandas sort + groupby().rolling() for one column: {pandas_seconds:.2f} s; max difference {error:.2e}")
+
+    failures = []
+    if error > 1e-6:
+        failures.append("rolling averages differ from pandas")
+    if seconds > args.budget_s:
+        failures.append(f"derivation took {seconds:.1f} s (budget {args.budget_s:.0f} s)")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
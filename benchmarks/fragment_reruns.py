@@ -0,0 +1,128 @@
+# benchmarks/fragment_reruns.py - Server time per interaction: full-app rerun vs fragment rerun
+# Drives the app with AppTest (mock backend, two captions generated so every region renders),
+# then times the common edit paths twice: as a full script run (what every widget change cost
+# before the regions became st.fragment functions) and as a rerun of only the owning fragment.
+# AppTest always runs the whole script, so the fragment-scoped run swaps in a script runner that
+# queues the fragment id, exactly as the browser's rerun request does.
+#
+#   python benchmarks/fragment_reruns.py --repeats 15
+
+import argparse
+import dataclasses
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import app_test
+from streamlit.runtime.scriptrunner import ScriptRunnerEvent
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+ROOT = Path(__file__).resolve().parent.parent
+os.environ.setdefault("CONTENT_SYNTH_BACKEND", "mock")
+
+class FragmentScriptRunner(LocalScriptRunner):
+    """LocalScriptRunner that reruns only `fragment_ids` when set and records server time"""
+    fragment_ids = []
+    server_ms = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        started = []
+
+        def clock(sender, event, **_):
+            if event == ScriptRunnerEvent.SCRIPT_STARTED and not started:
+                started.append(time.perf_counter())
+            elif event == ScriptRunnerEvent.SHUTDOWN and started:
+                FragmentScriptRunner.server_ms = (time.perf_counter() - started[0]) * 1000
+
+        self.on_event.connect(clock, weak=False)
+
+    def request_rerun(self, rerun_data):
+        if not self.fragment_ids:
+            return super().request_rerun(rerun_data)
+        # The constructor already queued a full rerun, which would absorb a fragment request;
+        # replace it with what the browser sends for a widget inside the fragment.
+        self._requests._rerun_data = dataclasses.replace(
+            rerun_data, fragment_id_queue=list(self.fragment_ids), is_fragment_scoped_rerun=True)
+        return True
+
+app_test.LocalScriptRunner = FragmentScriptRunner
+
+# (name, owning region, widget change)
+INTERACTIONS = [
+    ("image style", "image_region", lambda at, i: selectbox(at, "Style").set_value(["Modern", "Vibrant"][i % 2])),
+    ("image keywords", "image_region", lambda at, i: text_input(at, "Keywords / Description (optional)").input(f"campus {i}")),
+    ("schedule weeks", "export_region", lambda at, i: [s for s in at.slider if s.label == "Weeks"][0].set_value(2 + i % 2)),
+    ("course title", "input_region", lambda at, i: text_input(at, "Course Title").input(f"Summer Program {i}")),
+    ("use alternative", "caption_output_region",
+     lambda at, i: [b for b in at.button if b.label == "Use this caption"][0].click()),
+]
+
+def selectbox(at, label):
+    return [s for s in at.selectbox if s.label == label][0]
+
+def text_input(at, label):
+    return [t for t in at.text_input if t.label == label][0]
+
+def fragment_ids(at):
+    """{region function name: fragment id} from the fragments the last full run registered"""
+    ids = {}
+    for fragment_id, fragment in at._fragment_storage._fragments.items():
+        for cell in fragment.__closure__ or ():
+            name = getattr(cell.cell_contents, "__name__", None)
+            if name and name.endswith("_region"):
+                ids[name] = fragment_id
+    return ids
+
+def timed_run(at, fragment_id=None):
+    """Script-thread time (ms) for one run, excluding AppTest's polling and tree parsing"""
+    FragmentScriptRunner.fragment_ids = [fragment_id] if fragment_id else []
+    try:
+        at.run()
+    finally:
+        FragmentScriptRunner.fragment_ids = []
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return FragmentScriptRunner.server_ms
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=15)
+    parser.add_argument("--min-speedup", type=float, default=1.5, help="required median full/fragment ratio")
+    args = parser.parse_args()
+
+    at = AppTest.from_file(str(ROOT / "content_synth_app.py"), default_timeout=120)
+    at.secrets["ANTHROPIC_API_KEY"] = ""
+    at.secrets["OPENAI_API_KEY"] = ""
+    at.run()
+    for _ in range(2):  # two results so the caption output and export regions render
+        [b for b in at.button if "GENERATE CAPTION" in b.label][0].click().run()
+    timed_run(at)  # settle caches
+    regions = fragment_ids(at)
+
+    print(f"{'interaction':18}{'region':24}{'full ms':>10}{'fragment ms':>13}{'speedup':>9}")
+    speedups = []
+    for name, region, change in INTERACTIONS:
+        full, scoped = [], []
+        for i in range(args.repeats):
+            change(at, i)
+            full.append(timed_run(at))
+            change(at, i + 1)
+            scoped.append(timed_run(at, regions[region]))
+            timed_run(at)  # AppTest keeps only the fragment's elements after a scoped run; rebuild the tree
+        full_ms, scoped_ms = statistics.median(full), statistics.median(scoped)
+        speedups.append(full_ms / scoped_ms)
+        print(f"{name:18}{region:24}{full_ms:>10.1f}{scoped_ms:>13.1f}{full_ms / scoped_ms:>8.1f}x")
+
+    median_speedup = statistics.median(speedups)
+    print(f"\nmedian speedup {median_speedup:.1f}x (required {args.min_speedup:.1f}x)")
+    if median_speedup < args.min_speedup:
+        print("FAIL fragment reruns are not cheaper than full reruns")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
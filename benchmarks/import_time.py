@@ -0,0 +1,89 @@
+# benchmarks/import_time.py - Cold-start import budget for the Streamlit app
+# Runs the app's first script run (mock backend, AppTest) in a fresh interpreter with
+# `-X importtime`, subtracts what Streamlit itself imports, and summarises the remaining
+# import cost by top-level package. Fails when the app's own import time exceeds the budget
+# or when a deferred dependency (openai, pandas, requests, PIL, anthropic) loads at start.
+#
+#   python benchmarks/import_time.py --budget-ms 250
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFERRED = ["openai", "pandas", "requests", "PIL", "anthropic"]  # must not load on a plain first run
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+BASELINE_SCRIPT = "import streamlit; from streamlit.testing.v1 import AppTest"
+APP_SCRIPT = f"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+started = time.perf_counter()
+at = AppTest.from_file({str(ROOT / 'content_synth_app.py')!r}, default_timeout=120)
+at.secrets["ANTHROPIC_API_KEY"] = ""
+at.secrets["OPENAI_API_KEY"] = ""
+at.run()
+print(json.dumps({{"run_s": time.perf_counter() - started, "exception": bool(at.exception),
+                  "loaded": [m for m in {DEFERRED!r} if m in sys.modules]}}))
+"""
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            rows.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2))
+    return rows
+
+def run_importtime(script, cwd):
+    env = {**os.environ, "CONTENT_SYNTH_BACKEND": "mock", "PYTHONDONTWRITEBYTECODE": "1"}
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", script], cwd=cwd, env=env,
+                             capture_output=True, text=True, timeout=300)
+    return process.stdout, parse_importtime(process.stderr)
+
+def summarise(rows, skip):
+    """Self time (ms) per top-level package for modules not in skip"""
+    packages = {}
+    for module, self_us, _, _ in rows:
+        if module not in skip:
+            root = module.split(".")[0]
+            packages[root] = packages.get(root, 0.0) + self_us / 1000
+    return dict(sorted(packages.items(), key=lambda item: -item[1]))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=250.0, help="max import time added by the app")
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args()
+
+    _, baseline_rows = run_importtime(BASELINE_SCRIPT, ROOT)
+    stdout, app_rows = run_importtime(APP_SCRIPT, ROOT)
+    result = json.loads(stdout.strip().splitlines()[-1])
+    packages = summarise(app_rows, {row[0] for row in baseline_rows})
+    total_ms = sum(packages.values())
+
+    print(f"first script run {result['run_s'] * 1000:.0f} ms; imports added by the app {total_ms:.0f} ms "
+          f"(budget {args.budget_ms:.0f} ms); Streamlit baseline "
+          f"{sum(row[1] for row in baseline_rows) / 1000:.0f} ms")
+    print(f"{'package':28}{'self ms':>10}")
+    for package, ms in list(packages.items())[:args.top]:
+        print(f"{package:28}{ms:>10.1f}")
+
+    failures = []
+    if result["exception"]:
+        failures.append("app raised on its first run")
+    if result["loaded"]:
+        failures.append(f"deferred dependencies imported at start: {', '.join(result['loaded'])}")
+    if total_ms > args.budget_ms:
+        failures.append(f"app import time {total_ms:.0f} ms over the {args.budget_ms:.0f} ms budget")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
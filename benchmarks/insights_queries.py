@@ -0,0 +1,61 @@
+# benchmarks/insights_queries.py - Insight query latency: SQL engine vs reloading DataFrames
+# Times every INSIGHT_QUERIES entry on a fresh InsightsEngine (unmemoised, then memoised) and
+# compares with the old pattern of loading the analytics tables and grouping them in pandas.
+#
+#   python benchmarks/insights_queries.py --repeats 20
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analytics_store import AnalyticsStore
+from insights_sql import INSIGHT_QUERIES, InsightsEngine, build_query, duckdb_available
+
+def timed_ms(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def pandas_engagement_by_day():
+    """What the apps did before: load the tables, then group"""
+    posts = AnalyticsStore.load().posts
+    return posts.groupby("Day_of_Week", observed=True)["total_engagement"].agg(["count", "mean"])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=20.0, help="max unmemoised latency per query")
+    args = parser.parse_args()
+
+    backends = ["sqlite"] + (["duckdb"] if duckdb_available() else [])
+    failures = []
+    for backend in backends:
+        started = time.perf_counter()
+        engine = InsightsEngine(backend=backend)
+        open_ms = (time.perf_counter() - started) * 1000
+        print(f"\n{backend}: engine opened in {open_ms:.1f} ms")
+        print(f"{'query':26}{'sql ms':>10}{'memoised ms':>13}{'rows':>6}")
+        for name in INSIGHT_QUERIES:
+            first = timed_ms(lambda: engine.sql(*build_query(name)), args.repeats)
+            rows = engine.run(name)
+            memoised = timed_ms(lambda: engine.run(name), args.repeats)
+            print(f"{name:26}{first:>10.2f}{memoised:>13.3f}{len(rows):>6}")
+            if first > args.budget_ms:
+                failures.append(f"{backend} {name} took {first:.1f} ms")
+        engine.close()
+
+    reload_ms = timed_ms(pandas_engagement_by_day, max(1, args.repeats // 4))
+    print(f"\npandas reload + groupby (engagement by day): {reload_ms:.1f} ms")
+    for failure in failures:
+        print(f"FAIL {failure} (budget {args.budget_ms:.0f} ms)")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
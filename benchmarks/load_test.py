@@ -0,0 +1,349 @@
+# benchmarks/load_test.py - Concurrent-session load test against a real Streamlit server
+# Starts `streamlit run content_synth_app.py` on the mock Claude/DALL-E backend and drives N
+# simulated browser sessions over Streamlit's websocket protocol (protobuf BackMsg/ForwardMsg,
+# fragment-scoped reruns where the browser would send them). Each session walks a realistic
+# flow - load, pick platform, pick style, generate caption, generate image, regenerate,
+# generate again, export CSV + bundle - and the harness reports throughput, latency percentiles,
+# server RSS per session and the app's own per-session accounting (?debug=memory) as N scales.
+#
+#   python benchmarks/load_test.py --sessions 1,5,10,20 --latency-scale 0.25
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from request_executor import percentile
+FINAL_STATUSES = {ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_WITH_COMPILE_ERROR,
+                  ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY}
+VALUE_FIELDS = {"selectbox": "string_value", "radio": "string_value", "text_input": "string_value"}
+STEP_TIMEOUT_S = 120
+
+class FlowError(RuntimeError):
+    pass
+
+# ==========================================
+# SIMULATED BROWSER SESSION
+# ==========================================
+
+class SimulatedSession:
+    """One browser tab: keeps the widget map and current widget values like the frontend does"""
+
+    def __init__(self, base_url, query_string=""):
+        self.base_url = base_url
+        self.query_string = query_string
+        self.session_id = None
+        self.widgets = {}   # label -> (element type, element proto, fragment id)
+        self.values = {}    # widget id -> WidgetState sent with every rerun
+        self.texts = []     # markdown bodies from the latest run
+        self.exceptions = []
+        self._ws = None
+
+    async def open(self):
+        url = self.base_url.replace("http", "ws", 1) + "/_stcore/stream"
+        self._ws = await websockets.connect(url, subprotocols=["streamlit"], max_size=None)
+        return await self.rerun()
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+
+    async def _send(self, message):
+        await self._ws.send(message.SerializeToString())
+
+    async def _receive(self):
+        message = ForwardMsg()
+        message.ParseFromString(await asyncio.wait_for(self._ws.recv(), STEP_TIMEOUT_S))
+        return message
+
+    async def rerun(self, trigger=None, fragment_id=""):
+        """Send a rerun with the current widget values (+ a trigger); ms until the last run ends"""
+        message = BackMsg()
+        message.rerun_script.query_string = self.query_string
+        message.rerun_script.fragment_id = fragment_id
+        for state in self.values.values():
+            message.rerun_script.widget_states.widgets.add().CopyFrom(state)
+        if trigger is not None:
+            trigger_state = message.rerun_script.widget_states.widgets.add()
+            trigger_state.id = trigger
+            trigger_state.trigger_value = True
+
+        started = time.perf_counter()
+        await self._send(message)
+        self.texts = []
+        while True:
+            forward = await self._receive()
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.session_id = forward.new_session.initialize.session_id or self.session_id
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self._track(forward.delta.new_element, forward.delta.fragment_id)
+            elif kind == "script_finished" and forward.script_finished in FINAL_STATUSES:
+                return (time.perf_counter() - started) * 1000
+
+    def _track(self, element, fragment_id):
+        element_type = element.WhichOneof("type")
+        inner = getattr(element, element_type)
+        if element_type == "exception":
+            self.exceptions.append(inner.message)
+        elif element_type == "markdown":
+            self.texts.append(inner.body)
+        elif getattr(inner, "id", "") and getattr(inner, "label", ""):
+            self.widgets[inner.label] = (element_type, inner, fragment_id)
+
+    def widget(self, label):
+        for widget_label, widget in self.widgets.items():
+            if widget_label.startswith(label):
+                return widget
+        raise FlowError(f"no widget labelled {label!r}")
+
+    async def set(self, label, value):
+        element_type, element, fragment_id = self.widget(label)
+        state = self.values.setdefault(element.id, WidgetState(id=element.id))
+        setattr(state, VALUE_FIELDS[element_type], value)
+        return await self.rerun(fragment_id=fragment_id)
+
+    async def click(self, label):
+        _, element, fragment_id = self.widget(label)
+        return await self.rerun(trigger=element.id, fragment_id=fragment_id)
+
+    async def download(self, label):
+        """Fetch a download button's file (deferred ones via a backend operation), then click it"""
+        _, element, fragment_id = self.widget(label)
+        url = element.url
+        if not url and element.deferred_file_id:
+            request = BackMsg()
+            request.backend_operation_request.request_id = f"{element.deferred_file_id}:{time.monotonic_ns()}"
+            request.backend_operation_request.session_id = self.session_id
+            request.backend_operation_request.deferred_file.file_id = element.deferred_file_id
+            started = time.perf_counter()
+            await self._send(request)
+            while True:
+                forward = await self._receive()
+                if forward.WhichOneof("type") == "backend_operation_response":
+                    response = forward.backend_operation_response
+                    if response.error_msg:
+                        raise FlowError(f"deferred download failed: {response.error_msg}")
+                    url = response.deferred_file.url
+                    break
+        else:
+            started = time.perf_counter()
+        size = len(await asyncio.to_thread(_fetch, self.base_url + url))
+        elapsed = (time.perf_counter() - started) * 1000
+        return elapsed + await self.rerun(trigger=element.id, fragment_id=fragment_id), size
+
+async def open_and_close(session):
+    try:
+        await session.open()
+    finally:
+        await session.close()
+
+def _fetch(url):
+    with urllib.request.urlopen(url, timeout=STEP_TIMEOUT_S) as response:
+        return response.read()
+
+# ==========================================
+# USER FLOW
+# ==========================================
+
+async def user_flow(session, rng, think_s, record):
+    """load -> platform -> style -> caption -> image -> regenerate -> caption -> export"""
+
+    async def step(name, action):
+        try:
+            result = await action
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as error:
+            raise FlowError(f"{name}: {error}") from error
+        latency = result[0] if isinstance(result, tuple) else result
+        record(name, latency)
+        if session.exceptions:
+            raise FlowError(f"{name}: app raised {session.exceptions[-1]}")
+        await asyncio.sleep(rng.uniform(0.5, 1.5) * think_s)
+
+    await step("load", session.open())
+    platforms = list(session.widget("Platform")[1].options)
+    await step("pick platform", session.set("Platform", rng.choice(platforms)))
+    await step("pick style", session.set("Style", rng.choice(list(session.widget("Style")[1].options))))
+    await step("keywords", session.set("Keywords", f"load test {rng.getrandbits(32):08x}"))
+    await step("generate caption", session.click("✨ GENERATE CAPTION"))
+    await step("generate image", session.click("🎨 GENERATE IMAGE"))
+    await step("regenerate", session.click("🔄 Regenerate"))
+    await step("generate caption", session.click("✨ GENERATE CAPTION"))
+    await step("export csv", session.download("📊 Export All"))
+    await step("export bundle", session.download("📦 Download campaign bundle"))
+
+async def warm_up(base_url, seed):
+    """One untimed flow so imports and shared caches are paid before the baseline RSS"""
+    session = SimulatedSession(base_url)
+    try:
+        await user_flow(session, random.Random(seed), 0, lambda name, latency: None)
+    finally:
+        await session.close()
+
+# ==========================================
+# SERVER
+# ==========================================
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def start_server(port, latency_scale, secrets_path, log_path):
+    env = {**os.environ, "CONTENT_SYNTH_BACKEND": "mock", "CONTENT_SYNTH_MOCK_LATENCY_SCALE": str(latency_scale)}
+    command = [sys.executable, "-m", "streamlit", "run", "content_synth_app.py", "--server.headless", "true",
+               "--server.port", str(port), "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false",
+               "--secrets.files", str(secrets_path)]
+    with open(log_path, "w") as log:  # the child keeps its own handle
+        server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if _fetch(f"http://127.0.0.1:{port}/_stcore/health") == b"ok":
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"streamlit did not start: {Path(log_path).read_text()[-2000:]}")
+
+def rss_mb(pid):
+    """Resident set size of a process (Linux /proc), None elsewhere"""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+async def app_accounting(base_url):
+    """(sessions, KB) from the app's ?debug=memory view"""
+    session = SimulatedSession(base_url, query_string="debug=memory")
+    await open_and_close(session)
+    for text in session.texts:
+        match = re.match(r"(\d+) sessions · (\d+) KB", text)
+        if match:
+            return int(match.group(1)), int(match.group(2))
+    return None, None
+
+# ==========================================
+# LOAD LEVELS
+# ==========================================
+
+async def run_level(base_url, pid, sessions, think_s, ramp_s, seed):
+    latencies = {}
+    errors = []
+    peak = [rss_mb(pid) or 0.0]
+
+    def record(name, latency):
+        latencies.setdefault(name, []).append(latency)
+
+    async def one(index):
+        rng = random.Random(seed * 1000 + index)
+        await asyncio.sleep(ramp_s * index / max(1, sessions))
+        session = SimulatedSession(base_url)
+        try:
+            await user_flow(session, rng, think_s, record)
+            return session
+        except (FlowError, OSError, asyncio.TimeoutError, websockets.WebSocketException) as error:
+            errors.append(f"session {index}: {error}")
+            return session
+
+    async def sample_rss():
+        while True:
+            peak[0] = max(peak[0], rss_mb(pid) or 0.0)
+            await asyncio.sleep(0.25)
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    finished = await asyncio.gather(*(one(index) for index in range(sessions)))
+    wall_s = time.perf_counter() - started
+    sampler.cancel()
+
+    live_rss = rss_mb(pid)  # every session still connected
+    accounted_sessions, accounted_kb = await app_accounting(base_url)
+    for session in finished:
+        await session.close()
+    samples = [latency for values in latencies.values() for latency in values]
+    return {
+        "sessions": sessions,
+        "wall_s": wall_s,
+        "flows_per_s": (sessions - len(errors)) / wall_s,
+        "steps_per_s": len(samples) / wall_s,
+        "p50_ms": percentile(samples, 50), "p95_ms": percentile(samples, 95), "p99_ms": percentile(samples, 99),
+        "max_ms": max(samples, default=float("nan")),
+        "steps": {name: {"p50_ms": percentile(values, 50), "p95_ms": percentile(values, 95), "n": len(values)}
+                  for name, values in latencies.items()},
+        "rss_live_mb": live_rss, "rss_peak_mb": peak[0],
+        "app_sessions": accounted_sessions, "app_kb": accounted_kb,
+        "errors": errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", default="1,5,10,20", help="comma-separated concurrency levels")
+    parser.add_argument("--latency-scale", type=float, default=0.25, help="mock model latency multiplier")
+    parser.add_argument("--think-ms", type=float, default=300, help="mean pause between a user's steps")
+    parser.add_argument("--ramp-s", type=float, default=2.0, help="spread session starts over this many seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="also write the results here")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        secrets_path = Path(scratch) / "secrets.toml"
+        secrets_path.write_text('ANTHROPIC_API_KEY = ""\nOPENAI_API_KEY = ""\n', encoding="utf-8")
+        for sessions in [int(level) for level in args.sessions.split(",")]:
+            port = free_port()
+            server = start_server(port, args.latency_scale, secrets_path, Path(scratch) / f"server_{sessions}.log")  # fresh process per level
+            base_url = f"http://127.0.0.1:{port}"
+            try:
+                asyncio.run(warm_up(base_url, args.seed))
+                baseline = rss_mb(server.pid)
+                result = asyncio.run(run_level(base_url, server.pid, sessions, args.think_ms / 1000, args.ramp_s, args.seed))
+                result["rss_baseline_mb"] = baseline
+                results.append(result)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+    print(f"{'sessions':>8}{'flows/s':>9}{'steps/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'RSS MB':>9}{'MB/sess':>9}{'app KB/sess':>12}{'errors':>8}")
+    for result in results:
+        per_session = ((result["rss_live_mb"] - result["rss_baseline_mb"]) / result["sessions"]
+                       if result["rss_live_mb"] and result["rss_baseline_mb"] else float("nan"))
+        app_kb = result["app_kb"] / result["app_sessions"] if result["app_sessions"] else float("nan")
+        print(f"{result['sessions']:>8}{result['flows_per_s']:>9.2f}{result['steps_per_s']:>9.1f}{result['p50_ms']:>9.0f}"
+              f"{result['p95_ms']:>9.0f}{result['p99_ms']:>9.0f}{result['max_ms']:>9.0f}{result['rss_live_mb'] or 0:>9.0f}"
+              f"{per_session:>9.2f}{app_kb:>12.1f}{len(result['errors']):>8}")
+
+    heaviest = results[-1]
+    print(f"\nper step at {heaviest['sessions']} sessions:")
+    for name, step in heaviest["steps"].items():
+        print(f"  {name:18} p50 {step['p50_ms']:>7.0f} ms   p95 {step['p95_ms']:>7.0f} ms   ({step['n']})")
+    for result in results:
+        for error in result["errors"][:5]:
+            print(f"FAIL [{result['sessions']} sessions] {error}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2, default=str), encoding="utf-8")
+    return 1 if any(result["errors"] for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
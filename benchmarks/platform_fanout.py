@@ -0,0 +1,60 @@
+# benchmarks/platform_fanout.py - Five per-platform caption calls vs one multi-platform fan-out call
+# Generates a tailored caption for every platform in the brand profile on the mock backend, once
+# with a generate_caption_set call per platform and once with generate_platform_captions, and
+# compares wall time, tokens, cost and how many captions land within their platform limit.
+#
+#   python benchmarks/platform_fanout.py --briefs 10 --latency-scale 0.2
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from brand_profiles import get_brand_profile
+from content_engine import auto_select_persona, fanout_platforms, generate_caption_set, generate_platform_captions
+from mock_backend import MockAnthropic
+from request_executor import percentile
+from token_budget import CostLedger
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--briefs", type=int, default=10, help="cross-platform briefs to generate")
+    parser.add_argument("--latency-scale", type=float, default=0.2, help="mock latency multiplier")
+    args = parser.parse_args()
+
+    profile = get_brand_profile()
+    platforms = fanout_platforms(profile)
+    campaigns = profile.campaign_types
+    rows = {}
+    for mode in ("per-platform", "fan-out"):
+        client, ledger = MockAnthropic(latency_scale=args.latency_scale), CostLedger(path=None)
+        durations, within = [], 0
+        for i in range(args.briefs):
+            campaign = campaigns[i % len(campaigns)]
+            persona = auto_select_persona(campaign, profile)
+            started = time.perf_counter()
+            if mode == "fan-out":
+                results = list(generate_platform_captions(client, persona, campaign, "Friendly", f"Course {i}",
+                                                          platforms, profile=profile, ledger=ledger).values())
+            else:
+                results = [generate_caption_set(client, persona, platform, campaign, "Friendly", f"Course {i}", 1,
+                                                profile=profile, ledger=ledger)[0] for platform in platforms]
+            durations.append(time.perf_counter() - started)
+            within += sum(result["char_count"] <= result["char_limit"] for result in results)
+        rows[mode] = {"p50_s": percentile(durations, 50), "p95_s": percentile(durations, 95),
+                      "within": within, **ledger.totals()}
+
+    total = args.briefs * len(platforms)
+    print(f"{len(platforms)} platforms x {args.briefs} briefs")
+    print(f"{'mode':14}{'p50 s':>8}{'p95 s':>8}{'calls':>7}{'in tok':>9}{'out tok':>9}{'cost $':>9}  within limit")
+    for mode, row in rows.items():
+        print(f"{mode:14}{row['p50_s']:>8.2f}{row['p95_s']:>8.2f}{row['calls']:>7}{row['input_tokens']:>9}"
+              f"{row['output_tokens']:>9}{row['cost_usd']:>9.4f}  {row['within']}/{total}")
+    speedup = rows["per-platform"]["p50_s"] / rows["fan-out"]["p50_s"]
+    print(f"fan-out p50 is {speedup:.1f}x faster per brief")
+    return 0 if rows["fan-out"]["within"] == total else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
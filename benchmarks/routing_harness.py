@@ -0,0 +1,96 @@
+# benchmarks/routing_harness.py - Model routing policy against the local mock backend
+# Checks the routing decisions in config/model_routing.json, then runs the same briefs through
+# "always quality tier" and the routed policy and compares latency, acceptance and cost.
+#
+#   python benchmarks/routing_harness.py --requests 120 --latency-scale 0.02
+
+import argparse
+import itertools
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from brand_profiles import get_brand_profile
+from content_engine import auto_select_persona, generate_caption_set
+from mock_backend import MockAnthropic
+from model_router import ModelRouter
+from request_executor import percentile
+from token_budget import CostLedger
+
+def check_policy(router, profile):
+    """Routing decisions the config promises; returns a list of failures"""
+    failures = []
+    limits = {platform: spec["recommended_caption"] for platform, spec in profile.platform_specs.items()}
+    short_limit = router.config["short_caption_chars"]
+    for platform, limit in limits.items():
+        expected = router.config["escalation_order"][0] if limit <= short_limit else router.config["default_tier"]
+        tier = router.route(limit).tier
+        if tier != expected:
+            failures.append(f"{platform} ({limit} chars) routed to {tier}, expected {expected}")
+    for operation, expected in router.config["operation_tiers"].items():
+        if router.route(max(limits.values()), operation).tier != expected:
+            failures.append(f"{operation} jobs not routed to {expected}")
+    top = router.route(max(limits.values()))
+    if router.escalation(top) is not None:
+        failures.append("top tier should not escalate further")
+    rejected = {"length_status": "exceeded", "alignment_score": 100}
+    if router.rejection_reason(rejected) is None:
+        failures.append("an over-limit result was accepted")
+    return failures
+
+def run_policy(briefs, router, latency_scale, model=None):
+    client = MockAnthropic(latency_scale=latency_scale, seed=42)
+    ledger = CostLedger(path=None)
+    scoring = router or ModelRouter()
+    latencies, accepted, escalated = [], 0, 0
+    for persona, platform, campaign_type, tone in briefs:
+        started = time.perf_counter()
+        result, _ = generate_caption_set(client, persona, platform, campaign_type, tone, "", 3,
+                                         ledger=ledger, router=router, model=model)
+        latencies.append(time.perf_counter() - started)
+        accepted += scoring.rejection_reason(result) is None
+        escalated += "on fast" in result.get("route", "")
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "acceptance": accepted / len(briefs),
+        "escalated": escalated,
+        "cost_usd": ledger.totals()["cost_usd"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=120)
+    parser.add_argument("--latency-scale", type=float, default=0.02, help="mock latency multiplier (1.0 = real-ish)")
+    args = parser.parse_args()
+
+    router = ModelRouter.from_file()
+    profile = get_brand_profile()
+    failures = check_policy(router, profile)
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    combos = list(itertools.product(profile.platforms, profile.campaign_types, profile.brand_tones))
+    briefs = [(auto_select_persona(c, profile), p, c, t) for p, c, t in itertools.islice(itertools.cycle(combos), args.requests)]
+
+    baseline = run_policy(briefs, None, args.latency_scale, model=router.config["tiers"][router.config["default_tier"]])
+    routed = run_policy(briefs, router, args.latency_scale)
+
+    print(f"{'policy':10}{'p50 ms':>10}{'p95 ms':>10}{'accepted':>10}{'escalated':>11}{'cost $':>10}")
+    for label, stats in (("quality", baseline), ("routed", routed)):
+        print(f"{label:10}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['acceptance']:>10.0%}"
+              f"{stats['escalated']:>11}{stats['cost_usd']:>10.4f}")
+    print()
+    for tier, stats in router.report().items():
+        print(f"{tier:8} {stats['model']:28} calls {stats['calls']:4}  accepted {stats['acceptance_rate']:.0%}  "
+              f"p50 {stats['p50_ms']:.1f} ms  p95 {stats['p95_ms']:.1f} ms")
+
+    if routed["acceptance"] + 0.02 < baseline["acceptance"]:
+        failures.append("routed policy accepts noticeably fewer captions than the quality tier")
+        print(f"FAIL {failures[-1]}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+# benchmarks/scheduler_speed.py - Content scheduler solve time and constraint check
+# Schedules synthetic posts across every platform and verifies daily caps and spacing.
+#
+#   python benchmarks/scheduler_speed.py --posts 5000 --weeks 26
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analytics_store import AnalyticsStore
+from content_scheduler import DAILY_CAPS, MIN_GAP_HOURS, posting_time_model, schedule_posts
+
+def check_constraints(schedule, min_gap):
+    """Cap and spacing violations in a schedule; returns a list of failures"""
+    failures = []
+    placed = schedule[schedule["scheduled"]]
+    for (platform, day), hours in placed.groupby(["platform", "date"])["hour"]:
+        hours = np.sort(hours.to_numpy(dtype=int))
+        if len(hours) > DAILY_CAPS.get(platform, len(hours)):
+            failures.append(f"{platform} {day}: {len(hours)} posts over the cap")
+        if len(hours) > 1 and np.diff(hours).min() < min_gap:
+            failures.append(f"{platform} {day}: posts {np.diff(hours).min()}h apart")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--weeks", type=int, default=26)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    model = posting_time_model(AnalyticsStore.load().daily)
+    rng = np.random.default_rng(7)
+    platforms = list(DAILY_CAPS)
+    posts = [{"post_id": f"p{i}", "platform": platforms[i % len(platforms)],
+              "alignment_score": int(rng.integers(60, 101))} for i in range(args.posts)]
+
+    timings = []
+    for _ in range(args.repeats):
+        started = time.perf_counter()
+        schedule = schedule_posts(posts, "2026-01-05", args.weeks, model)
+        timings.append(time.perf_counter() - started)
+
+    placed = schedule[schedule["scheduled"]]
+    print(f"{args.posts} posts over {args.weeks} weeks: {len(placed)} scheduled, "
+          f"{len(schedule) - len(placed)} over capacity")
+    print(f"solve time: best {min(timings) * 1000:.1f} ms, median {np.median(timings) * 1000:.1f} ms")
+    print(placed.groupby("platform")["predicted_engagement"].agg(["count", "mean"]).round(2).to_string())
+
+    failures = check_constraints(schedule, MIN_GAP_HOURS)
+    if np.median(timings) > 1.0:
+        failures.append("median solve time over one second")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
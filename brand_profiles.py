@@ -0,0 +1,198 @@
+# brand_profiles.py - Multi-tenant brand profiles
+# Each institution's personas, hashtag bank and platform specs live in config/brands/<tenant>.json
+# (or .yaml). Profiles compile once into frozen lookup structures, are cached per process and
+# reload atomically when their file changes.
+
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+
+BRANDS_DIR = Path("config") / "brands"
+DEFAULT_TENANT = "default"
+RELOAD_CHECK_SECONDS = 2.0  # how often a cached profile stats its file for changes
+PROFILE_SUFFIXES = (".json", ".yaml", ".yml")
+
+REQUIRED_KEYS = ["personas", "default_persona", "campaign_personas", "hashtag_bank", "platforms", "platform_specs"]
+
+# ==========================================
+# FREEZING + KEYWORD AUTOMATA
+# ==========================================
+
+def freeze(value):
+    """Recursively turn dicts into read-only mappings and lists into tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def compile_keywords(keywords):
+    """One compiled alternation per keyword set - a single scan finds every keyword present"""
+    ordered = sorted({k.lower() for k in keywords if k}, key=len, reverse=True)
+    if not ordered:
+        return None
+    return re.compile("(?=(" + "|".join(re.escape(k) for k in ordered) + "))")
+
+def count_keywords(matcher, text_lower):
+    """Number of distinct keywords from a compiled set found in (lowercased) text"""
+    if matcher is None:
+        return 0
+    return len(set(matcher.findall(text_lower)))
+
+@dataclass(frozen=True)
+class BrandProfile:
+    """Compiled, immutable view of one tenant's brand configuration"""
+    tenant_id: str
+    display_name: str
+    source_path: str
+    personas: MappingProxyType
+    persona_names: tuple
+    default_persona: str
+    campaign_personas: MappingProxyType
+    campaign_types: tuple
+    hashtag_bank: MappingProxyType           # category -> full entry (tags, avg_engagement, note)
+    hashtag_tags: MappingProxyType           # category -> tuple of tags
+    all_hashtags: tuple
+    persona_hashtag_categories: MappingProxyType
+    campaign_hashtag_categories: MappingProxyType
+    mobile_tag_probability: float
+    recommended_hashtag_counts: MappingProxyType
+    content_templates: MappingProxyType      # template name -> structure, description, matching rules
+    default_content_template: str
+    persona_keyword_matchers: MappingProxyType
+    tone_matchers: MappingProxyType
+    brand_tones: tuple
+    default_brand_tone: str
+    platforms: tuple
+    platform_specs: MappingProxyType
+    platform_image_specs: MappingProxyType
+
+def compile_profile(config, tenant_id, source_path=""):
+    """Validate a raw config dict and compile it into a BrandProfile"""
+    missing = [key for key in REQUIRED_KEYS if key not in config]
+    if missing:
+        raise ValueError(f"Brand profile '{tenant_id}' is missing: {', '.join(missing)}")
+    if config["default_persona"] not in config["personas"]:
+        raise ValueError(f"Brand profile '{tenant_id}': default_persona is not a defined persona")
+    unknown = sorted(set(config["campaign_personas"].values()) - set(config["personas"]))
+    if unknown:
+        raise ValueError(f"Brand profile '{tenant_id}': campaigns map to unknown personas {unknown}")
+
+    personas = config["personas"]
+    hashtag_bank = config["hashtag_bank"]
+    hashtag_tags = {category: tuple(entry["tags"]) for category, entry in hashtag_bank.items()}
+    all_hashtags = tuple(dict.fromkeys(tag for tags in hashtag_tags.values() for tag in tags))
+    brand_tones = tuple(config.get("brand_tones", ["Professional", "Casual", "Friendly"]))
+    content_templates = config.get("content_templates", {})
+    default_template = config.get("default_content_template", next(iter(content_templates), ""))
+    if content_templates and default_template not in content_templates:
+        raise ValueError(f"Brand profile '{tenant_id}': default_content_template is not a defined template")
+
+    return BrandProfile(
+        tenant_id=tenant_id,
+        display_name=config.get("display_name", tenant_id),
+        source_path=str(source_path),
+        personas=freeze(personas),
+        persona_names=tuple(personas),
+        default_persona=config["default_persona"],
+        campaign_personas=freeze(config["campaign_personas"]),
+        campaign_types=tuple(config.get("campaign_types", config["campaign_personas"])),
+        hashtag_bank=freeze(hashtag_bank),
+        hashtag_tags=freeze(hashtag_tags),
+        all_hashtags=all_hashtags,
+        persona_hashtag_categories=freeze({
+            name: info["hashtag_category"] for name, info in personas.items() if info.get("hashtag_category") in hashtag_tags
+        }),
+        campaign_hashtag_categories=freeze(config.get("campaign_hashtag_categories", {})),
+        mobile_tag_probability=float(config.get("mobile_tag_probability", 0.3)),
+        recommended_hashtag_counts=freeze(config.get("recommended_hashtag_counts", {})),
+        content_templates=freeze(content_templates),
+        default_content_template=default_template,
+        persona_keyword_matchers=MappingProxyType({
+            name: compile_keywords(info.get("visual_keywords", [])) for name, info in personas.items()
+        }),
+        tone_matchers=MappingProxyType({
+            tone: compile_keywords(words) for tone, words in config.get("tone_indicators", {}).items()
+        }),
+        brand_tones=brand_tones,
+        default_brand_tone=config.get("default_brand_tone", brand_tones[0]),
+        platforms=tuple(config["platforms"]),
+        platform_specs=freeze(config["platform_specs"]),
+        platform_image_specs=freeze(config.get("platform_image_specs", {})),
+    )
+
+# ==========================================
+# LOADING + PER-PROCESS CACHE
+# ==========================================
+
+def _profile_path(tenant_id, brands_dir):
+    for suffix in PROFILE_SUFFIXES:
+        path = Path(brands_dir) / f"{tenant_id}{suffix}"
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"No brand profile for tenant '{tenant_id}' in {brands_dir}")
+
+def read_profile_file(path):
+    """Parse a JSON or YAML profile file (YAML needs PyYAML)"""
+    text = Path(path).read_text(encoding="utf-8")
+    if Path(path).suffix == ".json":
+        return json.loads(text)
+    try:
+        import yaml
+    except ImportError as exc:
+        raise ImportError(f"PyYAML is required to load {path}") from exc
+    return yaml.safe_load(text)
+
+def list_tenants(brands_dir=BRANDS_DIR):
+    """Tenant ids with a profile file, default first"""
+    tenants = sorted({p.stem for p in Path(brands_dir).glob("*") if p.suffix in PROFILE_SUFFIXES})
+    return sorted(tenants, key=lambda t: t != DEFAULT_TENANT)
+
+class BrandProfileCache:
+    """Compiled profiles per tenant; a changed file is re-parsed off to the side and swapped in atomically"""
+
+    def __init__(self, brands_dir=BRANDS_DIR, check_seconds=RELOAD_CHECK_SECONDS):
+        self.brands_dir = Path(brands_dir)
+        self.check_seconds = check_seconds
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._profiles = {}  # tenant -> (mtime_ns, last_checked, BrandProfile)
+
+    def get(self, tenant_id=DEFAULT_TENANT):
+        now = time.monotonic()
+        cached = self._profiles.get(tenant_id)
+        if cached and now - cached[1] < self.check_seconds:
+            return cached[2]
+
+        path = _profile_path(tenant_id, self.brands_dir)
+        mtime = path.stat().st_mtime_ns
+        if cached and cached[0] == mtime:
+            self._profiles[tenant_id] = (mtime, now, cached[2])
+            return cached[2]
+
+        with self._lock:
+            cached = self._profiles.get(tenant_id)
+            if cached and cached[0] == mtime:
+                return cached[2]
+            try:
+                profile = compile_profile(read_profile_file(path), tenant_id, path)
+            except Exception:
+                if cached:
+                    # Half-saved or invalid edit: keep serving the last good profile
+                    self._profiles[tenant_id] = (cached[0], now, cached[2])
+                    return cached[2]
+                raise
+            self._profiles[tenant_id] = (mtime, now, profile)
+            if cached:
+                self.reloads += 1
+            return profile
+
+_default_cache = BrandProfileCache()
+
+def get_brand_profile(tenant_id=DEFAULT_TENANT):
+    """Compiled profile for a tenant from the shared per-process cache"""
+    return _default_cache.get(tenant_id)
@@ -0,0 +1,216 @@
+# bundle_export.py - Streaming ZIP export of a campaign: captions, manifest and image renditions
+# The archive is produced as a sequence of byte chunks: zipfile writes into a non-seekable sink
+# (so members use data descriptors) and the sink is drained after every small write. Images are
+# copied from the ImageCache in fixed-size blocks, platform-size renditions are the WebP files the
+# app already stored with each image (a JPEG is rendered one at a time only when none exists), so
+# memory stays bounded however many posts and images the bundle holds.
+#
+#   python bundle_export.py --posts .cache/batches/<run_id>/results.jsonl --out campaign.zip
+
+import argparse
+import csv
+import io
+import json
+import re
+import sys
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+from image_cache import ImageCache
+from image_delivery import webp_rendition_name
+
+COPY_BLOCK_BYTES = 1024 * 1024  # image bytes copied (and yielded) per step
+RENDITION_QUALITY = 88
+MANIFEST_FIELDS = ["index", "caption_file", "platform", "persona", "campaign_type", "brand_tone", "template",
+                   "char_count", "char_limit", "alignment_score", "length_status", "model", "timestamp",
+                   "scheduled_at", "hashtags", "caption", "image_key", "image_files"]
+
+# ==========================================
+# TEXT EXPORT
+# ==========================================
+
+def caption_text(result):
+    """Formatted text export of one caption"""
+    return f"""Content Synth AI - Generated Caption
+{'='*50}
+
+Platform: {result['platform']}
+Persona: {result['persona']}
+Campaign: {result['campaign_type']}
+Brand Tone: {result['brand_tone']}
+Timestamp: {result['timestamp']}
+Character Count: {result['char_count']}/{result['char_limit']}
+
+CAPTION:
+{result['caption']}
+
+HASHTAGS:
+{' '.join(result['hashtags'])}
+
+METADATA:
+- Brand Alignment Score: {result['alignment_score']}%
+- Length Status: {result['length_status']}
+- Generated with: Claude AI + Research-based Personas
+"""
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "_", str(text).lower()).strip("_") or "post"
+
+# ==========================================
+# STREAMING ZIP
+# ==========================================
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable target for zipfile; bytes are collected until drained"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _rendition(handle, size):
+    """JPEG resized/cropped to a platform size like "1080x1350" (one decoded image at a time)"""
+    from PIL import ImageOps
+
+    width, height = map(int, size.split("x"))
+    with handle.open() as image:
+        fitted = ImageOps.fit(image.convert("RGB"), (width, height))
+    buffer = io.BytesIO()
+    fitted.save(buffer, format="JPEG", quality=RENDITION_QUALITY)
+    return buffer.getvalue()
+
+def _copy_file(bundle, sink, source, name):
+    """Store a file as a member in COPY_BLOCK_BYTES blocks, yielding the drained chunks"""
+    # PNG/JPEG/WebP are already compressed - store, don't deflate
+    with source.open("rb") as image_file, bundle.open(
+        zipfile.ZipInfo(name, date_time=datetime.now().timetuple()[:6]), "w"
+    ) as member:
+        while block := image_file.read(COPY_BLOCK_BYTES):
+            member.write(block)
+            yield sink.drain()
+
+def _rendition_size(post, handle):
+    """Platform size the post's image is delivered at, None when the original already has it"""
+    size = post.get("image_size")
+    return None if size == handle.metadata.get("dalle_size") else size
+
+def estimate_bundle_bytes(posts, image_cache=None, renditions=True):
+    """Approximate ZIP size from the files on disk (captions and manifests count ~4 KB per post)"""
+    image_cache = image_cache or ImageCache()
+    total, seen = 4096 * len(posts), set()
+    for post in posts:
+        handle = image_cache.peek(post["image_key"]) if post.get("image_key") else None
+        if handle is None:
+            continue
+        size = _rendition_size(post, handle) if renditions else None
+        sources = [handle.path, handle.thumbnail_path] + ([handle.rendition_path(webp_rendition_name(size))] if size else [])
+        for source in sources:
+            if source not in seen and source.exists():
+                seen.add(source)
+                total += source.stat().st_size
+    return total
+
+def iter_bundle(posts, image_cache=None, renditions=True):
+    """Yield the ZIP for posts (result dicts, optionally with image_key/image_size) chunk by chunk"""
+    image_cache = image_cache or ImageCache()
+    sink = _ChunkSink()
+    written_images = {}  # image key -> archive paths, so shared images are stored once
+    manifest = []
+
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        for index, post in enumerate(posts, start=1):
+            caption_file = f"captions/{index:04d}_{_slug(post.get('platform'))}_{_slug(post.get('persona'))}.txt"
+            bundle.writestr(caption_file, caption_text(post))
+            yield sink.drain()
+
+            image_files = []
+            image_key = post.get("image_key")
+            handle = image_cache.peek(image_key) if image_key else None
+            if handle is not None:
+                if image_key not in written_images:
+                    written_images[image_key] = []
+                    for source, name in ((handle.path, f"images/{image_key}.png"),
+                                         (handle.thumbnail_path, f"images/{image_key}.thumb.jpg")):
+                        if not source.exists():
+                            continue
+                        yield from _copy_file(bundle, sink, source, name)
+                        written_images[image_key].append(name)
+                image_files = list(written_images[image_key])
+
+                size = _rendition_size(post, handle) if renditions else None
+                if size:
+                    # The WebP the app delivered is reused as-is; a JPEG is rendered only when there is none
+                    stored = handle.rendition_path(webp_rendition_name(size))
+                    rendition_name = f"images/{image_key}_{size}.{'webp' if stored.exists() else 'jpg'}"
+                    if rendition_name not in written_images[image_key]:
+                        if stored.exists():
+                            yield from _copy_file(bundle, sink, stored, rendition_name)
+                        else:
+                            bundle.writestr(rendition_name, _rendition(handle, size), compress_type=zipfile.ZIP_STORED)
+                            yield sink.drain()
+                        written_images[image_key].append(rendition_name)
+                    image_files.append(rendition_name)
+
+            manifest.append({
+                **{field: post.get(field, "") for field in MANIFEST_FIELDS},
+                "index": index,
+                "caption_file": caption_file,
+                "hashtags": " ".join(post.get("hashtags", [])),
+                "image_key": image_key if handle is not None else "",
+                "image_files": " ".join(image_files),
+            })
+
+        csv_buffer = io.StringIO()
+        writer = csv.DictWriter(csv_buffer, fieldnames=MANIFEST_FIELDS)
+        writer.writeheader()
+        writer.writerows(manifest)
+        bundle.writestr("manifest.csv", csv_buffer.getvalue())
+        bundle.writestr("manifest.json", json.dumps(manifest, indent=2, ensure_ascii=False, default=str))
+        yield sink.drain()
+    yield sink.drain()  # central directory, written on close
+
+def write_bundle(posts, target, image_cache=None, renditions=True):
+    """Stream the bundle into a path or binary file object; returns bytes written"""
+    written = 0
+    output = open(target, "wb") if isinstance(target, (str, Path)) else target
+    try:
+        for chunk in iter_bundle(posts, image_cache, renditions):
+            output.write(chunk)
+            written += len(chunk)
+    finally:
+        if output is not target:
+            output.close()
+    return written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export captions and cached images as one ZIP bundle")
+    parser.add_argument("--posts", required=True, help="results.jsonl from batch_generation.py")
+    parser.add_argument("--out", default="campaign_bundle.zip")
+    parser.add_argument("--no-renditions", action="store_true", help="skip platform-size image renditions")
+    args = parser.parse_args(argv)
+
+    from content_scheduler import load_batch_posts
+
+    posts = load_batch_posts(args.posts)
+    size = write_bundle(posts, args.out, renditions=not args.no_renditions)
+    print(f"{len(posts)} posts -> {args.out} ({size / 1e6:.1f} MB)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+# campaign_prewarm.py - Off-peak pre-generation for upcoming campaigns
+# Reads config/campaign_calendar.json, expands each upcoming campaign into caption briefs
+# (platform x tone x course title), generates and scores results in a small low-priority pool
+# and queues them in the ResponseCache, so launch-day Generate clicks are cache reads.
+#
+# Run from cron during off-peak hours, e.g.:  0 23 * * *  python campaign_prewarm.py
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from brand_profiles import get_brand_profile
+from content_engine import auto_select_persona, generate_caption_set
+from insights_sql import prompt_insights
+from mock_backend import anthropic_client, use_mock_backend
+from model_router import ModelRouter
+from response_cache import ResponseCache, make_response_key
+from token_budget import CostLedger
+
+CALENDAR_PATH = Path("config") / "campaign_calendar.json"
+PREWARM_SESSION = "prewarm"  # ledger session id for pre-generated spend
+
+# ==========================================
+# CALENDAR
+# ==========================================
+
+def load_calendar(path=CALENDAR_PATH):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+def in_off_peak(hour, window):
+    """True if hour falls in [start, end) - windows may wrap midnight, e.g. [22, 6]"""
+    start, end = window
+    return start <= hour < end if start < end else hour >= start or hour < end
+
+def upcoming_briefs(calendar, today=None, days_ahead=None):
+    """Expand campaigns running now or starting within days_ahead into one brief per combination"""
+    today = today or date.today()
+    days_ahead = calendar.get("days_ahead", 14) if days_ahead is None else days_ahead
+    n_candidates = calendar.get("n_candidates", 3)
+
+    briefs = []
+    for campaign in calendar.get("campaigns", []):
+        start = date.fromisoformat(campaign["start"])
+        end = date.fromisoformat(campaign.get("end", campaign["start"]))
+        if end < today or start > today + timedelta(days=days_ahead):
+            continue
+        for platform, tone, course in itertools.product(
+            campaign["platforms"], campaign["tones"], campaign.get("course_titles") or [""]
+        ):
+            briefs.append({
+                "campaign": campaign.get("name", campaign["campaign_type"]),
+                "tenant": campaign.get("tenant", "default"),
+                "campaign_type": campaign["campaign_type"],
+                "platform": platform,
+                "brand_tone": tone,
+                "course_title": course,
+                "n_candidates": n_candidates,
+                "expires": datetime.combine(end + timedelta(days=1), datetime.min.time()).timestamp(),
+            })
+    return briefs
+
+# ==========================================
+# PRE-WARM
+# ==========================================
+
+def prewarm_brief(client, brief, cache, ledger, results_per_brief, spend_cap_usd=None, router=None):
+    """Top up one brief's queue to results_per_brief; returns the number of results generated"""
+    key = make_response_key(brief["tenant"], brief["platform"], brief["campaign_type"],
+                            brief["brand_tone"], brief["course_title"], brief["n_candidates"])
+    missing = results_per_brief - cache.count(key)
+    ttl_seconds = max(brief["expires"] - time.time(), 3600)
+
+    profile = get_brand_profile(brief["tenant"])
+    persona = auto_select_persona(brief["campaign_type"], profile)
+    for _ in range(max(missing, 0)):
+        result, alternatives = generate_caption_set(
+            client, persona, brief["platform"], brief["campaign_type"], brief["brand_tone"],
+            brief["course_title"], brief["n_candidates"], profile=profile, ledger=ledger,
+            ledger_tags={"session_id": PREWARM_SESSION, "tenant": brief["tenant"]},
+            spend_cap_usd=spend_cap_usd, router=router, operation="prewarm",
+            insights=prompt_insights(brief["platform"]),
+        )
+        cache.put(key, {"result": result, "alternatives": alternatives}, ttl_seconds=ttl_seconds)
+    return max(missing, 0)
+
+def run_prewarm(client, briefs, cache=None, ledger=None, results_per_brief=3, workers=2, spend_cap_usd=None):
+    """Pre-generate every brief in a small thread pool; returns counts and spend"""
+    cache = cache or ResponseCache()
+    ledger = ledger or CostLedger()
+    spend_before = ledger.totals(session_id=PREWARM_SESSION)["cost_usd"]
+    router = ModelRouter.from_file()
+    stats = {"briefs": len(briefs), "generated": 0, "failed": 0, "errors": []}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prewarm") as pool:
+        futures = {
+            pool.submit(prewarm_brief, client, brief, cache, ledger, results_per_brief, spend_cap_usd, router): brief
+            for brief in briefs
+        }
+        for future in as_completed(futures):
+            try:
+                stats["generated"] += future.result()
+            except Exception as e:
+                brief = futures[future]
+                stats["failed"] += 1
+                stats["errors"].append(f"{brief['campaign']} / {brief['platform']} / {brief['brand_tone']}: {e}")
+
+    stats["routes"] = router.report()
+    stats["cost_usd"] = round(ledger.totals(session_id=PREWARM_SESSION)["cost_usd"] - spend_before, 6)
+    return stats
+
+def _anthropic_client():
+    if use_mock_backend():
+        return anthropic_client(None)
+
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    secrets_path = Path(".streamlit") / "secrets.toml"
+    if not api_key and secrets_path.exists():
+        import tomllib
+
+        api_key = tomllib.loads(secrets_path.read_text(encoding="utf-8")).get("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise SystemExit("Set ANTHROPIC_API_KEY (or add it to .streamlit/secrets.toml)")
+    return anthropic_client(api_key)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate captions for upcoming campaigns")
+    parser.add_argument("--calendar", default=CALENDAR_PATH)
+    parser.add_argument("--days-ahead", type=int, default=None)
+    parser.add_argument("--per-brief", type=int, default=None, help="results to keep queued per brief")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--spend-cap", type=float, default=None, help="per-tenant USD cap (same ledger as the app)")
+    parser.add_argument("--force", action="store_true", help="run even outside the off-peak window")
+    parser.add_argument("--dry-run", action="store_true", help="list briefs without calling the API")
+    args = parser.parse_args(argv)
+
+    calendar = load_calendar(args.calendar)
+    window = calendar.get("off_peak_hours", [22, 6])
+    if not (args.force or args.dry_run or in_off_peak(datetime.now().hour, window)):
+        print(f"Outside off-peak window {window[0]:02d}:00-{window[1]:02d}:00; use --force to run anyway")
+        return 0
+
+    briefs = upcoming_briefs(calendar, days_ahead=args.days_ahead)
+    if args.dry_run:
+        for brief in briefs:
+            print(f"{brief['campaign']}: {brief['platform']} / {brief['brand_tone']} / {brief['course_title'] or '-'}")
+        print(f"{len(briefs)} briefs")
+        return 0
+
+    if hasattr(os, "nice"):
+        os.nice(10)  # background job: yield CPU to the interactive app on the same host
+
+    stats = run_prewarm(
+        _anthropic_client(), briefs,
+        results_per_brief=args.per_brief or calendar.get("results_per_brief", 3),
+        workers=args.workers, spend_cap_usd=args.spend_cap,
+    )
+    print(f"{stats['generated']} results generated for {stats['briefs']} briefs "
+          f"(${stats['cost_usd']:.4f}, {stats['failed']} failed)")
+    for error in stats["errors"]:
+        print(f"  ! {error}")
+    return 1 if stats["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
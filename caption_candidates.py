@@ -0,0 +1,191 @@
+# caption_candidates.py - Best-of-N caption generation
+# One Claude call returns N candidate captions as JSON; candidates are scored locally and ranked.
+# The same JSON approach fans one brief out to every platform: one call, one caption per platform.
+
+import json
+import re
+
+# ==========================================
+# PROMPT
+# ==========================================
+
+def build_candidates_prompt(prompt_body, n_candidates):
+    """Extend the caption brief so a single call returns N candidates as JSON"""
+    return f"""{prompt_body}
+
+Write {n_candidates} DIFFERENT caption options. Vary the hook, structure and call-to-action between options.
+Every option must follow all of the rules above.
+
+Return ONLY a JSON object in exactly this format (no markdown, no explanations, no hashtags):
+{{"captions": ["option 1", "option 2"]}}"""
+
+# ==========================================
+# PARSING
+# ==========================================
+
+def _clean_caption(text):
+    """Strip list markers and wrapping quotes from a single candidate"""
+    text = re.sub(r'^\s*(?:\d+[.)]|[-*•])\s+', '', str(text)).strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'':
+        text = text[1:-1].strip()
+    return text
+
+_JSON_STRING = r'"((?:[^"\\]|\\.)*)"'
+_JSON_ARRAY_ITEM = re.compile(_JSON_STRING + r'\s*[,\]]')
+_JSON_STRING_PAIR = re.compile(_JSON_STRING + r'\s*:\s*' + _JSON_STRING)
+
+def _json_string(raw):
+    """Decode the inside of a JSON string literal; None if it is malformed"""
+    try:
+        return json.loads(f'"{raw}"')
+    except ValueError:
+        return None
+
+def _complete_items(text):
+    """Every closed string item of a JSON array that was cut off (max_tokens)"""
+    start = text.find("[")
+    if start < 0:
+        return []
+    items = (_json_string(raw) for raw in _JSON_ARRAY_ITEM.findall(text, start))
+    return [item for item in items if item is not None]
+
+def parse_candidates(response_text, n_candidates=None, truncated=False):
+    """Parse candidate captions from a model response, tolerating fenced or loose output.
+
+    truncated (the reply hit max_tokens) keeps only candidates that were complete: closed
+    strings of a cut-off JSON array, or every line but the last of a plain list.
+    """
+    text = response_text.strip()
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text)
+
+    candidates = None
+    for pattern in (None, r'\{.*\}', r'\[.*\]'):
+        snippet = text
+        if pattern:
+            match = re.search(pattern, text, re.S)
+            if not match:
+                continue
+            snippet = match.group(0)
+        try:
+            data = json.loads(snippet)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            data = data.get("captions", [])
+        if isinstance(data, list):
+            candidates = data
+            break
+
+    # JSON that does not parse (cut off): its closed strings, never the raw JSON text
+    if candidates is None and text[:1] in "{[":
+        candidates = _complete_items(text)
+
+    # Fall back to one caption per non-empty line (numbered list output)
+    if candidates is None:
+        candidates = [line for line in text.splitlines() if line.strip()]
+        if truncated:
+            candidates = candidates[:-1]
+
+    cleaned = []
+    for candidate in candidates:
+        if isinstance(candidate, dict):
+            candidate = candidate.get("caption", "")
+        candidate = _clean_caption(candidate)
+        if candidate and candidate not in cleaned:
+            cleaned.append(candidate)
+
+    if n_candidates:
+        cleaned = cleaned[:n_candidates]
+    return cleaned
+
+# ==========================================
+# MULTI-PLATFORM FAN-OUT
+# ==========================================
+
+def build_fanout_prompt(prompt_body, platforms):
+    """Extend a multi-platform brief so a single call returns one caption per platform as JSON"""
+    example = json.dumps({platform: "caption" for platform in platforms[:2]}, ensure_ascii=False)
+    return f"""{prompt_body}
+
+Return ONLY a JSON object with one caption per platform, using exactly these keys: {json.dumps(list(platforms), ensure_ascii=False)}
+(no markdown, no explanations, no hashtags), e.g.
+{example}"""
+
+def _platform_key(name):
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+def _complete_pairs(text):
+    """Every closed "key": "value" pair in a JSON object that was cut off (max_tokens)"""
+    pairs = {}
+    for raw_key, raw_value in _JSON_STRING_PAIR.findall(text):
+        key, value = _json_string(raw_key), _json_string(raw_value)
+        if key is not None and value is not None:
+            pairs.setdefault(key, value)
+    return pairs
+
+def parse_platform_captions(response_text, platforms):
+    """{platform: caption} from a fan-out response; platforms the model skipped are left out.
+
+    A reply cut off mid-object still yields the captions it completed.
+    """
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', response_text.strip())
+    data = None
+    for pattern in (None, r'\{.*\}'):
+        snippet = text
+        if pattern:
+            match = re.search(pattern, text, re.S)
+            if not match:
+                continue
+            snippet = match.group(0)
+        try:
+            data = json.loads(snippet)
+        except ValueError:
+            continue
+        break
+    if not isinstance(data, dict):
+        data = _complete_pairs(text)
+    if isinstance(data.get("captions"), dict):
+        data = data["captions"]
+
+    # Match keys loosely ("instagram", "Twitter" for "Twitter/X")
+    aliases = {}
+    for platform in platforms:
+        for alias in (platform, *platform.split("/")):
+            aliases.setdefault(_platform_key(alias), platform)
+    captions = {}
+    for key, value in data.items():
+        platform = aliases.get(_platform_key(key))
+        if isinstance(value, dict):
+            value = value.get("caption", "")
+        caption = _clean_caption(value) if platform and value else ""
+        if caption and platform not in captions:
+            captions[platform] = caption
+    return captions
+
+# ==========================================
+# LOCAL RANKING
+# ==========================================
+
+LENGTH_STATUS_RANK = {"good": 0, "warning": 1, "exceeded": 2}
+
+def rank_candidates(captions, score_fn):
+    """Score every candidate locally and return them best-first.
+
+    score_fn(caption) must return a dict with at least length_status, char_count and
+    alignment_score. Candidates under the platform limit always rank ahead of longer ones,
+    and captions that local repair had to cut mid-sentence (needs_llm_retry) rank last within their tier.
+    """
+    scored = []
+    for index, caption in enumerate(captions):
+        entry = {"caption": caption, "candidate_index": index}
+        entry.update(score_fn(caption))
+        scored.append(entry)
+
+    scored.sort(key=lambda c: (
+        LENGTH_STATUS_RANK.get(c["length_status"], len(LENGTH_STATUS_RANK)),
+        c.get("needs_llm_retry", False),
+        -c["alignment_score"],
+        c["char_count"] if c["length_status"] != "good" else 0,
+        c["candidate_index"]
+    ))
+    return scored
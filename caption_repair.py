@@ -0,0 +1,253 @@
+# caption_repair.py - Deterministic local length repair
+# Fits over-long captions to the platform limit without another API call:
+# filler removal -> emoji compaction -> sentence-aware trimming (CTA preserved) -> word truncation.
+
+import re
+import unicodedata
+
+# ==========================================
+# GRAPHEME CLUSTERS (emoji-aware character counting)
+# ==========================================
+
+ZWJ = "\u200d"
+
+def _is_regional_indicator(char):
+    return 0x1F1E6 <= ord(char) <= 0x1F1FF
+
+def _is_extend(char):
+    """Characters that attach to the previous cluster (marks, variation selectors, skin tones, tags)"""
+    code = ord(char)
+    return (
+        0xFE00 <= code <= 0xFE0F
+        or 0x1F3FB <= code <= 0x1F3FF
+        or 0xE0020 <= code <= 0xE007F
+        or code == 0x200C
+        or unicodedata.category(char) in ("Mn", "Me", "Mc")
+    )
+
+def split_graphemes(text):
+    """Split text into user-perceived characters (simplified UAX #29 for emoji and marks)"""
+    clusters = []
+    i, n = 0, len(text)
+    while i < n:
+        j = i + 1
+        if text[i] == "\r" and j < n and text[j] == "\n":
+            j += 1
+        elif _is_regional_indicator(text[i]) and j < n and _is_regional_indicator(text[j]):
+            j += 1  # flag = pair of regional indicators
+        while j < n:
+            if _is_extend(text[j]):
+                j += 1
+            elif text[j] == ZWJ:
+                j += 2 if j + 1 < n else 1  # ZWJ glues the next emoji into this cluster
+            else:
+                break
+        clusters.append(text[i:j])
+        i = j
+    return clusters
+
+def grapheme_length(text):
+    """Count characters the way users (and platforms) see them - one per emoji, flag or accented letter"""
+    if text.isascii():
+        return len(text) - text.count("\r\n")
+    return len(split_graphemes(text))
+
+def _is_emoji_cluster(cluster):
+    code = ord(cluster[0])
+    return (
+        0x1F000 <= code <= 0x1FAFF
+        or 0x2600 <= code <= 0x27BF
+        or 0x2B00 <= code <= 0x2BFF
+        or "\ufe0f" in cluster
+    )
+
+# ==========================================
+# REPAIR RULES
+# ==========================================
+
+# Word-level fillers that can go without changing meaning
+FILLER_PATTERNS = [
+    (r"\bin order to\b", "to"),
+    (r"\bdue to the fact that\b", "because"),
+    (r"\bat this point in time\b", "now"),
+    (r"\bthe opportunity to\b", "the chance to"),
+    (r"\b(?:really|very|just|actually|basically|literally|truly|totally|simply|definitely|absolutely)\s+", ""),
+]
+
+# Generic call-to-action verbs, used alongside the persona's own cta_style phrases
+CTA_MARKERS = [
+    "join", "apply", "enrol", "enroll", "sign up", "register", "book", "discover", "explore",
+    "start", "learn more", "link in bio", "dm us", "tag", "share", "save", "comment", "turn up", "show up"
+]
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])[ \t]+|[ \t]*\n+[ \t]*")
+
+def _tidy(text):
+    """Collapse whitespace left behind by removals"""
+    text = re.sub(r"[ \t]{2,}", " ", text)
+    text = re.sub(r" +([,.!?;:…])", r"\1", text)
+    text = re.sub(r"[ \t]*\n[ \t]*", "\n", text)
+    return text.strip()
+
+def _fits(text, limit):
+    return grapheme_length(text) <= limit
+
+def _remove_fillers(text, limit):
+    """Apply filler rewrites one at a time until the caption fits"""
+    for pattern, replacement in FILLER_PATTERNS:
+        if _fits(text, limit):
+            break
+
+        def substitute(match):
+            # Keep sentence-initial capitalisation when the filler opened the sentence
+            start = match.start()
+            at_sentence_start = start == 0 or re.search(r"[.!?…\n]\s*$", text[:start])
+            if match.group(0)[:1].isupper() and at_sentence_start:
+                return replacement[:1].upper() + replacement[1:] if replacement else "\x00"
+            return replacement
+
+        text = re.sub(pattern, substitute, text, flags=re.IGNORECASE)
+        # \x00 marks a removed sentence opener: capitalise whatever now starts the sentence
+        text = re.sub(r"\x00(\w)", lambda m: m.group(1).upper(), text).replace("\x00", "")
+        text = _tidy(text)
+    return text
+
+def _repeated_emoji(clusters):
+    """Indices of emoji repeating the one before ("🔥🔥🔥" -> "🔥")"""
+    return [i for i in range(1, len(clusters)) if _is_emoji_cluster(clusters[i]) and clusters[i] == clusters[i - 1]]
+
+def _emoji_run_tails(clusters):
+    """Indices of every emoji after the first in a run of different emoji ("🎶💃✨" -> "🎶")"""
+    tails = []
+    in_run = False
+    for i, cluster in enumerate(clusters):
+        if _is_emoji_cluster(cluster):
+            if in_run:
+                tails.append(i)
+            in_run = True
+        elif not cluster.isspace():
+            in_run = False
+    return tails
+
+def _emoji_after_first(clusters):
+    """Indices of every emoji but the first"""
+    return [i for i, cluster in enumerate(clusters) if _is_emoji_cluster(cluster)][1:]
+
+def _compact_emoji(text, limit):
+    """Drop emoji one at a time from the end until the caption fits: repeats first, then the
+    rest of each emoji run, then every emoji but the first"""
+    if _fits(text, limit):
+        return text
+
+    for removable in (_repeated_emoji, _emoji_run_tails, _emoji_after_first):
+        clusters = split_graphemes(text)
+        for index in reversed(removable(clusters)):
+            del clusters[index]
+            text = _tidy("".join(clusters))
+            if _fits(text, limit):
+                return text
+    return text
+
+def _split_sentences(text):
+    """Split into [sentence, separator] pairs; emoji-only fragments stay with their sentence"""
+    parts = []
+    pos = 0
+    for match in SENTENCE_BOUNDARY.finditer(text):
+        parts.append([text[pos:match.start()], "\n" if "\n" in match.group(0) else " "])
+        pos = match.end()
+    parts.append([text[pos:], ""])
+
+    sentences = []
+    for sentence, separator in parts:
+        if sentences and not re.search(r"\w", sentence):
+            sentences[-1][0] += " " + sentence if sentence else ""
+            sentences[-1][1] = separator
+        elif sentence:
+            sentences.append([sentence, separator])
+    return sentences
+
+def _join_sentences(sentences):
+    return _tidy("".join(sentence + separator for sentence, separator in sentences))
+
+def find_cta_index(sentences, cta_phrases=()):
+    """Index of the sentence carrying the call-to-action (last match wins), or None"""
+    markers = [p.strip().lower() for p in cta_phrases if p.strip()] + CTA_MARKERS
+    for index in range(len(sentences) - 1, -1, -1):
+        lowered = sentences[index][0].lower()
+        if any(re.search(r"\b" + re.escape(marker) + r"\b", lowered) for marker in markers):
+            return index
+    return None
+
+def _truncate_words(text, limit):
+    """Cut at a word boundary and add an ellipsis so the result fits the limit"""
+    if _fits(text, limit):
+        return text
+    clusters = split_graphemes(text)[:max(limit - 1, 0)]
+    cut = "".join(clusters)
+    if " " in cut:
+        cut = cut[:cut.rfind(" ")]
+    return cut.rstrip(" ,;:-–—\n") + "…"
+
+def _trim_sentences(text, limit, cta_phrases):
+    """Drop middle sentences (latest first), keeping the hook and the CTA; then shorten the hook"""
+    sentences = _split_sentences(text)
+    if len(sentences) < 2:
+        return text, False
+
+    cta_index = find_cta_index(sentences, cta_phrases)
+    protected = {0, cta_index}
+    for index in range(len(sentences) - 1, 0, -1):
+        if _fits(_join_sentences(sentences), limit):
+            break
+        if index not in protected:
+            del sentences[index]
+            if cta_index is not None and index < cta_index:
+                cta_index -= 1
+            protected = {0, cta_index}
+
+    text = _join_sentences(sentences)
+    if _fits(text, limit) or cta_index is None or cta_index == 0:
+        return text, False
+
+    # Hook + CTA still too long: shorten the hook, never the CTA
+    cta = _join_sentences(sentences[cta_index:])
+    room = limit - grapheme_length(cta) - 1
+    hook = _join_sentences(sentences[:cta_index])
+    if room >= 20:
+        return _tidy(f"{_truncate_words(hook, room)} {cta}"), True
+    if _fits(cta, limit):
+        return cta, False
+    return text, False
+
+# ==========================================
+# PUBLIC ENTRY POINT
+# ==========================================
+
+def repair_caption(caption, limit, cta_phrases=()):
+    """Fit a caption to `limit` graphemes locally.
+
+    Returns (caption, actions, needs_llm_retry). needs_llm_retry is True only when the
+    caption had to be cut mid-sentence - the one case worth another API round trip.
+    """
+    actions = []
+    text = _tidy(caption)
+    if _fits(text, limit):
+        return text, actions, False
+
+    for name, step in (("filler_removal", _remove_fillers), ("emoji_compaction", _compact_emoji)):
+        repaired = step(text, limit)
+        if repaired != text:
+            actions.append(name)
+            text = repaired
+        if _fits(text, limit):
+            return text, actions, False
+
+    repaired, cut_mid_sentence = _trim_sentences(text, limit, cta_phrases)
+    if repaired != text:
+        actions.append("sentence_trim")
+        text = repaired
+    if _fits(text, limit):
+        return text, actions, cut_mid_sentence
+
+    actions.append("word_truncation")
+    return _truncate_words(text, limit), actions, True
@@ -0,0 +1,101 @@
+# circuit_breaker.py - Stop calling a degraded upstream and fail over to local results instantly
+# Outcomes of recent calls (errors, deadline misses and successes slower than SLOW_CALL_SECONDS
+# count as bad) are kept in a rolling window. When the bad share crosses FAILURE_RATE the circuit
+# opens and callers go straight to their fallback. After OPEN_SECONDS one probe call is let
+# through (half-open): success closes the circuit, failure re-opens it for another period.
+
+import threading
+import time
+from collections import deque
+
+WINDOW = 20               # most recent outcomes considered
+MIN_CALLS = 5             # no verdict below this many outcomes
+FAILURE_RATE = 0.5        # bad share that opens the circuit
+SLOW_CALL_SECONDS = 10.0  # a success slower than this counts as bad
+OPEN_SECONDS = 30.0       # wait before probing again
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class CircuitOpen(RuntimeError):
+    pass
+
+class CircuitBreaker:
+    """Closed -> open on a bad error/latency rate -> half-open probe after open_seconds -> closed"""
+
+    def __init__(self, name, window=WINDOW, min_calls=MIN_CALLS, failure_rate=FAILURE_RATE,
+                 slow_call_seconds=SLOW_CALL_SECONDS, open_seconds=OPEN_SECONDS, clock=time.monotonic):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)  # True = bad
+        self._state = CLOSED
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._counters = {"opened": 0, "short_circuited": 0, "probes": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+        return self._state
+
+    def allow(self):
+        """True if a call may go upstream now (half-open lets exactly one probe through)"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._counters["probes"] += 1
+                return True
+            self._counters["short_circuited"] += 1
+            return False
+
+    def record_success(self, seconds):
+        self._record(bad=seconds > self.slow_call_seconds)
+
+    def record_failure(self):
+        self._record(bad=True)
+
+    def release(self):
+        """A call ended with no verdict on upstream health (e.g. a rejected request): free the probe slot"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _record(self, bad):
+        with self._lock:
+            if self._probe_in_flight:
+                self._probe_in_flight = False
+                if bad:
+                    self._trip()
+                else:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(bad)
+            if (self._state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate):
+                self._trip()
+
+    def _trip(self):
+        self._state, self._opened_at = OPEN, self._clock()
+        self._counters["opened"] += 1
+
+    def metrics(self):
+        with self._lock:
+            outcomes = list(self._outcomes)
+            return {
+                "state": self._current_state(),
+                "bad_rate": sum(outcomes) / len(outcomes) if outcomes else 0.0,
+                "retry_in_s": max(0.0, self.open_seconds - (self._clock() - self._opened_at)) if self._state == OPEN else 0.0,
+                **self._counters,
+            }
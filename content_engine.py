@@ -0,0 +1,604 @@
+# content_engine.py - Persona, hashtag, prompt and scoring logic shared by every entry point
+# All lookups go through a compiled BrandProfile, so the same code serves every tenant.
+
+import random
+import time
+from datetime import datetime
+
+from brand_profiles import count_keywords, get_brand_profile
+from caption_candidates import (build_candidates_prompt, build_fanout_prompt, parse_candidates, parse_platform_captions,
+                                rank_candidates)
+from caption_repair import grapheme_length, repair_caption
+from fallback_captions import brief_seed, template_captions
+from token_budget import CostLedger, caption_call_limits, estimate_cost, estimate_tokens, fanout_call_limits
+
+CAPTION_MODEL = "claude-sonnet-4-20250514"
+FANOUT_LEDGER_PLATFORM = "Cross-platform"  # ledger platform tag for one-call multi-platform captions
+
+# ==========================================
+# CAMPAIGN TYPE TO PERSONA MAPPING
+# ==========================================
+
+def auto_select_persona(campaign_type, profile=None):
+    """Automatically select the best persona based on campaign type"""
+    profile = profile or get_brand_profile()
+    return profile.campaign_personas.get(campaign_type, profile.default_persona)
+
+# ==========================================
+# HASHTAG SELECTION FUNCTION (WITH VARIATION)
+# ==========================================
+
+def select_hashtags_for_persona(persona, platform, campaign_type, variation_seed=None, profile=None, bandit=None):
+    """Select hashtags based on persona, platform, and campaign with built-in variation
+
+    With an EngagementBandit, tags within each category are drawn by their engagement posterior
+    (and the mobile tag is a learned include/omit decision) instead of uniformly.
+    """
+    profile = profile or get_brand_profile()
+    tags = profile.hashtag_tags
+    rng = random.Random(variation_seed)
+
+    def sample(pool, k):
+        if bandit:
+            return bandit.top_k("hashtag", [tag for tag in pool if tag not in selected], k, rng)
+        return rng.sample(pool, k)
+
+    selected = []
+
+    # 1. Always include 1-2 high engagement boosters
+    selected.extend(sample(tags["high_engagement_boosters"], 2))
+
+    # 2. Add 2-3 education core tags
+    selected.extend(sample(tags["education_core"], rng.randint(2, 3)))
+
+    # 3. Add persona-specific tags (3-4)
+    if persona in profile.persona_hashtag_categories:
+        persona_tags = tags[profile.persona_hashtag_categories[persona]]
+        selected.extend(sample(persona_tags, min(rng.randint(3, 4), len(persona_tags))))
+
+    # 4. Add campaign-specific tags (1-2)
+    if campaign_type in profile.campaign_hashtag_categories:
+        campaign_tags = tags[profile.campaign_hashtag_categories[campaign_type]]
+        selected.extend(sample(campaign_tags, min(2, len(campaign_tags))))
+
+    # 5. Add location tags (1-2)
+    selected.extend(sample(tags["location_specific"], 2))
+
+    # 6. Optionally add mobile tags if audience is mobile-heavy (learned once engagement data exists)
+    if bandit and bandit.has_data("mobile", ("include", "omit")):
+        include_mobile = bandit.choose("mobile", ("include", "omit"), rng) == "include"
+    else:
+        include_mobile = rng.random() < profile.mobile_tag_probability
+    if include_mobile:
+        selected.extend(sample(tags["mobile_optimized"], 1) if bandit else [rng.choice(tags["mobile_optimized"])])
+
+    # Platform-specific adjustments
+    target_count = profile.recommended_hashtag_counts.get(platform, 8)
+
+    # Trim or pad to target count
+    if len(selected) > target_count:
+        selected = bandit.top_k("hashtag", selected, target_count, rng) if bandit else rng.sample(selected, target_count)
+    elif len(selected) < target_count:
+        # Fill with random tags from other categories
+        all_remaining = [tag for tag in profile.all_hashtags if tag not in selected]
+
+        if all_remaining:
+            needed = target_count - len(selected)
+            selected.extend(sample(all_remaining, min(needed, len(all_remaining))))
+
+    return selected
+
+# ==========================================
+# CONTENT TEMPLATE SELECTION
+# ==========================================
+
+def rule_based_template(campaign_type, day_of_week=None, profile=None):
+    """First profile template whose campaign keywords or optimal days match, else the default"""
+    profile = profile or get_brand_profile()
+    for name, template in profile.content_templates.items():
+        if any(keyword in campaign_type for keyword in template.get("campaign_keywords", ())):
+            return name
+        if day_of_week and day_of_week.lower() in (day.lower() for day in template.get("optimal_days", ())):
+            return name
+    return profile.default_content_template or None
+
+def select_content_template(campaign_type, day_of_week=None, profile=None, bandit=None, variation_seed=None):
+    """Content template for a brief: the rule-based pick, or a posterior draw once templates have engagement data"""
+    profile = profile or get_brand_profile()
+    preferred = rule_based_template(campaign_type, day_of_week, profile)
+    if bandit is None or not profile.content_templates or not bandit.has_data("template", profile.content_templates):
+        return preferred
+    return bandit.choose("template", profile.content_templates, random.Random(variation_seed), preferred=preferred)
+
+# ==========================================
+# CAPTION LENGTH CHECKER
+# ==========================================
+
+def check_caption_length(caption, target_limit):
+    """Check if caption meets length requirements (emoji count as one character)"""
+    actual_length = grapheme_length(caption)
+
+    if actual_length <= target_limit:
+        return "good", actual_length
+    elif actual_length <= target_limit + 20:
+        return "warning", actual_length
+    else:
+        return "exceeded", actual_length
+
+# ==========================================
+# BRAND ALIGNMENT CALCULATOR
+# ==========================================
+
+def calculate_brand_alignment(caption, hashtags, persona, brand_tone, profile=None):
+    """Calculate brand alignment percentage based on multiple factors"""
+    profile = profile or get_brand_profile()
+    score = 100
+    caption_lower = caption.lower()
+
+    # Check persona alignment
+    keyword_matches = count_keywords(profile.persona_keyword_matchers.get(persona), caption_lower)
+    if keyword_matches < 2:
+        score -= 15
+
+    # Check brand tone consistency
+    if brand_tone in profile.tone_matchers:
+        tone_matches = count_keywords(profile.tone_matchers[brand_tone], caption_lower)
+        if tone_matches == 0:
+            score -= 10
+
+    return max(score, 60)  # Minimum 60% alignment
+
+# ==========================================
+# CAPTION PROMPT
+# ==========================================
+
+DEFAULT_RESEARCH_INSIGHTS = [
+    "- Peak engagement: 12-3pm, 7-10pm",
+    "- Visual content gets 45% more engagement",
+    "- Persona-aligned messaging increases conversion by 60%",
+]
+
+def _brief_context(persona, platform_line, campaign_type, brand_tone, course_title, profile, template):
+    """Persona, campaign and content template sections shared by single-platform and fan-out briefs"""
+    persona_info = profile.personas[persona]
+    template_section = ""
+    if template in profile.content_templates:
+        template_info = profile.content_templates[template]
+        structure = "\n".join(f"- {key.replace('_', ' ').title()}: {value}" for key, value in template_info["structure"].items())
+        template_section = f"""
+CONTENT TEMPLATE: {template} ({template_info.get('description', '')})
+{structure}
+"""
+
+    return f"""You are a social media expert creating content for educational institutions targeting Gen Z students.
+
+TARGET PERSONA: {persona}
+- Description: {persona_info['description']}
+- Demographics: {persona_info['demographics']}
+- Interests: {', '.join(persona_info['interests'])}
+- Messaging Style: {persona_info['messaging_style']}
+- Key Benefits to Highlight: {persona_info['key_benefits']}
+- CTA Style: {persona_info['cta_style']}
+
+CAMPAIGN DETAILS:
+- {platform_line}
+- Campaign Type: {campaign_type}
+- Brand Tone: {brand_tone}
+- Course/Event: {course_title if course_title else 'General education program'}
+{template_section}"""
+
+def build_caption_brief(persona, platform, campaign_type, brand_tone, course_title, char_limit, profile=None, template=None,
+                        insights=None):
+    """Caption brief shared by single, best-of-N and batch generation (output format is appended by the caller)
+
+    insights are "- ..." lines from the analytics data (insights_sql.research_insights); without
+    them the brief falls back to DEFAULT_RESEARCH_INSIGHTS.
+    """
+    profile = profile or get_brand_profile()
+    platform_data = profile.platform_specs.get(platform, profile.platform_specs["Instagram"])
+    context = _brief_context(persona, f"Platform: {platform}", campaign_type, brand_tone, course_title, profile, template)
+    research_section = "\n".join(insights or DEFAULT_RESEARCH_INSIGHTS)
+
+    return f"""{context}
+PLATFORM REQUIREMENTS:
+- Character Limit: {char_limit} characters (STRICT)
+- Best Practice: {platform_data['best_practice']}
+
+INSIGHTS FROM RESEARCH:
+{research_section}
+
+Create a {platform} caption that:
+1. Speaks directly to {persona} using their preferred messaging style
+2. Stays UNDER {char_limit} characters
+3. Includes a clear call-to-action matching their CTA style
+4. Uses {brand_tone.lower()} tone
+5. Feels authentic and engaging for Gen Z
+6. Incorporates relevant benefits and interests"""
+
+def build_fanout_brief(persona, platforms, campaign_type, brand_tone, course_title, profile=None, template=None,
+                       insights=None):
+    """Caption brief asking for one tailored caption per platform, each with its own limit (format appended by the caller)"""
+    profile = profile or get_brand_profile()
+    context = _brief_context(persona, f"Platforms: {', '.join(platforms)}", campaign_type, brand_tone, course_title,
+                             profile, template)
+    requirements = "\n".join(
+        f"- {platform}: UNDER {profile.platform_specs[platform]['recommended_caption']} characters (STRICT). "
+        f"{profile.platform_specs[platform]['best_practice']}"
+        for platform in platforms
+    )
+    research_section = "\n".join(insights or DEFAULT_RESEARCH_INSIGHTS)
+
+    return f"""{context}
+PLATFORM REQUIREMENTS:
+{requirements}
+
+INSIGHTS FROM RESEARCH:
+{research_section}
+
+Create one caption for each platform above. Every caption:
+1. Speaks directly to {persona} using their preferred messaging style
+2. Stays UNDER its own platform's character limit
+3. Includes a clear call-to-action matching their CTA style
+4. Uses {brand_tone.lower()} tone
+5. Follows its platform's best practice - vary length, hook and structure, never repeat one caption
+6. Feels authentic and engaging for Gen Z"""
+
+SINGLE_CAPTION_INSTRUCTION = "Return ONLY the caption text, no hashtags, no explanations."
+
+# ==========================================
+# CAPTION GENERATION (prompt -> call -> local repair -> rank)
+# ==========================================
+
+class SpendCapExceeded(RuntimeError):
+    """The next call would push the tenant's recorded spend over its cap"""
+
+def _create_message(client, executor, operation, deadline, on_discard, **request):
+    """(message, None) from client.messages.create, run under the executor's deadline/hedging when one is given
+
+    (None, reason) when the call fell back - deadline missed, transient upstream errors or an
+    open circuit; errors a retry cannot fix (bad key, invalid request) are raised.
+    """
+    if executor is None:
+        return client.messages.create(**request), None
+    reasons = []
+    message = executor.run(
+        operation,
+        lambda timeout: client.messages.create(timeout=timeout, **request),
+        deadline=deadline,
+        fallback=reasons.append,
+        on_discard=on_discard
+    )
+    return message, (reasons[0] if reasons else None)
+
+def template_caption_set(persona, platform, campaign_type, brand_tone, course_title, profile=None, template=None,
+                         n_candidates=3):
+    """Offline result from local templates (no API call), shaped like generate_caption_set's result
+
+    Deterministic per brief: captions come from the content template's structure and the
+    persona's campaigns/benefits/CTA style, ranked with the live path's scorer.
+    """
+    profile = profile or get_brand_profile()
+    char_limit = profile.platform_specs.get(platform, profile.platform_specs["Instagram"])['recommended_caption']
+    template = template or rule_based_template(campaign_type, datetime.now().strftime("%A"), profile)
+    seed = brief_seed(persona, platform, campaign_type, brand_tone, course_title, template)
+    captions = template_captions(profile.personas[persona], campaign_type, course_title, brand_tone, char_limit,
+                                 profile.content_templates.get(template), max(1, n_candidates), seed)
+    hashtags = select_hashtags_for_persona(persona, platform, campaign_type, seed, profile)
+    ranked = rank_candidates(captions, caption_scorer(persona, brand_tone, hashtags, char_limit, profile))
+    result = build_result(ranked[0], hashtags, persona, platform, campaign_type, brand_tone, char_limit, None,
+                          {"input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0})
+    result["fallback"] = "template"
+    result["template"] = template
+    return result, ranked[1:]
+
+def generate_caption_set(client, persona, platform, campaign_type, brand_tone, course_title, n_candidates=3,
+                         profile=None, ledger=None, ledger_tags=None, spend_cap_usd=None, model=None,
+                         executor=None, deadline=None, fallback=None, router=None, operation="interactive",
+                         bandit=None, template=None, insights=None):
+    """Generate, repair and rank captions for one brief; returns (result, ranked alternatives).
+
+    With an executor, calls run under deadlines/hedging (and its circuit breaker); if the caption
+    call misses its deadline or is short-circuited the result comes from fallback() (default:
+    template_caption_set) instead. With a router (and
+    no explicit model) the model tier is picked per request and escalated once if the result
+    fails local scoring. With a bandit, hashtags and the content template are drawn from
+    engagement statistics; the chosen template is recorded in result["template"]. insights
+    replace the brief's default research lines.
+    """
+    profile = profile or get_brand_profile()
+    ledger = ledger or CostLedger(path=None)
+    ledger_tags = {"persona": persona, "campaign": campaign_type, "platform": platform,
+                   "tenant": profile.tenant_id, **(ledger_tags or {})}
+    char_limit = profile.platform_specs.get(platform, profile.platform_specs["Instagram"])['recommended_caption']
+    template = template or select_content_template(campaign_type, datetime.now().strftime("%A"), profile, bandit)
+    brief = (client, persona, platform, campaign_type, brand_tone, course_title, n_candidates, profile,
+             ledger, ledger_tags, spend_cap_usd, executor, deadline, fallback, bandit, template, insights)
+
+    if router is None or model:
+        return _generate_with_model(model or CAPTION_MODEL, *brief)
+
+    route = router.route(char_limit, operation)
+    started = time.monotonic()
+    result, alternatives = _generate_with_model(route.model, *brief)
+    rejection = None if result.get("fallback") else router.rejection_reason(result)
+    router.record(route, time.monotonic() - started, accepted=rejection is None)
+    result["route"] = f"{route.tier} ({route.reason})"
+
+    upgrade = router.escalation(route) if rejection else None
+    if upgrade and not (deadline and deadline.expired):
+        started = time.monotonic()
+        escalated, escalated_alternatives = _generate_with_model(upgrade.model, *brief)
+        router.record(upgrade, time.monotonic() - started,
+                      accepted=not escalated.get("fallback") and router.rejection_reason(escalated) is None)
+        if not escalated.get("fallback"):
+            # Keep the fast tier's caption as an alternative - it may still be the one the user wants
+            previous = {key: result[key] for key in ("caption", "char_count", "length_status", "alignment_score", "repair_actions")}
+            escalated["route"] = f"{upgrade.tier} ({rejection} on {route.tier})"
+            return escalated, escalated_alternatives + [previous] + alternatives
+    return result, alternatives
+
+def build_caption_prompt(persona, platform, campaign_type, brand_tone, course_title, n_candidates, profile=None,
+                         template=None, insights=None):
+    """Full prompt for one brief (single caption or best-of-N JSON) plus the platform character limit"""
+    profile = profile or get_brand_profile()
+    char_limit = profile.platform_specs.get(platform, profile.platform_specs["Instagram"])['recommended_caption']
+    prompt_body = build_caption_brief(persona, platform, campaign_type, brand_tone, course_title, char_limit, profile,
+                                      template, insights)
+    if n_candidates > 1:
+        return build_candidates_prompt(prompt_body, n_candidates), char_limit
+    return f"{prompt_body}\n\n{SINGLE_CAPTION_INSTRUCTION}", char_limit
+
+def caption_scorer(persona, brand_tone, hashtags, char_limit, profile=None):
+    """score_fn for rank_candidates: local length repair + length check + brand alignment"""
+    profile = profile or get_brand_profile()
+    cta_phrases = profile.personas[persona]['cta_style'].split(",")
+
+    def score_caption(candidate):
+        repair_actions, needs_llm_retry = [], False
+        if check_caption_length(candidate, char_limit)[0] == "exceeded":
+            candidate, repair_actions, needs_llm_retry = repair_caption(candidate, char_limit, cta_phrases)
+        length_status, actual_length = check_caption_length(candidate, char_limit)
+        return {
+            "caption": candidate,
+            "char_count": actual_length,
+            "length_status": length_status,
+            "alignment_score": calculate_brand_alignment(candidate, hashtags, persona, brand_tone, profile),
+            "repair_actions": ", ".join(repair_actions),
+            "needs_llm_retry": needs_llm_retry
+        }
+
+    return score_caption
+
+def parse_caption_response(response_text, n_candidates, truncated=False):
+    """Candidate captions from one response (a lone caption when n_candidates is 1).
+
+    Only complete captions are returned - none for a lone caption cut off at max_tokens - so the
+    caller retries or falls back instead of scoring a fragment or raw JSON.
+    """
+    response_text = response_text.strip()
+    if n_candidates > 1:
+        return parse_candidates(response_text, n_candidates, truncated)
+    return [response_text] if response_text and not truncated else []
+
+def hit_max_tokens(message):
+    return getattr(message, "stop_reason", None) == "max_tokens"
+
+def build_result(best, hashtags, persona, platform, campaign_type, brand_tone, char_limit, model, usage):
+    """Result dict stored in history, caches and exports"""
+    return {
+        "caption": best["caption"],
+        "hashtags": hashtags,
+        "platform": platform,
+        "persona": persona,
+        "char_count": best["char_count"],
+        "char_limit": char_limit,
+        "length_status": best["length_status"],
+        "alignment_score": best["alignment_score"],
+        "repair_actions": best["repair_actions"],
+        "input_tokens": usage["input_tokens"],
+        "output_tokens": usage["output_tokens"],
+        "cost_usd": round(usage["cost_usd"], 6),
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "campaign_type": campaign_type,
+        "brand_tone": brand_tone,
+        "model": model
+    }
+
+def _generate_with_model(model, client, persona, platform, campaign_type, brand_tone, course_title, n_candidates,
+                         profile, ledger, ledger_tags, spend_cap_usd, executor, deadline, fallback, bandit, template,
+                         insights):
+    """One full generation pass (call, parse, local repair, rank, optional rewrite) on one model"""
+    prompt, char_limit = build_caption_prompt(persona, platform, campaign_type, brand_tone, course_title, n_candidates,
+                                              profile, template, insights)
+
+    # Get research-based hashtags with variation (engagement-weighted with a bandit)
+    hashtags = select_hashtags_for_persona(persona, platform, campaign_type, datetime.now().timestamp(), profile, bandit)
+
+    # Output budget sized to the platform limit (widened by observed output lengths)
+    call_limits = caption_call_limits(char_limit, n_candidates, ledger.observed_output_tokens(platform))
+    estimated_cost = estimate_cost(model, estimate_tokens(prompt), call_limits["max_tokens"])
+    if ledger.would_exceed(spend_cap_usd, estimated_cost, tenant=ledger_tags["tenant"]):
+        raise SpendCapExceeded(f"Spend cap of ${float(spend_cap_usd):.2f} reached for this workspace")
+
+    def record_discarded(late_message):
+        """A losing hedge still costs tokens - keep the ledger honest"""
+        ledger.record(model, late_message.usage.input_tokens, late_message.usage.output_tokens,
+                      n_candidates=n_candidates, operation="hedge_discarded", **ledger_tags)
+
+    def fall_back(reason):
+        if fallback:
+            result, alternatives = fallback()
+        else:
+            result, alternatives = template_caption_set(persona, platform, campaign_type, brand_tone, course_title,
+                                                        profile, template, n_candidates)
+        result["fallback_reason"] = reason
+        if executor is not None and executor.circuit_state("caption") == "open":
+            result["circuit_open"] = True
+        return result, alternatives
+
+    message, fallback_reason = _create_message(
+        client, executor, "caption", deadline, record_discarded,
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        **call_limits
+    )
+    if message is None:  # deadline passed, every attempt failed or the circuit is open
+        return fall_back(fallback_reason)
+    usage = dict(ledger.record(model, message.usage.input_tokens, message.usage.output_tokens,
+                               n_candidates=n_candidates, **ledger_tags))
+    captions = parse_caption_response(message.content[0].text, n_candidates, hit_max_tokens(message))
+
+    # Cut off at max_tokens before one caption was complete: one retry with twice the budget
+    if not captions:
+        message, fallback_reason = _create_message(
+            client, executor, "caption", deadline, record_discarded,
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            **{**call_limits, "max_tokens": call_limits["max_tokens"] * 2}
+        )
+        if message is None:
+            return fall_back(fallback_reason)
+        retry_usage = ledger.record(model, message.usage.input_tokens, message.usage.output_tokens,
+                                    n_candidates=n_candidates, operation="truncation_retry", **ledger_tags)
+        for key in ("input_tokens", "output_tokens", "cost_usd"):
+            usage[key] += retry_usage[key]
+        captions = parse_caption_response(message.content[0].text, n_candidates, hit_max_tokens(message))
+    if not captions:
+        return fall_back("truncated")
+    score_caption = caption_scorer(persona, brand_tone, hashtags, char_limit, profile)
+
+    # Rank candidates: under the limit first, then by brand alignment
+    ranked = rank_candidates(captions, score_caption)
+    best = ranked[0]
+
+    # Last resort: local repair had to cut mid-sentence, so ask Claude for a shorter rewrite once
+    retry = None
+    if best["needs_llm_retry"]:
+        retry, _ = _create_message(
+            client, executor, "length_retry", deadline, record_discarded,
+            model=model,
+            messages=[{"role": "user", "content": f"""Rewrite this {platform} caption in at most {char_limit} characters.
+Keep the call-to-action and the {brand_tone.lower()} tone. Return ONLY the caption text.
+
+{captions[best['candidate_index']]}"""}],
+            **caption_call_limits(char_limit)
+        )
+    if retry is not None:  # no time left for the rewrite: keep the locally repaired caption
+        retry_usage = ledger.record(model, retry.usage.input_tokens, retry.usage.output_tokens,
+                                    operation="length_retry", **ledger_tags)
+        for key in ("input_tokens", "output_tokens", "cost_usd"):
+            usage[key] += retry_usage[key]
+        if not hit_max_tokens(retry):  # a cut-off rewrite is worse than the local repair
+            best.update(score_caption(retry.content[0].text.strip()))
+            best["repair_actions"] = ", ".join(filter(None, ["llm_rewrite", best["repair_actions"]]))
+
+    result = build_result(best, hashtags, persona, platform, campaign_type, brand_tone, char_limit, model, usage)
+    result["template"] = template
+    return result, ranked[1:]
+
+# ==========================================
+# MULTI-PLATFORM FAN-OUT (one call, one caption per platform)
+# ==========================================
+
+def fanout_platforms(profile=None):
+    """Platforms with their own caption specs - what a cross-platform post is tailored for"""
+    profile = profile or get_brand_profile()
+    return tuple(profile.platform_specs)
+
+def generate_platform_captions(client, persona, campaign_type, brand_tone, course_title, platforms=None, profile=None,
+                               ledger=None, ledger_tags=None, spend_cap_usd=None, model=None, executor=None,
+                               deadline=None, bandit=None, template=None, insights=None):
+    """One call for a caption per platform; returns {platform: result} in platform order.
+
+    Each caption is repaired and scored locally against its own platform limit and gets that
+    platform's hashtags; the call's tokens and cost are split evenly across the live results.
+    Platforms missing from the response - every platform when the call misses its deadline or
+    the circuit is open - get a local template caption, never a second call. Their
+    fallback_reason is "truncated" when the reply hit max_tokens and "missing" when it skipped them.
+    """
+    profile = profile or get_brand_profile()
+    platforms = tuple(platforms or fanout_platforms(profile))
+    model = model or CAPTION_MODEL
+    ledger = ledger or CostLedger(path=None)
+    ledger_tags = {"persona": persona, "campaign": campaign_type, "platform": FANOUT_LEDGER_PLATFORM,
+                   "tenant": profile.tenant_id, **(ledger_tags or {})}
+    char_limits = {platform: profile.platform_specs[platform]['recommended_caption'] for platform in platforms}
+    template = template or select_content_template(campaign_type, datetime.now().strftime("%A"), profile, bandit)
+    prompt = build_fanout_prompt(build_fanout_brief(persona, platforms, campaign_type, brand_tone, course_title, profile,
+                                                    template, insights), platforms)
+
+    call_limits = fanout_call_limits(char_limits.values())
+    estimated_cost = estimate_cost(model, estimate_tokens(prompt), call_limits["max_tokens"])
+    if ledger.would_exceed(spend_cap_usd, estimated_cost, tenant=ledger_tags["tenant"]):
+        raise SpendCapExceeded(f"Spend cap of ${float(spend_cap_usd):.2f} reached for this workspace")
+
+    def record_discarded(late_message):
+        ledger.record(model, late_message.usage.input_tokens, late_message.usage.output_tokens,
+                      n_candidates=len(platforms), operation="hedge_discarded", **ledger_tags)
+
+    message, fallback_reason = _create_message(
+        client, executor, "caption", deadline, record_discarded,
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        **call_limits
+    )
+    captions, share = {}, {"input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0}
+    if message is not None:
+        usage = ledger.record(model, message.usage.input_tokens, message.usage.output_tokens,
+                              n_candidates=len(platforms), operation="fanout", **ledger_tags)
+        captions = parse_platform_captions(message.content[0].text, platforms)
+        fallback_reason = "truncated" if hit_max_tokens(message) else "missing"
+        if captions:
+            share = {"input_tokens": round(usage["input_tokens"] / len(captions)),
+                     "output_tokens": round(usage["output_tokens"] / len(captions)),
+                     "cost_usd": usage["cost_usd"] / len(captions)}
+    circuit_open = message is None and executor is not None and executor.circuit_state("caption") == "open"
+
+    seed = datetime.now().timestamp()
+    results = {}
+    for platform in platforms:
+        if platform not in captions:
+            result, _ = template_caption_set(persona, platform, campaign_type, brand_tone, course_title, profile,
+                                             template, n_candidates=1)
+            result["fallback_reason"] = fallback_reason
+            if circuit_open:
+                result["circuit_open"] = True
+        else:
+            hashtags = select_hashtags_for_persona(persona, platform, campaign_type, f"{seed}:{platform}", profile, bandit)
+            best = caption_scorer(persona, brand_tone, hashtags, char_limits[platform], profile)(captions[platform])
+            result = build_result(best, hashtags, persona, platform, campaign_type, brand_tone, char_limits[platform],
+                                  model, share)
+            result["template"] = template
+        result["fanout"] = True
+        results[platform] = result
+    return results
+
+# ==========================================
+# IMAGE GENERATION PROMPT FUNCTION
+# ==========================================
+
+def generate_image_prompt(persona, campaign_type, course_title, brand_tone, visual_style, profile=None):
+    """Generate detailed prompt for DALL-E based on persona and campaign"""
+    profile = profile or get_brand_profile()
+    persona_info = profile.personas[persona]
+    visual_keywords = ", ".join(persona_info["visual_keywords"])
+
+    base_prompt = f"""Create a {visual_style} educational marketing image for {campaign_type}.
+    
+Target audience: {persona} - {persona_info['description']}
+Visual style: {visual_keywords}
+Mood: {persona_info['messaging_style']}
+
+The image should:
+- Appeal to {persona_info['demographics']}
+- Convey {persona_info['key_benefits']}
+- Be {visual_style} and suitable for social media
+- Feature educational/learning elements
+- Include diverse students in a {brand_tone.lower()} environment
+- Be engaging and shareable
+
+Course focus: {course_title if course_title else 'general education'}
+
+Style: Professional photography, high quality, modern, appealing to Gen Z"""
+
+    return base_prompt
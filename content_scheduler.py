@@ -0,0 +1,221 @@
+# content_scheduler.py - Assign generated posts to posting slots over N weeks
+# Predicted engagement per (platform, weekday, hour) is fitted from the photography CSV's posting
+# hours, peak-time matches and engagement. Each platform gets a daily cap and a minimum gap
+# between posts; slots are chosen by a vectorised greedy over per-day marginal gains and the
+# strongest posts are paired with the best slots. Thousands of posts schedule in milliseconds.
+#
+#   python content_scheduler.py --posts .cache/batches/<run_id>/results.jsonl --weeks 4 --out schedule.csv
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+POSTING_HOURS = list(range(7, 23))  # candidate slots, 07:00-22:00
+DAILY_CAPS = {"Instagram": 2, "Facebook": 2, "TikTok": 3, "LinkedIn": 1, "Twitter/X": 3}
+DEFAULT_DAILY_CAP = 2
+MIN_GAP_HOURS = 3
+SAME_DAY_SATURATION = 0.85  # each extra same-platform post in a day earns 15% less (data too thin to fit)
+PRIOR_STRENGTH = 3          # pseudo-observations pulling sparse weekdays/hours toward the prior
+
+# platform -> (posting hour, engagement, peak-time match) columns in the daily table
+PLATFORM_COLUMNS = {
+    "Instagram": ("Instagram_Posting_Hour", "In_total_engagement", "Instagram_Peak_Time_Match"),
+    "Facebook": ("Facebook_Posting_Hour", "Fa_total_engagement", "Facebook_Peak_Time_Match"),
+}
+DAY_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+SCHEDULE_COLUMNS = ["post_id", "platform", "scheduled", "date", "day_of_week", "hour", "scheduled_at",
+                    "predicted_engagement", "weight", "persona", "campaign_type", "caption", "hashtags"]
+
+# ==========================================
+# ENGAGEMENT MODEL
+# ==========================================
+
+def _shrunk_mean(sums, counts, prior):
+    return (sums + PRIOR_STRENGTH * prior) / (counts + PRIOR_STRENGTH)
+
+def posting_time_model(daily, hours=POSTING_HOURS):
+    """platform -> (7 weekdays x len(hours)) array of predicted engagement per post
+
+    Weekday and hour effects are multiplicative and shrunk toward a prior: hours that matched
+    the peak time toward the peak-post mean, every other hour toward the off-peak mean.
+    Platforms the CSV does not cover use the "_default" entry (average of the fitted ones).
+    """
+    hours = np.asarray(hours)
+    model = {}
+    for platform, (hour_col, engagement_col, match_col) in PLATFORM_COLUMNS.items():
+        posted = daily[daily[hour_col].notna() & (daily["Total_Posts_Today"] > 0)]
+        engagement = posted[engagement_col].to_numpy(dtype="float64")
+        peak = posted[match_col].to_numpy(dtype=bool)
+        mean = engagement.mean()
+        peak_mean = engagement[peak].mean() if peak.any() else mean
+        off_peak_mean = engagement[~peak].mean() if (~peak).any() else mean
+
+        weekday = pd.Categorical(posted["Day_of_Week"], categories=DAY_ORDER).codes
+        known = weekday >= 0
+        day_sums = np.bincount(weekday[known], weights=engagement[known], minlength=7)
+        day_counts = np.bincount(weekday[known], minlength=7)
+        day_factor = _shrunk_mean(day_sums, day_counts, mean) / mean
+
+        posted_hours = posted[hour_col].to_numpy().astype(int)
+        slot = posted_hours - hours[0]
+        in_range = (slot >= 0) & (slot < len(hours))
+        slot, in_range_engagement = slot[in_range], engagement[in_range]
+        hour_sums = np.bincount(slot, weights=in_range_engagement, minlength=len(hours))
+        hour_counts = np.bincount(slot, minlength=len(hours))
+        peak_hours = np.bincount(slot, weights=peak[in_range], minlength=len(hours)) > 0
+        hour_prior = np.where(peak_hours, peak_mean, off_peak_mean)
+        hour_factor = _shrunk_mean(hour_sums, hour_counts, hour_prior) / mean
+
+        model[platform] = mean * np.outer(day_factor, hour_factor)
+
+    fitted = list(model.values())
+    model["_default"] = np.mean([values / values.mean() for values in fitted], axis=0) * np.mean([v.mean() for v in fitted])
+    return model
+
+# ==========================================
+# SLOT SELECTION
+# ==========================================
+
+def day_plans(values, cap, min_gap=MIN_GAP_HOURS, saturation=SAME_DAY_SATURATION):
+    """Best spaced hour set for 1..cap posts in one day -> [{hour_index: discounted value}, ...]
+
+    Exact DP over the day's hours; within a plan the k-th best slot earns saturation**k.
+    """
+    n = len(values)
+    best = [[(0.0, ())] * (n + min_gap + 1)]
+    for k in range(1, cap + 1):
+        row = [(-np.inf, ())] * (n + min_gap + 1)
+        for i in range(n - 1, -1, -1):
+            rest = best[k - 1][i + min_gap]
+            take = (values[i] + rest[0], (i,) + rest[1])
+            row[i] = take if take[0] > row[i + 1][0] else row[i + 1]
+        best.append(row)
+
+    plans = []
+    for k in range(1, cap + 1):
+        if not np.isfinite(best[k][0][0]):
+            break
+        ranked = sorted(best[k][0][1], key=lambda h: -values[h])
+        plans.append({h: values[h] * saturation ** rank for rank, h in enumerate(ranked)})
+    return plans
+
+def select_slots(values, weekdays, n_posts, cap, min_gap=MIN_GAP_HOURS, saturation=SAME_DAY_SATURATION):
+    """Choose up to n_posts (day index, hour index, value) slots across the given days
+
+    Per-weekday plan totals give the marginal gain of a 2nd, 3rd... post on a day; gains are made
+    non-increasing, so taking the top n_posts gains over the (day x k) matrix fills each day
+    with a prefix of its plans - one argsort instead of an ILP.
+    """
+    plans = [day_plans(values[w], cap, min_gap, saturation) for w in range(7)]
+    totals = np.full((7, cap), np.nan)
+    for w, weekday_plans in enumerate(plans):
+        totals[w, :len(weekday_plans)] = [sum(plan.values()) for plan in weekday_plans]
+    gains = np.diff(totals, prepend=0.0, axis=1)
+    gains = np.minimum.accumulate(np.where(np.isnan(gains), -np.inf, gains), axis=1)
+
+    day_gains = gains[weekdays].ravel()
+    n_take = min(n_posts, int(np.isfinite(day_gains).sum()))
+    chosen = np.argsort(-day_gains, kind="stable")[:n_take]
+    per_day = np.bincount(chosen // cap, minlength=len(weekdays))
+
+    return [(day, hour, value)
+            for day in np.flatnonzero(per_day)
+            for hour, value in plans[weekdays[day]][per_day[day] - 1].items()]
+
+def post_weight(post):
+    """Relative strength of a post: explicit weight/priority, else brand alignment, else 1"""
+    for key in ("weight", "priority"):
+        if post.get(key) is not None:
+            return float(post[key])
+    if post.get("alignment_score") is not None:
+        return float(post["alignment_score"]) / 100
+    return 1.0
+
+def schedule_posts(posts, start, weeks, model, daily_caps=None, min_gap_hours=MIN_GAP_HOURS,
+                   saturation=SAME_DAY_SATURATION, hours=POSTING_HOURS):
+    """Assign posts (dicts with at least "platform") to slots; posts beyond capacity stay unscheduled"""
+    caps = {**DAILY_CAPS, **(daily_caps or {})}
+    days = pd.date_range(pd.Timestamp(start).normalize(), periods=weeks * 7, freq="D")
+    weekdays = days.dayofweek.to_numpy()
+    hours = np.asarray(hours)
+
+    schedule = pd.DataFrame({
+        "post_id": [str(post.get("post_id", index)) for index, post in enumerate(posts)],
+        "platform": [post["platform"] for post in posts],
+        "weight": [post_weight(post) for post in posts],
+        "persona": [post.get("persona", "") for post in posts],
+        "campaign_type": [post.get("campaign_type", "") for post in posts],
+        "caption": [post.get("caption", "") for post in posts],
+        "hashtags": [" ".join(post.get("hashtags", [])) for post in posts],
+    })
+    day_index = np.full(len(schedule), -1)
+    hour_index = np.full(len(schedule), -1)
+    slot_value = np.full(len(schedule), np.nan)
+
+    for platform, rows in schedule.groupby("platform", sort=False).indices.items():
+        values = model.get(platform, model["_default"])
+        slots = select_slots(values, weekdays, len(rows), caps.get(platform, DEFAULT_DAILY_CAP),
+                             min_gap_hours, saturation)
+        slots.sort(key=lambda slot: -slot[2])
+        # Best post to best slot maximises the sum of weight x slot value (rearrangement inequality)
+        ranked_rows = rows[np.argsort(-schedule["weight"].to_numpy()[rows], kind="stable")]
+        placed = ranked_rows[:len(slots)]
+        day_index[placed] = [slot[0] for slot in slots]
+        hour_index[placed] = [slot[1] for slot in slots]
+        slot_value[placed] = [slot[2] for slot in slots]
+
+    scheduled = day_index >= 0
+    schedule["scheduled"] = scheduled
+    schedule["date"] = pd.Series(days[day_index[scheduled]].date, index=schedule.index[scheduled])
+    schedule["hour"] = pd.Series(hours[hour_index[scheduled]], index=schedule.index[scheduled]).astype("Int64")
+    schedule["scheduled_at"] = pd.to_datetime(schedule["date"]) + pd.to_timedelta(schedule["hour"].astype("float"), unit="h")
+    schedule["day_of_week"] = schedule["scheduled_at"].dt.day_name()
+    schedule["predicted_engagement"] = (slot_value * schedule["weight"].to_numpy()).round(2)
+    return (schedule[SCHEDULE_COLUMNS]
+            .sort_values(["scheduled_at", "platform"], na_position="last", kind="stable")
+            .reset_index(drop=True))
+
+def export_schedule_csv(schedule, path=None):
+    """Schedule as CSV text (also written to path when given)"""
+    csv_text = schedule.to_csv(index=False, date_format="%Y-%m-%d %H:%M")
+    if path:
+        Path(path).write_text(csv_text, encoding="utf-8")
+    return csv_text
+
+def load_batch_posts(path):
+    """Posts from a batch_generation results.jsonl"""
+    posts = []
+    with Path(path).open(encoding="utf-8") as results_file:
+        for line in results_file:
+            if line.strip():
+                entry = json.loads(line)
+                posts.append({"post_id": entry["custom_id"], **entry["result"]})
+    return posts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Schedule generated posts into posting slots")
+    parser.add_argument("--posts", required=True, help="results.jsonl from batch_generation.py")
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--start", default=None, help="first day (YYYY-MM-DD, default tomorrow)")
+    parser.add_argument("--min-gap", type=int, default=MIN_GAP_HOURS, help="hours between same-platform posts")
+    parser.add_argument("--out", default="schedule.csv")
+    args = parser.parse_args(argv)
+
+    from analytics_store import AnalyticsStore
+
+    start = pd.Timestamp(args.start) if args.start else pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+    model = posting_time_model(AnalyticsStore.load().daily)
+    schedule = schedule_posts(load_batch_posts(args.posts), start, args.weeks, model, min_gap_hours=args.min_gap)
+    export_schedule_csv(schedule, args.out)
+
+    placed = schedule[schedule["scheduled"]]
+    print(f"{len(placed)}/{len(schedule)} posts scheduled over {args.weeks} weeks -> {args.out}")
+    print(placed.groupby("platform")["predicted_engagement"].agg(["count", "sum"]).round(1).to_string())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,33 @@
 # content_synth_app.py - VERSION 3.1 (DALL-E Edition)
 # Features: DALL-E Image Generation, Improved Hashtag Variation, Visual Image Generator UI, Brand Alignment Scoring
 
+# Heavy dependencies (anthropic, openai, requests, pandas, PIL) are imported inside the code paths
+# that use them - see benchmarks/import_time.py for the cold-start budget.
+
 import streamlit as st
-from anthropic import Anthropic
-from openai import OpenAI
-import pandas as pd
 from datetime import datetime
 from pathlib import Path
-import random
-import re
-import requests
-import io
-from PIL import Image
+from image_cache import ImageCache, ImageMemoryPool, make_image_key
+from image_delivery import ImageDelivery, data_uri
+from image_generation import DALLE_MODEL, DALLE_QUALITY, create_image, dalle_size
+from analytics_store import AnalyticsStore, cached_summary
+from insights_sql import InsightsEngine, best_posting_times, prompt_insights
+from token_budget import CostLedger
+from brand_profiles import DEFAULT_TENANT, get_brand_profile, list_tenants
+from content_engine import (auto_select_persona, generate_caption_set, generate_image_prompt, generate_platform_captions,
+                            template_caption_set)
+from response_cache import ResponseCache, make_response_key
+from request_executor import Deadline, RequestExecutor
+from circuit_breaker import CircuitBreaker
+from model_router import ModelRouter
+from mock_backend import anthropic_client, openai_client, use_mock_backend
+from engagement_bandit import EngagementBandit
+from bundle_export import caption_text, estimate_bundle_bytes, write_bundle
+from session_memory import SessionMemoryRegistry, TracemallocMonitor
+import os
+import sqlite3
+import tempfile
+import uuid
 
 # Page config
 st.set_page_config(
@@ -20,22 +36,79 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def get_analytics_store():
+    """Typed store over every data/ file, built once per process (Parquet-cached across restarts)"""
+    return AnalyticsStore.load(Path("data"))
+
+@st.cache_resource
+def _insights_engine():
+    return InsightsEngine(Path("data"))
+
+def get_insights_engine():
+    """SQL insight queries over the analytics caches (results memoised until data/ changes), None
+    without readable data/ - briefs then use their default lines; a failure is not cached"""
+    try:
+        return _insights_engine()
+    except (OSError, sqlite3.Error):
+        return None
+
+@st.cache_resource
+def get_anthropic_client(api_key):
+    """Claude client (or the local mock), created on the first Generate click"""
+    return anthropic_client(api_key)
+
+@st.cache_resource
+def get_openai_client(api_key):
+    """DALL-E client (or the local mock), created on the first image request"""
+    return openai_client(api_key)
+
+@st.cache_resource
+def get_engagement_bandit(tenant_id):
+    """Per-tenant hashtag/template engagement statistics (updated from uploaded engagement data)"""
+    return EngagementBandit.for_tenant(tenant_id)
+
 # API KEY SETUP
 anthropic_api_key = st.secrets.get("ANTHROPIC_API_KEY", None)
 openai_api_key = st.secrets.get("OPENAI_API_KEY", None)
 
+# Whole Generate click (caption call + any length rewrite) must answer within this many seconds
+CAPTION_DEADLINE_SECONDS = 20
+
+# Spend accounting: every call is charged to the selected tenant; optional USD cap from secrets
+spend_cap_usd = st.secrets.get("TENANT_SPEND_CAP_USD", None)
+
+# Operator diagnostics (?debug=memory) only where CONTENT_SYNTH_DEBUG is set in the environment or secrets
+debug_enabled = str(os.environ.get("CONTENT_SYNTH_DEBUG") or st.secrets.get("CONTENT_SYNTH_DEBUG", "")).lower() in (
+    "1", "true", "yes", "on")
+
 # Sidebar for API keys if not in secrets
 with st.sidebar:
+    # Tenant / brand profile (config/brands/<tenant>.json, compiled once per process)
+    tenant_options = list_tenants()
+    default_tenant = st.query_params.get("tenant", st.secrets.get("TENANT_ID", DEFAULT_TENANT))
+    if len(tenant_options) > 1:
+        st.markdown("### 🏫 Brand Profile")
+        TENANT_ID = st.selectbox(
+            "Brand Profile",
+            tenant_options,
+            index=tenant_options.index(default_tenant) if default_tenant in tenant_options else 0,
+            label_visibility="collapsed"
+        )
+    else:
+        TENANT_ID = tenant_options[0] if tenant_options else DEFAULT_TENANT
+    brand_profile = get_brand_profile(TENANT_ID)
+    
     st.markdown("### 🔑 API Configuration")
     
-    if not anthropic_api_key:
+    if not anthropic_api_key and not use_mock_backend():
         anthropic_api_key = st.text_input(
             "Claude API Key", 
             type="password",
             help="Enter your Anthropic API key for caption generation"
         )
     
-    if not openai_api_key:
+    if not openai_api_key and not use_mock_backend():
         openai_api_key = st.text_input(
             "OpenAI API Key", 
             type="password",
@@ -46,36 +119,63 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("### 📊 Live Data Sources")
     
-    st.markdown("""
-    <div style="background-color: #e8f5e9; padding: 0.5rem; border-radius: 5px; margin: 0.5rem 0;">
-        ✅ <strong>Photography Business:</strong> 502 days
-    </div>
-    """, unsafe_allow_html=True)
+    # Counts come from the Parquet cache manifest when it is current (no pandas import)
+    try:
+        analytics_summary = cached_summary(Path("data"))
+        if analytics_summary is None:
+            analytics_store = get_analytics_store()
+            analytics_summary = analytics_store.summary(), analytics_store.memory_report()
+        data_counts, memory = analytics_summary
+    except Exception as e:
+        analytics_summary = None
+        st.warning(f"⚠️ Could not load data/ files: {e}")
     
-    st.markdown("""
-    <div style="background-color: #e8f5e9; padding: 0.5rem; border-radius: 5px; margin: 0.5rem 0;">
-        ✅ <strong>Viral Trends:</strong> 4802 posts
-    </div>
-    """, unsafe_allow_html=True)
+    if analytics_summary:
+        for source_label, source_count in [
+            ("Photography Business", f"{data_counts['daily']} days"),
+            ("Viral Trends", f"{data_counts['viral']} posts"),
+            ("Clustering Marketing", f"{data_counts['audience']} users"),
+            ("Fluidphoto Posts", f"{data_counts['posts']} posts"),
+        ]:
+            st.markdown(f"""
+            <div style="background-color: #e8f5e9; padding: 0.5rem; border-radius: 5px; margin: 0.5rem 0;">
+                ✅ <strong>{source_label}:</strong> {source_count}
+            </div>
+            """, unsafe_allow_html=True)
+        
+        st.caption(f"💾 {memory['compact_bytes'] / 1e6:.1f} MB resident ({memory['saving_pct']}% smaller than raw pandas)")
     
-    st.markdown("""
-    <div style="background-color: #e8f5e9; padding: 0.5rem; border-radius: 5px; margin: 0.5rem 0;">
-        ✅ <strong>Clustering Marketing:</strong> 14904 users
-    </div>
-    """, unsafe_allow_html=True)
+    # Engagement feedback: observed results train hashtag/template selection
+    st.markdown("---")
+    st.markdown("### 📈 Engagement Feedback")
+    engagement_bandit = get_engagement_bandit(TENANT_ID)
+    engagement_upload = st.file_uploader(
+        "Post engagement CSV",
+        type="csv",
+        help="Exported history (hashtags, template) plus an engagement or likes/comments/shares column"
+    )
+    if engagement_upload is not None and st.session_state.get("ingested_engagement") != engagement_upload.file_id:
+        try:
+            import pandas as pd
+            
+            recorded = engagement_bandit.ingest_frame(pd.read_csv(engagement_upload), brand_profile)
+            st.session_state.ingested_engagement = engagement_upload.file_id
+            st.success(f"Learned from {recorded} posts")
+        except ValueError as e:
+            st.warning(f"⚠️ {e}")
+    if engagement_bandit.posts:
+        best_templates = engagement_bandit.report("template", top_n=1)
+        best_tags = ", ".join(row["arm"] for row in engagement_bandit.report("hashtag", top_n=3))
+        st.caption(f"{engagement_bandit.posts} posts learned · top tags {best_tags}"
+                   + (f" · top template {best_templates[0]['arm']}" if best_templates else ""))
     
     # Student Personas
     st.markdown("---")
     st.markdown("### 👥 Student Personas")
     
-    with st.expander("👤 Creative Performer", expanded=False):
-        st.markdown("Music, dance, and arts-focused students (45% of audience)")
-    
-    with st.expander("👤 Competitive Athlete", expanded=False):
-        st.markdown("Sports and achievement-driven students (35% of audience)")
-    
-    with st.expander("👤 Balanced Explorer", expanded=False):
-        st.markdown("Lifestyle and well-rounded learners (20% of audience)")
+    for persona_name, persona_details in brand_profile.personas.items():
+        with st.expander(f"👤 {persona_name}", expanded=False):
+            st.markdown(persona_details["description"])
     
     # About DALL-E
     st.markdown("---")
@@ -86,17 +186,10 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
 
-if anthropic_api_key:
-    client = Anthropic(api_key=anthropic_api_key)
-else:
+if not anthropic_api_key and not use_mock_backend():
     st.warning("⚠️ Please enter your Claude API key to continue")
     st.stop()
 
-if openai_api_key:
-    openai_client = OpenAI(api_key=openai_api_key)
-else:
-    openai_client = None
-
 # Custom CSS
 st.markdown("""
 <style>
@@ -207,393 +300,97 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ==========================================
-# STUDENT PERSONAS - Based on research
+# BRAND PROFILE - personas, hashtag bank and platform specs per tenant (config/brands/)
 # ==========================================
 
-STUDENT_PERSONAS = {
-    "Creative Performer": {
-        "description": "Music, dance, and arts-focused students (45% of audience)",
-        "demographics": "70% Female, Age 16-18",
-        "interests": ["Music (0.77)", "Dance (0.49)", "Band (0.30)", "Rock (0.25)"],
-        "messaging_style": "Friendly, expressive, energetic",
-        "key_benefits": "Empowerment, creativity, belonging",
-        "cta_style": "Share your vibe, Turn up for your dreams, Join the movement",
-        "campaigns": ["Your Story. Your Stage.", "Start Your Story Here", "Discover What NZ Can Teach You"],
-        "visual_keywords": ["vibrant", "colorful", "energetic", "artistic", "creative", "expressive"]
-    },
-    "Competitive Athlete": {
-        "description": "Sports and achievement-driven students (35% of audience)",
-        "demographics": "75% Male, Age 17-20",
-        "interests": ["Football (0.45)", "Basketball (0.31)", "Baseball (0.27)", "Sports (0.20)"],
-        "messaging_style": "Motivational, bold, competitive",
-        "key_benefits": "Achievement, teamwork, consistency",
-        "cta_style": "Show up strong, Join the challenge, Train hard",
-        "campaigns": ["Game On: Every Day Counts", "Snap & Score Challenge", "Summer Drive"],
-        "visual_keywords": ["dynamic", "powerful", "athletic", "energetic", "determined", "action"]
-    },
-    "Balanced Explorer": {
-        "description": "Lifestyle and well-rounded learners (20% of audience)",
-        "demographics": "Mixed gender, Age 16-22",
-        "interests": ["Music (0.50)", "Dance (0.34)", "Swimming (0.09)", "Study-life balance"],
-        "messaging_style": "Warm, conversational, inclusive",
-        "key_benefits": "Discovery, belonging, life-balance",
-        "cta_style": "Learn. Explore. Belong., Start your story, Discover",
-        "campaigns": ["Explore Your Path", "Study + Adventure Diaries", "Inspiring the Future"],
-        "visual_keywords": ["balanced", "welcoming", "diverse", "natural", "inclusive", "friendly"]
-    }
-}
+STUDENT_PERSONAS = brand_profile.personas
+HASHTAG_BANK = brand_profile.hashtag_bank
+PLATFORM_SPECS = brand_profile.platform_specs
+PLATFORM_IMAGE_SPECS = brand_profile.platform_image_specs
 
 # ==========================================
-# RESEARCH-BASED HASHTAG BANK (IMPROVED)
-# ==========================================
-
-HASHTAG_BANK = {
-    "high_engagement_boosters": {
-        "tags": ["#viral", "#comedy", "#challenge", "#tech", "#trending", "#fyp", "#foryou"],
-        "avg_engagement": "80-100%",
-        "note": "Algorithmic visibility boosters"
-    },
-    "education_core": {
-        "tags": ["#education", "#learning", "#study", "#student", "#school", "#university", "#knowledge"],
-        "avg_engagement": "45-60%",
-        "note": "Core education terms"
-    },
-    "persona_creative": {
-        "tags": ["#music", "#dance", "#art", "#creative", "#performance", "#band", "#rock"],
-        "avg_engagement": "60-75%",
-        "note": "Creative Performer aligned"
-    },
-    "persona_athlete": {
-        "tags": ["#sports", "#football", "#basketball", "#baseball", "#athlete", "#fitness", "#training"],
-        "avg_engagement": "55-70%",
-        "note": "Competitive Athlete aligned"
-    },
-    "persona_explorer": {
-        "tags": ["#lifestyle", "#balance", "#wellness", "#adventure", "#discovery", "#explore"],
-        "avg_engagement": "50-65%",
-        "note": "Balanced Explorer aligned"
-    },
-    "location_specific": {
-        "tags": ["#newzealand", "#nz", "#studyinnz", "#nzlife", "#kiwi", "#aotearoa"],
-        "avg_engagement": "40-55%",
-        "note": "New Zealand focus"
-    },
-    "campaign_enrollment": {
-        "tags": ["#enrollment", "#admissions", "#applytoday", "#jointoday", "#newstudent"],
-        "avg_engagement": "35-50%",
-        "note": "Enrollment campaigns"
-    },
-    "campaign_summer": {
-        "tags": ["#summerschool", "#summerlearning", "#summercourse", "#vacation", "#summerstudy"],
-        "avg_engagement": "40-60%",
-        "note": "Summer programs"
-    },
-    "campaign_discount": {
-        "tags": ["#discount", "#sale", "#earlybird", "#limitedtime", "#specialoffer"],
-        "avg_engagement": "50-70%",
-        "note": "Promotional campaigns"
-    },
-    "mobile_optimized": {
-        "tags": ["#mobile", "#onthego", "#mobilelearning", "#smartphone", "#app"],
-        "avg_engagement": "30-45%",
-        "note": "87% mobile audience"
-    }
-}
-
-# ==========================================
-# PHOTO DATASET INSIGHTS
+# DALL-E IMAGE GENERATION FUNCTION (REPLACED HUGGING FACE)
 # ==========================================
 
-photo_insights = {
-    "mobile_pct": 87,
-    "avg_session": "2.5 minutes",
-    "peak_times": "12-3pm, 7-10pm",
-    "seasonal_boost": "Summer +45%, Winter -12%"
-}
-
-# ==========================================
-# PLATFORM SPECIFICATIONS
-# ==========================================
+@st.cache_resource
+def get_image_cache():
+    """One on-disk image cache shared by every session"""
+    return ImageCache()
 
-PLATFORM_SPECS = {
-    "Instagram": {
-        "caption_limit": 2200,
-        "hashtag_limit": 30,
-        "recommended_caption": 150,
-        "recommended_hashtags": "8-12",
-        "best_practice": "Use line breaks, 1st comment for extra hashtags"
-    },
-    "TikTok": {
-        "caption_limit": 150,
-        "hashtag_limit": None,
-        "recommended_caption": 100,
-        "recommended_hashtags": "3-5",
-        "best_practice": "Short, punchy, trending hashtags"
-    },
-    "Facebook": {
-        "caption_limit": 63206,
-        "hashtag_limit": None,
-        "recommended_caption": 200,
-        "recommended_hashtags": "2-5",
-        "best_practice": "Conversational, longer OK, fewer hashtags"
-    },
-    "LinkedIn": {
-        "caption_limit": 3000,
-        "hashtag_limit": None,
-        "recommended_caption": 200,
-        "recommended_hashtags": "3-5",
-        "best_practice": "Professional tone, industry keywords"
-    },
-    "Twitter/X": {
-        "caption_limit": 280,
-        "hashtag_limit": None,
-        "recommended_caption": 250,
-        "recommended_hashtags": "1-2",
-        "best_practice": "Concise, timely, limited hashtags"
-    }
-}
+@st.cache_resource
+def get_image_delivery():
+    """Preview / platform-sized WebP / original delivery for cached images, with per-format stats"""
+    return ImageDelivery(get_image_cache())
 
-# Image Specifications for DALL-E
-PLATFORM_IMAGE_SPECS = {
-    "Instagram": {
-        "Square (1:1)": {"size": "1024x1024", "dalle_size": "1024x1024"},
-        "Portrait (4:5)": {"size": "1080x1350", "dalle_size": "1024x1024"},
-        "Landscape (1.91:1)": {"size": "1080x566", "dalle_size": "1792x1024"},
-        "Story/Reel (9:16)": {"size": "1080x1920", "dalle_size": "1024x1792"}
-    },
-    "TikTok": {
-        "Video (9:16)": {"size": "1080x1920", "dalle_size": "1024x1792"}
-    },
-    "Facebook": {
-        "Feed Post (1.91:1)": {"size": "1200x630", "dalle_size": "1792x1024"},
-        "Story (9:16)": {"size": "1080x1920", "dalle_size": "1024x1792"}
-    },
-    "LinkedIn": {
-        "Feed Post (1.91:1)": {"size": "1200x627", "dalle_size": "1792x1024"}
-    },
-    "Twitter/X": {
-        "Post (16:9)": {"size": "1200x675", "dalle_size": "1792x1024"}
-    },
-    "Cross-platform": {
-        "square": {"size": "1024x1024", "dalle_size": "1024x1024"}
-    }
-}
-
-# ==========================================
-# CAMPAIGN TYPE TO PERSONA MAPPING
-# ==========================================
-
-def auto_select_persona(campaign_type):
-    """Automatically select the best persona based on campaign type"""
-    persona_map = {
-        "Music-Integrated Learning": "Creative Performer",
-        "Sports-Based Education": "Competitive Athlete",
-        "Creative Arts Program": "Creative Performer",
-        "General Summer School": "Balanced Explorer",
-        "Study Abroad": "Balanced Explorer",
-        "Athletic Training": "Competitive Athlete",
-        "Performance Arts": "Creative Performer",
-        "Online Learning": "Balanced Explorer",
-        "Tutoring Services": "Balanced Explorer"
-    }
-    return persona_map.get(campaign_type, "Balanced Explorer")
-
-# ==========================================
-# HASHTAG SELECTION FUNCTION (WITH VARIATION)
-# ==========================================
+@st.cache_resource
+def get_image_index():
+    """Perceptual-hash and prompt-similarity index over the image cache (numpy loads on first use)"""
+    from image_similarity import ImageSimilarityIndex
 
-def select_hashtags_for_persona(persona, platform, campaign_type, variation_seed=None):
-    """Select hashtags based on persona, platform, and campaign with built-in variation"""
-    
-    if variation_seed:
-        random.seed(variation_seed)
-    
-    selected = []
-    
-    # 1. Always include 1-2 high engagement boosters
-    selected.extend(random.sample(HASHTAG_BANK["high_engagement_boosters"]["tags"], 2))
-    
-    # 2. Add 2-3 education core tags
-    selected.extend(random.sample(HASHTAG_BANK["education_core"]["tags"], random.randint(2, 3)))
-    
-    # 3. Add persona-specific tags (3-4)
-    persona_key_map = {
-        "Creative Performer": "persona_creative",
-        "Competitive Athlete": "persona_athlete",
-        "Balanced Explorer": "persona_explorer"
-    }
-    
-    if persona in persona_key_map:
-        persona_tags = HASHTAG_BANK[persona_key_map[persona]]["tags"]
-        selected.extend(random.sample(persona_tags, min(random.randint(3, 4), len(persona_tags))))
-    
-    # 4. Add campaign-specific tags (1-2)
-    campaign_map = {
-        "Enrollment Drive": "campaign_enrollment",
-        "Summer School": "campaign_summer",
-        "Discount Offer": "campaign_discount"
-    }
-    
-    if campaign_type in campaign_map:
-        campaign_tags = HASHTAG_BANK[campaign_map[campaign_type]]["tags"]
-        selected.extend(random.sample(campaign_tags, min(2, len(campaign_tags))))
-    
-    # 5. Add location tags (1-2)
-    selected.extend(random.sample(HASHTAG_BANK["location_specific"]["tags"], 2))
-    
-    # 6. Optionally add mobile tags if audience is mobile-heavy
-    if random.random() < 0.3:  # 30% chance to include
-        selected.append(random.choice(HASHTAG_BANK["mobile_optimized"]["tags"]))
-    
-    # Platform-specific adjustments
-    recommended_count = {
-        "Instagram": 10,
-        "TikTok": 5,
-        "Facebook": 4,
-        "LinkedIn": 4,
-        "Twitter/X": 2,
-        "Cross-platform": 7
-    }
-    
-    target_count = recommended_count.get(platform, 8)
-    
-    # Trim or pad to target count
-    if len(selected) > target_count:
-        selected = random.sample(selected, target_count)
-    elif len(selected) < target_count:
-        # Fill with random tags from other categories
-        all_remaining = []
-        for category in HASHTAG_BANK.values():
-            all_remaining.extend([tag for tag in category["tags"] if tag not in selected])
-        
-        if all_remaining:
-            needed = target_count - len(selected)
-            selected.extend(random.sample(all_remaining, min(needed, len(all_remaining))))
-    
-    return selected
+    return ImageSimilarityIndex(get_image_cache())
 
-# ==========================================
-# CAPTION LENGTH CHECKER
-# ==========================================
+@st.cache_resource
+def get_response_cache():
+    """Pre-generated caption results shared with the off-peak campaign_prewarm.py job"""
+    return ResponseCache()
 
-def check_caption_length(caption, target_limit):
-    """Check if caption meets length requirements"""
-    actual_length = len(caption)
-    
-    if actual_length <= target_limit:
-        return "good", actual_length
-    elif actual_length <= target_limit + 20:
-        return "warning", actual_length
-    else:
-        return "exceeded", actual_length
+@st.cache_resource
+def get_request_executor():
+    """Shared deadline/hedging layer for Claude, DALL-E and image download calls
 
-# ==========================================
-# BRAND ALIGNMENT CALCULATOR
-# ==========================================
+    One circuit breaker guards both Claude operations: while Claude is degraded, captions come
+    from local templates immediately instead of after a full deadline.
+    """
+    claude_breaker = CircuitBreaker("anthropic")
+    return RequestExecutor(breakers={"caption": claude_breaker, "length_retry": claude_breaker})
 
-def calculate_brand_alignment(caption, hashtags, persona, brand_tone):
-    """Calculate brand alignment percentage based on multiple factors"""
-    score = 100
-    
-    # Check persona alignment
-    persona_keywords = STUDENT_PERSONAS[persona]["visual_keywords"]
-    caption_lower = caption.lower()
-    
-    keyword_matches = sum(1 for keyword in persona_keywords if keyword in caption_lower)
-    if keyword_matches < 2:
-        score -= 15
-    
-    # Check hashtag count
-    optimal_hashtag_count = {
-        "Instagram": (8, 12),
-        "TikTok": (3, 5),
-        "Facebook": (2, 5),
-        "LinkedIn": (3, 5),
-        "Twitter/X": (1, 2),
-        "Cross-platform": (5, 8)
-    }
-    
-    # Check brand tone consistency
-    tone_indicators = {
-        "Professional": ["learn", "discover", "develop", "achieve", "professional"],
-        "Friendly": ["join", "hey", "welcome", "together", "community"],
-        "Casual": ["fun", "awesome", "cool", "check out", "hey"],
-        "Energetic": ["!", "exciting", "amazing", "awesome", "let's go"],
-        "Inspiring": ["dream", "inspire", "transform", "empower", "potential"]
-    }
-    
-    if brand_tone in tone_indicators:
-        tone_matches = sum(1 for word in tone_indicators[brand_tone] if word.lower() in caption_lower)
-        if tone_matches == 0:
-            score -= 10
-    
-    return max(score, 60)  # Minimum 60% alignment
+@st.cache_resource
+def get_model_router():
+    """Model tier policy from config/model_routing.json, with per-route latency/acceptance stats"""
+    return ModelRouter.from_file()
 
-# ==========================================
-# IMAGE GENERATION PROMPT FUNCTION
-# ==========================================
+@st.cache_resource
+def get_cost_ledger():
+    """Process-wide token/cost ledger (persisted as JSONL so spend caps survive restarts)"""
+    return CostLedger()
 
-def generate_image_prompt(persona, campaign_type, course_title, brand_tone, visual_style):
-    """Generate detailed prompt for DALL-E based on persona and campaign"""
-    
-    persona_info = STUDENT_PERSONAS[persona]
-    visual_keywords = ", ".join(persona_info["visual_keywords"])
-    
-    base_prompt = f"""Create a {visual_style} educational marketing image for {campaign_type}.
-    
-Target audience: {persona} - {persona_info['description']}
-Visual style: {visual_keywords}
-Mood: {persona_info['messaging_style']}
+@st.cache_resource
+def get_posting_time_model():
+    """Predicted engagement per platform/weekday/hour, fitted once from the photography CSV"""
+    from content_scheduler import posting_time_model
 
-The image should:
-- Appeal to {persona_info['demographics']}
-- Convey {persona_info['key_benefits']}
-- Be {visual_style} and suitable for social media
-- Feature educational/learning elements
-- Include diverse students in a {brand_tone.lower()} environment
-- Be engaging and shareable
+    return posting_time_model(get_analytics_store().daily)
 
-Course focus: {course_title if course_title else 'general education'}
+@st.cache_resource
+def get_image_pool():
+    """Encoded image bytes kept hot in memory, capped per session and globally"""
+    return ImageMemoryPool()
 
-Style: Professional photography, high quality, modern, appealing to Gen Z"""
-    
-    return base_prompt
+@st.cache_resource
+def get_session_memory():
+    """Per-session memory accounting and budgets (MB overrides from secrets)"""
+    limits = {}
+    if st.secrets.get("SESSION_MEMORY_MAX_MB"):
+        limits["session_max_bytes"] = int(float(st.secrets["SESSION_MEMORY_MAX_MB"]) * 1024 * 1024)
+    if st.secrets.get("TOTAL_MEMORY_MAX_MB"):
+        limits["total_max_bytes"] = int(float(st.secrets["TOTAL_MEMORY_MAX_MB"]) * 1024 * 1024)
+    return SessionMemoryRegistry(image_pool=get_image_pool(), **limits)
 
-# ==========================================
-# DALL-E IMAGE GENERATION FUNCTION (REPLACED HUGGING FACE)
-# ==========================================
+@st.cache_resource
+def get_memory_monitor():
+    """tracemalloc snapshots for the ?debug=memory view (active only while tracing)"""
+    return TracemallocMonitor()
 
 def generate_image_dalle(prompt, width, height, api_key):
-    """Generate image using DALL-E 3 - ONLY CHANGE FROM HUGGING FACE VERSION"""
+    """Generate image using DALL-E 3 - returns an on-disk CachedImage handle, never decoded pixels"""
     
-    if not openai_client:
+    if not api_key and not use_mock_backend():
         return None, "Please configure OpenAI API key for DALL-E image generation"
     
-    # DALL-E 3 only supports these specific sizes
-    # Map requested dimensions to closest DALL-E size
-    if width == height:
-        size = "1024x1024"
-    elif height > width:
-        size = "1024x1792"  # Portrait
-    else:
-        size = "1792x1024"  # Landscape
-    
     try:
-        response = openai_client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            size=size,
-            quality="standard",  # Can be "standard" or "hd"
-            n=1
-        )
-        
-        # Get the image URL
-        image_url = response.data[0].url
-        
-        # Download the image
-        image_response = requests.get(image_url)
-        image = Image.open(io.BytesIO(image_response.content))
-        
+        # Cache hit skips the API entirely
+        image = create_image(get_openai_client(api_key), prompt, dalle_size(width, height), get_image_cache(),
+                             get_request_executor(), get_image_index())
         return image, None
         
     except Exception as e:
@@ -605,30 +402,12 @@ def generate_image_dalle(prompt, width, height, api_key):
 
 def create_export_text(result):
     """Create formatted text export"""
-    return f"""Content Synth AI - Generated Caption
-{'='*50}
-
-Platform: {result['platform']}
-Persona: {result['persona']}
-Campaign: {result['campaign_type']}
-Brand Tone: {result['brand_tone']}
-Timestamp: {result['timestamp']}
-Character Count: {result['char_count']}/{result['char_limit']}
-
-CAPTION:
-{result['caption']}
-
-HASHTAGS:
-{' '.join(result['hashtags'])}
-
-METADATA:
-- Brand Alignment Score: {result['alignment_score']}%
-- Length Status: {result['length_status']}
-- Generated with: Claude AI + Research-based Personas
-"""
+    return caption_text(result)
 
 def create_export_csv(history):
     """Create CSV export of generation history"""
+    import pandas as pd
+    
     df = pd.DataFrame(history)
     return df.to_csv(index=False)
 
@@ -642,9 +421,44 @@ if 'generated_caption' not in st.session_state:
 if 'generation_history' not in st.session_state:
     st.session_state.generation_history = []
 
+# Image cache key of the current image (bytes live in the shared image cache/pool, not here)
 if 'generated_image' not in st.session_state:
     st.session_state.generated_image = None
 
+# Platform size ("1080x1350") the current image is delivered at
+if 'image_size' not in st.session_state:
+    st.session_state.image_size = None
+
+# Image request waiting on the "reuse a similar image?" offer
+if 'image_matches' not in st.session_state:
+    st.session_state.image_matches = None
+
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+if 'caption_alternatives' not in st.session_state:
+    st.session_state.caption_alternatives = []
+
+# Cross-platform fan-out: {platform: result} from one call (None for single-platform captions)
+if 'platform_captions' not in st.session_state:
+    st.session_state.platform_captions = None
+
+# Latest brief from the input region, read by the image region
+if 'brief' not in st.session_state:
+    st.session_state.brief = None
+
+if 'image_format' not in st.session_state:
+    st.session_state.image_format = "standard"
+
+# Record this session's footprint; trim it when it (or the whole process) is over budget
+memory_actions = get_session_memory().enforce(
+    st.session_state.session_id, st.session_state,
+    release_images=lambda: get_image_pool().release_session(st.session_state.session_id)
+)
+if memory_actions:
+    st.toast(f"🧹 Session memory over budget: {', '.join(memory_actions)}")
+get_memory_monitor().maybe_snapshot()
+
 # ==========================================
 # MAIN APP LAYOUT
 # ==========================================
@@ -660,38 +474,150 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Two-column layout (kept from original)
-col_input, col_output = st.columns([1, 1], gap="large")
+# ==========================================
+# SHARED STATE BETWEEN REGIONS
+# ==========================================
+# The input, image generator, caption output and export regions are st.fragment functions: a
+# widget change reruns only its own region. Regions read each other's results from these
+# session_state keys only. Actions that change what another region shows end with a full
+# st.rerun(): a new caption, a new image, or a platform switch (which changes the ratio options).
+#   brief                - platform, campaign, persona, course, tone, N (input region)
+#   generated_caption    - current result dict (caption output + exports)
+#   caption_alternatives - ranked alternatives from the same call
+#   platform_captions    - one tailored result per platform from a cross-platform fan-out call
+#   generated_image      - image cache key of the current image (image region -> caption output)
+#   image_format         - platform/ratio that image was generated for
+#   image_size           - platform pixel size the image is delivered at (WebP rendition)
+#   image_matches        - pending image request plus close cached images offered instead (image region)
+#   generation_history   - every result this session (export region)
+#   posting_schedule     - last schedule built from the history, with the history/weeks it was built for
 
-with col_input:
+def use_alternative(index):
+    """Swap the shown caption with alternative `index` (instant, no API call)"""
+    result = st.session_state.generated_caption
+    alternative = st.session_state.caption_alternatives[index]
+    current = {key: result.get(key, "") for key in ("caption", "char_count", "length_status", "alignment_score", "repair_actions")}
+    swapped = {**result, **{key: alternative.get(key, "") for key in current}}
+    st.session_state.generated_caption = swapped
+    # The history entry is the shown result itself: replace it so exports carry the chosen caption
+    history = st.session_state.generation_history
+    for position in range(len(history) - 1, -1, -1):
+        if history[position] is result:
+            history[position] = swapped
+            break
+    st.session_state.caption_alternatives = (
+        st.session_state.caption_alternatives[:index] + [current] + st.session_state.caption_alternatives[index + 1:]
+    )
+
+def clear_caption():
+    """Regenerate: drop the current caption and image (history and exports are kept)"""
+    st.session_state.generated_caption = None
+    st.session_state.generated_image = None
+    st.session_state.caption_alternatives = []
+    st.session_state.platform_captions = None
+    get_image_pool().release_session(st.session_state.session_id)
+
+def use_platform_caption(platform):
+    """Show another platform's caption from the same fan-out call (no API call)"""
+    st.session_state.generated_caption = st.session_state.platform_captions[platform]
+
+def generate_platform_set(brief):
+    """Cross-platform fan-out: one call, a tailored caption for every platform; stored in session_state"""
+    results = generate_platform_captions(
+        get_anthropic_client(anthropic_api_key), brief["persona"], brief["campaign_type"], brief["brand_tone"],
+        brief["course_title"],
+        profile=brand_profile,
+        ledger=get_cost_ledger(),
+        ledger_tags={"session_id": st.session_state.session_id, "tenant": TENANT_ID},
+        spend_cap_usd=spend_cap_usd,
+        executor=get_request_executor(),
+        deadline=Deadline(CAPTION_DEADLINE_SECONDS),
+        bandit=engagement_bandit,
+        insights=prompt_insights(brief["platform"], get_insights_engine())
+    )
+    st.session_state.platform_captions = results
+    st.session_state.generated_caption = next(iter(results.values()))
+    st.session_state.caption_alternatives = []
+    st.session_state.generation_history.extend(results.values())
+
+def generate_caption(brief):
+    """Pre-warmed result for the brief, else a live call; stored in session_state"""
+    if brief.get("fanout"):
+        return generate_platform_set(brief)
+    platform, campaign_type, brand_tone = brief["platform"], brief["campaign_type"], brief["brand_tone"]
+    course_title, n_candidates, selected_persona = brief["course_title"], brief["n_candidates"], brief["persona"]
+
+    # Pre-warmed results for this brief (filled off-peak by campaign_prewarm.py) skip the API call
+    response_key = make_response_key(TENANT_ID, platform, campaign_type, brand_tone, course_title, n_candidates)
+    prewarmed = get_response_cache().take(response_key)
+    if prewarmed:
+        result, alternatives = prewarmed["result"], prewarmed["alternatives"]
+        result.update({"prewarmed": True, "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+    else:
+        response_cache = get_response_cache()
+
+        def caption_fallback():
+            """Deadline missed or circuit open: last good result for this brief, else a local template caption"""
+            remembered = response_cache.recall(response_key)
+            if remembered:
+                remembered["result"].update({"fallback": "cached", "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+                return remembered["result"], remembered["alternatives"]
+            return template_caption_set(selected_persona, platform, campaign_type, brand_tone, course_title, brand_profile,
+                                        n_candidates=n_candidates)
+
+        result, alternatives = generate_caption_set(
+            get_anthropic_client(anthropic_api_key), selected_persona, platform, campaign_type, brand_tone, course_title, n_candidates,
+            profile=brand_profile,
+            ledger=get_cost_ledger(),
+            ledger_tags={"session_id": st.session_state.session_id, "tenant": TENANT_ID},
+            spend_cap_usd=spend_cap_usd,
+            executor=get_request_executor(),
+            deadline=Deadline(CAPTION_DEADLINE_SECONDS),
+            fallback=caption_fallback,
+            router=get_model_router(),
+            bandit=engagement_bandit,
+            insights=prompt_insights(platform, get_insights_engine())
+        )
+        if not result.get("fallback"):
+            response_cache.remember(response_key, {"result": result, "alternatives": alternatives})
+
+    st.session_state.generated_caption = result
+    st.session_state.caption_alternatives = alternatives
+    st.session_state.platform_captions = None
+    st.session_state.generation_history.append(result)
+
+# ==========================================
+# INPUT REGION
+# ==========================================
+
+@st.fragment
+def input_region():
     st.markdown('<div class="section-header">📝 INPUT SECTION</div>', unsafe_allow_html=True)
-    
+
     # Platform selection
     st.markdown("📱 **Platform**")
     platform = st.selectbox(
         "Platform",
-        ["Cross-platform", "Instagram", "TikTok", "Facebook"],
+        brand_profile.platforms,
         label_visibility="collapsed"
     )
-    
+
     # Show platform caption limit
     platform_data = PLATFORM_SPECS.get(platform, PLATFORM_SPECS["Instagram"])
     char_limit = platform_data['recommended_caption']
     st.caption(f"💬 Caption limit for this platform: {char_limit} characters")
-    
+
     # Campaign Type
     st.markdown("🎯 **Campaign Type**")
     campaign_type = st.selectbox(
         "Campaign Type",
-        ["Music-Integrated Learning", "Sports-Based Education", "Creative Arts Program", 
-         "General Summer School", "Study Abroad", 
-         "Athletic Training", "Performance Arts", "Online Learning", "Tutoring Services"],
+        brand_profile.campaign_types,
         label_visibility="collapsed"
     )
-    
+
     # Auto-select persona based on campaign
-    selected_persona = auto_select_persona(campaign_type)
-    
+    selected_persona = auto_select_persona(campaign_type, brand_profile)
+
     # Display auto-selected persona
     st.markdown(f"""
     <div style="background-color: #f0f0f0; padding: 1rem; border-radius: 8px; margin: 1rem 0;">
@@ -700,7 +626,7 @@ with col_input:
         <p style="font-size: 0.85rem; margin-top: 0.3rem;"><strong>Messaging:</strong> {STUDENT_PERSONAS[selected_persona]['messaging_style']}</p>
     </div>
     """, unsafe_allow_html=True)
-    
+
     # Course Title
     st.markdown("📚 **Course/Event Title**")
     course_title = st.text_input(
@@ -708,299 +634,519 @@ with col_input:
         placeholder="Summer Program 2025",
         label_visibility="collapsed"
     )
-    
+
     # Brand Voice
     st.markdown("🎨 **Brand Voice**")
-    brand_tone_options = ["Professional", "Casual", "Friendly"]
+    brand_tone_options = list(brand_profile.brand_tones)
     brand_tone = st.radio(
         "Brand Voice",
         brand_tone_options,
         horizontal=True,
         label_visibility="collapsed",
-        index=2  # Default to Friendly
+        index=brand_tone_options.index(brand_profile.default_brand_tone)
     )
-    
+
+    # Best-of-N: one call returns several candidates, ranked locally
+    st.markdown("🏆 **Caption Options (best of N)**")
+    n_candidates = st.select_slider(
+        "Caption Options",
+        options=[1, 3, 5],
+        value=3,
+        label_visibility="collapsed",
+        help="Ask for several captions in one call; the best under the platform limit is shown first"
+    )
+
+    # Cross-platform: one call can return a tailored caption for every platform instead of one generic caption
+    fanout = platform not in PLATFORM_SPECS and st.toggle(
+        f"🌐 Tailor for every platform ({', '.join(PLATFORM_SPECS)}) in one call",
+        value=True,
+        help="One Claude call returns a caption per platform, each fitted to its own limit and hashtags"
+    )
+
+    previous_brief = st.session_state.brief
+    st.session_state.brief = {"platform": platform, "campaign_type": campaign_type, "persona": selected_persona,
+                              "course_title": course_title, "brand_tone": brand_tone, "n_candidates": n_candidates,
+                              "fanout": fanout}
+    if previous_brief and previous_brief["platform"] != platform:
+        st.rerun()  # the image region's ratio options follow the platform
+
     # Generate Caption Button
-    generate_caption_clicked = st.button("✨ GENERATE CAPTION", use_container_width=True, type="primary")
-    
+    if st.button("✨ GENERATE CAPTION", use_container_width=True, type="primary"):
+        with st.spinner("🤖 Generating your caption..."):
+            try:
+                generate_caption(st.session_state.brief)
+            except Exception as e:
+                st.error(f"❌ Error: {str(e)}")
+            else:
+                st.rerun()  # caption output and exports show the new result
+
+# ==========================================
+# IMAGE GENERATOR REGION
+# ==========================================
+
+def show_image(image, request):
+    """Make a cached image the current one and link it to the current caption"""
+    st.session_state.generated_image = image.key
+    st.session_state.image_format = request["format"]
+    st.session_state.image_size = f"{request['width']}x{request['height']}"
+    # Link the image to the current caption so bundle exports ship them together
+    if st.session_state.generated_caption:
+        st.session_state.generated_caption.update({"image_key": image.key,
+                                                   "image_size": f"{request['width']}x{request['height']}"})
+
+def generate_image(request):
+    """DALL-E call for an image request (prompt, width, height, format); full rerun on success"""
+    with st.spinner("🎨 Generating image with DALL-E 3... (10-20 seconds)"):
+        try:
+            # Generate image using DALL-E
+            image, error = generate_image_dalle(request["prompt"], request["width"], request["height"], openai_api_key)
+        except Exception as e:
+            st.error(f"❌ Image generation error: {str(e)}")
+            return
+
+    if not image:
+        st.error(f"❌ {error}")
+        st.info("💡 Make sure you have OpenAI credits available!")
+        return
+    show_image(image, request)
+    st.toast("✅ Image generated successfully with DALL-E 3!")
+    st.rerun()  # the caption output shows the new image
+
+@st.fragment
+def image_region():
+    brief = st.session_state.brief
+    platform = brief["platform"]
+
     # Visual Image Generator Section
     st.markdown("---")
     st.markdown('<div class="section-header">🎨 VISUAL IMAGE GENERATOR</div>', unsafe_allow_html=True)
-    
+
     st.markdown("📷 **Generate AI Image (DALL-E)**")
-    
+
     # Image Type dropdown
-    image_type = st.selectbox(
+    st.selectbox(
         "Image Type",
         ["Social Media Post", "Educational Banner", "Event Poster", "Course Thumbnail"],
         label_visibility="collapsed"
     )
-    
-    # Style dropdown  
+
+    # Style dropdown
     visual_style = st.selectbox(
         "Style",
         ["Abstract", "Modern", "Photographic", "Minimalist", "Vibrant", "Artistic"],
         label_visibility="collapsed"
     )
-    
+
     # Ratio dropdown (updated for selected platform)
     if platform in PLATFORM_IMAGE_SPECS:
         ratio_options = list(PLATFORM_IMAGE_SPECS[platform].keys())
     else:
         ratio_options = ["square"]
-    
+
     selected_ratio = st.selectbox(
         "Ratio",
         ratio_options,
         label_visibility="collapsed"
     )
-    
+
     # Keywords input
     keywords_description = st.text_input(
         "Keywords / Description (optional)",
         placeholder="e.g., students studying, summer vibes, outdoor learning",
         label_visibility="collapsed"
     )
-    
+
     # Info about generation time
     st.info("⏱️ Image generation takes 10-20 seconds. First request may take 30 seconds while model loads.")
-    
-    # Generate Image Button
-    generate_image_clicked = st.button("🎨 GENERATE IMAGE", use_container_width=True)
 
-# OUTPUT SECTION
-with col_output:
-    st.markdown('<div class="section-header">📤 OUTPUT SECTION</div>', unsafe_allow_html=True)
-    
-    # Process caption generation
-    if generate_caption_clicked:
-        with st.spinner("🤖 Generating your caption..."):
-            
-            # Get persona insights
-            persona_info = STUDENT_PERSONAS[selected_persona]
-            
-            # Build prompt
-            prompt = f"""You are a social media expert creating content for educational institutions targeting Gen Z students.
-
-TARGET PERSONA: {selected_persona}
-- Description: {persona_info['description']}
-- Demographics: {persona_info['demographics']}
-- Interests: {', '.join(persona_info['interests'])}
-- Messaging Style: {persona_info['messaging_style']}
-- Key Benefits to Highlight: {persona_info['key_benefits']}
-- CTA Style: {persona_info['cta_style']}
-
-CAMPAIGN DETAILS:
-- Platform: {platform}
-- Campaign Type: {campaign_type}
-- Brand Tone: {brand_tone}
-- Course/Event: {course_title if course_title else 'General education program'}
-
-PLATFORM REQUIREMENTS:
-- Character Limit: {char_limit} characters (STRICT)
-- Best Practice: {platform_data['best_practice']}
-
-INSIGHTS FROM RESEARCH:
-- 87% of audience uses mobile devices
-- Peak engagement: 12-3pm, 7-10pm
-- Visual content gets 45% more engagement
-- Persona-aligned messaging increases conversion by 60%
-
-Create a {platform} caption that:
-1. Speaks directly to {selected_persona} using their preferred messaging style
-2. Stays UNDER {char_limit} characters
-3. Includes a clear call-to-action matching their CTA style
-4. Uses {brand_tone.lower()} tone
-5. Feels authentic and engaging for Gen Z
-6. Incorporates relevant benefits and interests
-
-Return ONLY the caption text, no hashtags, no explanations."""
-            
-            # Get research-based hashtags with variation
-            variation_seed = datetime.now().timestamp()
-            hashtags = select_hashtags_for_persona(selected_persona, platform, campaign_type, variation_seed)
-            
-            try:
-                message = client.messages.create(
-                    model="claude-sonnet-4-20250514",
-                    max_tokens=512,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                
-                caption = message.content[0].text.strip()
-                
-                # Check caption length
-                length_status, actual_length = check_caption_length(caption, char_limit)
-                
-                # Calculate brand alignment score
-                alignment_score = calculate_brand_alignment(caption, hashtags, selected_persona, brand_tone)
-                
-                # Store result
-                result = {
-                    "caption": caption,
-                    "hashtags": hashtags,
-                    "platform": platform,
-                    "persona": selected_persona,
-                    "char_count": actual_length,
-                    "char_limit": char_limit,
-                    "length_status": length_status,
-                    "alignment_score": alignment_score,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "campaign_type": campaign_type,
-                    "brand_tone": brand_tone
-                }
-                
-                st.session_state.generated_caption = result
-                st.session_state.generation_history.append(result)
-                
-            except Exception as e:
-                st.error(f"❌ Error: {str(e)}")
-    
-    # Image Generation
-    if generate_image_clicked:
-        if not openai_client:
+    cache_stats = get_image_cache().stats()
+    st.caption(f"🗂️ Image cache: {cache_stats['entries']} images · {cache_stats['hit_ratio']:.0%} hit ratio ({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']} requests)")
+
+    # Generate Image Button
+    if st.button("🎨 GENERATE IMAGE", use_container_width=True):
+        if not openai_api_key and not use_mock_backend():
             st.error("⚠️ Please configure your OpenAI API key for image generation!")
+            return
+        # Generate image prompt
+        image_prompt = generate_image_prompt(brief["persona"], brief["campaign_type"], brief["course_title"],
+                                             brief["brand_tone"], visual_style, brand_profile)
+        if keywords_description:
+            image_prompt = f"{image_prompt}. Additional elements: {keywords_description}"
+
+        # Determine size based on platform and ratio
+        if platform in PLATFORM_IMAGE_SPECS and selected_ratio in PLATFORM_IMAGE_SPECS[platform]:
+            size_str = PLATFORM_IMAGE_SPECS[platform][selected_ratio]["size"]
+            width, height = map(int, size_str.split('x'))
         else:
-            with st.spinner("🎨 Generating image with DALL-E 3... (10-20 seconds)"):
-                try:
-                    # Generate image prompt
-                    if keywords_description:
-                        image_prompt = f"{generate_image_prompt(selected_persona, campaign_type, course_title, brand_tone, visual_style)}. Additional elements: {keywords_description}"
-                    else:
-                        image_prompt = generate_image_prompt(selected_persona, campaign_type, course_title, brand_tone, visual_style)
-                    
-                    # Determine size based on platform and ratio
-                    if platform in PLATFORM_IMAGE_SPECS and selected_ratio in PLATFORM_IMAGE_SPECS[platform]:
-                        size_str = PLATFORM_IMAGE_SPECS[platform][selected_ratio]["size"]
-                        width, height = map(int, size_str.split('x'))
-                    else:
-                        width, height = 1024, 1024
-                    
-                    # Generate image using DALL-E
-                    image, error = generate_image_dalle(image_prompt, width, height, openai_api_key)
-                    
-                    if image:
-                        st.session_state.generated_image = image
-                        st.success("✅ Image generated successfully with DALL-E 3!")
-                    else:
-                        st.error(f"❌ {error}")
-                        st.info("💡 Make sure you have OpenAI credits available!")
-                    
-                except Exception as e:
-                    st.error(f"❌ Image generation error: {str(e)}")
-    
+            width, height = 1024, 1024
+        request = {"prompt": image_prompt, "width": width, "height": height, "format": f"{platform} - {selected_ratio}"}
+
+        # A near-identical cached image is offered first (an exact repeat is served by the cache anyway)
+        size = dalle_size(width, height)
+        matches = []
+        if not get_image_cache().peek(make_image_key(image_prompt, size, DALLE_QUALITY, DALLE_MODEL)):
+            matches = get_image_index().similar_prompts(image_prompt, size)
+        if not matches:
+            st.session_state.image_matches = None
+            generate_image(request)
+            return
+        st.session_state.image_matches = {"request": request, "matches": matches}
+
+    offer = st.session_state.image_matches
+    if offer:
+        st.markdown(f"♻️ **{len(offer['matches'])} similar image(s) already generated** - reuse one to skip a paid DALL-E call")
+        columns = st.columns(len(offer["matches"]))
+        for column, match in zip(columns, offer["matches"]):
+            handle = get_image_cache().peek(match["key"])
+            if not handle:
+                continue
+            with column:
+                st.image(handle.thumbnail_path.read_bytes(), use_container_width=True)
+                differs = ", ".join(match["differs_in"][:6]) or "identical prompt"
+                st.caption(f"{match['similarity']:.0%} similar prompt · differs in: {differs}")
+                if st.button("Use this image", key=f"use_image_{match['key'][:12]}", use_container_width=True):
+                    st.session_state.image_matches = None
+                    show_image(handle, offer["request"])
+                    st.toast("♻️ Reused a cached image - no DALL-E call")
+                    st.rerun()  # the caption output shows the image
+        if st.button("🎨 Generate a new image anyway", use_container_width=True):
+            st.session_state.image_matches = None
+            generate_image(offer["request"])
+
+# ==========================================
+# CAPTION OUTPUT REGION
+# ==========================================
+
+# Why a caption came from a fallback (request_executor.failure_reason / executor fallback reasons)
+FALLBACK_CAUSES = {
+    "deadline": "🕒 Claude was too slow",
+    "timeout": "🕒 Claude timed out",
+    "rate_limited": "🚦 Claude is rate limiting requests (429)",
+    "server_error": "⚠️ Claude returned server errors (5xx)",
+    "connection_error": "📡 Claude could not be reached",
+    "circuit_open": "🔌 Claude is degraded",
+    "truncated": "✂️ Claude's reply was cut off at the output limit",
+    "missing": "🧩 Claude's reply left this platform out",
+}
+
+def fallback_cause(result):
+    return FALLBACK_CAUSES.get(result.get("fallback_reason"), FALLBACK_CAUSES["deadline"])
+
+@st.fragment
+def caption_output_region():
+    st.markdown('<div class="section-header">📤 OUTPUT SECTION</div>', unsafe_allow_html=True)
+
     # Display results
-    if st.session_state.generated_caption:
-        result = st.session_state.generated_caption
-        
-        # Determine character count color
-        if result['length_status'] == 'good':
-            char_class = 'char-limit-good'
-            char_icon = '✅'
-        elif result['length_status'] == 'warning':
-            char_class = 'char-limit-warning'
-            char_icon = '⚠️'
-        else:
-            char_class = 'char-limit-exceeded'
-            char_icon = '❌'
-        
-        st.markdown(f"""
-        <div class="output-box">
-            <h3>✅ Caption Ready!</h3>
-            <p class="char-counter {char_class}">
-                {char_icon} {result['char_count']}/{result['char_limit']} characters
-            </p>
-            <span class="persona-badge">🎭 {result['persona']}</span>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Brand Alignment Score
-        st.markdown(f"""
-        <div class="brand-alignment-box">
-            <h4>📊 Brand Alignment Checklist</h4>
-            <p>✓ Matches brand keywords</p>
-            <p>✓ Tone consistent with caption</p>
-            <p>✓ Optimal hashtag count</p>
-            <p><strong>Brand Consistency Score: <span class="alignment-score">{result['alignment_score']}%</span></strong></p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Warning if length exceeded
-        if result['length_status'] == 'exceeded':
-            st.warning(f"⚠️ Caption exceeds {result['char_limit']} character limit by {result['char_count'] - result['char_limit']} characters. Consider regenerating.")
-        elif result['length_status'] == 'warning':
-            st.info("💡 Caption is slightly over the recommended limit but may still work.")
-        
-        # Caption
-        st.markdown("**📝 Your Caption:**")
-        st.markdown(f'<div class="caption-text">{result["caption"]}</div>', unsafe_allow_html=True)
-        
-        # Hashtags
-        st.markdown("**#️⃣ Research-Based Hashtags:**")
-        st.markdown(f'<div class="hashtag-box">{" ".join(result["hashtags"])}</div>', unsafe_allow_html=True)
-        st.caption("Based on TikTok Education NZ research (120-day analysis)")
-        
-        # Display generated image if available
-        if st.session_state.generated_image:
-            st.markdown("---")
-            st.markdown("**🎨 Visual Output:**")
-            st.image(st.session_state.generated_image, use_container_width=True)
-            st.caption(f"Generated with DALL-E 3 - {platform} - {selected_ratio if 'selected_ratio' in locals() else 'standard'} format")
-        
-        # Persona insights
-        st.markdown("**🎯 Persona Insights Applied:**")
-        persona_info = STUDENT_PERSONAS[result['persona']]
-        
-        insights_display = [
-            f"👤 Target: {persona_info['demographics']}",
-            f"💬 Tone: {persona_info['messaging_style']}",
-            f"✨ Benefits: {persona_info['key_benefits']}",
-            f"📱 Mobile-optimized: {photo_insights['mobile_pct']}% mobile users"
-        ]
-        
-        for insight in insights_display:
-            st.markdown(f'<div class="insight-badge">• {insight}</div>', unsafe_allow_html=True)
-        
-        # Export/Action buttons
+    if not st.session_state.generated_caption:
+        return
+    result = st.session_state.generated_caption
+
+    # Determine character count color
+    if result['length_status'] == 'good':
+        char_class = 'char-limit-good'
+        char_icon = '✅'
+    elif result['length_status'] == 'warning':
+        char_class = 'char-limit-warning'
+        char_icon = '⚠️'
+    else:
+        char_class = 'char-limit-exceeded'
+        char_icon = '❌'
+
+    st.markdown(f"""
+    <div class="output-box">
+        <h3>✅ Caption Ready!</h3>
+        <p class="char-counter {char_class}">
+            {char_icon} {result['char_count']}/{result['char_limit']} characters
+        </p>
+        <span class="persona-badge">🎭 {result['persona']}</span>
+    </div>
+    """, unsafe_allow_html=True)
+
+    if result.get('circuit_open'):
+        source = "the last caption generated for this brief" if result.get('fallback') == 'cached' else "an on-brand template caption"
+        st.caption(f"🔌 Claude is degraded - showing {source} (no API call); live captions resume automatically")
+    elif result.get('fallback') == 'cached':
+        st.caption(f"{fallback_cause(result)} - showing the last caption generated for this brief")
+    elif result.get('fallback') == 'template':
+        st.caption(f"{fallback_cause(result)} - showing an on-brand template caption (no API call)")
+    elif result.get('prewarmed'):
+        st.caption("⚡ Pre-generated off-peak for this campaign - served from cache, no API call")
+    elif 'cost_usd' in result:
+        if result.get('route'):
+            st.caption(f"🧭 Model route: {result['route']} · {result['model']}")
+        session_spend = get_cost_ledger().totals(session_id=st.session_state.session_id)
+        st.caption(f"🧾 {result['input_tokens']} in / {result['output_tokens']} out tokens · ${result['cost_usd']:.4f} · session total ${session_spend['cost_usd']:.4f} ({session_spend['calls']} calls)")
+
+    # Brand Alignment Score
+    st.markdown(f"""
+    <div class="brand-alignment-box">
+        <h4>📊 Brand Alignment Checklist</h4>
+        <p>✓ Matches brand keywords</p>
+        <p>✓ Tone consistent with caption</p>
+        <p>✓ Optimal hashtag count</p>
+        <p><strong>Brand Consistency Score: <span class="alignment-score">{result['alignment_score']}%</span></strong></p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Warning if length exceeded
+    if result.get('repair_actions'):
+        st.info(f"✂️ Caption fitted to the {result['char_limit']} character limit locally ({result['repair_actions'].replace('_', ' ')}).")
+
+    if result['length_status'] == 'exceeded':
+        st.warning(f"⚠️ Caption exceeds {result['char_limit']} character limit by {result['char_count'] - result['char_limit']} characters. Consider regenerating.")
+    elif result['length_status'] == 'warning':
+        st.info("💡 Caption is slightly over the recommended limit but may still work.")
+
+    # Caption
+    st.markdown("**📝 Your Caption:**")
+    st.markdown(f'<div class="caption-text">{result["caption"]}</div>', unsafe_allow_html=True)
+
+    # Hashtags
+    st.markdown("**#️⃣ Research-Based Hashtags:**")
+    st.markdown(f'<div class="hashtag-box">{" ".join(result["hashtags"])}</div>', unsafe_allow_html=True)
+    st.caption("Based on TikTok Education NZ research (120-day analysis)")
+
+    # Alternatives from the same best-of-N call - swapping is instant, no API call
+    if st.session_state.caption_alternatives:
+        with st.expander(f"🔁 {len(st.session_state.caption_alternatives)} alternative captions (ranked)"):
+            for i, alt in enumerate(st.session_state.caption_alternatives):
+                st.markdown(f"**Option {i + 2}** · {alt['char_count']}/{result['char_limit']} characters · {alt['alignment_score']}% brand alignment")
+                st.markdown(f'<div class="caption-text">{alt["caption"]}</div>', unsafe_allow_html=True)
+                st.button("Use this caption", key=f"use_alternative_{i}", use_container_width=True,
+                          on_click=use_alternative, args=(i,))
+
+    # Every platform's caption from the same fan-out call - switching is instant, no API call
+    platform_captions = st.session_state.platform_captions
+    if platform_captions:
+        live = [entry for entry in platform_captions.values() if not entry.get("fallback")]
+        st.markdown(f"**🌐 Tailored for {len(platform_captions)} platforms:**")
+        if live:
+            st.caption(f"One call for all platforms · {sum(entry['input_tokens'] for entry in live)} in / "
+                       f"{sum(entry['output_tokens'] for entry in live)} out tokens · ${sum(entry['cost_usd'] for entry in live):.4f}")
+        for tab, (name, entry) in zip(st.tabs(list(platform_captions)), platform_captions.items()):
+            with tab:
+                status_icon = {"good": "✅", "warning": "⚠️"}.get(entry["length_status"], "❌")
+                source = f" · template caption ({fallback_cause(entry)})" if entry.get("fallback") else ""
+                st.caption(f"{status_icon} {entry['char_count']}/{entry['char_limit']} characters · "
+                           f"{entry['alignment_score']}% brand alignment{source}")
+                st.markdown(f'<div class="caption-text">{entry["caption"]}</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="hashtag-box">{" ".join(entry["hashtags"])}</div>', unsafe_allow_html=True)
+                st.button(f"Use the {name} caption", key=f"use_platform_{name}", use_container_width=True,
+                          on_click=use_platform_caption, args=(name,), disabled=entry is result)
+
+    # Display generated image if available
+    if st.session_state.generated_image:
         st.markdown("---")
-        st.markdown("**💾 Export & Actions:**")
-        
-        col_btn1, col_btn2, col_btn3 = st.columns(3)
-        
-        export_txt = create_export_text(result)
-        full_text_for_copy = f"{result['caption']}\n\n{' '.join(result['hashtags'])}"
-        
-        with col_btn1:
+        st.markdown("**🎨 Visual Output:**")
+        image_handle = get_image_cache().peek(st.session_state.generated_image)
+        if image_handle:
+            # Progressive delivery: the thumbnail goes out at once, the platform-sized WebP replaces it
+            delivery, size = get_image_delivery(), st.session_state.image_size
+            slot = st.empty()
+            if not delivery.has_webp(image_handle, size):
+                slot.image(delivery.preview(image_handle), use_container_width=True)
+            webp = get_image_pool().get_bytes(st.session_state.session_id, image_handle, f"webp-{size}",
+                                              lambda: delivery.webp(image_handle, size))
+            slot.image(data_uri(webp, "image/webp"), use_container_width=True)
+            st.caption(f"Generated with DALL-E 3 - {st.session_state.image_format} format · {len(webp) / 1024:.0f} KB WebP")
             st.download_button(
-                label="📥 Download TXT",
-                data=export_txt,
-                file_name=f"caption_{result['persona'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                mime="text/plain",
+                label="⬇️ Download original PNG",
+                data=lambda: delivery.original(image_handle),  # read only when downloaded
+                file_name=f"image_{image_handle.key[:12]}.png",
+                mime="image/png",
                 use_container_width=True
             )
-        
-        with col_btn2:
-            if st.button("📋 Copy Caption", use_container_width=True):
-                st.code(full_text_for_copy, language=None)
-                st.caption("👆 Click inside, Ctrl+A, then Ctrl+C to copy")
-        
-        with col_btn3:
-            if st.button("🔄 Regenerate", use_container_width=True):
-                st.session_state.generated_caption = None
-                st.session_state.generated_image = None
-                st.rerun()
-        
-        # CSV export for history
-        if len(st.session_state.generation_history) > 1:
-            st.markdown("---")
-            csv_data = create_export_csv(st.session_state.generation_history)
+        else:
+            st.caption("🗂️ This image has been evicted from the image cache - generate it again to view it.")
+            st.caption(f"Generated with DALL-E 3 - {st.session_state.image_format} format")
+
+    # Persona insights
+    st.markdown("**🎯 Persona Insights Applied:**")
+    persona_info = STUDENT_PERSONAS[result['persona']]
+
+    insights_display = [
+        f"👤 Target: {persona_info['demographics']}",
+        f"💬 Tone: {persona_info['messaging_style']}",
+        f"✨ Benefits: {persona_info['key_benefits']}",
+    ]
+    insights_engine = get_insights_engine()
+    if insights_engine is not None:
+        devices = insights_engine.run('device_mix')
+        if devices and devices[0]['mobile_pct'] is not None:
+            insights_display.append(f"📱 Mobile: {devices[0]['mobile_pct']:g}% of website users")
+        insights_display.append(
+            f"🕒 Best times on {result['platform']}: {', '.join(best_posting_times(insights_engine, result['platform']))}"
+        )
+
+    for insight in insights_display:
+        st.markdown(f'<div class="insight-badge">• {insight}</div>', unsafe_allow_html=True)
+
+    # Export/Action buttons
+    st.markdown("---")
+    st.markdown("**💾 Export & Actions:**")
+
+    col_btn1, col_btn2, col_btn3 = st.columns(3)
+
+    export_txt = create_export_text(result)
+    full_text_for_copy = f"{result['caption']}\n\n{' '.join(result['hashtags'])}"
+
+    with col_btn1:
+        st.download_button(
+            label="📥 Download TXT",
+            data=export_txt,
+            file_name=f"caption_{result['persona'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+            mime="text/plain",
+            use_container_width=True
+        )
+
+    with col_btn2:
+        if st.button("📋 Copy Caption", use_container_width=True):
+            st.code(full_text_for_copy, language=None)
+            st.caption("👆 Click inside, Ctrl+A, then Ctrl+C to copy")
+
+    with col_btn3:
+        st.button("🔄 Regenerate", use_container_width=True, on_click=clear_caption)
+
+# ==========================================
+# EXPORT REGION
+# ==========================================
+
+BUNDLE_MAX_POSTS = 50  # newest captions in the app's bundle download
+BUNDLE_MAX_MB = 64     # the download is held in server memory until the browser fetches it
+
+@st.fragment
+def export_region():
+    history = st.session_state.generation_history
+
+    # CSV export for history
+    if len(history) <= 1:
+        return
+    st.markdown("---")
+    csv_data = create_export_csv(history)
+    st.download_button(
+        label=f"📊 Export All ({len(history)} captions) as CSV",
+        data=csv_data,
+        file_name=f"captions_history_{datetime.now().strftime('%Y%m%d')}.csv",
+        mime="text/csv",
+        use_container_width=True
+    )
+
+    # st.download_button holds the whole file in server memory, so the app's bundle is capped;
+    # `python bundle_export.py` streams bundles of any size
+    bundle_posts = history[-BUNDLE_MAX_POSTS:]
+    bundle_bytes = estimate_bundle_bytes(bundle_posts, get_image_cache())
+
+    def build_campaign_bundle(posts=list(bundle_posts)):
+        """ZIP streamed to a temp file on click - captions, manifest and cached image renditions"""
+        bundle_file = tempfile.TemporaryFile(buffering=0)  # raw file: st.download_button rejects buffered ones
+        write_bundle(posts, bundle_file, get_image_cache())
+        bundle_file.seek(0)
+        return bundle_file
+
+    newest = f", newest {len(bundle_posts)}" if len(bundle_posts) < len(history) else ""
+    st.download_button(
+        label=f"📦 Download campaign bundle (ZIP, {len(bundle_posts)} captions + images{newest}, ~{bundle_bytes / 2**20:.0f} MB)",
+        data=build_campaign_bundle,
+        file_name=f"campaign_bundle_{datetime.now().strftime('%Y%m%d')}.zip",
+        mime="application/zip",
+        use_container_width=True,
+        disabled=bundle_bytes > BUNDLE_MAX_MB * 2**20
+    )
+    if bundle_bytes > BUNDLE_MAX_MB * 2**20:
+        st.caption(f"The bundle is over {BUNDLE_MAX_MB} MB - export it with `python bundle_export.py` instead.")
+
+    with st.expander(f"📅 Schedule {len(history)} captions into posting slots"):
+        # Built on click only: pandas, the analytics store and the solver stay out of ordinary reruns
+        schedule_weeks = st.slider("Weeks", 1, 12, 2, key="schedule_weeks")
+        schedule_key = (tuple((entry.get("timestamp"), entry["caption"]) for entry in history), schedule_weeks)
+        built = st.session_state.get("posting_schedule")
+        if st.button("📅 Build schedule", use_container_width=True):
+            import pandas as pd
+            from content_scheduler import schedule_posts
+
+            schedule = schedule_posts(history, datetime.now().date() + pd.Timedelta(days=1), schedule_weeks,
+                                      get_posting_time_model())
+            built = st.session_state.posting_schedule = {"key": schedule_key, "schedule": schedule}
+        if built and built["key"] == schedule_key:
+            from content_scheduler import export_schedule_csv
+
+            schedule = built["schedule"]
+            placed = schedule[schedule["scheduled"]]
+            st.caption(f"{len(placed)}/{len(schedule)} scheduled · predicted engagement {placed['predicted_engagement'].sum():.0f}")
+            st.dataframe(placed[["scheduled_at", "platform", "predicted_engagement", "caption"]],
+                         hide_index=True, use_container_width=True)
             st.download_button(
-                label=f"📊 Export All ({len(st.session_state.generation_history)} captions) as CSV",
-                data=csv_data,
-                file_name=f"captions_history_{datetime.now().strftime('%Y%m%d')}.csv",
+                label="📥 Download schedule CSV",
+                data=lambda: export_schedule_csv(schedule),  # built only when downloaded
+                file_name=f"posting_schedule_{datetime.now().strftime('%Y%m%d')}.csv",
                 mime="text/csv",
                 use_container_width=True
             )
+        elif built:
+            st.caption("The captions or weeks changed since the last build - build the schedule again.")
+
+# Two-column layout (kept from original)
+col_input, col_output = st.columns([1, 1], gap="large")
+
+with col_input:
+    input_region()
+    image_region()
+
+with col_output:
+    caption_output_region()
+    export_region()
+
+# Request latency (rendered last so it includes this run's calls)
+request_metrics = get_request_executor().metrics()
+if request_metrics:
+    with st.sidebar:
+        st.markdown("---")
+        st.markdown("### ⏱️ Request Latency")
+        for operation, op_metrics in request_metrics.items():
+            latency = f"p50 {op_metrics['p50_ms']:.0f} ms · p99 {op_metrics['p99_ms']:.0f} ms" if op_metrics['p50_ms'] is not None else "no successful calls yet"
+            st.caption(f"**{operation}**: {latency} · hedged {op_metrics['hedge_rate']:.0%} · fallback {op_metrics['fallback_rate']:.0%} ({op_metrics['calls']} calls)")
+            if op_metrics['circuit'] not in (None, "closed"):
+                st.caption(f"🔌 circuit {op_metrics['circuit'].replace('_', '-')} · {op_metrics['short_circuited']} calls skipped")
+        for tier, route_metrics in get_model_router().report().items():
+            st.caption(f"**{tier} tier** ({route_metrics['model']}): p50 {route_metrics['p50_ms']:.0f} ms · {route_metrics['acceptance_rate']:.0%} accepted ({route_metrics['calls']} calls)")
+
+# Image delivery: bytes and render time per format (preview / WebP / original download)
+delivery_metrics = get_image_delivery().report()
+if delivery_metrics:
+    with st.sidebar:
+        st.markdown("### 🖼️ Image Delivery")
+        for fmt, fmt_metrics in delivery_metrics.items():
+            st.caption(f"**{fmt}**: {fmt_metrics['mean_kb']:.0f} KB avg · p50 {fmt_metrics['p50_ms']:.1f} ms · p95 {fmt_metrics['p95_ms']:.1f} ms ({fmt_metrics['deliveries']} served, {fmt_metrics['renders']} rendered)")
+
+# Memory debug view (?debug=memory, with CONTENT_SYNTH_DEBUG set): session footprints and tracemalloc growth
+if debug_enabled and st.query_params.get("debug") == "memory":
+    with st.sidebar:
+        st.markdown("---")
+        st.markdown("### 🧠 Memory")
+        memory_report = get_session_memory().report(top_n=5)
+        st.caption(f"{memory_report['sessions']} sessions · {memory_report['bytes'] / 1024:.0f} KB "
+                   f"(budget {memory_report['total_max_bytes'] / 2**20:.0f} MB, {memory_report['session_max_bytes'] / 2**20:.0f} MB per session) · "
+                   f"{memory_report['evictions']} trims · {memory_report['expired']} expired")
+        for key, size in memory_report["by_key"].items():
+            st.caption(f"**{key}**: {size / 1024:.1f} KB")
+        st.dataframe([{"session": entry["session_id"][:8], "KB": round(entry["bytes"] / 1024, 1),
+                       "idle s": round(entry["idle_s"])} for entry in memory_report["top"]],
+                     hide_index=True, use_container_width=True)
+        memory_monitor = get_memory_monitor()
+        if not memory_monitor.tracing:
+            if st.button("Start tracemalloc", use_container_width=True):
+                memory_monitor.start()
+                memory_monitor.maybe_snapshot(force=True)
+                st.rerun()
+        else:
+            if st.button("📸 Snapshot now", use_container_width=True):
+                memory_monitor.maybe_snapshot(force=True)
+            traced = memory_monitor.report(top_n=10)
+            st.caption(f"traced {traced['current'] / 2**20:.1f} MB (peak {traced['peak'] / 2**20:.1f} MB)")
+            if traced["top_growth"]:
+                st.dataframe([{"site": row["site"], "growth KB": round(row["size_diff"] / 1024, 1),
+                               "blocks": row["count_diff"]} for row in traced["top_growth"]],
+                             hide_index=True, use_container_width=True)
 
 # Footer
 st.markdown("---")
@@ -1,6 +1,13 @@
 import streamlit as st
 import anthropic
 from datetime import datetime
+from token_budget import output_token_budget
+from brand_profiles import get_brand_profile
+from insights_sql import InsightsEngine, best_posting_times
+
+# Output room beyond the caption itself: the 8 hashtags, plus a lead-in line the model may add
+HASHTAG_CHARS = 160
+LEAD_IN_CHARS = 120
 
 st.set_page_config(
     page_title="Content Synth AI",
@@ -19,6 +26,11 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_insights_engine():
+    """SQL insight queries over data/ (memoised until the files change)"""
+    return InsightsEngine()
+
 st.markdown('<h1 class="main-header">Content Synth AI</h1>', unsafe_allow_html=True)
 st.markdown("**AI-Powered Content Generation for Educational Social Media**")
 st.markdown("---")
@@ -56,6 +68,7 @@ with tab1:
             with st.spinner("Generating..."):
                 try:
                     client = anthropic.Anthropic(api_key=api_key)
+                    caption_chars = get_brand_profile().platform_specs[platform]['recommended_caption']
                     
                     prompt = f"""Generate social media content:
 Industry: {industry}
@@ -64,11 +77,12 @@ Platform: {platform}
 Tone: {brand_tone}
 Details: {campaign_details}
 
-Provide a caption and 8 hashtags."""
+Provide a caption of at most {caption_chars} characters, then a line with 8 hashtags.
+Return only the caption and the hashtags, no introduction or explanations."""
 
                     message = client.messages.create(
                         model="claude-sonnet-4-20250514",
-                        max_tokens=1024,
+                        max_tokens=output_token_budget(caption_chars + HASHTAG_CHARS + LEAD_IN_CHARS),
                         messages=[{"role": "user", "content": prompt}]
                     )
                     
@@ -80,7 +94,31 @@ Provide a caption and 8 hashtags."""
 
 with tab2:
     st.subheader("Campaign Insights")
-    st.info("Performance metrics will display here")
+    engine = get_insights_engine()
+    insight_platform = st.selectbox("Platform filter", ["All", "Instagram", "Facebook"], key="insight_platform")
+    platform_filter = None if insight_platform == "All" else insight_platform
+
+    devices = engine.run("device_mix")
+    metric_cols = st.columns(3)
+    mobile_pct = devices[0]["mobile_pct"] if devices else None
+    metric_cols[0].metric("Mobile website users", f"{mobile_pct:g}%" if mobile_pct is not None else "-")
+    top_day = engine.run("engagement_by_day", limit=1, platform=platform_filter)
+    metric_cols[1].metric("Best day", top_day[0]["day"] if top_day else "-")
+    top_format = engine.run("top_content_types", limit=1, platform=platform_filter)
+    metric_cols[2].metric("Top trending format", top_format[0]["content_type"] if top_format else "-")
+
     st.markdown("**Optimal Posting Times (from Fluidphoto data):**")
-    st.markdown("- Instagram: 12:00, 18:00, 20:00")
-    st.markdown("- Facebook: 08:00, 18:00, 13:00")
\ No newline at end of file
+    for platform_name in ["Instagram", "Facebook"]:
+        st.markdown(f"- {platform_name}: {', '.join(best_posting_times(engine, platform_name))}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Engagement by day**")
+        st.dataframe(engine.run("engagement_by_day", platform=platform_filter), hide_index=True)
+        st.markdown("**Top content types (viral trends)**")
+        st.dataframe(engine.run("top_content_types", limit=5, platform=platform_filter), hide_index=True)
+    with col2:
+        st.markdown("**Engagement by hour published**")
+        st.dataframe(engine.run("engagement_by_hour", limit=8, platform=platform_filter), hide_index=True)
+        st.markdown("**Audience mix**")
+        st.dataframe(engine.run("audience_mix", limit=6), hide_index=True)
\ No newline at end of file
@@ -0,0 +1,216 @@
+# derived_features.py - Declarative, vectorized derivation of the daily analytics columns
+# The photography CSV ships with derived columns (device mix, social totals, activity levels,
+# footprint score, 7-day averages) baked in. DERIVED_FEATURES defines each one from the raw
+# GA / Pinterest / Meta columns and derive_features() recomputes them with whole-column NumPy
+# operations - rolling averages use per-client cumulative sums, so many clients and years of
+# daily rows are one pass with no Python row loops.
+#
+#   python derived_features.py --verify
+#   python derived_features.py --input daily_exports.csv --client-column client --out derived.csv
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analytics_store import DATA_DIR, DAY_ORDER, LEVEL_ORDER, MONTH_ORDER, PHOTO_CSV
+
+DATE_FORMAT = "%d/%m/%Y"
+
+# ==========================================
+# FEATURE DEFINITIONS
+# ==========================================
+
+# column -> (operation, arguments); later features may use earlier ones
+DERIVED_FEATURES = {
+    "Day_of_Week": ("calendar", "day_name"),
+    "Is_Weekend": ("calendar", "is_weekend"),
+    "Year": ("calendar", "year"),
+    "Month": ("calendar", "month"),
+    "MonthName": ("calendar", "month_name"),
+    "Total_Device_Usage": ("sum", ["Device_desktop", "Device_mobile", "Device_tablet"]),
+    "Dominant_Device": ("argmax", {"desktop": "Device_desktop", "mobile": "Device_mobile", "tablet": "Device_tablet"}),
+    "Mobile_Percentage": ("ratio", ("Device_mobile", "Total_Device_Usage", 100.0)),
+    "Total_Social_Reach": ("sum", ["Fa_reach", "In_reach"]),
+    "Total_Social_Views": ("sum", ["Web_PageViews", "Fa_views", "In_views"]),
+    "Total_Social_Engagement": ("sum", ["Web_EngagementRate", "Acq_Engagement_rate", "PT_Engagement rate",
+                                        "PT_Engagement", "Fa_total_engagement", "In_total_engagement"]),
+    # (lower, upper] bins; zero activity has no level
+    "Website_Activity_Level": ("bins", ("Web_TotalUsers", [0, 10, 30, 100, np.inf], LEVEL_ORDER)),
+    "PT_Level": ("bins", ("PT_Engagement", [0, 5, 15, 30, np.inf], LEVEL_ORDER)),
+    "Social_to_Web_Ratio": ("ratio", ("Web_TotalUsers", "Total_Social_Views", 1.0)),
+    "Digital_Footprint_Score": ("weighted", {"Web_TotalUsers": 1.0, "Total_Social_Views": 0.1}),
+    "Web_TotalUsers_7day_avg": ("rolling_mean", ("Web_TotalUsers", 7)),
+    "Total_Social_Engagement_7day_avg": ("rolling_mean", ("Total_Social_Engagement", 7)),
+    "PT_Engagement_7day_avg": ("rolling_mean", ("PT_Engagement", 7)),
+}
+
+def _sources(operation, arguments):
+    """Columns one definition reads"""
+    if operation in ("sum", "weighted"):
+        return list(arguments)
+    if operation == "argmax":
+        return list(arguments.values())
+    if operation == "ratio":
+        return list(arguments[:2])
+    if operation in ("bins", "rolling_mean"):
+        return [arguments[0]]
+    return []
+
+def required_columns(features=DERIVED_FEATURES):
+    """Raw input columns the definitions read (beyond the date)"""
+    raw = []
+    for operation, arguments in features.values():
+        raw.extend(source for source in _sources(operation, arguments) if source not in features and source not in raw)
+    return raw
+
+# ==========================================
+# VECTORIZED OPERATIONS
+# ==========================================
+
+def _calendar(dates, part):
+    """Calendar fields; names are built from integer codes rather than formatted per row"""
+    if part == "day_name":
+        return pd.Categorical.from_codes(dates.dt.dayofweek.to_numpy(), categories=DAY_ORDER, ordered=True)
+    if part == "is_weekend":
+        return (dates.dt.dayofweek >= 5).to_numpy()
+    if part == "month_name":
+        return pd.Categorical.from_codes(dates.dt.month.to_numpy() - 1, categories=MONTH_ORDER, ordered=True)
+    return getattr(dates.dt, part).to_numpy()
+
+def _ratio(numerator, denominator, scale):
+    """numerator / denominator * scale, 0 where the denominator is 0"""
+    out = np.zeros_like(numerator)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out * scale
+
+def _argmax(values, options):
+    labels = np.array(list(options))
+    stacked = np.column_stack([np.nan_to_num(values(column)) for column in options.values()])
+    return labels[stacked.argmax(axis=1)]  # ties go to the first option
+
+def rolling_mean(values, window, groups=None):
+    """Trailing mean over up to `window` rows, restarting at each group; NaNs are skipped
+
+    Same result as groupby(...).rolling(window, min_periods=1).mean() on rows sorted by group,
+    computed from two cumulative sums instead of per-group windows.
+    """
+    valid = ~np.isnan(values)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    rows = np.arange(1, len(values) + 1)
+    start = rows - window
+    if groups is not None and len(values):
+        boundaries = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        group_start = boundaries[np.searchsorted(boundaries, rows - 1, side="right") - 1]
+        start = np.maximum(start, group_start)
+    start = np.maximum(start, 0)
+    window_counts = counts[rows] - counts[start]
+    out = np.full(len(values), np.nan)
+    np.divide(sums[rows] - sums[start], window_counts, out=out, where=window_counts > 0)
+    return out
+
+def derive_features(frame, client_column=None, date_column="Date", features=DERIVED_FEATURES):
+    """Copy of frame with every derived column recomputed (rows keep their order)
+
+    Rolling windows run over each client's rows in date order: only the rolled columns are
+    permuted into (client, date) order and back, never the whole frame.
+    """
+    dates = frame[date_column]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, format=DATE_FORMAT)
+    clients = pd.factorize(frame[client_column])[0] if client_column else None
+    order = np.lexsort((dates.to_numpy(),) if clients is None else (dates.to_numpy(), clients))
+    groups = clients[order] if clients is not None else None
+
+    missing = [column for column in required_columns(features) if column not in frame.columns]
+    if missing:
+        raise KeyError(f"Raw columns missing for derived features: {', '.join(missing)}")
+
+    derived = {}  # assigned in one step at the end - per-column inserts would re-copy the frame
+
+    def values(column):
+        source = derived[column] if column in derived else frame[column]
+        return np.asarray(source, dtype="float64") if column in derived else source.to_numpy(dtype="float64", na_value=np.nan)
+
+    for column, (operation, arguments) in features.items():
+        if operation == "calendar":
+            derived[column] = _calendar(dates, arguments)
+        elif operation == "sum":
+            derived[column] = np.nansum(np.column_stack([values(source) for source in arguments]), axis=1)
+        elif operation == "weighted":
+            derived[column] = sum(weight * np.nan_to_num(values(source)) for source, weight in arguments.items())
+        elif operation == "ratio":
+            numerator, denominator, scale = arguments
+            derived[column] = _ratio(np.nan_to_num(values(numerator)), np.nan_to_num(values(denominator)), scale)
+        elif operation == "argmax":
+            derived[column] = _argmax(values, arguments)
+        elif operation == "bins":
+            source, edges, labels = arguments
+            derived[column] = pd.cut(values(source), edges, labels=labels[:len(edges) - 1], right=True)
+        elif operation == "rolling_mean":
+            source, window = arguments
+            rolled = np.empty(len(frame))
+            rolled[order] = rolling_mean(values(source)[order], window, groups)
+            derived[column] = rolled
+        else:
+            raise ValueError(f"Unknown feature operation {operation!r} for {column}")
+
+    result = pd.concat([frame.drop(columns=[c for c in derived if c in frame.columns]),
+                        pd.DataFrame(derived, index=frame.index)], axis=1)
+    return result[[c for c in frame.columns] + [c for c in derived if c not in frame.columns]]
+
+# ==========================================
+# VERIFICATION
+# ==========================================
+
+def compare_features(expected, derived, columns=None, rtol=1e-6, atol=1e-6):
+    """{column: {"mismatches": n, "max_abs_error": x}} for derived vs shipped values (rows aligned)"""
+    report = {}
+    for column in columns or DERIVED_FEATURES:
+        left, right = expected[column], derived[column]
+        if pd.api.types.is_numeric_dtype(left) or pd.api.types.is_bool_dtype(left):
+            a, b = left.to_numpy(dtype="float64"), right.to_numpy(dtype="float64")
+            equal = np.isclose(a, b, rtol=rtol, atol=atol, equal_nan=True)
+            error = float(np.nanmax(np.abs(a - b))) if len(a) else 0.0
+        else:
+            a, b = left.astype("string"), right.astype("string")
+            equal = ((a == b) | (a.isna() & b.isna())).fillna(False).to_numpy(dtype=bool)
+            error = None
+        report[column] = {"mismatches": int((~equal).sum()), "max_abs_error": error}
+    return report
+
+def verify_shipped_csv(data_dir=DATA_DIR):
+    """Recompute the photography CSV's derived columns and compare; returns the report"""
+    shipped = pd.read_csv(Path(data_dir) / PHOTO_CSV)
+    shipped = shipped.sort_values("Date", key=lambda d: pd.to_datetime(d, format=DATE_FORMAT), kind="stable")
+    shipped = shipped.reset_index(drop=True)
+    raw = shipped.drop(columns=list(DERIVED_FEATURES))
+    return compare_features(shipped, derive_features(raw))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute derived analytics columns from raw daily exports")
+    parser.add_argument("--verify", action="store_true", help="check the definitions against the shipped CSV")
+    parser.add_argument("--input", help="CSV of raw daily rows (GA / Pinterest / Meta columns)")
+    parser.add_argument("--client-column", default=None, help="column identifying the client in multi-client input")
+    parser.add_argument("--out", default="derived_features.csv")
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        report = verify_shipped_csv()
+        for column, result in report.items():
+            error = "" if result["max_abs_error"] is None else f"  max error {result['max_abs_error']:.2e}"
+            print(f"{column:34} {'ok' if not result['mismatches'] else str(result['mismatches']) + ' mismatches'}{error}")
+        return 1 if any(result["mismatches"] for result in report.values()) else 0
+    if not args.input:
+        parser.error("--input or --verify is required")
+
+    derived = derive_features(pd.read_csv(args.input), args.client_column)
+    derived.to_csv(args.out, index=False)
+    print(f"{len(derived)} rows, {len(DERIVED_FEATURES)} derived columns -> {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
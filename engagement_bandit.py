@@ -0,0 +1,246 @@
+# engagement_bandit.py - Online hashtag / template selection learned from observed engagement
+# Every posted caption's engagement updates a Beta posterior for each hashtag it used, its content
+# template and whether it carried a mobile tag. Selection draws from those posteriors (Thompson
+# sampling, or UCB) instead of sampling uniformly. Stats are two stdlib float arrays per arm
+# family (O(1) update, O(k) draw; no numpy/pandas on the selection path) persisted per tenant
+# in .cache/bandit/<tenant>.json.
+#
+#   python engagement_bandit.py --ingest engagement.csv --tenant default
+
+import argparse
+import ast
+import heapq
+import json
+import math
+import os
+import sys
+import threading
+from array import array
+from pathlib import Path
+
+BANDIT_DIR = Path(".cache") / "bandit"
+FAMILIES = ("hashtag", "template", "mobile")
+PRIOR_ALPHA = PRIOR_BETA = 1.0  # uniform prior: with no data, Thompson top-k is a uniform sample
+RULE_PRIOR_BONUS = 1.0         # pseudo-success for the rule-based template pick
+ENGAGEMENT_COLUMNS = ("engagement", "total_engagement", "Total_Social_Engagement")
+INTERACTION_COLUMNS = ("likes", "comments", "shares", "saves")
+
+# ==========================================
+# ARM STATISTICS
+# ==========================================
+
+class ArmStats:
+    """Beta(alpha, beta) per named arm in two packed float64 arrays"""
+
+    def __init__(self, names=(), alpha=(), beta=()):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.alpha = array("d", alpha or [PRIOR_ALPHA] * len(self.names))
+        self.beta = array("d", beta or [PRIOR_BETA] * len(self.names))
+
+    def _slot(self, name):
+        slot = self.index.get(name)
+        if slot is None:
+            slot = self.index[name] = len(self.names)
+            self.names.append(name)
+            self.alpha.append(PRIOR_ALPHA)
+            self.beta.append(PRIOR_BETA)
+        return slot
+
+    def update(self, name, reward):
+        slot = self._slot(name)
+        self.alpha[slot] += reward
+        self.beta[slot] += 1.0 - reward
+
+    def params(self, name):
+        """(alpha, beta) for one arm; unseen arms get the prior"""
+        slot = self.index.get(name)
+        if slot is None:
+            return PRIOR_ALPHA, PRIOR_BETA
+        return self.alpha[slot], self.beta[slot]
+
+    def observations(self, names):
+        return sum(sum(self.params(name)) - PRIOR_ALPHA - PRIOR_BETA for name in names)
+
+    def to_dict(self):
+        return {"names": list(self.names), "alpha": self.alpha.tolist(), "beta": self.beta.tolist()}
+
+def engagement_reward(engagement, baseline):
+    """Engagement mapped to (0, 1): 0.5 at the running mean, approaching 1 for breakout posts"""
+    engagement = max(float(engagement), 0.0)
+    return engagement / (engagement + baseline) if engagement + baseline > 0 else 0.5
+
+# ==========================================
+# BANDIT
+# ==========================================
+
+class EngagementBandit:
+    """Per-tenant arm statistics for hashtags, templates and the mobile-tag decision"""
+
+    def __init__(self, path=None, strategy="thompson"):
+        self.path = Path(path) if path else None
+        self.strategy = strategy
+        self._lock = threading.Lock()
+        self.arms = {family: ArmStats() for family in FAMILIES}
+        self.engagement_sum, self.posts = 0.0, 0
+        if self.path and self.path.exists():
+            saved = json.loads(self.path.read_text(encoding="utf-8"))
+            for family, stats in saved["arms"].items():
+                self.arms[family] = ArmStats(stats["names"], stats["alpha"], stats["beta"])
+            self.engagement_sum, self.posts = saved["engagement_sum"], saved["posts"]
+
+    @classmethod
+    def for_tenant(cls, tenant_id, root=BANDIT_DIR, strategy="thompson"):
+        return cls(Path(root) / f"{tenant_id}.json", strategy)
+
+    def save(self):
+        """Atomic write of every array (no-op for an in-memory bandit)"""
+        if self.path is None:
+            return
+        with self._lock:
+            state = {"engagement_sum": self.engagement_sum, "posts": self.posts,
+                     "arms": {family: stats.to_dict() for family, stats in self.arms.items()}}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    # ------------------------------------------
+    # Updates
+    # ------------------------------------------
+
+    def record(self, engagement, hashtags=(), template=None, mobile=None):
+        """Append one observed post; returns the reward credited to each of its arms"""
+        with self._lock:
+            baseline = self.engagement_sum / self.posts if self.posts else float(engagement)
+            reward = engagement_reward(engagement, baseline)
+            self.engagement_sum += max(float(engagement), 0.0)
+            self.posts += 1
+            for tag in dict.fromkeys(hashtags):
+                self.arms["hashtag"].update(tag, reward)
+            if template:
+                self.arms["template"].update(template, reward)
+            if mobile is not None:
+                self.arms["mobile"].update("include" if mobile else "omit", reward)
+        return reward
+
+    def ingest_frame(self, frame, profile=None):
+        """Record every row of an engagement export (hashtags + engagement, optional template); returns rows used"""
+        import pandas as pd
+
+        engagement = post_engagement(frame)
+        if engagement is None or "hashtags" not in frame:
+            raise ValueError("Engagement data needs a hashtags column and an engagement (or likes/comments/shares) column")
+        mobile_tags = set(profile.hashtag_tags.get("mobile_optimized", ())) if profile else None
+        templates = frame["template"] if "template" in frame else pd.Series(None, index=frame.index)
+        used = 0
+        for tags_cell, template, value in zip(frame["hashtags"], templates, engagement):
+            if pd.isna(value):
+                continue
+            hashtags = parse_hashtags(tags_cell)
+            mobile = bool(mobile_tags.intersection(hashtags)) if mobile_tags is not None else None
+            self.record(value, hashtags, template if isinstance(template, str) and template else None, mobile)
+            used += 1
+        self.save()
+        return used
+
+    # ------------------------------------------
+    # Selection
+    # ------------------------------------------
+
+    def _scores(self, family, names, rng, preferred=None):
+        """One score per arm: a posterior draw (Thompson) or an upper confidence bound (UCB)
+
+        Pools are a handful of tags, so plain random.betavariate beats numpy's per-call overhead.
+        """
+        stats = self.arms[family]
+        scores = []
+        with self._lock:
+            for name in names:
+                alpha, beta = stats.params(name)
+                if name == preferred:
+                    alpha += RULE_PRIOR_BONUS
+                if self.strategy == "ucb":
+                    n = alpha + beta
+                    scores.append(alpha / n + math.sqrt(2 * math.log(self.posts + 2) / n) + rng.random() * 1e-9)
+                else:
+                    scores.append(rng.betavariate(alpha, beta))
+        return scores
+
+    def top_k(self, family, pool, k, rng):
+        """k arms from pool with the highest scores (rng is a random.Random)"""
+        pool = list(pool)
+        scores = self._scores(family, pool, rng)
+        return [pool[i] for i in heapq.nlargest(k, range(len(pool)), key=scores.__getitem__)]
+
+    def choose(self, family, options, rng, preferred=None):
+        """One arm from options; preferred gets RULE_PRIOR_BONUS pseudo-successes"""
+        options = list(options)
+        scores = self._scores(family, options, rng, preferred)
+        return options[max(range(len(options)), key=scores.__getitem__)]
+
+    def has_data(self, family, names):
+        with self._lock:
+            return self.arms[family].observations(names) > 0
+
+    def report(self, family, top_n=10):
+        """Arms ranked by posterior mean reward: [{"arm", "posts", "mean_reward"}, ...]"""
+        with self._lock:
+            stats = self.arms[family]
+            rows = [(stats.alpha[i] / (stats.alpha[i] + stats.beta[i]), i) for i in range(len(stats.names))]
+            return [{"arm": stats.names[i], "posts": round(stats.alpha[i] + stats.beta[i] - PRIOR_ALPHA - PRIOR_BETA, 1),
+                     "mean_reward": round(mean, 3)} for mean, i in heapq.nlargest(top_n, rows)]
+
+# ==========================================
+# ENGAGEMENT EXPORTS
+# ==========================================
+
+def parse_hashtags(cell):
+    """Hashtags from a CSV cell: "['#a', '#b']" (history export) or "#a #b" / "#a, #b" """
+    if isinstance(cell, (list, tuple)):
+        return list(cell)
+    if not isinstance(cell, str) or not cell.strip():
+        return []
+    cell = cell.strip()
+    if cell.startswith("["):
+        try:
+            return [str(tag) for tag in ast.literal_eval(cell)]
+        except (ValueError, SyntaxError):
+            pass
+    return [tag for tag in cell.replace(",", " ").split() if tag.startswith("#")]
+
+def post_engagement(frame):
+    """Engagement per row: an engagement column, else the sum of likes/comments/shares/saves"""
+    import pandas as pd
+
+    columns = {column.lower(): column for column in frame.columns}
+    for name in ENGAGEMENT_COLUMNS:
+        if name.lower() in columns:
+            return pd.to_numeric(frame[columns[name.lower()]], errors="coerce")
+    interactions = [columns[name] for name in INTERACTION_COLUMNS if name in columns]
+    if interactions:
+        return frame[interactions].apply(pd.to_numeric, errors="coerce").sum(axis=1, min_count=1)
+    return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update hashtag/template statistics from observed engagement")
+    parser.add_argument("--ingest", nargs="+", required=True, help="CSV files with hashtags + engagement columns")
+    parser.add_argument("--tenant", default="default")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+
+    from brand_profiles import get_brand_profile
+
+    profile = get_brand_profile(args.tenant)
+    bandit = EngagementBandit.for_tenant(args.tenant)
+    for csv_path in args.ingest:
+        print(f"{csv_path}: {bandit.ingest_frame(pd.read_csv(csv_path), profile)} posts recorded")
+    for family in ("template", "hashtag"):
+        print(f"\nTop {family}s:")
+        for row in bandit.report(family, top_n=8):
+            print(f"  {row['arm']:40} {row['mean_reward']:.3f}  ({row['posts']:.0f} posts)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# fallback_captions.py - Local template captions for when the live model is unavailable
+# Built only from the brand profile (content template structure + persona campaigns, benefits and
+# CTA style), so they are instant, free, on-brand and deterministic: the same brief always
+# yields the same captions, which keeps them cacheable and reviewable while Claude is down.
+
+import zlib
+
+from caption_repair import grapheme_length, repair_caption
+
+HOOKS = {
+    "Professional": "{course} is now open.",
+    "Casual": "{course} is happening!",
+    "Friendly": "{course} is here and we'd love you to join us!",
+}
+
+# Hook/body/CTA shapes keyed by words in a content template's structure descriptions
+HOOK_SHAPES = [
+    ("question", "Ready for {course}?"),
+    ("weekend", "This weekend: {course}."),
+    ("music", "{slogan} {course} puts music and arts at the centre."),
+    ("benefit", "{benefit} starts with {course}."),
+]
+BODY_SHAPES = [
+    ("tip", "Quick tip: {benefits} grow one small step at a time."),
+    ("how", "Learning sticks when it's built on {benefits}."),
+    ("", "Built around {benefits}."),
+]
+CTA_SHAPES = [
+    ("save, share, tag", "Save this and tag a friend!"),
+    ("question", "Which part are you most excited for?"),
+]
+
+def _phrases(text):
+    return [phrase.strip() for phrase in text.split(",") if phrase.strip()]
+
+def _shape(shapes, description, default=None):
+    description = description.lower()
+    return next((shape for keyword, shape in shapes if keyword in description), default)
+
+def _sentence(text):
+    text = text.strip()
+    return text if text[-1:] in ".!?" else f"{text}!"
+
+def brief_seed(*parts):
+    """Stable seed for a brief (crc32, unlike hash() it survives restarts)"""
+    return zlib.crc32("|".join(str(part) for part in parts).encode("utf-8"))
+
+def template_captions(persona_info, campaign_type, course_title, brand_tone, char_limit, template_info=None,
+                      n_variants=3, seed=0):
+    """n_variants deterministic hook + body + CTA captions, each fitted to char_limit
+
+    template_info is a profile content template; its structure descriptions pick the hook, body
+    and CTA shapes. Variants rotate through the persona's campaign slogans and CTA phrases.
+    """
+    structure = (template_info or {}).get("structure", {})
+    hook_description = structure.get("hook", "")
+    body_description = " ".join(value for key, value in structure.items() if key not in ("hook", "cta"))
+    course = course_title.strip() if course_title else campaign_type
+    slogans = persona_info.get("campaigns") or [campaign_type]
+    benefits = _phrases(persona_info["key_benefits"])
+    ctas = _phrases(persona_info["cta_style"])
+
+    captions = []
+    for variant in range(n_variants):
+        pick = seed + variant
+        slogan, cta = slogans[pick % len(slogans)], ctas[pick % len(ctas)]
+        hook = _shape(HOOK_SHAPES, hook_description, HOOKS.get(brand_tone, HOOKS["Friendly"]))
+        hook = hook.format(course=course, slogan=_sentence(slogan), benefit=benefits[pick % len(benefits)].capitalize())
+        body = _shape(BODY_SHAPES, body_description).format(benefits=", ".join(benefits).lower())
+        closing = _shape(CTA_SHAPES, structure.get("cta", ""), _sentence(cta))
+        if variant % 2 and slogan not in hook:
+            body = f"{_sentence(slogan)} {body}"
+
+        caption = f"{hook} {body} {closing}"
+        if grapheme_length(caption) > char_limit:
+            caption = repair_caption(caption, char_limit, [closing.rstrip("!?."), cta])[0]
+        if caption not in captions:
+            captions.append(caption)
+    return captions
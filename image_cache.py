@@ -0,0 +1,296 @@
+# image_cache.py - Content-addressed, size-bounded image store
+# Generated images are keyed by a hash of (prompt, dalle_size, quality, model) so an identical
+# request is served from disk instead of a 10-20 s (paid) DALL-E call.
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+IMAGE_CACHE_DIR = Path(".cache") / "images"
+IMAGE_CACHE_MAX_BYTES = 500 * 1024 * 1024  # 500 MB on disk
+THUMBNAIL_SIZE = (256, 256)
+
+def make_image_key(prompt, dalle_size, quality, model):
+    """Stable content address for one image request"""
+    payload = json.dumps([prompt.strip(), dalle_size, quality, model], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def make_thumbnail(image_bytes, size=THUMBNAIL_SIZE):
+    """Small JPEG preview of an encoded image"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image.draft("RGB", size)  # cheap reduced decode where the codec supports it
+        image = image.convert("RGB")
+        image.thumbnail(size)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+class CachedImage:
+    """Handle to a cached image on disk - nothing is read or decoded until asked for"""
+
+    def __init__(self, key, directory):
+        self.key = key
+        self.path = directory / f"{key}.png"
+        self.thumbnail_path = directory / f"{key}.thumb.jpg"
+        self.metadata_path = directory / f"{key}.json"
+        self._metadata = None
+
+    @property
+    def metadata(self):
+        if self._metadata is None:
+            self._metadata = json.loads(self.metadata_path.read_text(encoding="utf-8"))
+        return self._metadata
+
+    def read_bytes(self):
+        return self.path.read_bytes()
+
+    def rendition_path(self, name):
+        """Derived file stored with the image, e.g. rendition_path("1080x1350.webp")"""
+        return self.path.with_name(f"{self.key}.{name}")
+
+    def open(self):
+        """Return a lazily-decoded PIL image (pixels load on first use)"""
+        from PIL import Image
+
+        return Image.open(self.path)
+
+class ImageCache:
+    """Thread-safe on-disk LRU of generated images with thumbnails and metadata"""
+
+    def __init__(self, root=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> bytes on disk, least recently used first
+        self._total_bytes = 0
+        self._load_index()
+
+    def _directory(self, key):
+        return self.root / key[:2]
+
+    def _entry_files(self, key):
+        handle = CachedImage(key, self._directory(key))
+        renditions = sorted(handle.path.parent.glob(f"{key}.*.webp"))
+        return [handle.path, handle.thumbnail_path, handle.metadata_path, *renditions]
+
+    def _load_index(self):
+        """Rebuild the LRU order from file modification times (touched on every hit)"""
+        if not self.root.exists():
+            return
+        found = []
+        for metadata_path in self.root.glob("*/*.json"):
+            key = metadata_path.stem
+            files = [f for f in self._entry_files(key) if f.exists()]
+            if len(files) < 2:
+                continue
+            stats = [f.stat() for f in files]
+            found.append((max(s.st_mtime for s in stats), key, sum(s.st_size for s in stats)))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def _adopt(self, key):
+        """Index an entry another process (app or API service) wrote to the shared directory"""
+        files = [f for f in self._entry_files(key) if f.exists()]
+        if len(files) < 2:
+            return False
+        size = sum(f.stat().st_size for f in files)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = size
+                self._total_bytes += size
+        return True
+
+    def get(self, key):
+        """Return a CachedImage for key, or None on a miss"""
+        with self._lock:
+            known = key in self._entries
+        if not known and not self._adopt(key):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        handle = CachedImage(key, self._directory(key))
+        try:
+            os.utime(handle.metadata_path)
+        except OSError:
+            pass
+        return handle
+
+    def peek(self, key):
+        """Handle for key without counting a lookup (used when re-rendering), or None if evicted"""
+        with self._lock:
+            known = key in self._entries
+        if not known and not self._adopt(key):
+            return None
+        return CachedImage(key, self._directory(key))
+
+    def keys(self):
+        """Cached keys, least recently used first"""
+        with self._lock:
+            return list(self._entries)
+
+    def put(self, key, image_bytes, metadata):
+        """Store encoded image bytes plus thumbnail and metadata; evicts LRU entries over budget"""
+        directory = self._directory(key)
+        directory.mkdir(parents=True, exist_ok=True)
+        handle = CachedImage(key, directory)
+
+        thumbnail = make_thumbnail(image_bytes)
+        record = {**metadata, "key": key, "bytes": len(image_bytes), "created": time.time()}
+        for path, data in (
+            (handle.path, image_bytes),
+            (handle.thumbnail_path, thumbnail),
+            (handle.metadata_path, json.dumps(record, ensure_ascii=False).encode("utf-8")),
+        ):
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)  # atomic: readers never see half-written files
+
+        size = len(image_bytes) + len(thumbnail) + handle.metadata_path.stat().st_size
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+        return handle
+
+    def put_rendition(self, handle, name, data):
+        """Store a derived file next to a cached image; it counts towards the budget and is evicted with it"""
+        path = handle.rendition_path(name)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if handle.key in self._entries:
+                self._entries[handle.key] += len(data)
+                self._total_bytes += len(data)
+                self._evict()
+        return path
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            for path in self._entry_files(key):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+# ==========================================
+# IN-MEMORY HOT TIER (encoded bytes, never decoded pixels)
+# ==========================================
+
+IMAGE_POOL_MAX_BYTES = 64 * 1024 * 1024          # all sessions together
+IMAGE_POOL_SESSION_MAX_BYTES = 16 * 1024 * 1024  # any single session
+
+class ImageMemoryPool:
+    """Encoded image bytes shared across sessions, bounded globally and per session.
+
+    Sessions hold only cache keys; bytes are read from the ImageCache on demand and
+    dropped (LRU) whenever a session or the whole process goes over its budget.
+    """
+
+    def __init__(self, max_bytes=IMAGE_POOL_MAX_BYTES, session_max_bytes=IMAGE_POOL_SESSION_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.session_max_bytes = session_max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # image key -> encoded bytes, least recently used first
+        self._owners = {}              # image key -> set of session ids
+        self._sessions = {}            # session id -> OrderedDict(image key -> size)
+        self._total_bytes = 0
+
+    def get_bytes(self, session_id, handle, variant=None, load=None):
+        """Encoded bytes for a cached image, pinned to session_id within its budget
+
+        variant/load keep a derived encoding (e.g. a WebP rendition) hot instead of the original.
+        """
+        key = handle.key if variant is None else f"{handle.key}/{variant}"
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self._pin(session_id, key, len(data))
+                return data
+
+        data = load() if load is not None else handle.read_bytes()
+        if len(data) > self.session_max_bytes:
+            return data  # too big to keep hot; serve straight from disk
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = data
+                self._total_bytes += len(data)
+            self._pin(session_id, key, len(data))
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+        return data
+
+    def _pin(self, session_id, key, size):
+        session = self._sessions.setdefault(session_id, OrderedDict())
+        session[key] = size
+        session.move_to_end(key)
+        self._owners.setdefault(key, set()).add(session_id)
+        while sum(session.values()) > self.session_max_bytes and len(session) > 1:
+            self._unpin(session_id, next(iter(session)))
+
+    def _unpin(self, session_id, key):
+        self._sessions.get(session_id, {}).pop(key, None)
+        owners = self._owners.get(key, set())
+        owners.discard(session_id)
+        if not owners:
+            self._drop(key)
+
+    def _drop(self, key):
+        data = self._entries.pop(key, None)
+        if data is not None:
+            self._total_bytes -= len(data)
+            self.evictions += 1
+        for session_id in self._owners.pop(key, set()):
+            self._sessions.get(session_id, {}).pop(key, None)
+
+    def release_session(self, session_id):
+        """Forget everything a session pinned (e.g. on Regenerate or session end)"""
+        with self._lock:
+            for key in list(self._sessions.pop(session_id, {})):
+                owners = self._owners.get(key, set())
+                owners.discard(session_id)
+                if not owners:
+                    self._drop(key)
+
+    def session_bytes(self, session_id):
+        with self._lock:
+            return sum(self._sessions.get(session_id, {}).values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "sessions": len(self._sessions),
+                "evictions": self.evictions,
+            }
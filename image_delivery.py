@@ -0,0 +1,136 @@
+# image_delivery.py - Progressive image delivery: instant preview, platform-sized WebP, original on download
+# A generated image is shown in three steps instead of pushing the full-resolution PNG to the
+# browser: the cached 256 px JPEG thumbnail goes out immediately, then a WebP rendition sized
+# for the post's platform replaces it (rendered once, stored with the image in the ImageCache),
+# and the original PNG is read only when the user downloads it. Bytes and render time are
+# recorded per format so the saving is visible.
+#
+#   python image_delivery.py --cache-dir .cache/images     sizes and timings for every cached image
+
+import argparse
+import base64
+import io
+import sys
+import threading
+import time
+
+from image_cache import IMAGE_CACHE_DIR, ImageCache
+from request_executor import percentile
+
+WEBP_QUALITY = 80
+WEBP_METHOD = 4       # 0 (fast) .. 6 (smallest); 4 is libwebp's default trade-off
+METRICS_WINDOW = 200  # recent deliveries kept per format
+FORMATS = ("preview", "webp", "original")
+
+def fit_size(size, source_size):
+    """Platform size ("1080x1350") scaled down so neither side exceeds the source image"""
+    width, height = map(int, size.split("x"))
+    scale = min(1.0, source_size[0] / width, source_size[1] / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def render_webp(handle, size=None, quality=WEBP_QUALITY):
+    """WebP of a cached image, cropped to a platform size's aspect ratio when given"""
+    from PIL import Image, ImageOps
+
+    with handle.open() as image:
+        if size:
+            target = fit_size(size, image.size)
+            image.draft("RGB", target)  # reduced decode for JPEG sources
+            rendition = ImageOps.fit(image.convert("RGB"), target, Image.Resampling.LANCZOS)
+        else:
+            rendition = image.convert("RGB")
+    buffer = io.BytesIO()
+    rendition.save(buffer, format="WEBP", quality=quality, method=WEBP_METHOD)
+    return buffer.getvalue()
+
+def webp_rendition_name(size=None, quality=WEBP_QUALITY):
+    """Name of a stored WebP rendition (see ImageCache.rendition_path)"""
+    return f"{size or 'full'}.q{quality}.webp"
+
+def data_uri(data, mimetype):
+    """st.image re-encodes anything but JPEG/PNG/GIF bytes; a data URI reaches the browser as-is"""
+    return f"data:{mimetype};base64,{base64.b64encode(data).decode('ascii')}"
+
+class ImageDelivery:
+    """Preview / WebP / original bytes for cached images, with per-format size and render-time stats"""
+
+    def __init__(self, cache, quality=WEBP_QUALITY):
+        self.cache = cache
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._samples = {fmt: [] for fmt in FORMATS}  # format -> [(bytes, seconds, rendered)]
+
+    def _record(self, fmt, data, started, rendered=False):
+        with self._lock:
+            samples = self._samples[fmt]
+            samples.append((len(data), time.perf_counter() - started, rendered))
+            del samples[:-METRICS_WINDOW]
+        return data
+
+    def _name(self, size):
+        return webp_rendition_name(size, self.quality)
+
+    def has_webp(self, handle, size=None):
+        return handle.rendition_path(self._name(size)).exists()
+
+    def preview(self, handle):
+        """Small JPEG shown straight away (the thumbnail written when the image was cached)"""
+        started = time.perf_counter()
+        return self._record("preview", handle.thumbnail_path.read_bytes(), started)
+
+    def webp(self, handle, size=None):
+        """Platform-sized WebP, rendered on first request and stored with the image"""
+        started = time.perf_counter()
+        path = handle.rendition_path(self._name(size))
+        try:
+            return self._record("webp", path.read_bytes(), started)
+        except FileNotFoundError:
+            data = render_webp(handle, size, self.quality)
+            self.cache.put_rendition(handle, self._name(size), data)
+            return self._record("webp", data, started, rendered=True)
+
+    def original(self, handle):
+        """Full-resolution original - only for downloads"""
+        started = time.perf_counter()
+        return self._record("original", handle.read_bytes(), started)
+
+    def report(self):
+        """{format: deliveries, mean KB, p50/p95 ms, renders} for formats delivered so far"""
+        with self._lock:
+            samples = {fmt: list(values) for fmt, values in self._samples.items() if values}
+        report = {}
+        for fmt, values in samples.items():
+            sizes, seconds = [size for size, _, _ in values], [elapsed for _, elapsed, _ in values]
+            report[fmt] = {
+                "deliveries": len(values),
+                "mean_kb": round(sum(sizes) / len(sizes) / 1024, 1),
+                "p50_ms": round(percentile(seconds, 50) * 1000, 2),
+                "p95_ms": round(percentile(seconds, 95) * 1000, 2),
+                "renders": sum(1 for *_, rendered in values if rendered),
+            }
+        return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Delivery sizes and render times for cached images")
+    parser.add_argument("--cache-dir", default=str(IMAGE_CACHE_DIR))
+    parser.add_argument("--size", default="1080x1350", help="platform size for the WebP rendition")
+    args = parser.parse_args()
+
+    cache = ImageCache(root=args.cache_dir)
+    delivery = ImageDelivery(cache)
+    for key in cache.keys():
+        handle = cache.peek(key)
+        if handle is None:
+            continue
+        delivery.preview(handle)
+        delivery.webp(handle, args.size)
+        delivery.webp(handle, args.size)  # second request is served from disk
+        delivery.original(handle)
+
+    print(f"{'format':10}{'deliveries':>12}{'mean KB':>10}{'p50 ms':>9}{'p95 ms':>9}{'renders':>9}")
+    for fmt, row in delivery.report().items():
+        print(f"{fmt:10}{row['deliveries']:>12}{row['mean_kb']:>10.1f}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['renders']:>9}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# image_generation.py - DALL-E 3 call path shared by the Streamlit app and the HTTP API
+# Requests are content-addressed in the ImageCache first; a miss makes one (never hedged) paid
+# generation under the RequestExecutor's deadline, fetches the bytes (inline base64 or a hedged
+# CDN download) and stores them with a thumbnail, so every entry point reuses every image.
+
+import base64
+
+from image_cache import make_image_key
+
+DALLE_MODEL = "dall-e-3"
+DALLE_QUALITY = "standard"  # Can be "standard" or "hd"
+
+def dalle_size(width, height):
+    """DALL-E 3 only supports these specific sizes - map requested dimensions to the closest one"""
+    if width == height:
+        return "1024x1024"
+    if height > width:
+        return "1024x1792"  # Portrait
+    return "1792x1024"  # Landscape
+
+def create_image(client, prompt, size, image_cache, executor, index=None, model=DALLE_MODEL, quality=DALLE_QUALITY):
+    """CachedImage for prompt at a DALL-E size: a cache hit, else one generation stored in the cache"""
+    cache_key = make_image_key(prompt, size, quality, model)
+    cached = image_cache.get(cache_key)
+    if cached:
+        return cached
+
+    # Paid call: deadline only, never hedged
+    response = executor.run(
+        "image_generate",
+        lambda timeout: client.images.generate(
+            model=model,
+            prompt=prompt,
+            size=size,
+            quality=quality,
+            n=1,
+            timeout=timeout
+        ),
+        hedge=False
+    )
+
+    if getattr(response.data[0], "b64_json", None):
+        # Inline answer (response_format="b64_json", or the local mock): nothing to download
+        image_bytes = base64.b64decode(response.data[0].b64_json)
+    else:
+        # Download the image (cheap to duplicate, so a slow CDN fetch is hedged)
+        import requests
+
+        image_url = response.data[0].url
+
+        def download(timeout):
+            # An expired URL or CDN error page must not be cached as the image
+            reply = requests.get(image_url, timeout=timeout)
+            reply.raise_for_status()
+            return reply
+
+        image_bytes = executor.run("image_download", download).content
+    image = image_cache.put(cache_key, image_bytes, {
+        "prompt": prompt,
+        "dalle_size": size,
+        "quality": quality,
+        "model": model
+    })
+    if index is not None:
+        try:
+            index.add(image)
+        except Exception:
+            pass  # the image is paid for and cached; the next index rebuild() hashes it
+    return image
@@ -0,0 +1,303 @@
+# image_similarity.py - Perceptual-hash and prompt-similarity index over the image cache
+# Prompts that differ only in style or keywords often come back from DALL-E as near-identical
+# images. Every cached image gets a 64-bit pHash (2-D DCT of a 32x32 greyscale reduction) and
+# dHash (horizontal gradients), kept in a BK-tree so near-duplicates are found by Hamming
+# distance, and its prompt gets a feature-hashed embedding in a random-hyperplane LSH index so
+# close existing images can be offered before paying for a new generation.
+#
+#   python image_similarity.py --report            dedup report for the image library
+#   python image_similarity.py --similar "prompt"  closest cached images for a prompt
+
+import argparse
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from image_cache import IMAGE_CACHE_DIR, ImageCache
+
+HASH_SIZE = 8                  # 8x8 bits -> 64-bit hashes
+PHASH_SCALE = 4                # pHash DCT input is HASH_SIZE * PHASH_SCALE pixels square
+DUPLICATE_DISTANCE = 10        # pHash bits; at or below this two images look the same
+EMBEDDING_DIMS = 512
+LSH_TABLES = 10                # more tables -> higher recall (~97% at cosine 0.9)
+LSH_BITS = 8                   # hyperplanes per table; more bits -> fewer, closer candidates
+PROMPT_MATCH_SIMILARITY = 0.9  # cosine similarity at which a cached image is offered
+INDEX_FILE = "similarity.json"
+
+# ==========================================
+# PERCEPTUAL HASHES
+# ==========================================
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis, so dct(X) = D @ X @ D.T in two matrix products"""
+    k = np.arange(n)[:, None]
+    matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+_DCT = _dct_matrix(HASH_SIZE * PHASH_SCALE)
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+def image_hashes(image_bytes):
+    """(phash, dhash) of an encoded image as 64-bit ints (one decode, both hashes)"""
+    from PIL import Image
+
+    side = HASH_SIZE * PHASH_SCALE
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image.draft("L", (side * 4, side * 4))  # cheap reduced decode for JPEGs
+        grey = image.convert("L")
+    pixels = np.asarray(grey.resize((side, side), Image.Resampling.LANCZOS), dtype=np.float64)
+    gradient = np.asarray(grey.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS), dtype=np.float64)
+
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE]
+    phash = _bits_to_int(low > np.median(low.ravel()[1:]))  # DC term excluded from the median
+    dhash = _bits_to_int(gradient[:, 1:] > gradient[:, :-1])
+    return phash, dhash
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+class BKTree:
+    """Metric tree over 64-bit hashes; search(h, d) visits only subtrees that can be within d"""
+
+    def __init__(self):
+        self._root = None  # [hash, keys, {distance: child}]
+        self.size = 0
+
+    def add(self, value, key):
+        self.size += 1
+        if self._root is None:
+            self._root = [value, [key], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(key)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [key], {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """[(distance, key)] for every stored hash within max_distance, closest first"""
+        found, stack = [], [self._root] if self._root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                found.extend((distance, key) for key in node[1])
+            stack.extend(child for edge, child in node[2].items()
+                         if distance - max_distance <= edge <= distance + max_distance)
+        return sorted(found)
+
+# ==========================================
+# PROMPT EMBEDDINGS
+# ==========================================
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def prompt_words(prompt):
+    return _TOKEN.findall(prompt.lower())
+
+def prompt_embedding(prompt, dims=EMBEDDING_DIMS):
+    """L2-normalised feature-hashed bag of words and word pairs (stable across processes)"""
+    words = prompt_words(prompt)
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector = np.zeros(dims, dtype=np.float32)
+    if not features:
+        return vector
+    hashes = np.array([zlib.crc32(feature.encode("utf-8")) for feature in features], dtype=np.uint64)
+    signs = np.where(hashes & np.uint64(1 << 31), -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, (hashes % np.uint64(dims)).astype(np.intp), signs)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class PromptLSH:
+    """Random-hyperplane LSH: prompts with a high cosine similarity share buckets in some table"""
+
+    def __init__(self, dims=EMBEDDING_DIMS, tables=LSH_TABLES, bits=LSH_BITS, seed=0):
+        self._planes = np.random.default_rng(seed).standard_normal((tables, bits, dims)).astype(np.float32)
+        self._weights = 1 << np.arange(bits)
+        self._buckets = [{} for _ in range(tables)]
+        self._vectors = {}
+
+    def _signatures(self, vector):
+        return ((self._planes @ vector) > 0) @ self._weights
+
+    def add(self, key, vector):
+        self._vectors[key] = vector
+        for table, signature in zip(self._buckets, self._signatures(vector)):
+            table.setdefault(int(signature), []).append(key)
+
+    def query(self, vector, min_similarity, top_k):
+        """[(cosine, key)] among the bucket candidates, best first"""
+        candidates = {key for table, signature in zip(self._buckets, self._signatures(vector))
+                      for key in table.get(int(signature), ())}
+        if not candidates:
+            return []
+        keys = list(candidates)
+        scores = np.stack([self._vectors[key] for key in keys]) @ vector
+        ranked = sorted(zip(scores.tolist(), keys), reverse=True)
+        return [(score, key) for score, key in ranked if score >= min_similarity][:top_k]
+
+# ==========================================
+# INDEX OVER THE IMAGE CACHE
+# ==========================================
+
+class ImageSimilarityIndex:
+    """pHash/dHash BK-tree and prompt LSH over every image in an ImageCache
+
+    Hashes are taken from the cached 256 px thumbnail (~1 ms, same result as the full image at
+    8x8 bits) and persisted next to the cache; prompts are read from each image's metadata. Evicted images drop out of results; rebuild() compacts.
+    """
+
+    def __init__(self, cache, path=None):
+        self.cache = cache
+        self.path = Path(path) if path else cache.root / INDEX_FILE
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.rebuild()
+
+    def rebuild(self):
+        """Load stored hashes, hash any cached image that has none, and rebuild both indexes"""
+        stored = json.loads(self.path.read_text(encoding="utf-8")) if self.path.exists() else {}
+        with self._lock:
+            self._records = {}
+            self._tree = BKTree()
+            self._lsh = PromptLSH()
+        for key in self.cache.keys():
+            handle = self.cache.peek(key)
+            if handle is None:
+                continue
+            try:
+                record = stored.get(key) or self._hash_record(handle)
+                self._index(key, record, handle.metadata)
+            except (OSError, ValueError):
+                continue  # evicted or unreadable while scanning
+        self._save()
+
+    @staticmethod
+    def _hash_record(handle):
+        phash, dhash = image_hashes(handle.thumbnail_path.read_bytes())
+        return {"phash": f"{phash:016x}", "dhash": f"{dhash:016x}"}
+
+    def _index(self, key, record, metadata):
+        record = {**record, "prompt": metadata.get("prompt", ""), "dalle_size": metadata.get("dalle_size"),
+                  "bytes": metadata.get("bytes", 0)}
+        with self._lock:
+            self._records[key] = record
+            self._tree.add(int(record["phash"], 16), key)
+            self._lsh.add(key, prompt_embedding(record["prompt"]))
+
+    def _save(self):
+        """Atomic write; a temp file per call keeps concurrent savers (threads or worker processes) apart"""
+        with self._save_lock:
+            with self._lock:
+                payload = {key: {"phash": record["phash"], "dhash": record["dhash"]} for key, record in self._records.items()}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.path.parent, prefix=self.path.stem,
+                                             suffix=".tmp", delete=False) as tmp_file:
+                tmp_file.write(json.dumps(payload))
+            try:
+                os.replace(tmp_file.name, self.path)
+            except OSError:
+                os.unlink(tmp_file.name)
+                raise
+
+    def add(self, handle):
+        """Index a freshly cached image (CachedImage handle)"""
+        self._index(handle.key, self._hash_record(handle), handle.metadata)
+        self._save()
+
+    def _live(self, key):
+        return self.cache.peek(key) is not None
+
+    def similar_prompts(self, prompt, dalle_size=None, min_similarity=PROMPT_MATCH_SIMILARITY, top_k=3):
+        """Cached images whose prompt is close to prompt (same DALL-E size when given), best first
+
+        Generated prompts share a long template, so style, keyword, course and campaign changes
+        all score above the threshold; differs_in lists the words that set each match apart.
+        """
+        with self._lock:
+            matches = self._lsh.query(prompt_embedding(prompt), min_similarity, top_k * 4)
+            records = dict(self._records)
+        words = set(prompt_words(prompt))
+        return [{"key": key, "similarity": round(score, 3), "prompt": records[key]["prompt"],
+                 "differs_in": sorted(set(prompt_words(records[key]["prompt"])) ^ words)}
+                for score, key in matches
+                if (dalle_size is None or records[key]["dalle_size"] == dalle_size) and self._live(key)][:top_k]
+
+    def near_duplicates(self, key, max_distance=DUPLICATE_DISTANCE):
+        """[(phash distance, key)] of other cached images that look like key"""
+        with self._lock:
+            record = self._records.get(key)
+            found = self._tree.search(int(record["phash"], 16), max_distance) if record else []
+        return [(distance, other) for distance, other in found if other != key and self._live(other)]
+
+    def dedup_report(self, max_distance=DUPLICATE_DISTANCE):
+        """Groups of near-identical images (pHash within max_distance, dHash as tie-break info)
+
+        Each group keeps its first image; the rest are reported as reclaimable duplicates.
+        """
+        with self._lock:
+            records = {key: record for key, record in self._records.items()}
+        grouped, groups = set(), []
+        for key in sorted(records):
+            if key in grouped or not self._live(key):
+                continue
+            members = [key] + [other for _, other in self.near_duplicates(key, max_distance) if other not in grouped]
+            if len(members) < 2:
+                continue
+            grouped.update(members)
+            keep = records[key]
+            groups.append({
+                "keep": key,
+                "prompt": keep["prompt"],
+                "duplicates": [{
+                    "key": other,
+                    "phash_distance": hamming(int(keep["phash"], 16), int(records[other]["phash"], 16)),
+                    "dhash_distance": hamming(int(keep["dhash"], 16), int(records[other]["dhash"], 16)),
+                    "prompt": records[other]["prompt"],
+                } for other in members[1:]],
+                "reclaimable_bytes": sum(records[other]["bytes"] for other in members[1:]),
+            })
+        return {
+            "images": len(records),
+            "groups": groups,
+            "duplicates": sum(len(group["duplicates"]) for group in groups),
+            "reclaimable_bytes": sum(group["reclaimable_bytes"] for group in groups),
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate report and prompt lookup for the image cache")
+    parser.add_argument("--cache-dir", default=str(IMAGE_CACHE_DIR))
+    parser.add_argument("--report", action="store_true", help="group near-identical images")
+    parser.add_argument("--max-distance", type=int, default=DUPLICATE_DISTANCE, help="pHash bits")
+    parser.add_argument("--similar", help="list cached images with a prompt close to this one")
+    args = parser.parse_args()
+
+    index = ImageSimilarityIndex(ImageCache(root=args.cache_dir))
+    if args.similar:
+        print(json.dumps(index.similar_prompts(args.similar, top_k=10), indent=2, ensure_ascii=False))
+    if args.report or not args.similar:
+        report = index.dedup_report(args.max_distance)
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"{report['duplicates']} near-duplicates in {len(report['groups'])} groups among {report['images']} "
+              f"images; {report['reclaimable_bytes'] / 1024 / 1024:.1f} MB reclaimable", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+# insights_sql.py - Parameterized SQL insight queries over the analytics caches
+# DuckDB (when installed) queries the Parquet tables written by analytics_store in place; without
+# it the tables are copied once into .cache/analytics/insights.sqlite3 and queried with sqlite3.
+# Queries take milliseconds, results are memoised per (query, filters) until a data/ file changes,
+# and no DataFrame is rebuilt on the request path.
+#
+#   python insights_sql.py posting_times --platform Instagram
+
+import argparse
+import importlib.util
+import json
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+from analytics_store import ANALYTICS_CACHE_DIR, DATA_DIR, SCHEMAS, AnalyticsStore, cached_summary, source_fingerprint
+
+INSIGHTS_DB = "insights.sqlite3"
+
+# One row per platform post recorded in the daily photography export
+POSTING_SLOTS_VIEW = """CREATE VIEW IF NOT EXISTS posting_slots AS
+    SELECT 'Instagram' AS Platform, Day_of_Week, CAST(SUBSTR(Instagram_Posting_Time, 1, 2) AS INTEGER) AS hour,
+           In_total_engagement AS engagement, In_reach AS reach
+    FROM daily WHERE Instagram_Post_Count > 0
+    UNION ALL
+    SELECT 'Facebook', Day_of_Week, CAST(SUBSTR(Facebook_Posting_Time, 1, 2) AS INTEGER),
+           Fa_total_engagement, Fa_reach
+    FROM daily WHERE Facebook_Post_Count > 0"""
+
+# ==========================================
+# QUERY LIBRARY
+# ==========================================
+
+# name -> {"sql" with a {where} slot, "filters": keyword -> column (case-insensitive equality)}
+INSIGHT_QUERIES = {
+    "engagement_by_day": {
+        "description": "Mean engagement per post by weekday",
+        "sql": """SELECT Day_of_Week AS day, COUNT(*) AS posts, ROUND(AVG(total_engagement), 2) AS avg_engagement,
+                         ROUND(AVG(reach), 1) AS avg_reach
+                  FROM posts {where} GROUP BY Day_of_Week ORDER BY avg_engagement DESC""",
+        "filters": {"platform": "Platform", "content_category": "content_category"},
+    },
+    "engagement_by_hour": {
+        "description": "Mean engagement per post by hour published",
+        "sql": """SELECT hour, COUNT(*) AS posts, ROUND(AVG(total_engagement), 2) AS avg_engagement
+                  FROM posts {where} GROUP BY hour ORDER BY avg_engagement DESC""",
+        "filters": {"platform": "Platform", "day": "Day_of_Week"},
+    },
+    "engagement_by_platform": {
+        "description": "Posts, reach and engagement per platform",
+        "sql": """SELECT Platform AS platform, COUNT(*) AS posts, ROUND(AVG(total_engagement), 2) AS avg_engagement,
+                         ROUND(AVG(reach), 1) AS avg_reach, ROUND(AVG(engagement_rate_reach), 4) AS engagement_rate
+                  FROM posts {where} GROUP BY Platform ORDER BY avg_engagement DESC""",
+        "filters": {"day": "Day_of_Week"},
+    },
+    "posting_times": {
+        "description": "Engagement by posting hour from the daily photography export",
+        "sql": """SELECT hour, COUNT(*) AS posts, ROUND(AVG(engagement), 2) AS avg_engagement
+                  FROM posting_slots {where} GROUP BY hour ORDER BY avg_engagement DESC, posts DESC""",
+        "filters": {"platform": "Platform", "day": "Day_of_Week"},
+    },
+    "device_mix": {
+        "description": "Website users by device",
+        "sql": """SELECT SUM(Device_mobile) AS mobile, SUM(Device_desktop) AS desktop, SUM(Device_tablet) AS tablet,
+                         ROUND(100.0 * SUM(Device_mobile) / SUM(Device_mobile + Device_desktop + Device_tablet), 1)
+                             AS mobile_pct
+                  FROM daily {where}""",
+        "filters": {"day": "Day_of_Week", "month": "MonthName"},
+    },
+    "engagement_by_device": {
+        "description": "Social and web engagement by the day's dominant device",
+        "sql": """SELECT Dominant_Device AS device, COUNT(*) AS days,
+                         ROUND(AVG(Total_Social_Engagement), 2) AS avg_social_engagement,
+                         ROUND(AVG(Web_EngagementRate), 3) AS web_engagement_rate
+                  FROM daily {where} GROUP BY Dominant_Device ORDER BY avg_social_engagement DESC""",
+        "filters": {"day": "Day_of_Week"},
+    },
+    "monthly_engagement": {
+        "description": "Mean daily social engagement per month",
+        "sql": """SELECT MonthName AS month_name, COUNT(*) AS days, ROUND(AVG(Total_Social_Engagement), 2) AS avg_engagement
+                  FROM daily {where} GROUP BY Month, MonthName ORDER BY Month""",
+        "filters": {},
+    },
+    "top_content_types": {
+        "description": "Content types ranked by engagement rate in the viral-trends data",
+        "sql": """SELECT Content_Type AS content_type, COUNT(*) AS posts, ROUND(AVG(Views), 0) AS avg_views,
+                         ROUND(AVG(1.0 * (Likes + Shares + Comments) / Views), 4) AS engagement_rate
+                  FROM viral {where} GROUP BY Content_Type ORDER BY engagement_rate DESC""",
+        "filters": {"platform": "Platform", "region": "Region"},
+    },
+    "top_hashtags": {
+        "description": "Hashtags ranked by engagement rate in the viral-trends data",
+        "sql": """SELECT Hashtag AS hashtag, COUNT(*) AS posts,
+                         ROUND(AVG(1.0 * (Likes + Shares + Comments) / Views), 4) AS engagement_rate
+                  FROM viral {where} GROUP BY Hashtag ORDER BY engagement_rate DESC""",
+        "filters": {"platform": "Platform", "content_type": "Content_Type"},
+    },
+    "top_post_categories": {
+        "description": "Own post categories ranked by mean engagement",
+        "sql": """SELECT content_category, COUNT(*) AS posts, ROUND(AVG(total_engagement), 2) AS avg_engagement
+                  FROM posts {where} GROUP BY content_category ORDER BY avg_engagement DESC""",
+        "filters": {"platform": "Platform"},
+    },
+    "audience_mix": {
+        "description": "Audience share by age group and gender",
+        "sql": """SELECT age_group, gender, COUNT(*) AS people,
+                         ROUND(100.0 * COUNT(*) / (SELECT COUNT(*) FROM audience), 1) AS share_pct
+                  FROM audience {where} GROUP BY age_group, gender ORDER BY people DESC""",
+        "filters": {"gender": "gender", "age_group": "age_group"},
+    },
+}
+
+def build_query(name, limit=None, **filters):
+    """(sql, params) for a library query; unknown filters raise, None filters are ignored"""
+    spec = INSIGHT_QUERIES[name]
+    unknown = set(filters) - set(spec["filters"])
+    if unknown:
+        raise ValueError(f"{name} does not filter on {', '.join(sorted(unknown))}")
+    clauses, params = [], []
+    for keyword, value in filters.items():
+        if value is not None:
+            clauses.append(f"LOWER(CAST({spec['filters'][keyword]} AS VARCHAR)) = LOWER(?)")
+            params.append(str(value))
+    sql = spec["sql"].format(where=f"WHERE {' AND '.join(clauses)}" if clauses else "")
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    return sql, params
+
+# ==========================================
+# ENGINE
+# ==========================================
+
+def duckdb_available():
+    return importlib.util.find_spec("duckdb") is not None
+
+def _connect_duckdb(cache_dir):
+    """In-memory DuckDB with one view per cached Parquet table"""
+    import duckdb
+
+    conn = duckdb.connect()
+    for table in SCHEMAS:
+        path = (Path(cache_dir) / f"{table}.parquet").as_posix().replace("'", "''")
+        conn.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{path}')")
+    return conn
+
+def _connect_sqlite(db_path, fingerprint, data_dir, cache_dir):
+    """SQLite copy of the analytics tables, rebuilt only when the data/ files change"""
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    try:
+        stored = conn.execute("SELECT value FROM insights_meta WHERE key = 'sources'").fetchone()
+    except sqlite3.OperationalError:
+        stored = None
+    if stored is None or json.loads(stored[0]) != fingerprint:
+        store = AnalyticsStore.load(data_dir, cache_dir)
+        for name, frame in store.tables.items():
+            frame.to_sql(name, conn, if_exists="replace", index=False)
+        conn.execute("CREATE TABLE IF NOT EXISTS insights_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("INSERT OR REPLACE INTO insights_meta VALUES ('sources', ?)", (json.dumps(fingerprint),))
+        conn.commit()
+    return conn
+
+class InsightsEngine:
+    """Runs INSIGHT_QUERIES (or ad-hoc SQL) against the analytics tables, memoising results"""
+
+    def __init__(self, data_dir=DATA_DIR, cache_dir=ANALYTICS_CACHE_DIR, backend=None):
+        self.data_dir, self.cache_dir = Path(data_dir), Path(cache_dir)
+        self.backend = backend or ("duckdb" if duckdb_available() else "sqlite")
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        self.fingerprint = source_fingerprint(self.data_dir)
+        self._results = {}
+        if self.backend == "duckdb":
+            if cached_summary(self.data_dir, self.cache_dir) is None:
+                AnalyticsStore.load(self.data_dir, self.cache_dir)  # (re)writes the Parquet cache
+            self._conn = _connect_duckdb(self.cache_dir)
+        else:
+            self._conn = _connect_sqlite(self.cache_dir / INSIGHTS_DB, self.fingerprint, self.data_dir, self.cache_dir)
+        self._conn.execute(POSTING_SLOTS_VIEW)
+
+    def sql(self, query, params=()):
+        """Rows of an ad-hoc query as dicts (not memoised)"""
+        with self._lock:
+            cursor = self._conn.execute(query, list(params))
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def run(self, name, limit=None, **filters):
+        """Rows of a library query; repeated calls are served from memory until data/ changes"""
+        if source_fingerprint(self.data_dir) != self.fingerprint:
+            with self._lock:
+                self._conn.close()
+                self._open()
+        key = (name, limit, tuple(sorted(filters.items())))
+        with self._lock:
+            rows = self._results.get(key)
+            if rows is not None:
+                self.hits += 1
+                return [dict(row) for row in rows]
+            self.misses += 1
+        rows = self.sql(*build_query(name, limit, **filters))
+        with self._lock:
+            self._results[key] = rows
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_shared_engine = None
+_shared_lock = threading.Lock()
+
+def shared_engine():
+    """Process-wide engine for batch and pre-warm jobs"""
+    global _shared_engine
+    with _shared_lock:
+        if _shared_engine is None:
+            _shared_engine = InsightsEngine()
+        return _shared_engine
+
+# ==========================================
+# DERIVED INSIGHTS
+# ==========================================
+
+def best_posting_times(engine, platform=None, top_n=3):
+    """Best posting hours as "HH:00" strings (all platforms when the platform has no history)"""
+    rows = engine.run("posting_times", limit=top_n, platform=platform) if platform else []
+    rows = rows or engine.run("posting_times", limit=top_n)
+    return [f"{row['hour']:02d}:00" for row in rows]
+
+def research_insights(engine, platform=None):
+    """Prompt-ready "- ..." lines summarising the data for one platform"""
+    lines = []
+    devices = engine.run("device_mix")
+    if devices and devices[0]["mobile_pct"] is not None:
+        lines.append(f"- {devices[0]['mobile_pct']:g}% of website users are on mobile devices")
+    lines.append(f"- Best posting times: {', '.join(best_posting_times(engine, platform))}")
+    days = engine.run("engagement_by_day", limit=2, platform=platform) or engine.run("engagement_by_day", limit=2)
+    if days:
+        lines.append(f"- Highest-engagement days: {' and '.join(row['day'] for row in days)}")
+    content = engine.run("top_content_types", limit=2, platform=platform) or engine.run("top_content_types", limit=2)
+    if content:
+        lines.append(f"- Trending formats by engagement rate: {', '.join(row['content_type'] for row in content)}")
+    return lines
+
+def prompt_insights(platform, engine=None):
+    """research_insights for a caption brief, or None (the brief's default lines) without data/"""
+    try:
+        return research_insights(engine or shared_engine(), platform)
+    except (OSError, sqlite3.Error):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run an insight query over the analytics tables")
+    parser.add_argument("query", choices=sorted(INSIGHT_QUERIES))
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--backend", choices=["duckdb", "sqlite"], default=None)
+    for keyword in sorted({keyword for spec in INSIGHT_QUERIES.values() for keyword in spec["filters"]}):
+        parser.add_argument(f"--{keyword.replace('_', '-')}", dest=keyword, default=None)
+    args = parser.parse_args(argv)
+
+    engine = InsightsEngine(backend=args.backend)
+    filters = {keyword: getattr(args, keyword) for keyword in INSIGHT_QUERIES[args.query]["filters"]}
+    rows = engine.run(args.query, args.limit, **filters)
+    print(f"{args.query} ({engine.backend}): {INSIGHT_QUERIES[args.query]['description']}")
+    for row in rows:
+        print("  " + json.dumps(row, default=str))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
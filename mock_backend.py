@@ -0,0 +1,292 @@
+# mock_backend.py - Local stand-in for the Anthropic and OpenAI (DALL-E) clients
+# Answers messages.create with deterministic, prompt-aware captions and model-tier latency, so
+# routing, hedging and the UI can be exercised without an API key or spend.
+# Also stands in for the Message Batches endpoints and images.generate. Enable in the app with
+# CONTENT_SYNTH_BACKEND=mock.
+
+import base64
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+BACKEND_ENV = "CONTENT_SYNTH_BACKEND"
+MOCK_BATCH_DIR = Path(".cache") / "mock_batches"  # lets mock batches outlive a process restart
+
+# model -> (median latency seconds, share of sloppy answers: too long / off-tone)
+MOCK_MODEL_PROFILES = {
+    "claude-3-5-haiku-20241022": (0.8, 0.25),
+    "claude-sonnet-4-20250514": (3.5, 0.05),
+}
+DEFAULT_MOCK_PROFILE = (3.5, 0.05)
+MOCK_IMAGE_LATENCY = 6.0  # median seconds per images.generate (DALL-E 3 takes 10-20 s)
+
+TONE_WORDS = {
+    "professional": "Discover how you can develop and achieve more",
+    "casual": "Check out something awesome and fun",
+    "friendly": "Join a welcoming community together",
+}
+
+def _field(prompt, label, default=""):
+    match = re.search(rf"{label}:\s*(.+)", prompt)
+    return match.group(1).strip() if match else default
+
+def _mock_caption(prompt, rng, sloppy, limit=None):
+    """Hook from the brief's messaging style + tone phrase + one of the persona's CTAs"""
+    limit = limit or int(_field(prompt, "Character Limit", "150").split()[0])
+    style = [w.strip().lower() for w in _field(prompt, "Messaging Style", "friendly").split(",")]
+    tone = _field(prompt, "Brand Tone", "Friendly").lower()
+    course = _field(prompt, "Course/Event", "our program")
+    cta = rng.choice([phrase.strip() for phrase in _field(prompt, "CTA Style", "Join us").split(",")])
+
+    hook = f"{rng.choice(['Ready', 'Set', 'Built'])} for {style[0]}, {style[-1]} learners: {course}."
+    caption = f"{hook} {TONE_WORDS.get(tone, TONE_WORDS['friendly'])}. {cta}!"
+    if sloppy:
+        # Fast-tier failure modes: drifts off-tone and runs well past the limit
+        caption = f"{hook} So much is waiting for you this season, with sessions, mentors and friends. {cta}!" * 2
+    elif len(caption) > limit:
+        caption = f"{course}. {cta}!"
+    return caption
+
+def _mock_text(prompt, rng, sloppy_share):
+    rewrite = re.match(r"Rewrite this .* in at most (\d+) characters", prompt)
+    if rewrite:
+        original = prompt.strip().split("\n")[-1]
+        return original[: int(rewrite.group(1)) - 1].rsplit(" ", 1)[0] + "!"
+
+    options = re.search(r"Write (\d+) DIFFERENT caption options", prompt)
+    if options:
+        captions = [_mock_caption(prompt, rng, rng.random() < sloppy_share) for _ in range(int(options.group(1)))]
+        return json.dumps({"captions": captions}, ensure_ascii=False)
+
+    if "one caption per platform" in prompt:
+        limits = re.findall(r"^- (.+?): UNDER (\d+) characters", prompt, re.M)
+        return json.dumps({platform: _mock_caption(prompt, rng, rng.random() < sloppy_share, int(limit))
+                           for platform, limit in limits}, ensure_ascii=False)
+    return _mock_caption(prompt, rng, rng.random() < sloppy_share)
+
+class MockMessages:
+    def __init__(self, backend, batch_state_dir=None):
+        self._backend = backend
+        self.batches = MockBatches(backend, state_dir=batch_state_dir)
+
+    def create(self, model, messages, max_tokens, stop_sequences=None, timeout=None, **_):
+        prompt = messages[-1]["content"]
+        median, sloppy_share = MOCK_MODEL_PROFILES.get(model, DEFAULT_MOCK_PROFILE)
+        rng = self._backend.rng_for(prompt)
+
+        latency = median * rng.lognormvariate(0, 0.35) * self._backend.latency_scale
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"mock {model} timed out after {timeout:.1f}s")
+        time.sleep(latency)
+        return _message(_mock_record(model, prompt, max_tokens, rng, sloppy_share))
+
+def _mock_record(model, prompt, max_tokens, rng, sloppy_share):
+    """Plain-dict reply (JSON-safe, so batch results can be persisted)"""
+    text = _mock_text(prompt, rng, sloppy_share)
+    return {
+        "id": f"msg_mock_{rng.getrandbits(48):012x}",
+        "model": model,
+        "text": text,
+        "input_tokens": max(1, round(len(prompt) / 3.5)),
+        "output_tokens": min(max(1, round(len(text) / 3.5)), max_tokens),
+    }
+
+def _message(record):
+    return SimpleNamespace(
+        id=record["id"],
+        model=record["model"],
+        content=[SimpleNamespace(type="text", text=record["text"])],
+        stop_reason="end_turn",
+        usage=SimpleNamespace(input_tokens=record["input_tokens"], output_tokens=record["output_tokens"]),
+    )
+
+class MockBatches:
+    """Stand-in for client.messages.batches - create / retrieve / results / cancel.
+
+    A batch ends processing_seconds after it is created; a share of requests (error_rate) come
+    back errored. With a state_dir, batches persist on disk like the real service.
+    """
+
+    def __init__(self, backend, processing_seconds=2.0, error_rate=0.02, state_dir=None):
+        self._backend = backend
+        self.processing_seconds = processing_seconds
+        self.error_rate = error_rate
+        self.state_dir = Path(state_dir) if state_dir else None
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def _load(self, batch_id):
+        if batch_id not in self._batches and self.state_dir:
+            path = self.state_dir / f"{batch_id}.json"
+            if path.exists():
+                self._batches[batch_id] = json.loads(path.read_text(encoding="utf-8"))
+        if batch_id not in self._batches:
+            raise KeyError(f"mock batch {batch_id} not found")
+        return self._batches[batch_id]
+
+    def _save(self, batch):
+        self._batches[batch["id"]] = batch
+        if self.state_dir:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            (self.state_dir / f"{batch['id']}.json").write_text(json.dumps(batch), encoding="utf-8")
+
+    def _view(self, batch):
+        counts = {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        if batch["processing_status"] == "ended":
+            for entry in batch["results"]:
+                counts[entry["type"]] += 1
+        else:
+            counts["processing"] = len(batch["requests"])
+        return SimpleNamespace(
+            id=batch["id"],
+            type="message_batch",
+            processing_status=batch["processing_status"],
+            request_counts=SimpleNamespace(**counts),
+            created_at=batch["created_at"],
+            ended_at=batch.get("ended_at"),
+        )
+
+    def create(self, requests):
+        batch = {
+            "id": f"msgbatch_mock_{uuid.uuid4().hex[:20]}",
+            "created_at": time.time(),
+            "processing_status": "in_progress",
+            "requests": [{"custom_id": r["custom_id"], "params": r["params"]} for r in requests],
+            "results": None,
+        }
+        with self._lock:
+            self._save(batch)
+        return self._view(batch)
+
+    def retrieve(self, batch_id):
+        with self._lock:
+            batch = self._load(batch_id)
+            if batch["processing_status"] != "ended" and time.time() - batch["created_at"] >= self.processing_seconds:
+                batch["results"] = [self._process(request) for request in batch["requests"]]
+                batch["processing_status"] = "ended"
+                batch["ended_at"] = time.time()
+                self._save(batch)
+            return self._view(batch)
+
+    def _process(self, request):
+        params = request["params"]
+        prompt = params["messages"][-1]["content"]
+        rng = self._backend.rng_for(prompt)
+        if rng.random() < self.error_rate:
+            return {"custom_id": request["custom_id"], "type": "errored",
+                    "error": {"type": "overloaded_error", "message": "mock overload"}}
+        _, sloppy_share = MOCK_MODEL_PROFILES.get(params["model"], DEFAULT_MOCK_PROFILE)
+        return {"custom_id": request["custom_id"], "type": "succeeded",
+                "message": _mock_record(params["model"], prompt, params["max_tokens"], rng, sloppy_share)}
+
+    def cancel(self, batch_id):
+        with self._lock:
+            batch = self._load(batch_id)
+            if batch["processing_status"] != "ended":
+                batch["results"] = [{"custom_id": r["custom_id"], "type": "canceled"} for r in batch["requests"]]
+                batch["processing_status"] = "ended"
+                batch["ended_at"] = time.time()
+                self._save(batch)
+            return self._view(batch)
+
+    def results(self, batch_id):
+        with self._lock:
+            batch = self._load(batch_id)
+        if batch["processing_status"] != "ended":
+            raise ValueError(f"mock batch {batch_id} has not ended")
+        for entry in batch["results"]:
+            result = SimpleNamespace(type=entry["type"])
+            if entry["type"] == "succeeded":
+                result.message = _message(entry["message"])
+            elif entry["type"] == "errored":
+                result.error = SimpleNamespace(**entry["error"])
+            yield SimpleNamespace(custom_id=entry["custom_id"], result=result)
+
+class MockAnthropic:
+    """Drop-in for anthropic.Anthropic covering what this app calls"""
+
+    def __init__(self, api_key=None, latency_scale=1.0, seed=0, batch_state_dir=None, **_):
+        self.latency_scale = latency_scale
+        self.seed = seed
+        self._calls = 0
+        self._lock = threading.Lock()
+        self.messages = MockMessages(self, batch_state_dir)
+
+    def rng_for(self, prompt):
+        """Reproducible per (seed, prompt, call number) - repeated prompts still vary"""
+        with self._lock:
+            self._calls += 1
+            call = self._calls
+        digest = hashlib.sha256(f"{self.seed}:{call}:{prompt}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+# ==========================================
+# OPENAI IMAGES
+# ==========================================
+
+def _mock_png(prompt, size):
+    """Gradient PNG at the requested size, coloured by the prompt"""
+    from PIL import Image
+
+    width, height = map(int, size.split("x"))
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    start, end = Image.new("RGB", (width, height), tuple(digest[:3])), Image.new("RGB", (width, height), tuple(digest[3:6]))
+    mask = Image.linear_gradient("L").resize((width, height))
+    buffer = io.BytesIO()
+    Image.composite(end, start, mask).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+class MockImages:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def generate(self, model, prompt, size="1024x1024", quality="standard", n=1, timeout=None, **_):
+        rng = self._backend.rng_for(prompt)
+        latency = MOCK_IMAGE_LATENCY * rng.lognormvariate(0, 0.25) * self._backend.latency_scale
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"mock {model} timed out after {timeout:.1f}s")
+        time.sleep(latency)
+        image = base64.b64encode(_mock_png(prompt, size)).decode("ascii")
+        return SimpleNamespace(data=[SimpleNamespace(url=None, b64_json=image, revised_prompt=prompt)] * n)
+
+class MockOpenAI:
+    """Drop-in for openai.OpenAI covering images.generate (answers inline as b64_json)"""
+
+    def __init__(self, api_key=None, latency_scale=1.0, seed=0, **_):
+        self.latency_scale = latency_scale
+        self.seed = seed
+        self._calls = 0
+        self._lock = threading.Lock()
+        self.images = MockImages(self)
+
+    rng_for = MockAnthropic.rng_for
+
+def use_mock_backend():
+    return os.environ.get(BACKEND_ENV, "").lower() == "mock"
+
+def anthropic_client(api_key):
+    """Real Anthropic client, or the mock when CONTENT_SYNTH_BACKEND=mock"""
+    if use_mock_backend():
+        return MockAnthropic(latency_scale=float(os.environ.get("CONTENT_SYNTH_MOCK_LATENCY_SCALE", "1.0")),
+                             batch_state_dir=MOCK_BATCH_DIR)
+    from anthropic import Anthropic
+
+    return Anthropic(api_key=api_key)
+
+def openai_client(api_key):
+    """Real OpenAI client, or the mock when CONTENT_SYNTH_BACKEND=mock"""
+    if use_mock_backend():
+        return MockOpenAI(latency_scale=float(os.environ.get("CONTENT_SYNTH_MOCK_LATENCY_SCALE", "1.0")))
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key)
@@ -0,0 +1,107 @@
+# model_router.py - Latency-tiered model routing for caption generation
+# Short-limit platforms and background jobs go to the fast tier; a result that fails local
+# scoring (length check or brand alignment) is escalated once to the next tier up.
+# Policy lives in config/model_routing.json; per-route latency and acceptance are tracked in memory.
+
+import json
+import threading
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+
+from request_executor import percentile
+
+ROUTING_CONFIG_PATH = Path("config") / "model_routing.json"
+
+DEFAULT_ROUTING = {
+    "tiers": {
+        "fast": "claude-3-5-haiku-20241022",
+        "quality": "claude-sonnet-4-20250514",
+    },
+    "escalation_order": ["fast", "quality"],
+    "default_tier": "quality",
+    "short_caption_chars": 150,
+    "operation_tiers": {"prewarm": "fast", "batch": "fast"},
+    "escalate_when": {"min_alignment": 80, "accept_length_status": ["good", "warning"]},
+}
+
+@dataclass(frozen=True)
+class Route:
+    tier: str
+    model: str
+    reason: str
+
+def load_routing_config(path=ROUTING_CONFIG_PATH):
+    """Routing policy from JSON, with any missing keys taken from DEFAULT_ROUTING"""
+    path = Path(path)
+    config = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    return {**DEFAULT_ROUTING, **config}
+
+class ModelRouter:
+    """Picks a model tier per request and keeps per-route latency / acceptance statistics"""
+
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_ROUTING, **(config or {})}
+        self._lock = threading.Lock()
+        self._stats = {}  # tier -> counters + recent latencies
+
+    @classmethod
+    def from_file(cls, path=ROUTING_CONFIG_PATH):
+        return cls(load_routing_config(path))
+
+    def tier_route(self, tier, reason):
+        """Route for a named tier"""
+        return Route(tier, self.config["tiers"][tier], reason)
+
+    def route(self, char_limit, operation="interactive"):
+        """First route for a caption request"""
+        operation_tier = self.config["operation_tiers"].get(operation)
+        if operation_tier:
+            return self.tier_route(operation_tier, f"{operation} job")
+        if char_limit <= self.config["short_caption_chars"]:
+            return self.tier_route(self.config["escalation_order"][0], f"{char_limit}-char limit")
+        return self.tier_route(self.config["default_tier"], "default")
+
+    def escalation(self, route):
+        """Next tier up, or None if route is already the top tier"""
+        order = self.config["escalation_order"]
+        position = order.index(route.tier) if route.tier in order else len(order) - 1
+        if position + 1 >= len(order):
+            return None
+        return self.tier_route(order[position + 1], f"escalated from {route.tier}")
+
+    def rejection_reason(self, result):
+        """Why local scoring rejects a result (None = accepted)"""
+        rules = self.config["escalate_when"]
+        if result["length_status"] not in rules["accept_length_status"]:
+            return f"length {result['length_status']}"
+        if result["alignment_score"] < rules["min_alignment"]:
+            return f"alignment {result['alignment_score']}%"
+        return None
+
+    def record(self, route, latency_s, accepted):
+        with self._lock:
+            stats = self._stats.setdefault(route.tier, {
+                "model": route.model, "calls": 0, "accepted": 0, "escalated_in": 0,
+                "latencies": deque(maxlen=500),
+            })
+            stats["calls"] += 1
+            stats["accepted"] += bool(accepted)
+            stats["escalated_in"] += route.reason.startswith("escalated")
+            stats["latencies"].append(latency_s)
+
+    def report(self):
+        """Per-tier calls, acceptance rate and latency percentiles (ms)"""
+        with self._lock:
+            report = {}
+            for tier, stats in self._stats.items():
+                latencies = list(stats["latencies"])
+                report[tier] = {
+                    "model": stats["model"],
+                    "calls": stats["calls"],
+                    "acceptance_rate": stats["accepted"] / stats["calls"] if stats["calls"] else 0.0,
+                    "escalated_in": stats["escalated_in"],
+                    **{f"p{pct}_ms": round(percentile(latencies, pct) * 1000, 1) if latencies else None
+                       for pct in (50, 95)},
+                }
+            return report
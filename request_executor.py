@@ -0,0 +1,226 @@
+# request_executor.py - Deadlines, hedged requests and fallbacks for outbound calls
+# Every call runs under a per-operation deadline (shrunk to whatever the caller has left).
+# If the first attempt is still running after that operation's observed p95, one duplicate is
+# fired and the first answer wins; when the deadline passes the caller's fallback is returned.
+# Operations guarded by a CircuitBreaker skip the call entirely while the circuit is open.
+# Only transient failures (timeouts, 408/429/5xx, connection errors) are hedged or fall back;
+# errors a retry cannot fix - a bad key, an invalid request, a bug - are raised at once.
+
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from circuit_breaker import CircuitOpen
+
+# Seconds each operation may take end to end (hedge included)
+OPERATION_DEADLINES = {
+    "caption": 15.0,
+    "length_retry": 8.0,
+    "image_generate": 60.0,
+    "image_download": 15.0,
+}
+DEFAULT_DEADLINE = 30.0
+LATENCY_WINDOW = 200       # recent successful attempts per operation
+MIN_HEDGE_SAMPLES = 20     # below this, hedge at HEDGE_FALLBACK_FRACTION of the budget
+HEDGE_FALLBACK_FRACTION = 0.5
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+class Deadline:
+    """Absolute time budget handed down through nested calls"""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+def failure_reason(error):
+    """Why a failed attempt may succeed on retry: "timeout", "rate_limited", "server_error" or
+    "connection_error"; None for errors a retry cannot fix (401/400/403 responses, bugs)"""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        if status == 429:
+            return "rate_limited"
+        if status >= 500:
+            return "server_error"
+        return "timeout" if status == 408 else None
+    error_classes = [cls.__name__ for cls in type(error).__mro__]
+    if isinstance(error, TimeoutError) or any("Timeout" in name for name in error_classes):
+        return "timeout"
+    if isinstance(error, OSError) or "APIConnectionError" in error_classes:
+        return "connection_error"
+    return None
+
+def percentile(values, pct):
+    """Nearest-rank percentile (pct 0-100) of a list of samples; nan when there are none"""
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+class RequestExecutor:
+    """Runs blocking calls with deadlines and a single p95-delayed hedge; tracks hedge/fallback rates.
+
+    fn is called as fn(timeout) so the remaining budget reaches the HTTP client. Python threads
+    cannot be killed, so a losing attempt is abandoned: its future is cancelled if it has not
+    started, otherwise it ends at its own timeout and on_discard(result) sees any late success.
+    breakers maps operations to CircuitBreakers (one breaker may guard several operations).
+    fallback(reason) gets "circuit_open", "deadline" or the failure_reason of the last error.
+    """
+
+    def __init__(self, max_workers=32, deadlines=None, breakers=None):
+        self.deadlines = {**OPERATION_DEADLINES, **(deadlines or {})}
+        self.breakers = dict(breakers or {})
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="request")
+        self._lock = threading.Lock()
+        self._latencies = {}  # operation -> deque of attempt durations (seconds)
+        self._counters = {}   # operation -> counts
+
+    # ------------------------------------------
+    # Latency tracking
+    # ------------------------------------------
+
+    def _count(self, operation, field, amount=1):
+        with self._lock:
+            counters = self._counters.setdefault(operation, {
+                "calls": 0, "hedged": 0, "hedge_wins": 0, "fallbacks": 0, "failures": 0, "deadline_exceeded": 0,
+                "short_circuited": 0, "rejected": 0,
+            })
+            counters[field] += amount
+
+    def _observe(self, operation, seconds):
+        with self._lock:
+            self._latencies.setdefault(operation, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def hedge_delay(self, operation, budget):
+        """Seconds to wait before duplicating: the operation's p95, or half the budget until warmed up"""
+        with self._lock:
+            samples = list(self._latencies.get(operation, ()))
+        if len(samples) < MIN_HEDGE_SAMPLES:
+            return budget * HEDGE_FALLBACK_FRACTION
+        return min(percentile(samples, 95), budget * 0.9)
+
+    def _attempt(self, operation, fn, timeout):
+        started = time.monotonic()
+        result = fn(timeout)
+        self._observe(operation, time.monotonic() - started)  # only successes shape the p95
+        return result
+
+    # ------------------------------------------
+    # Execution
+    # ------------------------------------------
+
+    def run(self, operation, fn, deadline=None, hedge=True, fallback=None, on_discard=None):
+        """Result of fn(timeout) within the operation deadline, else fallback(reason) (or raise)"""
+        budget = self.deadlines.get(operation, DEFAULT_DEADLINE)
+        if deadline is not None:
+            budget = min(budget, deadline.remaining())
+        self._count(operation, "calls")
+
+        breaker = self.breakers.get(operation)
+        if breaker is not None and not breaker.allow():
+            self._count(operation, "short_circuited")
+            if fallback is not None:
+                self._count(operation, "fallbacks")
+                return fallback("circuit_open")
+            raise CircuitOpen(f"{operation} circuit is open")
+
+        started = time.monotonic()
+        ends_at = started + budget
+        hedge_at = started + self.hedge_delay(operation, budget) if hedge else math.inf
+        attempts = [self._pool.submit(self._attempt, operation, fn, budget)] if budget > 0 else []
+        pending, winner, error, rejected = set(attempts), None, None, None
+
+        while pending and winner is None:
+            now = time.monotonic()
+            if now >= ends_at:
+                break
+            wake_at = ends_at if len(attempts) > 1 else min(ends_at, hedge_at)
+            done, pending = wait(pending, timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    winner = winner or future
+                elif failure_reason(future.exception()) is None:
+                    rejected = future.exception()
+                else:
+                    error = future.exception()
+            if rejected is not None and winner is None:
+                break  # a duplicate would be rejected too
+
+            # Hedge once: when the p95 delay passes, or straight away if the first attempt failed fast
+            if winner is None and len(attempts) == 1 and time.monotonic() < ends_at \
+                    and (time.monotonic() >= hedge_at or (hedge and not pending)):
+                hedged = self._pool.submit(self._attempt, operation, fn, ends_at - time.monotonic())
+                attempts.append(hedged)
+                pending.add(hedged)
+                self._count(operation, "hedged")
+
+        for future in pending:
+            if not future.cancel() and on_discard:
+                future.add_done_callback(
+                    lambda f: on_discard(f.result()) if not f.cancelled() and f.exception() is None else None
+                )
+
+        if winner is not None:
+            if len(attempts) > 1 and winner is attempts[1]:
+                self._count(operation, "hedge_wins")
+            if breaker is not None:
+                breaker.record_success(time.monotonic() - started)
+            return winner.result()
+
+        if rejected is not None:
+            # Upstream answered and refused the request: not an outage, so no breaker verdict or fallback
+            if breaker is not None:
+                breaker.release()
+            self._count(operation, "rejected")
+            raise rejected
+
+        if not attempts:
+            # Deadline spent before the call: upstream never saw it, so no breaker verdict
+            if breaker is not None:
+                breaker.release()
+            self._count(operation, "deadline_exceeded")
+            if fallback is not None:
+                self._count(operation, "fallbacks")
+                return fallback("deadline")
+            raise DeadlineExceeded(f"{operation} had no time left before it started")
+
+        if breaker is not None:
+            breaker.record_failure()
+        self._count(operation, "failures" if error and not pending else "deadline_exceeded")
+        if fallback is not None:
+            self._count(operation, "fallbacks")
+            return fallback(failure_reason(error) if error and not pending else "deadline")
+        if error and not pending:
+            raise error
+        raise DeadlineExceeded(f"{operation} did not finish within {budget:.1f}s")
+
+    def circuit_state(self, operation):
+        """State of the operation's circuit breaker ("closed", "open", "half_open"), None if unguarded"""
+        breaker = self.breakers.get(operation)
+        return breaker.state if breaker is not None else None
+
+    def metrics(self):
+        """Per-operation counts, hedge/fallback rates, latency percentiles (ms) and circuit state"""
+        with self._lock:
+            report = {}
+            for operation, counters in self._counters.items():
+                calls = counters["calls"]
+                samples = list(self._latencies.get(operation, ()))
+                report[operation] = {
+                    **counters,
+                    "hedge_rate": counters["hedged"] / calls if calls else 0.0,
+                    "fallback_rate": counters["fallbacks"] / calls if calls else 0.0,
+                    **{f"p{pct}_ms": round(percentile(samples, pct) * 1000, 1) if samples else None
+                       for pct in (50, 95, 99)},
+                    "circuit": self.circuit_state(operation),
+                }
+            return report
@@ -0,0 +1,122 @@
+# response_cache.py - Ready-made caption results keyed by brief
+# Filled ahead of time by campaign_prewarm.py; the interactive Generate path takes one entry
+# (a millisecond SQLite read) before falling back to a live Claude call. SQLite keeps the cache
+# safe to share between the app process and the off-peak pre-warm job.
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+RESPONSE_CACHE_PATH = Path(".cache") / "responses.sqlite3"
+DEFAULT_TTL_SECONDS = 14 * 24 * 3600  # pre-warmed captions go stale after two weeks
+
+def make_response_key(tenant, platform, campaign_type, brand_tone, course_title, n_candidates):
+    """Stable key for one caption brief (course title compared case- and whitespace-insensitively)"""
+    course = " ".join((course_title or "").split()).lower()
+    payload = json.dumps([tenant, platform, campaign_type, brand_tone, course, n_candidates], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """Queue of pre-generated results per brief - each entry is served once so repeat clicks still vary"""
+
+    def __init__(self, path=RESPONSE_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                source TEXT,
+                created REAL NOT NULL,
+                expires REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_key ON responses (key, expires)")
+            conn.execute("""CREATE TABLE IF NOT EXISTS last_good (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                created REAL NOT NULL)""")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")  # the app reads while the pre-warm job writes
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def put(self, key, payload, ttl_seconds=DEFAULT_TTL_SECONDS, source="prewarm"):
+        """Queue one ready result (any JSON-serialisable payload) under key"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO responses (key, payload, source, created, expires) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(payload, ensure_ascii=False), source, now, now + ttl_seconds),
+            )
+
+    def take(self, key):
+        """Pop the oldest unexpired result for key, or None on a miss"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")  # claim the row so two sessions never get the same result
+            row = conn.execute(
+                "SELECT id, payload FROM responses WHERE key = ? AND expires > ? ORDER BY id LIMIT 1",
+                (key, time.time()),
+            ).fetchone()
+            if row:
+                conn.execute("DELETE FROM responses WHERE id = ?", (row[0],))
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[1])
+
+    def remember(self, key, payload):
+        """Keep the latest live result per brief as a stale-but-real fallback for outages"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO last_good (key, payload, created) VALUES (?, ?, ?)",
+                (key, json.dumps(payload, ensure_ascii=False), time.time()),
+            )
+
+    def recall(self, key, max_age_seconds=None):
+        """Last live result remembered for key (not consumed), or None; max_age_seconds skips older ones"""
+        oldest = time.time() - max_age_seconds if max_age_seconds is not None else 0
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload FROM last_good WHERE key = ? AND created >= ?", (key, oldest)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self, key):
+        """Unexpired results waiting under key"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM responses WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()[0]
+
+    def purge_expired(self):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),)).rowcount
+
+    def stats(self):
+        with self._connect() as conn:
+            entries, keys = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT key) FROM responses WHERE expires > ?", (time.time(),)
+            ).fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "briefs": keys,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
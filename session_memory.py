@@ -0,0 +1,259 @@
+# session_memory.py - Per-session memory accounting, budgets and leak instrumentation
+# Each Streamlit session keeps its generation history, current caption and image key resident
+# until it expires. SessionMemoryRegistry records the approximate bytes every session holds
+# (per key, plus the image bytes it pins in the shared ImageMemoryPool), reports global totals
+# and the heaviest sessions, and hands back a trim target when a session - or the process as a
+# whole - is over budget. TracemallocMonitor keeps periodic tracemalloc snapshots for the
+# app's ?debug=memory view.
+#
+#   PYTHONTRACEMALLOC=10 streamlit run content_synth_app.py   then open /?debug=memory
+
+import sys
+import threading
+import time
+import tracemalloc
+
+SESSION_MEMORY_MAX_BYTES = 8 * 1024 * 1024    # any single session (state + pinned images)
+TOTAL_MEMORY_MAX_BYTES = 256 * 1024 * 1024    # all sessions together
+SESSION_IDLE_TTL_SECONDS = 2 * 60 * 60        # unseen this long -> treated as expired
+MIN_HISTORY_KEPT = 5                          # trimming never drops the newest results
+
+# session_state keys that grow with use; everything else is small widget state
+TRACKED_KEYS = ("generation_history", "generated_caption", "caption_alternatives", "platform_captions", "generated_image",
+                "brief", "posting_schedule")
+IMAGE_POOL_KEY = "image_pool"  # pinned image bytes, reported alongside the state keys
+
+# ==========================================
+# SIZING
+# ==========================================
+
+def deep_sizeof(obj, _seen=None):
+    """Approximate bytes reachable from obj, counting each object once
+
+    Buffers are counted by their payload: bytes/bytearray/array via getsizeof, memoryviews and
+    NumPy arrays by nbytes, PIL images by decoded pixel size, DataFrames by deep memory_usage.
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj, 0)
+
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, memoryview):
+        return size + obj.nbytes
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(item, seen) for item in obj)
+    memory_usage = getattr(obj, "memory_usage", None)
+    if callable(memory_usage):  # pandas DataFrame / Series
+        try:
+            usage = memory_usage(deep=True)
+            return size + int(getattr(usage, "sum", lambda: usage)())
+        except TypeError:
+            pass
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int):  # NumPy arrays and other buffer-backed objects
+        return size + nbytes
+    if hasattr(obj, "getbands") and hasattr(obj, "size"):  # PIL image: decoded pixels
+        width, height = obj.size
+        return size + width * height * len(obj.getbands())
+    if hasattr(obj, "__dict__"):
+        return size + deep_sizeof(vars(obj), seen)
+    return size
+
+def session_footprint(state, keys=TRACKED_KEYS):
+    """{key: approximate bytes} for the tracked keys present in a session_state mapping"""
+    return {key: deep_sizeof(state[key]) for key in keys if key in state}
+
+def trim_session(state, target_bytes, release_images=None, min_history=MIN_HISTORY_KEPT):
+    """Shrink a session's state towards target_bytes; returns the actions taken
+
+    Cheapest loss first: pinned image bytes (re-readable from the disk cache), then unused
+    caption alternatives and the posting schedule, then the oldest history entries down to min_history.
+    """
+    actions = []
+    if release_images is not None:
+        release_images()
+        actions.append("released pinned images")
+    if sum(session_footprint(state).values()) <= target_bytes:
+        return actions
+
+    if state.get("caption_alternatives"):
+        state["caption_alternatives"] = []
+        actions.append("cleared caption alternatives")
+    if state.get("posting_schedule"):
+        state["posting_schedule"] = None  # rebuilt on the next "Build schedule" click
+        actions.append("cleared posting schedule")
+
+    history = list(state.get("generation_history") or [])
+    excess = sum(session_footprint(state).values()) - target_bytes
+    dropped = 0
+    while excess > 0 and len(history) - dropped > min_history:
+        excess -= deep_sizeof(history[dropped])
+        dropped += 1
+    if dropped:
+        state["generation_history"] = history[dropped:]
+        actions.append(f"dropped {dropped} oldest history entries")
+    return actions
+
+# ==========================================
+# REGISTRY (one per process)
+# ==========================================
+
+class SessionMemoryRegistry:
+    """Latest footprint of every live session, with budgets
+
+    Sessions are recorded by value (sizes only), so the registry never keeps a session's
+    state alive. Sessions not seen for idle_ttl_s are dropped and their image pins released.
+    """
+
+    def __init__(self, session_max_bytes=SESSION_MEMORY_MAX_BYTES, total_max_bytes=TOTAL_MEMORY_MAX_BYTES,
+                 idle_ttl_s=SESSION_IDLE_TTL_SECONDS, image_pool=None):
+        self.session_max_bytes = session_max_bytes
+        self.total_max_bytes = total_max_bytes
+        self.idle_ttl_s = idle_ttl_s
+        self.image_pool = image_pool
+        self.evictions = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._sessions = {}     # session id -> {"by_key": {...}, "bytes": n, "last_seen": t}
+        self._trim_targets = {}  # session id -> bytes it must shrink to on its next run
+
+    def _pinned_bytes(self, session_id):
+        return self.image_pool.session_bytes(session_id) if self.image_pool is not None else 0
+
+    def record(self, session_id, state, now=None):
+        """Store this session's footprint; returns a trim target in bytes when it must shrink"""
+        now = time.time() if now is None else now
+        by_key = session_footprint(state)
+        by_key[IMAGE_POOL_KEY] = self._pinned_bytes(session_id)
+        total = sum(by_key.values())
+        with self._lock:
+            self._sessions[session_id] = {"by_key": by_key, "bytes": total, "last_seen": now}
+            self._expire(now)
+            self._plan_global_trims()
+            target = self._trim_targets.pop(session_id, None)
+        if total > self.session_max_bytes:
+            target = min(target or total, self.session_max_bytes)
+        return target
+
+    def enforce(self, session_id, state, release_images=None):
+        """record() and, when over budget, trim_session(); returns the actions taken"""
+        target = self.record(session_id, state)
+        if target is None:
+            return []
+        actions = trim_session(state, target, release_images=release_images)
+        with self._lock:
+            self.evictions += 1
+        self.record(session_id, state)
+        return actions
+
+    def _expire(self, now):
+        for session_id, entry in list(self._sessions.items()):
+            if now - entry["last_seen"] > self.idle_ttl_s:
+                self._forget(session_id)
+                self.expired += 1
+
+    def _plan_global_trims(self):
+        """Over the total budget: halve the heaviest sessions until the projection fits"""
+        overflow = sum(entry["bytes"] for entry in self._sessions.values()) - self.total_max_bytes
+        for session_id, entry in sorted(self._sessions.items(), key=lambda item: -item[1]["bytes"]):
+            if overflow <= 0:
+                break
+            target = entry["bytes"] // 2
+            self._trim_targets[session_id] = min(self._trim_targets.get(session_id, target), target)
+            overflow -= entry["bytes"] - target
+
+    def _forget(self, session_id):
+        self._sessions.pop(session_id, None)
+        self._trim_targets.pop(session_id, None)
+        if self.image_pool is not None:
+            self.image_pool.release_session(session_id)
+
+    def forget(self, session_id):
+        with self._lock:
+            self._forget(session_id)
+
+    def report(self, top_n=5):
+        """Global totals, bytes per key across sessions and the top_n heaviest sessions"""
+        with self._lock:
+            sessions = {session_id: dict(entry) for session_id, entry in self._sessions.items()}
+            pending = len(self._trim_targets)
+        by_key = {}
+        for entry in sessions.values():
+            for key, size in entry["by_key"].items():
+                by_key[key] = by_key.get(key, 0) + size
+        heaviest = sorted(sessions.items(), key=lambda item: -item[1]["bytes"])[:top_n]
+        return {
+            "sessions": len(sessions),
+            "bytes": sum(entry["bytes"] for entry in sessions.values()),
+            "session_max_bytes": self.session_max_bytes,
+            "total_max_bytes": self.total_max_bytes,
+            "by_key": dict(sorted(by_key.items(), key=lambda item: -item[1])),
+            "top": [{"session_id": session_id, "bytes": entry["bytes"], "by_key": entry["by_key"],
+                     "idle_s": time.time() - entry["last_seen"]} for session_id, entry in heaviest],
+            "evictions": self.evictions,
+            "pending_trims": pending,
+            "expired": self.expired,
+        }
+
+# ==========================================
+# TRACEMALLOC SNAPSHOTS
+# ==========================================
+
+class TracemallocMonitor:
+    """Periodic tracemalloc snapshots compared with the first one (growth = leak candidates)
+
+    Tracing costs memory and CPU, so it runs only when started with PYTHONTRACEMALLOC or
+    explicitly via start(); maybe_snapshot() is a no-op otherwise.
+    """
+
+    def __init__(self, interval_s=300, frames=10):
+        self.interval_s = interval_s
+        self.frames = frames
+        self.baseline = None
+        self.latest = None
+        self.taken_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def maybe_snapshot(self, force=False):
+        """Take a snapshot if tracing and interval_s has passed since the last one"""
+        if not tracemalloc.is_tracing():
+            return False
+        with self._lock:
+            if not force and self.taken_at is not None and time.time() - self.taken_at < self.interval_s:
+                return False
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ])
+            if self.baseline is None:
+                self.baseline = snapshot
+            self.latest, self.taken_at = snapshot, time.time()
+        return True
+
+    def report(self, top_n=10, key_type="lineno"):
+        """Traced totals and the top_n allocation sites by growth since the baseline snapshot"""
+        if not tracemalloc.is_tracing():
+            return {"tracing": False}
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            baseline, latest, taken_at = self.baseline, self.latest, self.taken_at
+        growth = []
+        if latest is not None:
+            for stat in latest.compare_to(baseline, key_type)[:top_n]:
+                frame = stat.traceback[0]
+                growth.append({"site": f"{frame.filename}:{frame.lineno}", "size_diff": stat.size_diff,
+                               "size": stat.size, "count_diff": stat.count_diff})
+        return {"tracing": True, "current": current, "peak": peak, "snapshot_at": taken_at, "top_growth": growth}
@@ -0,0 +1,22 @@
+# conftest.py - Make the flat top-level modules importable from tests/
+# Modules read config/ and data/ relative to the working directory, as the app does.
+
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+@pytest.fixture
+def scratch_dir(tmp_path, monkeypatch):
+    """Working directory with a copy of config/ and the mock backend, so .cache/ writes stay out of the project"""
+    shutil.copytree(ROOT / "config", tmp_path / "config")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CONTENT_SYNTH_BACKEND", "mock")
+    monkeypatch.setenv("CONTENT_SYNTH_MOCK_LATENCY_SCALE", "0")
+    return tmp_path
@@ -0,0 +1,171 @@
+# test_api_service.py - Request validation, tenant/size checks and idempotency keys
+# Requests go straight to the ASGI app (no HTTP client needed) against the mock backend.
+
+import asyncio
+import io
+import json
+
+import pytest
+
+import api_service
+from api_service import ApiError, IdempotencyStore, Services, app, openapi_schema
+from image_cache import make_image_key
+
+def call(method, path, body=None, headers=None):
+    """(status, headers, body bytes) for one request through the ASGI app"""
+    raw = json.dumps(body).encode("utf-8") if isinstance(body, dict) else (body or b"")
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": raw, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    response_headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    return start["status"], response_headers, b"".join(m.get("body", b"") for m in messages[1:])
+
+@pytest.fixture
+def services(scratch_dir, monkeypatch):
+    monkeypatch.delenv("CONTENT_SYNTH_API_TOKEN", raising=False)
+    app.state.services = Services()
+    app.state.openapi = openapi_schema()
+    return app.state.services
+
+BRIEF = {"platform": "Instagram", "campaign_type": "Music-Integrated Learning"}
+
+# ==========================================
+# VALIDATION
+# ==========================================
+
+def test_caption_for_a_valid_brief(services):
+    status, _, body = call("POST", "/v1/captions", BRIEF)
+    assert status == 200
+    payload = json.loads(body)
+    assert payload["source"] == "live"
+    assert payload["result"]["platform"] == "Instagram"
+
+def test_unknown_tenant_is_404(services):
+    status, _, body = call("POST", "/v1/captions", {**BRIEF, "tenant": "nobody"})
+    assert status == 404
+    assert "nobody" in json.loads(body)["error"]
+
+def test_brief_is_checked_against_the_tenant_profile(services):
+    status, _, body = call("POST", "/v1/captions", {**BRIEF, "platform": "MySpace", "brand_tone": "Grumpy"})
+    assert status == 422
+    detail = json.loads(body)["detail"]
+    assert [line.split(" ")[0] for line in detail] == ["platform", "brand_tone"]
+
+@pytest.mark.parametrize("body", [
+    {**BRIEF, "n_candidates": 9},
+    {**BRIEF, "unexpected": True},
+    {"platform": "Instagram"},
+    b"{not json",
+])
+def test_malformed_bodies_are_422(services, body):
+    status, _, payload = call("POST", "/v1/captions", body)
+    assert status == 422
+    assert json.loads(payload)["error"] == "Invalid request"
+
+def test_oversized_body_is_413(services):
+    status, _, _ = call("POST", "/v1/captions", {**BRIEF, "course_title": "x" * api_service.MAX_BODY_BYTES})
+    assert status == 413
+
+def test_bearer_token_is_required_when_configured(services, monkeypatch):
+    monkeypatch.setenv("CONTENT_SYNTH_API_TOKEN", "secret")
+    assert call("POST", "/v1/captions", BRIEF)[0] == 401
+    assert call("POST", "/v1/captions", BRIEF, {"Authorization": "Bearer secret"})[0] == 200
+
+# ==========================================
+# IMAGE SIZES
+# ==========================================
+
+@pytest.fixture
+def cached_image(services):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (1024, 1024), (200, 80, 40)).save(buffer, format="PNG")
+    key = make_image_key("test prompt", "1024x1024", "standard", "dall-e-3")
+    return services.image_cache.put(key, buffer.getvalue(), {"prompt": "test prompt", "dalle_size": "1024x1024"})
+
+def test_webp_at_a_platform_size(services, cached_image):
+    size = sorted(api_service.rendition_sizes(cached_image))[0]
+    status, headers, body = call("GET", f"/v1/images/{cached_image.key}?format=webp&size={size}")
+    assert status == 200
+    assert headers["content-type"] == "image/webp"
+    assert body[:4] == b"RIFF"
+
+def test_webp_at_an_arbitrary_size_is_refused(services, cached_image):
+    status, _, body = call("GET", f"/v1/images/{cached_image.key}?format=webp&size=1234x999")
+    assert status == 422
+    assert "1024x1024" in json.loads(body)["detail"]
+
+@pytest.mark.parametrize("query", ["format=gif", "size=huge", "size=123456x1"])
+def test_bad_format_or_size_is_422(services, cached_image, query):
+    assert call("GET", f"/v1/images/{cached_image.key}?{query}")[0] == 422
+
+def test_unknown_or_malformed_image_key(services):
+    assert call("GET", f"/v1/images/{'0' * 64}")[0] == 404
+    assert call("GET", "/v1/images/not-a-key")[0] == 422
+
+# ==========================================
+# IDEMPOTENCY KEYS
+# ==========================================
+
+def test_retry_with_the_same_key_replays_the_first_response(services):
+    headers = {"Idempotency-Key": "post-1"}
+    first = call("POST", "/v1/captions", BRIEF, headers)
+    replay = call("POST", "/v1/captions", BRIEF, headers)
+    assert first[0] == replay[0] == 200
+    assert replay[1].get("idempotent-replayed") == "true"
+    assert replay[2] == first[2]
+
+def test_same_key_with_another_body_is_422(services):
+    headers = {"Idempotency-Key": "post-2"}
+    assert call("POST", "/v1/captions", BRIEF, headers)[0] == 200
+    status, _, body = call("POST", "/v1/captions", {**BRIEF, "n_candidates": 1}, headers)
+    assert status == 422
+    assert "Idempotency-Key" in json.loads(body)["error"]
+
+def test_keys_are_scoped_per_endpoint(services):
+    headers = {"Idempotency-Key": "post-3"}
+    assert call("POST", "/v1/captions", BRIEF, headers)[0] == 200
+    status, _, body = call("POST", "/v1/images", {**BRIEF, "ratio": "nope"}, headers)
+    assert (status, json.loads(body)["error"]) == (422, "Invalid brief")  # a new request, not a reused key
+
+def test_key_in_progress_is_409(tmp_path):
+    store = IdempotencyStore(tmp_path / "keys.sqlite3")
+    assert store.begin("k", "body-a") is None
+    with pytest.raises(ApiError) as conflict:
+        store.begin("k", "body-a")
+    assert conflict.value.status == 409
+    assert conflict.value.headers["Retry-After"]
+    with pytest.raises(ApiError) as mismatch:
+        store.begin("k", "body-b")
+    assert mismatch.value.status == 422
+
+def test_finished_key_replays_and_retryable_statuses_are_forgotten(tmp_path):
+    store = IdempotencyStore(tmp_path / "keys.sqlite3")
+    store.begin("ok", "body")
+    store.finish("ok", 200, '{"done": true}')
+    assert store.begin("ok", "body") == (200, '{"done": true}')
+    for status in (429, 503):
+        store.begin(f"retry-{status}", "body")
+        store.finish(f"retry-{status}", status, "{}")
+        assert store.begin(f"retry-{status}", "body") is None
+
+def test_stale_in_progress_key_may_run_again(tmp_path, monkeypatch):
+    store = IdempotencyStore(tmp_path / "keys.sqlite3")
+    store.begin("k", "body")
+    monkeypatch.setattr(api_service, "IDEMPOTENCY_STALE_SECONDS", -1)
+    assert store.begin("k", "body") is None
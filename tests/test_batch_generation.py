@@ -0,0 +1,99 @@
+# test_batch_generation.py - Bulk runs collect every brief once, bill it once and survive a crash mid-collection
+
+import copy
+import json
+
+import pytest
+
+from batch_generation import BatchRun, expand_briefs
+from brand_profiles import get_brand_profile
+from mock_backend import MockAnthropic
+from model_router import ModelRouter
+from response_cache import ResponseCache
+from token_budget import CostLedger
+
+@pytest.fixture
+def client(scratch_dir):
+    client = MockAnthropic(latency_scale=0, seed=1)
+    client.messages.batches.processing_seconds = 0
+    client.messages.batches.error_rate = 0
+    return client
+
+@pytest.fixture
+def run(scratch_dir):
+    return BatchRun.create(expand_briefs(get_brand_profile(), platforms=["Instagram"])[:12], root=scratch_dir / "batches")
+
+def _ended(run, client, ledger):
+    run.submit(client, ModelRouter.from_file(), ledger)
+    assert run.poll(client) == 0
+
+def _result_ids(run):
+    return [json.loads(line)["custom_id"] for line in run.results_path.read_text(encoding="utf-8").splitlines()]
+
+def test_every_brief_is_collected_and_billed_once(scratch_dir, client, run):
+    ledger = CostLedger(scratch_dir / "ledger.jsonl")
+    summary = run.run(client, ModelRouter.from_file(), ResponseCache(), ledger, poll_seconds=0)
+    assert summary["succeeded"] == 12
+    assert sorted(_result_ids(run)) == sorted(run.state["requests"])
+    assert ledger.totals()["cost_usd"] == pytest.approx(run.state["cost_usd"])
+
+def test_repeated_collection_is_a_no_op(scratch_dir, client, run):
+    ledger = CostLedger(scratch_dir / "ledger.jsonl")
+    _ended(run, client, ledger)
+    assert run.collect(client, ModelRouter.from_file(), ResponseCache(), ledger) > 0
+    assert run.collect(client, ModelRouter.from_file(), ResponseCache(), ledger) == 0
+    assert len(_result_ids(run)) == len(set(_result_ids(run)))
+
+def test_crash_during_collection_resumes_without_duplicates(scratch_dir, client, run):
+    ledger_path = scratch_dir / "ledger.jsonl"
+    _ended(run, client, CostLedger(ledger_path))
+    checkpoint = copy.deepcopy(run.state)  # last state.json written before collection
+    run.collect(client, ModelRouter.from_file(), ResponseCache(), CostLedger(ledger_path))
+    cost = run.state["cost_usd"]
+
+    # Crash: results and ledger were written but state.json was not, and a last line was half-written
+    (run.directory / "state.json").write_text(json.dumps(checkpoint), encoding="utf-8")
+    with run.results_path.open("a", encoding="utf-8") as results_file:
+        results_file.write('{"custom_id": "partial", "brief"')
+
+    resumed = BatchRun.load(run.run_id, root=scratch_dir / "batches")
+    ledger = CostLedger(ledger_path)
+    resumed.collect(client, ModelRouter.from_file(), ResponseCache(), ledger)
+
+    assert sorted(_result_ids(resumed)) == sorted(resumed.state["requests"])
+    assert resumed.counts() == {"succeeded": 12}
+    assert resumed.state["cost_usd"] == pytest.approx(cost)
+    assert ledger.totals()["calls"] == 12
+    assert ledger.totals()["cost_usd"] == pytest.approx(cost)
+
+def test_truncated_reply_is_resubmitted_with_twice_the_budget(scratch_dir, client, run):
+    ledger = CostLedger(scratch_dir / "ledger.jsonl")
+    router = ModelRouter.from_file()
+    _ended(run, client, ledger)
+    first_budget = {}
+    for batch in client.messages.batches._batches.values():
+        first_budget.update({r["custom_id"]: r["params"]["max_tokens"] for r in batch["requests"]})
+
+    results = client.messages.batches.results
+
+    def cut_off_first(batch_id):
+        for index, entry in enumerate(results(batch_id)):
+            if index == 0:
+                entry.result.message.stop_reason = "max_tokens"
+                entry.result.message.content[0].text = '{"captions": ["Learn gui'
+                cut_off_first.custom_id = entry.custom_id
+            yield entry
+
+    client.messages.batches.results = cut_off_first
+    run.collect(client, router, ResponseCache(), ledger)
+    truncated = run.state["requests"][cut_off_first.custom_id]
+    assert (truncated["status"], truncated["error"]) == ("pending", "max_tokens")
+    assert cut_off_first.custom_id not in _result_ids(run)
+    assert ledger.totals()["calls"] == 12  # the cut-off reply is still paid for
+
+    client.messages.batches.results = results
+    run.run(client, router, ResponseCache(), ledger, poll_seconds=0)
+    resubmitted = [r for batch in client.messages.batches._batches.values() for r in batch["requests"]
+                   if r["custom_id"] == cut_off_first.custom_id][-1]
+    assert resubmitted["params"]["max_tokens"] == 2 * first_budget[cut_off_first.custom_id]
+    assert run.state["requests"][cut_off_first.custom_id]["status"] == "succeeded"
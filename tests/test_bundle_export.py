@@ -0,0 +1,89 @@
+# test_bundle_export.py - Streamed campaign ZIPs: captions, manifest, shared images and stored renditions
+
+import io
+import json
+import zipfile
+
+import pytest
+
+from bundle_export import estimate_bundle_bytes, iter_bundle, write_bundle
+from image_cache import ImageCache, make_image_key
+from image_delivery import ImageDelivery
+
+def post(index, image=None, size=None):
+    return {"platform": "Instagram", "persona": "Young Creatives", "campaign_type": "Course Launch",
+            "brand_tone": "Friendly", "timestamp": "2024-03-04 10:00:00", "char_count": 20, "char_limit": 125,
+            "caption": f"Caption number {index}!", "hashtags": ["#music", "#learn"], "alignment_score": 80,
+            "length_status": "good", "image_key": image.key if image else None, "image_size": size}
+
+@pytest.fixture
+def cache(tmp_path):
+    return ImageCache(tmp_path)
+
+@pytest.fixture
+def image(cache):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (1024, 1024), (120, 40, 200)).save(buffer, format="PNG")
+    key = make_image_key("bundle prompt", "1024x1024", "standard", "dall-e-3")
+    return cache.put(key, buffer.getvalue(), {"prompt": "bundle prompt", "dalle_size": "1024x1024"})
+
+def unzip(posts, cache, **options):
+    return zipfile.ZipFile(io.BytesIO(b"".join(iter_bundle(posts, cache, **options))))
+
+def test_captions_and_manifest_without_images(cache):
+    archive = unzip([post(1), post(2)], cache)
+    assert archive.testzip() is None
+    assert sorted(name for name in archive.namelist() if name.startswith("captions/")) == [
+        "captions/0001_instagram_young_creatives.txt", "captions/0002_instagram_young_creatives.txt"]
+    manifest = json.loads(archive.read("manifest.json"))
+    assert [row["caption"] for row in manifest] == ["Caption number 1!", "Caption number 2!"]
+    assert archive.read("manifest.csv").decode().splitlines()[0].startswith("index,caption_file")
+
+def test_shared_image_is_stored_once(cache, image):
+    archive = unzip([post(1, image), post(2, image)], cache)
+    assert archive.namelist().count(f"images/{image.key}.png") == 1
+    assert archive.read(f"images/{image.key}.png") == image.path.read_bytes()
+    manifest = json.loads(archive.read("manifest.json"))
+    assert manifest[0]["image_files"] == manifest[1]["image_files"]
+
+def test_stored_webp_rendition_is_reused(cache, image):
+    delivered = ImageDelivery(cache).webp(image, "1080x1350")
+    archive = unzip([post(1, image, "1080x1350")], cache)
+    assert archive.read(f"images/{image.key}_1080x1350.webp") == delivered
+    assert f"images/{image.key}_1080x1350.jpg" not in archive.namelist()
+
+def test_missing_rendition_is_rendered_as_jpeg(cache, image):
+    from PIL import Image
+
+    archive = unzip([post(1, image, "1080x1350")], cache)
+    with Image.open(io.BytesIO(archive.read(f"images/{image.key}_1080x1350.jpg"))) as rendition:
+        assert rendition.size == (1080, 1350)
+
+def test_renditions_can_be_left_out(cache, image):
+    names = unzip([post(1, image, "1080x1350")], cache, renditions=False).namelist()
+    assert [name for name in names if name.startswith("images/")] == [f"images/{image.key}.png",
+                                                                    f"images/{image.key}.thumb.jpg"]
+
+def test_estimate_tracks_the_written_size(tmp_path, cache, image):
+    ImageDelivery(cache).webp(image, "1080x1350")
+    posts = [post(i, image, "1080x1350") for i in range(5)]
+    written = write_bundle(posts, tmp_path / "bundle.zip", cache)
+    assert written == (tmp_path / "bundle.zip").stat().st_size
+    estimate = estimate_bundle_bytes(posts, cache)
+    assert written <= estimate < written + 4096 * len(posts) + 4096
+
+def test_images_stream_in_blocks(cache, monkeypatch):
+    import bundle_export
+    import numpy as np
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.fromarray(np.random.default_rng(0).integers(0, 255, (512, 512, 3), dtype=np.uint8)).save(buffer, format="PNG")
+    noisy = cache.put(make_image_key("noise", "1024x1024", "standard", "dall-e-3"), buffer.getvalue(), {"prompt": "noise"})
+    monkeypatch.setattr(bundle_export, "COPY_BLOCK_BYTES", 64 * 1024)
+
+    chunks = list(iter_bundle([post(1, noisy)], cache))
+    assert noisy.path.stat().st_size > 10 * 64 * 1024
+    assert max(len(chunk) for chunk in chunks) < 2 * 64 * 1024
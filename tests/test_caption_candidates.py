@@ -0,0 +1,78 @@
+# test_caption_candidates.py - Parsing best-of-N replies, including ones cut off at max_tokens
+
+import json
+from types import SimpleNamespace
+
+from brand_profiles import get_brand_profile
+from caption_candidates import parse_candidates, parse_platform_captions
+from content_engine import generate_caption_set, parse_caption_response
+from token_budget import CostLedger
+
+def test_complete_json_reply():
+    reply = '```json\n{"captions": ["First option!", "Second option!", "First option!"]}\n```'
+    assert parse_candidates(reply, 3) == ["First option!", "Second option!"]
+
+def test_cut_off_json_keeps_closed_items_only():
+    reply = '{"captions": ["Join the \\"Guitar\\" crew!", "Share your vibe today!", "Start your jour'
+    assert parse_candidates(reply, 3, truncated=True) == ['Join the "Guitar" crew!', "Share your vibe today!"]
+
+def test_cut_off_json_is_never_returned_raw():
+    assert parse_candidates('{"captions": ["Start your jour', 3, truncated=True) == []
+
+def test_truncated_plain_list_drops_the_last_line():
+    reply = "1. Join the crew today!\n2. Share your vibe!\n3. Start your jour"
+    assert parse_candidates(reply, 3, truncated=True) == ["Join the crew today!", "Share your vibe!"]
+    assert len(parse_candidates(reply, 3)) == 3
+
+def test_cut_off_fanout_keeps_completed_platforms():
+    reply = '{"Instagram": "Insta caption!", "Twitter": "Tweet caption!", "TikTok": "Tik'
+    captions = parse_platform_captions(reply, ["Instagram", "Twitter/X", "TikTok"])
+    assert captions == {"Instagram": "Insta caption!", "Twitter/X": "Tweet caption!"}
+
+def test_lone_truncated_caption_is_dropped():
+    assert parse_caption_response("Join the crew", 1, truncated=True) == []
+    assert parse_caption_response("Join the crew today!", 1) == ["Join the crew today!"]
+
+# ==========================================
+# RETRY / FALLBACK ON TRUNCATION
+# ==========================================
+
+def _message(text, stop_reason="end_turn", output_tokens=50):
+    return SimpleNamespace(content=[SimpleNamespace(text=text)], stop_reason=stop_reason,
+                           usage=SimpleNamespace(input_tokens=100, output_tokens=output_tokens))
+
+class ScriptedClient:
+    """messages.create returns the scripted replies in order and records each request"""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.requests = []
+        self.messages = self
+
+    def create(self, **request):
+        self.requests.append(request)
+        return self.replies.pop(0)
+
+def _brief(client, ledger):
+    persona = next(iter(get_brand_profile().personas))
+    return dict(client=client, persona=persona, platform="Instagram", campaign_type="Course Launch",
+                brand_tone="Friendly", course_title="Guitar Basics", n_candidates=3, ledger=ledger)
+
+def test_unusable_truncated_reply_is_retried_with_a_larger_budget():
+    complete = json.dumps({"captions": ["Learn guitar with friends. Join today!", "Start playing now. Sign up!"]})
+    client = ScriptedClient(_message('{"captions": ["Learn gui', "max_tokens", 80), _message(complete))
+    ledger = CostLedger(path=None)
+    result, alternatives = generate_caption_set(**_brief(client, ledger))
+
+    assert client.requests[1]["max_tokens"] == 2 * client.requests[0]["max_tokens"]
+    assert not result.get("fallback")
+    assert result["caption"] in json.loads(complete)["captions"]
+    assert result["output_tokens"] == 130  # both calls are paid for
+    assert ledger.totals()["calls"] == 2
+
+def test_twice_truncated_reply_falls_back_to_a_template():
+    client = ScriptedClient(_message('{"captions": ["Learn gui', "max_tokens"), _message('{"captions": ["Le', "max_tokens"))
+    result, _ = generate_caption_set(**_brief(client, CostLedger(path=None)))
+    assert result["fallback"]
+    assert result["fallback_reason"] == "truncated"
+    assert "Learn gui" not in result["caption"]
@@ -0,0 +1,45 @@
+# test_caption_ranking.py - Best-of-N ranking and swapping in an alternative caption
+
+import pytest
+
+from caption_candidates import rank_candidates
+
+def scorer(table):
+    return lambda caption: {"char_count": len(caption), **table[caption]}
+
+def test_captions_under_the_limit_rank_first():
+    ranked = rank_candidates(["long", "short", "ok"], scorer({
+        "long": {"length_status": "exceeded", "alignment_score": 95},
+        "short": {"length_status": "good", "alignment_score": 60},
+        "ok": {"length_status": "warning", "alignment_score": 90},
+    }))
+    assert [c["caption"] for c in ranked] == ["short", "ok", "long"]
+    assert [c["candidate_index"] for c in ranked] == [1, 2, 0]
+
+def test_alignment_breaks_ties_and_cut_captions_rank_last():
+    ranked = rank_candidates(["a", "b", "c"], scorer({
+        "a": {"length_status": "good", "alignment_score": 70},
+        "b": {"length_status": "good", "alignment_score": 90, "needs_llm_retry": True},
+        "c": {"length_status": "good", "alignment_score": 80},
+    }))
+    assert [c["caption"] for c in ranked] == ["c", "a", "b"]
+
+def test_choosing_an_alternative_updates_the_exported_history(monkeypatch):
+    testing = pytest.importorskip("streamlit.testing.v1")
+    monkeypatch.setenv("CONTENT_SYNTH_BACKEND", "mock")
+    monkeypatch.setenv("CONTENT_SYNTH_MOCK_LATENCY_SCALE", "0")
+    app = testing.AppTest.from_file("../content_synth_app.py", default_timeout=60)
+    app.secrets["ANTHROPIC_API_KEY"] = app.secrets["OPENAI_API_KEY"] = ""
+    app.run()
+    next(button for button in app.button if "GENERATE CAPTION" in button.label).click().run()
+    rejected = app.session_state.generated_caption["caption"]
+    app.session_state.caption_alternatives = [{"caption": "Pick me instead!", "char_count": 16, "length_status": "good",
+                                               "alignment_score": 80, "repair_actions": ""}]
+    app.run()
+    next(button for button in app.button if button.label == "Use this caption").click().run()
+
+    assert not app.exception
+    captions = [entry["caption"] for entry in app.session_state.generation_history]
+    assert "Pick me instead!" in captions
+    assert rejected not in captions
+    assert app.session_state.caption_alternatives[0]["caption"] == rejected
@@ -0,0 +1,64 @@
+# test_caption_repair.py - Grapheme counting and local length repair
+
+import pytest
+
+from caption_repair import grapheme_length, repair_caption, split_graphemes
+
+FAMILY = "\U0001F468\u200d\U0001F469\u200d\U0001F467"  # family emoji - five code points, one character
+FLAG = "\U0001F1EC\U0001F1E7"  # flag - two regional indicators
+THUMBS_DARK = "\U0001F44D\U0001F3FF"  # thumbs up + skin tone
+E_ACUTE = "e\u0301"  # e + combining acute accent
+
+@pytest.mark.parametrize("text, expected", [
+    ("hello", 5),
+    ("line\r\nbreak", 10),
+    (FAMILY, 1),
+    (FLAG, 1),
+    (THUMBS_DARK, 1),
+    (E_ACUTE, 1),
+    (f"caf{E_ACUTE} {FAMILY}{FLAG}", 7),
+])
+def test_grapheme_length_counts_user_perceived_characters(text, expected):
+    assert grapheme_length(text) == expected
+
+def test_caption_within_limit_is_untouched():
+    caption = f"Join us today! {FAMILY}"
+    assert repair_caption(caption, grapheme_length(caption)) == (caption, [], False)
+
+@pytest.mark.parametrize("limit", range(5, 40, 3))
+def test_truncation_never_splits_a_cluster(limit):
+    caption = " ".join([FAMILY, FLAG, THUMBS_DARK, f"caf{E_ACUTE}"] * 10)
+    repaired, actions, _ = repair_caption(caption, limit)
+    assert grapheme_length(repaired) <= limit
+    original = set(split_graphemes(caption))
+    assert all(cluster in original or cluster == "…" for cluster in split_graphemes(repaired))
+
+def test_fillers_go_before_anything_is_cut():
+    caption = "We are really very excited to share this. Join the course today!"
+    repaired, actions, needs_retry = repair_caption(caption, 56)
+    assert repaired == "We are excited to share this. Join the course today!"
+    assert actions == ["filler_removal"]
+    assert not needs_retry
+
+def test_repeated_emoji_are_compacted_first():
+    caption = "Join the course today! " + "\U0001F525" * 6
+    repaired, actions, needs_retry = repair_caption(caption, 24)
+    assert repaired == "Join the course today! \U0001F525"
+    assert actions == ["emoji_compaction"]
+    assert not needs_retry
+
+def test_sentence_trim_keeps_hook_and_cta():
+    caption = ("Big news for creators. Our studio has new gear. The schedule is flexible. "
+               "Sign up through the link in bio!")
+    repaired, actions, needs_retry = repair_caption(caption, 60)
+    assert repaired == "Big news for creators. Sign up through the link in bio!"
+    assert "sentence_trim" in actions
+    assert not needs_retry
+
+def test_word_truncation_asks_for_a_retry():
+    caption = "word " * 40
+    repaired, actions, needs_retry = repair_caption(caption, 30)
+    assert grapheme_length(repaired) <= 30
+    assert repaired.endswith("…")
+    assert actions[-1] == "word_truncation"
+    assert needs_retry
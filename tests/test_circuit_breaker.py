@@ -0,0 +1,122 @@
+# test_circuit_breaker.py - Closed / open / half-open transitions on a controlled clock
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from request_executor import RequestExecutor
+
+class BadRequest(Exception):
+    status_code = 400
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def make_breaker(clock):
+    return CircuitBreaker("caption", window=10, min_calls=4, failure_rate=0.5, slow_call_seconds=2.0,
+                          open_seconds=30.0, clock=clock)
+
+def test_no_verdict_below_min_calls(clock):
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+
+def test_opens_at_the_failure_rate(clock):
+    breaker = make_breaker(clock)
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    breaker.record_failure()  # 2 of 4 bad
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.metrics()["short_circuited"] == 1
+
+def test_slow_successes_count_as_bad(clock):
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_success(5.0)
+    assert breaker.state == OPEN
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.advance(29.9)
+    assert breaker.state == OPEN
+    clock.advance(0.1)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    assert breaker.metrics()["probes"] == 1
+
+def test_successful_probe_closes_with_a_clean_window(clock):
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.advance(30)
+    assert breaker.allow()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.metrics()["bad_rate"] == 0.0
+
+def test_failed_probe_reopens_for_another_period(clock):
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.advance(30)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.metrics()["opened"] == 2
+    assert breaker.metrics()["retry_in_s"] == 30.0
+
+def test_release_frees_the_probe_slot(clock):
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.advance(30)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+# ==========================================
+# WITH THE REQUEST EXECUTOR
+# ==========================================
+
+def test_open_circuit_short_circuits_to_the_fallback(clock):
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    calls = []
+    executor = RequestExecutor(max_workers=2, breakers={"caption": breaker})
+    assert executor.run("caption", calls.append, fallback=lambda reason: reason) == "circuit_open"
+    assert calls == []
+    assert executor.circuit_state("caption") == OPEN
+
+def test_rejected_probe_leaves_the_circuit_half_open(clock):
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.advance(30)
+
+    def rejected(timeout):
+        raise BadRequest()
+
+    executor = RequestExecutor(max_workers=2, breakers={"caption": breaker})
+    with pytest.raises(BadRequest):
+        executor.run("caption", rejected, hedge=False)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
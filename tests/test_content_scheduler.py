@@ -0,0 +1,71 @@
+# test_content_scheduler.py - Posting slot selection respects caps and gaps and pairs strong posts with strong slots
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from content_scheduler import (DAILY_CAPS, POSTING_HOURS, SAME_DAY_SATURATION, day_plans, posting_time_model,
+                               schedule_posts)
+
+START = "2024-03-04"  # a Monday
+
+@pytest.fixture
+def model():
+    rng = np.random.default_rng(11)
+    values = {platform: rng.uniform(10, 100, (7, len(POSTING_HOURS))) for platform in ("Instagram", "Facebook")}
+    return {**values, "_default": rng.uniform(10, 100, (7, len(POSTING_HOURS)))}
+
+def _posts(counts):
+    posts = []
+    for platform, n in counts.items():
+        posts += [{"post_id": f"{platform}-{i}", "platform": platform, "weight": 1 + i / n} for i in range(n)]
+    return posts
+
+def test_day_plans_match_brute_force():
+    values = np.random.default_rng(5).uniform(0, 10, 9)
+    for k, plan in enumerate(day_plans(values, cap=3, min_gap=3), start=1):
+        feasible = [hours for hours in combinations(range(len(values)), k)
+                    if all(b - a >= 3 for a, b in zip(hours, hours[1:]))]
+        assert sum(values[list(plan)]) == pytest.approx(max(sum(values[list(h)]) for h in feasible))
+        ranked = sorted(values[list(plan)], reverse=True)
+        assert list(plan.values()) == pytest.approx([v * SAME_DAY_SATURATION ** r for r, v in enumerate(ranked)])
+
+@pytest.mark.parametrize("min_gap", [2, 3, 5])
+def test_daily_caps_and_minimum_gap_hold(model, min_gap):
+    schedule = schedule_posts(_posts({"Instagram": 30, "TikTok": 40, "LinkedIn": 10}), START, 2, model,
+                              min_gap_hours=min_gap)
+    placed = schedule[schedule["scheduled"]]
+    for (platform, _), day in placed.groupby(["platform", "date"]):
+        assert len(day) <= DAILY_CAPS[platform]
+        assert (np.diff(np.sort(day["hour"].to_numpy(dtype=int))) >= min_gap).all()
+    assert placed["hour"].between(POSTING_HOURS[0], POSTING_HOURS[-1]).all()
+    assert placed["date"].between(pd.Timestamp(START).date(), pd.Timestamp("2024-03-17").date()).all()
+
+def test_posts_beyond_capacity_stay_unscheduled(model):
+    schedule = schedule_posts(_posts({"LinkedIn": 10}), START, 1, model)
+    assert schedule["scheduled"].sum() == 7 * DAILY_CAPS["LinkedIn"]
+    unscheduled = schedule[~schedule["scheduled"]]
+    assert unscheduled["scheduled_at"].isna().all()
+    assert set(unscheduled["post_id"]) == {"LinkedIn-0", "LinkedIn-1", "LinkedIn-2"}  # the weakest posts
+
+def test_strongest_post_gets_the_best_slot(model):
+    schedule = schedule_posts(_posts({"Instagram": 12}), START, 1, model)
+    slot_value = schedule["predicted_engagement"] / schedule["weight"]
+    assert schedule.loc[slot_value.idxmax(), "post_id"] == "Instagram-11"
+    by_weight = schedule.sort_values("weight")
+    assert (np.diff((by_weight["predicted_engagement"] / by_weight["weight"]).to_numpy()) >= -1e-9).all()
+
+def test_caps_can_be_overridden(model):
+    schedule = schedule_posts(_posts({"Instagram": 20}), START, 1, model, daily_caps={"Instagram": 1})
+    assert schedule["scheduled"].sum() == 7
+
+def test_fitted_model_covers_every_weekday_and_hour():
+    from analytics_store import AnalyticsStore
+
+    model = posting_time_model(AnalyticsStore.load().daily)
+    assert {"Instagram", "Facebook", "_default"} <= set(model)
+    for values in model.values():
+        assert values.shape == (7, len(POSTING_HOURS))
+        assert np.isfinite(values).all() and (values > 0).all()
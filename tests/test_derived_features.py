@@ -0,0 +1,56 @@
+# test_derived_features.py - Vectorized derived columns against the pandas reference
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from derived_features import DERIVED_FEATURES, derive_features, required_columns, rolling_mean, verify_shipped_csv
+
+def _with_gaps(rng, n):
+    values = rng.normal(50, 20, n)
+    values[rng.random(n) < 0.2] = np.nan
+    return values
+
+@pytest.mark.parametrize("window", [1, 3, 7])
+def test_rolling_mean_matches_pandas(window):
+    values = _with_gaps(np.random.default_rng(window), 200)
+    expected = pd.Series(values).rolling(window, min_periods=1).mean().to_numpy()
+    np.testing.assert_allclose(rolling_mean(values, window), expected, equal_nan=True)
+
+def test_rolling_mean_restarts_at_each_group():
+    rng = np.random.default_rng(1)
+    groups = np.sort(rng.integers(0, 6, 300))
+    values = _with_gaps(rng, 300)
+    expected = (pd.Series(values).groupby(groups).rolling(7, min_periods=1).mean()
+                .reset_index(level=0, drop=True).sort_index().to_numpy())
+    np.testing.assert_allclose(rolling_mean(values, 7, groups), expected, equal_nan=True)
+
+def test_rolling_mean_of_an_all_missing_window_is_nan():
+    result = rolling_mean(np.array([np.nan, np.nan, 4.0, np.nan]), 2)
+    np.testing.assert_array_equal(result, [np.nan, np.nan, 4.0, 4.0])
+    assert len(rolling_mean(np.array([]), 7)) == 0
+
+def test_multi_client_rows_roll_per_client_in_date_order():
+    rng = np.random.default_rng(3)
+    days = pd.date_range("2024-01-01", periods=40)
+    frame = pd.DataFrame({column: rng.integers(0, 60, 120).astype(float) for column in required_columns()})
+    frame["client"] = np.repeat(["a", "b", "c"], 40)
+    frame["Date"] = np.tile(days, 3)
+    frame = frame.sample(frac=1, random_state=3).reset_index(drop=True)  # shuffled input order
+
+    derived = derive_features(frame, client_column="client")
+    assert list(derived.index) == list(frame.index)
+    ordered = derived.sort_values(["client", "Date"])
+    expected = (ordered.groupby("client")["Web_TotalUsers"].rolling(7, min_periods=1).mean()
+                .reset_index(level=0, drop=True))
+    np.testing.assert_allclose(derived.loc[expected.index, "Web_TotalUsers_7day_avg"], expected)
+
+def test_missing_raw_columns_are_reported():
+    frame = pd.DataFrame({"Date": ["01/01/2024"], "Web_TotalUsers": [3]})
+    with pytest.raises(KeyError, match="Device_mobile"):
+        derive_features(frame)
+
+def test_shipped_csv_is_reproduced():
+    report = verify_shipped_csv()
+    assert set(report) == set(DERIVED_FEATURES)
+    assert {column: result["mismatches"] for column, result in report.items() if result["mismatches"]} == {}
@@ -0,0 +1,81 @@
+# test_engagement_bandit.py - Posterior updates, persistence and selection
+
+import random
+
+import pandas as pd
+import pytest
+
+from engagement_bandit import EngagementBandit, engagement_reward, parse_hashtags
+
+def test_reward_is_one_half_at_the_baseline():
+    assert engagement_reward(100, 100) == 0.5
+    assert engagement_reward(300, 100) == 0.75
+    assert engagement_reward(0, 100) == 0.0
+    assert engagement_reward(0, 0) == 0.5
+
+def test_first_post_is_its_own_baseline():
+    bandit = EngagementBandit()
+    assert bandit.record(80, ["#music"], "hook_benefit_cta") == 0.5
+    assert bandit.arms["hashtag"].params("#music") == (1.5, 1.5)
+
+def test_record_updates_every_arm_of_the_post():
+    bandit = EngagementBandit()
+    bandit.record(100, ["#music"])
+    reward = bandit.record(300, ["#music", "#dance", "#music"], "story", mobile=True)
+    assert reward == pytest.approx(0.75)  # baseline is the running mean (100)
+    assert bandit.arms["hashtag"].params("#dance") == pytest.approx((1.75, 1.25))
+    assert bandit.arms["hashtag"].params("#music") == pytest.approx((2.25, 1.75))  # a repeated tag counts once
+    assert bandit.arms["template"].params("story") == pytest.approx((1.75, 1.25))
+    assert bandit.arms["mobile"].params("include") == pytest.approx((1.75, 1.25))
+    assert bandit.has_data("hashtag", ["#dance"])
+    assert not bandit.has_data("hashtag", ["#unseen"])
+
+def test_state_survives_a_reload(tmp_path):
+    bandit = EngagementBandit.for_tenant("acme", root=tmp_path)
+    bandit.record(50, ["#a"], "story", mobile=False)
+    bandit.record(150, ["#b"])
+    bandit.save()
+
+    reloaded = EngagementBandit.for_tenant("acme", root=tmp_path)
+    assert reloaded.posts == 2
+    assert reloaded.engagement_sum == 200
+    for family in ("hashtag", "template", "mobile"):
+        assert reloaded.arms[family].to_dict() == bandit.arms[family].to_dict()
+
+@pytest.mark.parametrize("strategy", ["thompson", "ucb"])
+def test_selection_prefers_the_engaging_arm(strategy):
+    bandit = EngagementBandit(strategy=strategy)
+    for _ in range(50):
+        bandit.record(500, ["#good"], "winner")
+        bandit.record(10, ["#bad"], "loser")
+    rng = random.Random(7)
+    assert bandit.top_k("hashtag", ["#bad", "#good"], 1, rng) == ["#good"]
+    assert bandit.choose("template", ["loser", "winner"], rng) == "winner"
+    assert bandit.report("template")[0]["arm"] == "winner"
+
+def test_preferred_arm_gets_the_rule_bonus():
+    bandit = EngagementBandit(strategy="ucb")
+    picks = {bandit.choose("template", ["a", "b"], random.Random(seed), preferred="b") for seed in range(20)}
+    assert picks == {"b"}
+
+@pytest.mark.parametrize("cell, tags", [
+    ("['#a', '#b']", ["#a", "#b"]),
+    ("#a #b", ["#a", "#b"]),
+    ("#a, #b, plain", ["#a", "#b"]),
+    ("", []),
+    (None, []),
+])
+def test_parse_hashtags(cell, tags):
+    assert parse_hashtags(cell) == tags
+
+def test_ingest_frame_sums_interactions_and_skips_missing(tmp_path):
+    frame = pd.DataFrame({
+        "hashtags": ["#a #b", "#a", "#c"],
+        "likes": [10, 20, None],
+        "comments": [5, 0, None],
+    })
+    bandit = EngagementBandit(tmp_path / "bandit.json")
+    assert bandit.ingest_frame(frame) == 2
+    assert bandit.posts == 2 and bandit.engagement_sum == 35
+    assert not bandit.has_data("hashtag", ["#c"])
+    assert (tmp_path / "bandit.json").exists()
@@ -0,0 +1,75 @@
+# test_image_generation.py - Cache-first DALL-E calls and checked image downloads
+
+import io
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from image_cache import ImageCache
+from image_generation import create_image, dalle_size
+from request_executor import RequestExecutor
+
+PROMPT = "Photographic portrait of a guitar student on stage"
+
+def png_bytes():
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (30, 120, 200)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+class UrlClient:
+    """images.generate answering with a download URL, counting calls"""
+
+    def __init__(self):
+        self.calls = 0
+        self.images = self
+
+    def generate(self, **_):
+        self.calls += 1
+        return SimpleNamespace(data=[SimpleNamespace(url="https://cdn.example/image.png", b64_json=None)])
+
+def fake_get(*statuses):
+    """requests.get stand-in answering with the given status codes in turn"""
+    remaining = list(statuses)
+
+    def get(url, timeout):
+        response = requests.Response()
+        response.status_code = remaining.pop(0)
+        response.url = url
+        response._content = png_bytes() if response.status_code == 200 else b"<html>AccessDenied</html>"
+        return response
+
+    return get
+
+@pytest.fixture
+def executor():
+    return RequestExecutor(max_workers=4)
+
+@pytest.mark.parametrize("width, height, size", [(1080, 1080, "1024x1024"), (1080, 1350, "1024x1792"),
+                                                 (1200, 628, "1792x1024")])
+def test_dalle_size(width, height, size):
+    assert dalle_size(width, height) == size
+
+def test_cached_image_is_not_generated_again(tmp_path, monkeypatch, executor):
+    monkeypatch.setattr(requests, "get", fake_get(200))
+    cache, client = ImageCache(tmp_path), UrlClient()
+    first = create_image(client, PROMPT, "1024x1024", cache, executor)
+    second = create_image(client, PROMPT, "1024x1024", cache, executor)
+    assert first.key == second.key
+    assert client.calls == 1
+    assert second.path.read_bytes() == png_bytes()
+
+def test_failed_download_is_raised_not_cached(tmp_path, monkeypatch, executor):
+    monkeypatch.setattr(requests, "get", fake_get(403))
+    cache = ImageCache(tmp_path)
+    with pytest.raises(requests.HTTPError):
+        create_image(UrlClient(), PROMPT, "1024x1024", cache, executor)
+    assert not list(cache.keys())
+
+def test_server_error_download_is_retried(tmp_path, monkeypatch, executor):
+    monkeypatch.setattr(requests, "get", fake_get(503, 200))
+    image = create_image(UrlClient(), PROMPT, "1024x1024", ImageCache(tmp_path), executor)
+    assert image.path.read_bytes() == png_bytes()
+    assert executor.metrics()["image_download"]["hedged"] == 1
@@ -0,0 +1,105 @@
+# test_image_similarity.py - Perceptual hashes, prompt matches and a safe on-disk index
+
+import base64
+import io
+import json
+import random
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from image_cache import ImageCache, make_image_key
+from image_generation import create_image
+from image_similarity import BKTree, ImageSimilarityIndex, hamming, image_hashes
+from request_executor import RequestExecutor
+
+def encoded(seed, fmt="PNG", size=256):
+    """A smooth random image (low frequencies dominate, like generated art)"""
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 255, (8, 8, 3), dtype=np.uint8)
+    image = Image.fromarray(coarse).resize((size, size), Image.Resampling.BICUBIC)
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+def cache_image(cache, prompt, seed):
+    key = make_image_key(prompt, "1024x1024", "standard", "dall-e-3")
+    return cache.put(key, encoded(seed), {"prompt": prompt, "dalle_size": "1024x1024"})
+
+PROMPT = "Vibrant modern illustration of young musicians learning guitar together, warm studio light"
+
+def test_reencoded_image_hashes_close_and_other_images_far():
+    phash, dhash = image_hashes(encoded(1))
+    resized_phash, _ = image_hashes(encoded(1, "JPEG", 512))
+    other_phash, other_dhash = image_hashes(encoded(2))
+    assert hamming(phash, resized_phash) <= 10
+    assert hamming(phash, other_phash) > 10
+    assert hamming(dhash, other_dhash) > 10
+
+def test_bk_tree_search_matches_brute_force():
+    rng = random.Random(3)
+    values = [rng.getrandbits(64) for _ in range(300)]
+    tree = BKTree()
+    for key, value in enumerate(values):
+        tree.add(value, key)
+    for query in values[:20]:
+        expected = sorted((hamming(query, value), key) for key, value in enumerate(values) if hamming(query, value) <= 24)
+        assert sorted(tree.search(query, 24)) == expected
+
+def test_similar_prompt_and_near_duplicate(tmp_path):
+    cache = ImageCache(tmp_path)
+    first = cache_image(cache, PROMPT, 1)
+    copy = cache.put(make_image_key(PROMPT + ", soft focus", "1024x1024", "standard", "dall-e-3"),
+                     encoded(1, "JPEG"), {"prompt": PROMPT + ", soft focus", "dalle_size": "1024x1024"})
+    cache_image(cache, "Minimalist line drawing of a mountain lake at dawn", 2)
+    index = ImageSimilarityIndex(cache)
+
+    matches = index.similar_prompts(PROMPT.replace("Vibrant", "Abstract"))
+    assert matches and matches[0]["key"] in (first.key, copy.key)
+    assert "abstract" in matches[0]["differs_in"]
+    assert index.similar_prompts(PROMPT, dalle_size="1792x1024") == []
+    assert [key for _, key in index.near_duplicates(first.key)] == [copy.key]
+    assert index.dedup_report()["duplicates"] == 1
+
+def test_stored_hashes_are_reused_on_reload(tmp_path, monkeypatch):
+    cache = ImageCache(tmp_path)
+    cache_image(cache, PROMPT, 1)
+    ImageSimilarityIndex(cache)
+    monkeypatch.setattr(ImageSimilarityIndex, "_hash_record", staticmethod(lambda handle: pytest.fail("rehashed")))
+    assert len(ImageSimilarityIndex(cache).dedup_report()["groups"]) == 0
+
+def test_concurrent_adds_leave_a_complete_index(tmp_path):
+    cache = ImageCache(tmp_path)
+    index = ImageSimilarityIndex(cache)
+    handles = [cache_image(cache, f"{PROMPT} #{n}", n) for n in range(16)]
+    errors = []
+
+    def add(handle):
+        try:
+            index.add(handle)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=add, args=(handle,)) for handle in handles]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert set(json.loads(index.path.read_text(encoding="utf-8"))) == {handle.key for handle in handles}
+    assert not list(tmp_path.glob("*.tmp"))
+
+class BrokenIndex:
+    def add(self, handle):
+        raise OSError("disk full")
+
+def test_index_failure_does_not_lose_a_paid_image(tmp_path):
+    cache = ImageCache(tmp_path)
+    reply = SimpleNamespace(data=[SimpleNamespace(b64_json=base64.b64encode(encoded(5)))])
+    client = SimpleNamespace(images=SimpleNamespace(generate=lambda **_: reply))
+    image = create_image(client, PROMPT, "1024x1024", cache, RequestExecutor(max_workers=2), BrokenIndex())
+    assert cache.get(image.key) is not None
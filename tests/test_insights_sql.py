@@ -0,0 +1,60 @@
+# test_insights_sql.py - Parameterised insight queries, memoised results and the prompt fallback
+
+import sqlite3
+
+import pytest
+
+from analytics_store import DATA_DIR
+import insights_sql
+from insights_sql import InsightsEngine, build_query, duckdb_available, prompt_insights
+
+BACKENDS = ["sqlite"] + (["duckdb"] if duckdb_available() else [])
+
+def test_filters_become_parameters():
+    sql, params = build_query("engagement_by_hour", limit=3, platform="Instagram", day=None)
+    assert "LOWER(CAST(Platform AS VARCHAR)) = LOWER(?)" in sql
+    assert "Day_of_Week" not in sql.split("WHERE")[1]
+    assert params == ["Instagram"]
+    assert sql.endswith("LIMIT 3")
+
+def test_unknown_filter_is_rejected():
+    with pytest.raises(ValueError, match="does not filter on region"):
+        build_query("engagement_by_day", region="EU")
+
+@pytest.fixture(scope="module", params=BACKENDS)
+def engine(request, tmp_path_factory):
+    """One engine per backend over the shipped data/ (building the tables takes seconds)"""
+    return InsightsEngine(DATA_DIR, tmp_path_factory.mktemp("analytics"), backend=request.param)
+
+def test_results_are_memoised_and_copied(engine):
+    misses = engine.misses
+    first = engine.run("engagement_by_platform")
+    assert first and {"platform", "posts", "avg_engagement"} <= set(first[0])
+    first[0]["platform"] = "changed"
+    hits = engine.hits
+    assert engine.run("engagement_by_platform")[0]["platform"] != "changed"
+    assert (engine.hits - hits, engine.misses - misses) == (1, 1)
+    assert engine.run("posting_times", limit=2, platform="instagram") != engine.run("posting_times")
+
+def test_prompt_insights_lines(engine):
+    lines = prompt_insights("Instagram", engine)
+    assert lines and all(line.startswith("- ") for line in lines)
+    assert any(line.startswith("- Best posting times: ") for line in lines)
+
+def test_changed_data_invalidates_the_results(engine, monkeypatch):
+    engine.run("device_mix")
+    misses = engine.misses
+    changed = {name: mtime + 1 for name, mtime in engine.fingerprint.items()}
+    monkeypatch.setattr(insights_sql, "source_fingerprint", lambda data_dir: changed)
+    engine.run("device_mix")
+    assert engine.misses == misses + 1
+    assert engine.fingerprint == changed
+
+class BrokenEngine:
+    def run(self, *args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+def test_prompt_insights_fall_back_without_data(tmp_path):
+    assert prompt_insights("Instagram", BrokenEngine()) is None
+    with pytest.raises(OSError):
+        InsightsEngine(tmp_path / "missing", tmp_path / "cache", backend="sqlite")
@@ -0,0 +1,43 @@
+# test_model_router.py - Tier selection, escalation order and local rejection rules
+
+from model_router import DEFAULT_ROUTING, ModelRouter
+
+def test_short_limit_uses_first_tier():
+    router = ModelRouter()
+    route = router.route(150)
+    assert route.tier == "fast"
+    assert route.model == DEFAULT_ROUTING["tiers"]["fast"]
+
+def test_long_limit_uses_default_tier():
+    assert ModelRouter().route(2200).tier == "quality"
+
+def test_operation_tier_overrides_char_limit():
+    router = ModelRouter()
+    assert router.route(2200, operation="prewarm").tier == "fast"
+    assert router.route(2200, operation="batch").reason == "batch job"
+
+def test_escalation_follows_order_and_stops_at_top():
+    router = ModelRouter()
+    escalated = router.escalation(router.route(100))
+    assert escalated.tier == "quality"
+    assert escalated.reason == "escalated from fast"
+    assert router.escalation(escalated) is None
+
+def test_rejection_reasons():
+    router = ModelRouter()
+    assert router.rejection_reason({"length_status": "good", "alignment_score": 90}) is None
+    assert router.rejection_reason({"length_status": "warning", "alignment_score": 80}) is None
+    assert router.rejection_reason({"length_status": "over", "alignment_score": 95}) == "length over"
+    assert router.rejection_reason({"length_status": "good", "alignment_score": 60}) == "alignment 60%"
+
+def test_report_counts_acceptance_and_escalations():
+    router = ModelRouter()
+    fast = router.route(100)
+    router.record(fast, 0.2, accepted=False)
+    router.record(router.escalation(fast), 0.8, accepted=True)
+    router.record(fast, 0.4, accepted=True)
+    report = router.report()
+    assert report["fast"]["calls"] == 2
+    assert report["fast"]["acceptance_rate"] == 0.5
+    assert report["quality"]["escalated_in"] == 1
+    assert report["fast"]["p95_ms"] == 400.0
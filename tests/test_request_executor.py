@@ -0,0 +1,110 @@
+# test_request_executor.py - Deadlines, hedging, fallbacks and the breaker verdicts they record
+
+import threading
+import time
+
+import pytest
+
+from circuit_breaker import CircuitBreaker
+from request_executor import Deadline, DeadlineExceeded, RequestExecutor, failure_reason, percentile
+
+class ServerError(Exception):
+    status_code = 503
+
+class BadRequest(Exception):
+    status_code = 400
+
+def scripted(*steps):
+    """fn(timeout) that runs the next step per attempt: (seconds to sleep, value or exception)"""
+    steps = list(steps)
+    lock = threading.Lock()
+    calls = []
+
+    def fn(timeout):
+        with lock:
+            calls.append(timeout)
+            seconds, outcome = steps.pop(0)
+        time.sleep(seconds)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    fn.calls = calls
+    return fn
+
+@pytest.fixture
+def executor():
+    return RequestExecutor(max_workers=4, deadlines={"op": 1.0})
+
+def test_percentile_is_nearest_rank():
+    assert percentile([5, 1, 4, 2, 3], 50) == 3
+    assert percentile([5, 1, 4, 2, 3], 95) == 5
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([], 50) != percentile([], 50)  # nan
+
+@pytest.mark.parametrize("error, reason", [
+    (ServerError(), "server_error"),
+    (type("TooMany", (Exception,), {"status_code": 429})(), "rate_limited"),
+    (TimeoutError(), "timeout"),
+    (ConnectionResetError(), "connection_error"),
+    (BadRequest(), None),
+    (ValueError(), None),
+])
+def test_failure_reason(error, reason):
+    assert failure_reason(error) == reason
+
+def test_fast_call_is_not_hedged(executor):
+    fn = scripted((0, "first"))
+    assert executor.run("op", fn) == "first"
+    assert len(fn.calls) == 1
+    assert executor.metrics()["op"]["hedged"] == 0
+
+def test_slow_call_is_hedged_and_the_duplicate_wins(executor):
+    # No latency history yet: the hedge fires at half the 1 s budget
+    fn = scripted((0.9, "slow"), (0, "hedge"))
+    assert executor.run("op", fn) == "hedge"
+    counts = executor.metrics()["op"]
+    assert (counts["hedged"], counts["hedge_wins"]) == (1, 1)
+
+def test_fast_transient_failure_is_hedged_at_once(executor):
+    fn = scripted((0, ServerError()), (0, "retried"))
+    started = time.monotonic()
+    assert executor.run("op", fn) == "retried"
+    assert time.monotonic() - started < 0.4
+
+def test_unhedged_call_falls_back_on_failure(executor):
+    fn = scripted((0, ServerError()))
+    assert executor.run("op", fn, hedge=False, fallback=lambda reason: reason) == "server_error"
+    assert executor.metrics()["op"]["fallbacks"] == 1
+
+def test_rejected_call_raises_without_a_hedge(executor):
+    fn = scripted((0, BadRequest()))
+    with pytest.raises(BadRequest):
+        executor.run("op", fn, fallback=lambda reason: reason)
+    assert len(fn.calls) == 1
+
+def test_deadline_falls_back_and_discards_the_late_answer(executor):
+    late = []
+    fn = scripted((0.5, "late"), (0.5, "late"))
+    reason = executor.run("op", fn, deadline=Deadline(0.2), fallback=lambda reason: reason, on_discard=late.append)
+    assert reason == "deadline"
+    time.sleep(0.6)
+    assert "late" in late
+
+def test_deadline_without_fallback_raises(executor):
+    with pytest.raises(DeadlineExceeded):
+        executor.run("op", scripted((0.5, "late")), deadline=Deadline(0.1), hedge=False)
+
+# ==========================================
+# BREAKER VERDICTS
+# ==========================================
+
+def test_expired_deadline_records_no_breaker_verdict():
+    breaker = CircuitBreaker("op", min_calls=1)
+    executor = RequestExecutor(max_workers=2, breakers={"op": breaker})
+    fn = scripted()
+    for _ in range(10):
+        assert executor.run("op", fn, deadline=Deadline(0), fallback=lambda reason: reason) == "deadline"
+    assert fn.calls == []
+    assert breaker.state == "closed"
+    assert breaker.metrics()["bad_rate"] == 0.0
@@ -0,0 +1,84 @@
+# test_session_memory.py - Trim order, history floor and registry budgets / expiry
+
+from session_memory import IMAGE_POOL_KEY, SessionMemoryRegistry, deep_sizeof, session_footprint, trim_session
+
+def make_state(history=10, payload=2000):
+    return {
+        "generation_history": [{"caption": "x" * payload, "n": i} for i in range(history)],
+        "caption_alternatives": [{"caption": "y" * payload}],
+        "posting_schedule": [{"slot": "Mon 09:00", "caption": "z" * payload}],
+        "brief": {"platform": "Instagram"},
+    }
+
+class FakePool:
+    def __init__(self, pinned):
+        self.pinned = dict(pinned)
+        self.released = []
+
+    def session_bytes(self, session_id):
+        return self.pinned.get(session_id, 0)
+
+    def release_session(self, session_id):
+        self.released.append(session_id)
+        self.pinned.pop(session_id, None)
+
+def test_deep_sizeof_counts_shared_objects_once():
+    text = "a" * 10_000
+    assert deep_sizeof([text, text]) < 2 * deep_sizeof(text)
+
+def test_released_images_enough_stops_trimming():
+    state = make_state()
+    released = []
+    actions = trim_session(state, 10**9, release_images=lambda: released.append(True))
+    assert actions == ["released pinned images"]
+    assert released and len(state["generation_history"]) == 10
+
+def test_trim_order_and_history_floor():
+    state = make_state()
+    newest = state["generation_history"][-5:]
+    actions = trim_session(state, 0)
+    assert actions == ["cleared caption alternatives", "cleared posting schedule", "dropped 5 oldest history entries"]
+    assert state["caption_alternatives"] == [] and state["posting_schedule"] is None
+    assert state["generation_history"] == newest
+
+def test_trim_drops_only_what_the_target_needs():
+    state = make_state()
+    target = sum(session_footprint(state).values()) - deep_sizeof(state["caption_alternatives"])
+    trim_session(state, target - 1)
+    assert len(state["generation_history"]) >= 9
+
+def test_registry_returns_target_over_session_budget():
+    registry = SessionMemoryRegistry(session_max_bytes=5_000, total_max_bytes=10**9)
+    assert registry.record("small", {"brief": {}}) is None
+    assert registry.record("big", make_state()) == 5_000
+
+def test_registry_counts_pinned_images():
+    pool = FakePool({"s1": 7_000})
+    registry = SessionMemoryRegistry(session_max_bytes=10**9, image_pool=pool)
+    registry.record("s1", {"brief": {}})
+    assert registry.report()["by_key"][IMAGE_POOL_KEY] == 7_000
+
+def test_global_budget_halves_heaviest_session():
+    registry = SessionMemoryRegistry(session_max_bytes=10**9, total_max_bytes=30_000)
+    registry.record("heavy", make_state(history=10))
+    registry.record("light", make_state(history=1))
+    assert registry.report()["pending_trims"] == 1
+    heavy_bytes = registry.report()["top"][0]["bytes"]
+    assert registry.record("heavy", make_state(history=10)) <= heavy_bytes // 2 + 1
+
+def test_enforce_trims_and_rerecords():
+    registry = SessionMemoryRegistry(session_max_bytes=15_000, total_max_bytes=10**9)
+    state = make_state()
+    actions = registry.enforce("s1", state)
+    assert "cleared caption alternatives" in actions
+    assert registry.evictions == 1
+    assert registry.report()["bytes"] < sum(session_footprint(make_state()).values())
+
+def test_idle_sessions_expire_and_release_pins():
+    pool = FakePool({"old": 1_000})
+    registry = SessionMemoryRegistry(idle_ttl_s=60, image_pool=pool)
+    registry.record("old", {"brief": {}}, now=0)
+    registry.record("new", {"brief": {}}, now=61)
+    report = registry.report()
+    assert report["sessions"] == 1 and report["expired"] == 1
+    assert pool.released == ["old"]
@@ -0,0 +1,75 @@
+# test_token_budget.py - Output budgets and the cost ledger's running totals
+
+import pytest
+
+from token_budget import (BATCH_PRICE_FACTOR, MIN_OUTPUT_TOKENS, OBSERVED_WINDOW, CostLedger, caption_call_limits,
+                          estimate_cost, output_token_budget)
+
+SONNET = "claude-sonnet-4-20250514"
+
+def test_budget_follows_the_character_limit():
+    assert output_token_budget(280) < output_token_budget(2200)
+    assert output_token_budget(10) == MIN_OUTPUT_TOKENS
+    assert output_token_budget(280, 3) > 3 * output_token_budget(280)  # plus the JSON wrapper
+
+def test_observed_lengths_widen_the_budget_up_to_twice():
+    base = output_token_budget(280)
+    assert output_token_budget(280, observed_tokens=[base * 1.5] * 10) > base
+    assert output_token_budget(280, observed_tokens=[base * 10] * 10) == 2 * base
+    assert output_token_budget(280, observed_tokens=[base * 10] * 2) == base  # too little history
+
+def test_single_caption_stops_at_hashtags():
+    assert caption_call_limits(280)["stop_sequences"]
+    assert "stop_sequences" not in caption_call_limits(280, 3)
+
+def test_batch_calls_cost_half():
+    assert estimate_cost(SONNET, 1000, 500, BATCH_PRICE_FACTOR) == pytest.approx(estimate_cost(SONNET, 1000, 500) / 2)
+
+def _fill(ledger):
+    ledger.record(SONNET, 1000, 100, session_id="s1", tenant="acme", persona="A", platform="Instagram")
+    ledger.record(SONNET, 1000, 300, session_id="s2", tenant="acme", persona="B", platform="Instagram", n_candidates=3)
+    ledger.record(SONNET, 500, 50, session_id="s3", tenant="other", persona="A", platform="TikTok")
+
+def test_running_totals_per_tenant_and_session(tmp_path):
+    ledger = CostLedger(tmp_path / "ledger.jsonl")
+    _fill(ledger)
+    assert ledger.totals()["calls"] == 3
+    assert ledger.totals(tenant="acme")["output_tokens"] == 400
+    assert ledger.totals(session_id="s3")["input_tokens"] == 500
+    assert ledger.totals(tenant="nobody") == {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0}
+    with pytest.raises(ValueError):
+        ledger.totals(persona="A")
+    with pytest.raises(ValueError):
+        ledger.totals(tenant="acme", session_id="s1")
+
+def test_totals_survive_a_reload_and_breakdown_reads_the_file(tmp_path):
+    ledger = CostLedger(tmp_path / "ledger.jsonl")
+    _fill(ledger)
+    reloaded = CostLedger(tmp_path / "ledger.jsonl")
+    for filters in ({}, {"tenant": "acme"}, {"session_id": "s2"}):
+        assert reloaded.totals(**filters) == ledger.totals(**filters)
+    by_persona = reloaded.breakdown("persona", tenant="acme")
+    assert {persona: totals["calls"] for persona, totals in by_persona.items()} == {"A": 1, "B": 1}
+
+def test_request_id_is_billed_once(tmp_path):
+    ledger = CostLedger(tmp_path / "ledger.jsonl")
+    first = ledger.record(SONNET, 1000, 100, request_id="run:1:1")
+    assert ledger.record(SONNET, 1000, 100, request_id="run:1:1") == first
+    assert CostLedger(tmp_path / "ledger.jsonl").record(SONNET, 1000, 100, request_id="run:1:1") == first
+    assert len((tmp_path / "ledger.jsonl").read_text().splitlines()) == 1
+
+def test_spend_cap_is_checked_per_tenant():
+    ledger = CostLedger(path=None)
+    _fill(ledger)
+    spent = ledger.totals(tenant="acme")["cost_usd"]
+    assert not ledger.would_exceed(None, 100.0)
+    assert ledger.would_exceed(spent + 0.001, 0.002, tenant="acme")
+    assert not ledger.would_exceed(spent + 0.001, 0.002, tenant="other")
+
+def test_observed_output_is_per_caption_and_bounded():
+    ledger = CostLedger(path=None)
+    _fill(ledger)
+    assert ledger.observed_output_tokens("Instagram") == [100, 100]  # 300 tokens over 3 candidates
+    for _ in range(OBSERVED_WINDOW + 50):
+        ledger.record(SONNET, 10, 20, platform="TikTok")
+    assert len(ledger.observed_output_tokens("TikTok")) == OBSERVED_WINDOW
@@ -0,0 +1,225 @@
+# token_budget.py - Pre-call token/cost estimates, per-platform output budgets and a spend ledger
+# Output budgets follow the platform character limit (and observed output lengths) instead of a
+# flat max_tokens, which keeps tail latency down; the ledger tracks spend per session/persona/campaign.
+#
+#   python token_budget.py --by persona --tenant default   spend report from the ledger file
+
+import argparse
+import json
+import math
+import re
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from request_executor import percentile
+
+LEDGER_PATH = Path(".cache") / "cost_ledger.jsonl"
+
+# USD per million tokens (input, output)
+MODEL_PRICES_PER_MTOK = {
+    "claude-sonnet-4-20250514": (3.00, 15.00),
+    "claude-3-5-haiku-20241022": (0.80, 4.00),
+}
+DEFAULT_MODEL = "claude-sonnet-4-20250514"
+BATCH_PRICE_FACTOR = 0.5  # Message Batches are billed at half the list price
+
+CHARS_PER_TOKEN = 3.5      # English marketing copy, Claude tokenizer
+LENGTH_HEADROOM = 1.3      # room for the model to overshoot before local repair trims it
+MIN_OUTPUT_TOKENS = 64
+JSON_OVERHEAD_TOKENS = 12  # {"captions": [...]} wrapper
+JSON_PER_CANDIDATE_TOKENS = 4
+MIN_HISTORY = 5            # observed calls needed before history shapes the budget
+
+# ==========================================
+# TOKEN ESTIMATE
+# ==========================================
+
+_TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+def estimate_tokens(text):
+    """Fast local token estimate (no tokenizer download; within ~10-15% for English copy)"""
+    tokens = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        if piece.isascii():
+            tokens += 1 + (len(piece) - 1) // 6 if piece[0].isalpha() else 1
+        else:
+            tokens += 2  # emoji and non-Latin characters usually cost 1-3 tokens
+    return tokens
+
+def estimate_cost(model, input_tokens, output_tokens, price_factor=1.0):
+    """USD cost of a call at list prices (price_factor=BATCH_PRICE_FACTOR for batch requests)"""
+    input_price, output_price = MODEL_PRICES_PER_MTOK.get(model, MODEL_PRICES_PER_MTOK[DEFAULT_MODEL])
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000 * price_factor
+
+# ==========================================
+# OUTPUT BUDGETS + STOP CONDITIONS
+# ==========================================
+
+def output_token_budget(char_limit, n_candidates=1, observed_tokens=None):
+    """max_tokens for a caption call, derived from the platform character limit.
+
+    observed_tokens (per-caption output tokens from earlier calls) widens the budget to the
+    historical p95 when the model habitually runs long, capped at twice the limit-based budget.
+    """
+    per_caption = math.ceil(char_limit / CHARS_PER_TOKEN * LENGTH_HEADROOM)
+    if observed_tokens and len(observed_tokens) >= MIN_HISTORY:
+        per_caption = min(max(per_caption, math.ceil(percentile(observed_tokens, 95) * 1.1)), per_caption * 2)
+
+    budget = per_caption * n_candidates
+    if n_candidates > 1:
+        budget += JSON_OVERHEAD_TOKENS + JSON_PER_CANDIDATE_TOKENS * n_candidates
+    return max(budget, MIN_OUTPUT_TOKENS)
+
+def stop_sequences(n_candidates=1):
+    """Stop as soon as a single caption starts drifting into hashtags (they are added separately)"""
+    if n_candidates > 1:
+        return []  # JSON output ends naturally; a stop sequence would cut the closing bracket
+    return ["\n\n#", "\n#"]
+
+def caption_call_limits(char_limit, n_candidates=1, observed_tokens=None):
+    """max_tokens / stop_sequences kwargs for client.messages.create"""
+    limits = {"max_tokens": output_token_budget(char_limit, n_candidates, observed_tokens)}
+    sequences = stop_sequences(n_candidates)
+    if sequences:
+        limits["stop_sequences"] = sequences
+    return limits
+
+def fanout_call_limits(char_limits):
+    """max_tokens for one call returning a caption per platform (char_limits) as a JSON object"""
+    per_platform = sum(math.ceil(limit / CHARS_PER_TOKEN * LENGTH_HEADROOM) for limit in char_limits)
+    budget = per_platform + JSON_OVERHEAD_TOKENS + (JSON_PER_CANDIDATE_TOKENS + 4) * len(char_limits)  # + key names
+    return {"max_tokens": max(budget, MIN_OUTPUT_TOKENS)}
+
+# ==========================================
+# COST LEDGER
+# ==========================================
+
+TOTALS_FIELDS = ("tenant", "session_id")  # kept as running totals; other filters read the ledger file
+OBSERVED_WINDOW = 200                      # recent calls per platform/operation feeding output_token_budget
+
+def _empty_totals():
+    return {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0}
+
+def _add_to_totals(totals, entry):
+    totals["calls"] += 1
+    totals["input_tokens"] += entry["input_tokens"]
+    totals["output_tokens"] += entry["output_tokens"]
+    totals["cost_usd"] = round(totals["cost_usd"] + entry["cost_usd"], 6)
+
+class CostLedger:
+    """Append-only record of every model call with running totals per tenant and session.
+
+    Entries are not kept in memory: the JSONL file is the history, read in full only by
+    breakdown() and the report CLI. Spend checks and output budgets use O(1) running totals and a
+    bounded window of recent output lengths.
+    """
+
+    def __init__(self, path=LEDGER_PATH):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._totals = {(): _empty_totals()}  # () overall, (field, value) per TOTALS_FIELDS value
+        self._observed = {}                    # (platform, operation) -> deque of per-caption output tokens
+        self._by_request_id = {}               # replay-safe entries (batch collection)
+        for entry in self._read_entries():
+            self._apply(entry)
+
+    def _read_entries(self):
+        if not self.path or not self.path.exists():
+            return
+        with self.path.open(encoding="utf-8") as ledger_file:
+            for line in ledger_file:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _apply(self, entry):
+        """Fold one entry into the running totals (caller holds the lock, or is __init__)"""
+        _add_to_totals(self._totals[()], entry)
+        for field in TOTALS_FIELDS:
+            _add_to_totals(self._totals.setdefault((field, entry.get(field)), _empty_totals()), entry)
+        window = self._observed.setdefault((entry.get("platform"), entry.get("operation")), deque(maxlen=OBSERVED_WINDOW))
+        window.append(entry["output_tokens"] / max(entry.get("n_candidates", 1), 1))
+        if entry.get("request_id"):
+            self._by_request_id[entry["request_id"]] = entry
+
+    def record(self, model, input_tokens, output_tokens, session_id=None, persona=None, campaign=None,
+               platform=None, tenant="default", n_candidates=1, operation="caption", price_factor=1.0,
+               request_id=None):
+        """Append one call's spend; a request_id already recorded returns its entry instead (safe to replay)"""
+        entry = {
+            "ts": time.time(),
+            "tenant": tenant,
+            "session_id": session_id,
+            "persona": persona,
+            "campaign": campaign,
+            "platform": platform,
+            "operation": operation,
+            "model": model,
+            "n_candidates": n_candidates,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost_usd": round(estimate_cost(model, input_tokens, output_tokens, price_factor), 6),
+        }
+        if request_id:
+            entry["request_id"] = request_id
+        with self._lock:
+            if request_id in self._by_request_id:
+                return self._by_request_id[request_id]
+            self._apply(entry)
+            if self.path:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a", encoding="utf-8") as ledger_file:
+                    ledger_file.write(json.dumps(entry) + "\n")
+        return entry
+
+    def totals(self, **filters):
+        """Calls, tokens and USD overall or for one tenant=/session_id= (other filters: breakdown)"""
+        if len(filters) > 1 or not set(filters) <= set(TOTALS_FIELDS):
+            raise ValueError(f"totals() filters on one of {TOTALS_FIELDS}; use breakdown() for {sorted(filters)}")
+        key = next(iter(filters.items()), ())
+        with self._lock:
+            return dict(self._totals.get(key) or _empty_totals())
+
+    def breakdown(self, field, **filters):
+        """Totals grouped by one field, e.g. breakdown("persona", tenant="default") - reads the whole file"""
+        groups = {}
+        for entry in self._read_entries():
+            if all(entry.get(k) == v for k, v in filters.items()):
+                _add_to_totals(groups.setdefault(entry.get(field), _empty_totals()), entry)
+        return groups
+
+    def would_exceed(self, cap_usd, estimated_cost, **filters):
+        """True if spending estimated_cost would push the filtered total over cap_usd"""
+        if cap_usd is None:
+            return False
+        return self.totals(**filters)["cost_usd"] + estimated_cost > float(cap_usd)
+
+    def observed_output_tokens(self, platform, operation="caption", limit=OBSERVED_WINDOW):
+        """Per-caption output tokens of recent calls for one platform (feeds output_token_budget)"""
+        with self._lock:
+            window = list(self._observed.get((platform, operation), ()))
+        return window[-limit:]
+
+# ==========================================
+# REPORT
+# ==========================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Spend report from the cost ledger")
+    parser.add_argument("--ledger", default=str(LEDGER_PATH))
+    parser.add_argument("--by", default="tenant", help="entry field to group by (tenant, session_id, persona, ...)")
+    parser.add_argument("--tenant", help="only this tenant")
+    args = parser.parse_args(argv)
+
+    filters = {"tenant": args.tenant} if args.tenant else {}
+    groups = CostLedger(args.ledger).breakdown(args.by, **filters)
+    print(f"{args.by:30}{'calls':>8}{'in tok':>10}{'out tok':>10}{'cost $':>10}")
+    for group, totals in sorted(groups.items(), key=lambda item: -item[1]["cost_usd"]):
+        print(f"{str(group):30}{totals['calls']:>8}{totals['input_tokens']:>10}{totals['output_tokens']:>10}"
+              f"{totals['cost_usd']:>10.4f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())